@@ -11,6 +11,7 @@ from app.auth.user_service import UserService
 from app.database.repositories.user_repository import UserRepository
 from app.services.admin_stats_service import AdminStatsService
 from app.utils.exceptions import ValidationError
+from app.utils.llm_telemetry import get_llm_telemetry
 from app.core.dependencies import get_user_service
 
 logger = logging.getLogger(__name__)
@@ -296,3 +297,29 @@ def get_statistics() -> Tuple[Response, int]:
     except Exception as e:
         logger.error(f"Error al obtener estadísticas: {e}", exc_info=True)
         return jsonify({"error": "Error al obtener estadísticas"}), 500
+
+
+@admin_bp.route('/llm-telemetry', methods=['GET'])
+@admin_only
+def get_llm_telemetry_summary() -> Tuple[Response, int]:
+    """
+    Obtiene la telemetría agregada de las llamadas al modelo por etapa (solo admin)
+    
+    Query params:
+        hours: Solo operaciones de las últimas N horas (opcional)
+    
+    Returns:
+        JSON con operaciones, fallos, reintentos, tiempos (modelo, cuota, backoff, p50/p95) y tokens
+    """
+    try:
+        hours = request.args.get('hours', type=float)
+        summary = get_llm_telemetry().summary(since_seconds=hours * 3600 if hours else None)
+        
+        return jsonify({
+            "success": True,
+            "telemetry": summary
+        }), 200
+    
+    except Exception as e:
+        logger.error(f"Error al obtener telemetría del modelo: {e}", exc_info=True)
+        return jsonify({"error": "Error al obtener telemetría del modelo"}), 500
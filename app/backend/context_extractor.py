@@ -2,16 +2,20 @@
 Módulo de Extracción de Contexto Global.
 
 Este componente es responsable de la "Primera Pasada" en la estrategia de generación.
-Su objetivo es leer el documento completo (o una representación significativa) y
+Su objetivo es leer el documento completo (por ventanas en paralelo si es extenso) y
 extraer un "Grafo de Conocimiento" o contexto compartido que evitará que
 el generador de historias trabaje a ciegas (limitación de chunks aislados).
 """
 
 import logging
-import google.generativeai as genai
+from typing import List
+
 from app.core.config import Config
+from app.utils.chunk_executor import ChunkExecutor
+from app.utils.gemini_client import get_gemini_model
 from app.utils.retry_utils import call_with_retry
-from app.backend.story_prompts import GLOBAL_ANALYSIS_PROMPT
+from app.utils.llm_call import governed_generate_content
+from app.backend.story_prompts import GLOBAL_ANALYSIS_PROMPT, GLOBAL_CONTEXT_MERGE_PROMPT, WINDOW_ANALYSIS_PROMPT
 
 logger = logging.getLogger(__name__)
 
@@ -24,8 +28,7 @@ class ContextExtractor:
     def __init__(self):
         self.api_key = Config.GOOGLE_API_KEY
         if self.api_key:
-            genai.configure(api_key=self.api_key)
-            self.model = genai.GenerativeModel(Config.GEMINI_MODEL)
+            self.model = get_gemini_model(api_key=self.api_key)
         else:
             logger.warning("API Key no configurada en ContextExtractor")
             self.model = None
@@ -35,8 +38,12 @@ class ContextExtractor:
         Analiza el documento completo para extraer definiciones, reglas y 
         dependencias globales.
 
+        Un documento que cabe en una ventana se analiza con una sola llamada. Uno más extenso
+        se recorre completo en dos fases: cada ventana se resume en paralelo (map) y los
+        resúmenes se fusionan en un único contexto acotado (reduce).
+
         Args:
-            document_text: Texto completo del documento (o resumen representativo).
+            document_text: Texto completo del documento.
 
         Returns:
             str: Resumen del contexto global formateado.
@@ -44,36 +51,20 @@ class ContextExtractor:
         if not self.model:
             return "Error: Modelo no inicializado por falta de API Key."
 
-        # Protección para ahorro de tokens en documentos masivos durante la fase de análisis
-        # Si es demasiado grande, tomamos inicio y fin, o confiamos en la capacidad del modelo
-        # Por ahora enviamos los primeros 15k caracteres como muestra representativa para contexto global
-        # si es que el documento es inmenso. Ajustable según necesidad.
-        MAX_CONTEXT_ANALYSIS_LENGTH = 30000 
-        text_to_analyze = document_text[:MAX_CONTEXT_ANALYSIS_LENGTH]
-        
-        if len(document_text) > MAX_CONTEXT_ANALYSIS_LENGTH:
-            logger.info(f"Documento extenso. Analizando los primeros {MAX_CONTEXT_ANALYSIS_LENGTH} caracteres para contexto global.")
-
         logger.info("Iniciando extracción de contexto global (Fase 1)...")
-
-        prompt = GLOBAL_ANALYSIS_PROMPT.format(document_text=text_to_analyze)
-
-        def _generate():
-            response = self.model.generate_content(
-                prompt, 
-                request_options={"timeout": Config.GEMINI_TIMEOUT_ANALYSIS}
-            )
-            if not response or not hasattr(response, 'text') or not response.text:
-                raise ValueError("Respuesta vacía al extraer contexto global")
-            return response.text.strip()
+        window_size = max(1000, Config.CONTEXT_WINDOW_SIZE)
 
         try:
-            global_context = call_with_retry(
-                _generate,
-                max_retries=2, # Menos reintentos para esta fase auxiliar
-                retry_delay=1,
-                timeout_base=Config.GEMINI_TIMEOUT_ANALYSIS
-            )
+            if len(document_text) <= window_size:
+                global_context = self._generate(GLOBAL_ANALYSIS_PROMPT.format(document_text=document_text))
+            else:
+                windows = split_into_windows(document_text, window_size)
+                logger.info(f"Documento extenso ({len(document_text)} caracteres). Analizando {len(windows)} ventanas en paralelo.")
+                partial_contexts = self._map_windows(windows)
+                if not partial_contexts:
+                    raise ValueError("Ninguna ventana del documento produjo contexto")
+                global_context = self._reduce(partial_contexts, window_size)
+
             logger.info("Contexto global extraído exitosamente.")
             return global_context
 
@@ -82,3 +73,121 @@ class ContextExtractor:
             # Fallback seguro: Si falla el análisis global, devolvemos cadena vacía
             # para no bloquear el flujo principal, aunque perderemos la inteligencia extra.
             return ""
+
+    def _map_windows(self, windows: List[str]) -> List[str]:
+        """Resume cada ventana en paralelo; las ventanas que fallan se omiten"""
+        total = len(windows)
+
+        def summarize(index: int, window: str) -> str:
+            return self._generate(WINDOW_ANALYSIS_PROMPT.format(
+                window_number=index + 1, total_windows=total, document_text=window
+            ))
+
+        results = ChunkExecutor().map_ordered(summarize, windows, label="ventana", resumable=True)
+        return [result.value for result in results if result.ok and result.value]
+
+    def _reduce(self, partial_contexts: List[str], window_size: int) -> str:
+        """
+        Fusiona los resúmenes parciales en un contexto de tamaño acotado
+
+        Si los resúmenes no caben juntos en una ventana, se fusionan por grupos (en paralelo)
+        hasta que quepan; cada grupo reúne al menos dos resúmenes, así que cada ronda reduce su
+        número. Si una fusión falla se conservan los resúmenes de ese grupo sin fusionar.
+        """
+        while len(partial_contexts) > 1 and len(_join_partials(partial_contexts)) > window_size:
+            groups = _group_by_length(partial_contexts, window_size)
+            logger.info(f"Fusionando {len(partial_contexts)} resúmenes parciales en {len(groups)} grupos")
+            results = ChunkExecutor().map_ordered(
+                lambda _index, group: self._merge(group) if len(group) > 1 else group[0], groups, label="grupo"
+            )
+            partial_contexts = [
+                result.value if result.ok else _join_partials(group)
+                for result, group in zip(results, groups)
+            ]
+
+        if len(partial_contexts) == 1:
+            merged = partial_contexts[0]
+        else:
+            try:
+                merged = self._merge(partial_contexts)
+            except Exception as e:
+                logger.warning(f"No se pudieron fusionar los resúmenes parciales, se usan sin fusionar: {e}")
+                merged = _join_partials(partial_contexts)
+
+        max_length = Config.CONTEXT_MAX_LENGTH
+        if max_length > 0 and len(merged) > max_length:
+            logger.info(f"Contexto global recortado a {max_length} caracteres")
+            merged = merged[:max_length]
+        return merged
+
+    def _merge(self, partial_contexts: List[str]) -> str:
+        return self._generate(GLOBAL_CONTEXT_MERGE_PROMPT.format(partial_contexts=_join_partials(partial_contexts)))
+
+    def _generate(self, prompt: str) -> str:
+        """Llama al modelo con reintentos y devuelve el texto de la respuesta"""
+        def _call():
+            response = governed_generate_content(
+                self.model,
+                prompt,
+                request_options={"timeout": Config.GEMINI_TIMEOUT_ANALYSIS}
+            )
+            if not response or not hasattr(response, 'text') or not response.text:
+                raise ValueError("Respuesta vacía al extraer contexto global")
+            return response.text.strip()
+
+        return call_with_retry(
+            _call,
+            max_retries=2, # Menos reintentos para esta fase auxiliar
+            retry_delay=1,
+            timeout_base=Config.GEMINI_TIMEOUT_ANALYSIS,
+            stage='context'
+        )
+
+
+def split_into_windows(text: str, window_size: int) -> List[str]:
+    """
+    Divide el texto en ventanas de como mucho window_size caracteres
+
+    Cada corte se hace en el último salto de línea del último cuarto de la ventana para no
+    partir párrafos; si no hay ninguno, se corta en el límite.
+
+    Args:
+        text: Texto del documento
+        window_size: Tamaño máximo de ventana
+
+    Returns:
+        List[str]: Ventanas en el orden del documento (cubren todo el texto)
+    """
+    windows = []
+    start = 0
+    while start < len(text):
+        end = min(start + window_size, len(text))
+        if end < len(text):
+            newline = text.rfind('\n', start + window_size * 3 // 4, end)
+            if newline > start:
+                end = newline + 1
+        window = text[start:end].strip()
+        if window:
+            windows.append(window)
+        start = end
+    return windows
+
+
+def _join_partials(partial_contexts: List[str]) -> str:
+    return "\n\n".join(f"[PARTE {index}]\n{context}" for index, context in enumerate(partial_contexts, 1))
+
+
+def _group_by_length(partial_contexts: List[str], limit: int) -> List[List[str]]:
+    """Agrupa resúmenes consecutivos sin superar limit (al menos dos por grupo para avanzar)"""
+    groups: List[List[str]] = []
+    current: List[str] = []
+    length = 0
+    for context in partial_contexts:
+        if len(current) >= 2 and length + len(context) > limit:
+            groups.append(current)
+            current, length = [], 0
+        current.append(context)
+        length += len(context)
+    if current:
+        groups.append(current)
+    return groups
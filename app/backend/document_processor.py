@@ -6,14 +6,22 @@ en chunks manejables.
 """
 
 import logging
-import time
 import re
-from typing import List, Dict
-import google.generativeai as genai
+from typing import List, Dict, Optional
 
 from app.core.config import Config
-from app.utils.document_chunker import DocumentChunker, ChunkingStrategy
+from app.utils.document_chunker import DocumentChunker, ChunkingStrategy, estimate_text_tokens
 from app.utils.retry_utils import call_with_retry
+from app.utils.gemini_client import get_gemini_model
+from app.utils.llm_call import governed_generate_content
+from app.utils.adaptive_timeout import adaptive_timeout
+from app.utils.llm_telemetry import llm_stage
+from app.utils.job_checkpoints import resumable_step
+from app.utils.chunk_executor import ChunkExecutor, healing_executor, split_batches
+from app.utils.stream_parsers import story_stream_handler
+from app.utils.passage_retriever import BM25Index
+from app.utils.progress_events import HEALING_STARTED, PHASE_STARTED, report_progress
+from app.utils.request_packing import pack_segments, story_number
 from app.backend.story_prompts import (
     create_analysis_prompt,
     create_story_generation_prompt,
@@ -27,13 +35,21 @@ def split_document_into_chunks(text: str, max_chunk_size: int = None) -> List[st
     """
     Divide el documento en chunks manejables usando DocumentChunker.
     
+    Sin tamaño explícito (y con CHUNK_BY_TOKENS) el límite es un presupuesto de tokens
+    estimados (Config.STORY_MAX_CHUNK_TOKENS) en lugar de caracteres.
+    
     Args:
         text: Texto del documento a dividir
-        max_chunk_size: Tamaño máximo del chunk (default: Config.STORY_MAX_CHUNK_SIZE)
+        max_chunk_size: Tamaño máximo del chunk en caracteres (default: Config.STORY_MAX_CHUNK_SIZE)
         
     Returns:
         List[str]: Lista de chunks del documento
     """
+    if max_chunk_size is None and Config.CHUNK_BY_TOKENS:
+        chunker = DocumentChunker(strategy=ChunkingStrategy.TOKEN, max_chunk_tokens=Config.STORY_MAX_CHUNK_TOKENS,
+                                  overlap_tokens=Config.CHUNK_OVERLAP_TOKENS)
+        return chunker.split_document_into_chunks(text)
+
     if max_chunk_size is None:
         max_chunk_size = Config.STORY_MAX_CHUNK_SIZE
     
@@ -46,7 +62,9 @@ def process_large_document(
     role: str,
     story_type: str,
     business_context: str = None,
-    skip_healing: bool = False
+    skip_healing: bool = False,
+    on_partial=None,
+    on_progress=None
 ) -> Dict:
     """
     Procesa documentos grandes dividiéndolos en chunks.
@@ -57,6 +75,8 @@ def process_large_document(
         story_type: Tipo de historia
         business_context: Contexto adicional de negocio
         skip_healing: Si se debe omitir la auto-curación
+        on_partial: Callback on_partial('story', historia) para entregar cada historia en cuanto se genera
+        on_progress: Callback on_progress(event, data) para los eventos de progreso (lotes, curación)
         
     Returns:
         dict: Resultado con status y contenido generado
@@ -69,8 +89,7 @@ def process_large_document(
                 "message": "API Key no configurada. Configura GOOGLE_API_KEY en el archivo .env"
             }
 
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel(Config.GEMINI_MODEL)
+        model = get_gemini_model(api_key=api_key)
 
         logger.info("Documento grande detectado. Iniciando análisis por fases...")
 
@@ -81,16 +100,23 @@ def process_large_document(
 
         # Fase 1: Análisis de funcionalidades
         logger.info("Fase 1: Identificando todas las funcionalidades...")
+        report_progress(on_progress, PHASE_STARTED, phase='analysis')
         analysis_prompt = create_analysis_prompt(document_text, role, business_context)
 
-        analysis_response = model.generate_content(
-            analysis_prompt,
-            request_options={"timeout": Config.GEMINI_TIMEOUT_ANALYSIS}
-        )
+        def analyze() -> str:
+            with llm_stage('analysis'):
+                return governed_generate_content(
+                    model,
+                    analysis_prompt,
+                    request_options={"timeout": Config.GEMINI_TIMEOUT_ANALYSIS}
+                ).text
+
+        # Dentro de un job reanudado, el análisis ya hecho no se repite
+        analysis_text = resumable_step('analysis', analyze)
 
         # Extraer lista de funcionalidades
         functionalities = []
-        lines = analysis_response.text.split('\n')
+        lines = analysis_text.split('\n')
         for line in lines:
             if re.match(r'^\d+\.', line.strip()):
                 functionalities.append(line.strip())
@@ -98,34 +124,55 @@ def process_large_document(
         logger.info(f"Identificadas {len(functionalities)} funcionalidades")
 
         # Fase 2: Generar historias por lotes
+        from app.services.text_processor import TextProcessor
+        # Cada lote recibe solo los pasajes del documento relevantes para sus funcionalidades
+        passage_index = BM25Index.from_document(document_text)
         all_stories = []
+        tp = TextProcessor()
         batch_size = Config.STORY_BATCH_SIZE
-        total_batches = (len(functionalities) + batch_size - 1) // batch_size
+        # Lotes adyacentes de funcionalidades cortas comparten una petición (menos viajes y pausas).
+        # La respuesta crece con las historias pedidas, no con la entrada: se acotan ambas
+        lotes_base = [range(start, min(start + batch_size, len(functionalities)))
+                      for start in range(0, len(functionalities), batch_size)]
+        paquetes = pack_segments(
+            lotes_base,
+            lambda lote: sum(estimate_text_tokens(functionalities[k]) for k in lote),
+            Config.STORY_PACK_MAX_TOKENS,
+            Config.REQUEST_PACKING_MAX_SEGMENTS,
+            count=len,
+            max_count=Config.STORY_PACK_MAX_STORIES
+        )
+        rangos = [(paquete[0].start, paquete[-1].stop) for paquete in paquetes]
+        total_batches = len(rangos)
+        if total_batches < len(lotes_base):
+            logger.info(f"{len(lotes_base)} lotes empaquetados en {total_batches} peticiones")
 
-        for batch_num in range(total_batches):
-            # Pacing: Obligar a un respiro entre lotes
-            if batch_num > 0:
-                logger.info("Esperando 5 segundos para respetar cuota RPM...")
-                time.sleep(5)
-                
-            start_idx = batch_num * batch_size
-            end_idx = min((batch_num + 1) * batch_size, len(functionalities))
+        def generar_lote(batch_num, rango):
+            start_idx, end_idx = rango
             batch = functionalities[start_idx:end_idx]
             
             logger.info(f"Generando lote {batch_num + 1}/{total_batches} ({len(batch)} funcionalidades)...")
 
+            reference_text = passage_index.retrieve("\n".join(batch))
             story_prompt = create_story_generation_prompt(
-                functionalities, document_text, role, business_context, start_idx, batch_size
+                functionalities, document_text, role, business_context, start_idx, end_idx - start_idx,
+                reference_text=reference_text
             )
 
+            # Historias ya entregadas en streaming; un reintento no las vuelve a emitir
+            emitted = [0]
+
             # Reintentos con backoff exponencial
             def generate_story_batch():
-                timeout_seconds = Config.GEMINI_TIMEOUT_BASE + (len(all_stories) * Config.GEMINI_TIMEOUT_INCREMENT)
-                response = model.generate_content(story_prompt, request_options={"timeout": timeout_seconds})
+                on_text, finish_stream = story_stream_handler(on_partial, emitted, TextProcessor.MIN_STORY_LENGTH)
+                response = governed_generate_content(
+                    model, story_prompt, on_text=on_text, request_options={"timeout": adaptive_timeout(story_prompt)}
+                )
                 if not response or not hasattr(response, 'text') or not response.text or not response.text.strip():
                     raise ValueError("Respuesta vacía o inválida del modelo")
                 if len(response.text.strip()) <= Config.MIN_RESPONSE_LENGTH:
                     raise ValueError(f"Respuesta demasiado corta ({len(response.text)} caracteres)")
+                finish_stream()
                 return response.text
             
             try:
@@ -135,7 +182,8 @@ def process_large_document(
                     retry_delay=Config.RETRY_DELAY,
                     timeout_base=Config.GEMINI_TIMEOUT_BASE,
                     timeout_increment=Config.GEMINI_TIMEOUT_INCREMENT,
-                    exceptions=(Exception,)
+                    exceptions=(Exception,),
+                    stage='chunk'
                 )
                 
                 # Auto-curación
@@ -144,18 +192,29 @@ def process_large_document(
                         story_text,
                         functionalities,
                         start_idx,
-                        document_text,
-                        model
+                        reference_text or document_text,
+                        model,
+                        on_progress=on_progress
                     )
                 
-                all_stories.append(story_text)
+                return story_text
                 
             except Exception as e:
                 logger.error(f"No se pudo generar el lote {batch_num + 1} después de {Config.MAX_RETRIES} intentos: {e}")
+                return None
+
+        # Los lotes se generan en paralelo (concurrencia acotada) y se unen en orden
+        report_progress(on_progress, PHASE_STARTED, phase='generation', total=total_batches)
+        lotes = ChunkExecutor().map_ordered(
+            generar_lote, rangos, label="lote", on_progress=on_progress,
+            count_items=lambda text: len(tp.split_story_text_into_individual_stories(text)) if text else 0,
+            resumable=True
+        )
+        for resultado in lotes:
+            if resultado.ok and resultado.value:
+                all_stories.append(resultado.value)
 
         # Flatten all_stories into a single list
-        from app.services.text_processor import TextProcessor
-        tp = TextProcessor()
         all_individual_stories = []
         for batch_story_text in all_stories:
             all_individual_stories.extend(tp.split_story_text_into_individual_stories(batch_story_text))
@@ -201,7 +260,8 @@ def _heal_stories_in_batch(
     functionalities: List[str],
     start_idx: int,
     document_text: str,
-    model
+    model,
+    on_progress=None
 ) -> str:
     """
     Realiza auto-curación de historias en un lote.
@@ -212,6 +272,7 @@ def _heal_stories_in_batch(
         start_idx: Índice de inicio del lote
         document_text: Texto del documento original
         model: Modelo de IA para curación
+        on_progress: Callback on_progress(event, data) para informar la curación
         
     Returns:
         str: Texto de historias curadas
@@ -228,32 +289,44 @@ def _heal_stories_in_batch(
     issues_list = []
     
     for idx_s, individual_story in enumerate(individual_stories):
-        # Usar funcionalidad específica como contexto si está disponible
-        validation_context = functionalities[start_idx + idx_s] if start_idx + idx_s < len(functionalities) else document_text[:1000]
+        # Usar funcionalidad específica como contexto si está disponible: por el número de la
+        # historia (un lote empaquetado puede omitir o reordenar alguna) o, si no lo tiene, por posición
+        numero = story_number(individual_story)
+        func_idx = numero - 1 if numero and numero <= len(functionalities) else start_idx + idx_s
+        validation_context = functionalities[func_idx] if func_idx < len(functionalities) else document_text[:1000]
         val_res = validator.semantic_validate_story(individual_story, validation_context)
         if not val_res["is_valid"]:
             failed_indices.append(idx_s)
             issues_list.append(f"Historia {idx_s + 1}: {', '.join(val_res['issues'])}")
     
     if failed_indices:
-        logger.warning(f"  ❌ {len(failed_indices)} historias fallaron validación. Iniciando curación en bloque...")
-        try:
-            stories_to_heal = [individual_stories[idx] for idx in failed_indices]
+        logger.warning(f"  ❌ {len(failed_indices)} historias fallaron validación. Iniciando curación en sub-lotes...")
+        report_progress(on_progress, HEALING_STARTED, count=len(failed_indices))
+        issues_by_index = dict(zip(failed_indices, issues_list))
+
+        def heal_sub_batch(_, batch_indices: List[int]) -> Optional[List[str]]:
+            """Sana un sub-lote; si falla, solo sus historias conservan la versión original"""
             prompt_heal = STORY_HEALING_PROMPT_BATCH.format(
-                batch_issues="\n".join(issues_list),
-                batch_stories="\n\n".join(stories_to_heal),
+                batch_issues="\n".join(issues_by_index[idx] for idx in batch_indices),
+                batch_stories="\n\n".join(individual_stories[idx] for idx in batch_indices),
                 doc_context=document_text[:2000]
             )
-            response_heal = model.generate_content(prompt_heal)
-            if response_heal and response_heal.text:
-                # Re-separar las historias corregidas
-                healed_stories = tp.split_story_text_into_individual_stories(response_heal.text)
-                for j, original_idx in enumerate(failed_indices):
-                    if j < len(healed_stories):
-                        individual_stories[original_idx] = healed_stories[j]
-                logger.info(f"  ✅ Curación en bloque completada para historias.")
-        except Exception as p_e:
-            logger.error(f"  Error al sanar historias en bloque: {p_e}")
+            with llm_stage('healing'):
+                response_heal = governed_generate_content(model, prompt_heal)
+            if not response_heal or not response_heal.text:
+                return None
+            # Re-separar las historias corregidas
+            return tp.split_story_text_into_individual_stories(response_heal.text)
+
+        sub_batches = split_batches(failed_indices, Config.HEALING_BATCH_SIZE)
+        for batch in healing_executor().map_ordered(heal_sub_batch, sub_batches, label="sub-lote de sanación"):
+            if not batch.ok:
+                logger.error(f"  Error al sanar el sub-lote de historias {batch.index + 1}: {batch.error}")
+                continue
+            for j, original_idx in enumerate(sub_batches[batch.index]):
+                if batch.value and j < len(batch.value):
+                    individual_stories[original_idx] = batch.value[j]
+        logger.info(f"  ✅ Curación en sub-lotes completada para historias.")
     
     return "\n\n".join(individual_stories)
 
@@ -24,7 +24,7 @@ class MatrixGenerator(Generator):
         
         Args:
             document_text: Texto del documento
-            parameters: Parámetros (context, flow, user_story, test_types, etc.)
+            parameters: Parámetros (context, flow, user_story, test_types, on_partial, on_progress, etc.)
             
         Returns:
             Dict con el resultado de la generación
@@ -46,7 +46,9 @@ class MatrixGenerator(Generator):
                 user_story, 
                 document_text, 
                 test_types,
-                skip_healing=skip_healing
+                skip_healing=skip_healing,
+                on_partial=parameters.get('on_partial'),
+                on_progress=parameters.get('on_progress')
             )
             
             return {"tool_used": "matrix_generator", "result": result}
@@ -24,7 +24,7 @@ class StoryGenerator(Generator):
         
         Args:
             document_text: Texto del documento
-            parameters: Parámetros (role, business_context, etc.)
+            parameters: Parámetros (role, business_context, on_partial, on_progress, etc.)
             
         Returns:
             Dict con el resultado de la generación
@@ -40,7 +40,9 @@ class StoryGenerator(Generator):
                 role, 
                 "funcionalidad", 
                 business_context,
-                skip_healing=skip_healing
+                skip_healing=skip_healing,
+                on_partial=parameters.get('on_partial'),
+                on_progress=parameters.get('on_progress')
             )
             
             return {"tool_used": "story_generator", "result": result}
@@ -0,0 +1,221 @@
+"""
+Almacén compartido de metadata de creación (createmeta) de Jira
+Responsabilidad única: Reutilizar respuestas de createmeta entre peticiones, usuarios y workers
+
+Las respuestas se indexan por (base_url, proyecto, tipo de issue), expiran según TTL,
+pueden invalidarse ante errores de creación y se cargan una sola vez por clave aunque
+varias peticiones concurrentes las soliciten (single-flight).
+"""
+import json
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from app.core.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class CreatemetaStore:
+    """Caché de proceso (y opcionalmente en BD) para respuestas de createmeta"""
+
+    def __init__(self, ttl_seconds: int = None, persist: bool = None):
+        """
+        Inicializa el almacén
+
+        Args:
+            ttl_seconds: Tiempo de vida de cada entrada (default: Config.JIRA_FIELD_METADATA_CACHE_TTL_SECONDS)
+            persist: Si es True, respalda las entradas en BD para compartirlas entre workers
+                     (default: Config.JIRA_FIELD_METADATA_CACHE_PERSIST)
+        """
+        self._ttl_seconds = ttl_seconds or Config.JIRA_FIELD_METADATA_CACHE_TTL_SECONDS
+        self._persist = Config.JIRA_FIELD_METADATA_CACHE_PERSIST if persist is None else persist
+        self._entries: Dict[str, Dict[str, Any]] = {}  # {cache_key: {'data': ..., 'timestamp': ...}}
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._repository = None
+        self._hits = 0
+        self._misses = 0
+        logger.info(f"CreatemetaStore inicializado con TTL de {self._ttl_seconds}s (persistencia: {self._persist})")
+
+    @staticmethod
+    def build_key(base_url: str, project_key: str, issue_type: Optional[str] = None) -> str:
+        """
+        Construye la clave del almacén
+
+        Args:
+            base_url: URL base de la instancia de Jira
+            project_key: Clave del proyecto
+            issue_type: Nombre del tipo de issue (None = todos los tipos)
+
+        Returns:
+            str: Clave del almacén
+        """
+        return f"{(base_url or '').rstrip('/')}|{project_key}|{issue_type or '*'}"
+
+    def get_or_load(self, base_url: str, project_key: str, issue_type: Optional[str],
+                    loader: Callable[[], Optional[Dict]], use_cache: bool = True) -> Optional[Dict]:
+        """
+        Obtiene la respuesta de createmeta desde el almacén o la carga con `loader`
+
+        Solo una petición por clave ejecuta `loader` a la vez; el resto espera y reutiliza
+        el resultado. Las respuestas None (errores) no se almacenan.
+
+        Args:
+            base_url: URL base de la instancia de Jira
+            project_key: Clave del proyecto
+            issue_type: Nombre del tipo de issue (None = todos los tipos)
+            loader: Función que realiza la petición a Jira
+            use_cache: Si es False, ignora las entradas existentes y recarga
+
+        Returns:
+            Dict con la respuesta de createmeta o None si no se pudo obtener
+        """
+        cache_key = self.build_key(base_url, project_key, issue_type)
+
+        if use_cache:
+            data = self._get_fresh(cache_key)
+            if data is not None:
+                return data
+
+        with self._lock:
+            key_lock = self._key_locks.setdefault(cache_key, threading.Lock())
+
+        with key_lock:
+            # Otra petición pudo haber cargado la entrada mientras esperábamos
+            if use_cache:
+                data = self._get_fresh(cache_key)
+                if data is not None:
+                    return data
+
+            self._misses += 1
+            data = loader()
+            if data is not None:
+                self._set(cache_key, data)
+            return data
+
+    def invalidate(self, base_url: str, project_key: str, issue_type: Optional[str] = None) -> None:
+        """
+        Invalida una entrada (p. ej. tras un error 'field cannot be set' al crear un issue)
+
+        Args:
+            base_url: URL base de la instancia de Jira
+            project_key: Clave del proyecto
+            issue_type: Nombre del tipo de issue (None = entrada de todos los tipos)
+        """
+        cache_key = self.build_key(base_url, project_key, issue_type)
+        with self._lock:
+            self._entries.pop(cache_key, None)
+
+        if self._persist:
+            try:
+                self._get_repository().delete(cache_key)
+            except Exception as e:
+                logger.warning(f"No se pudo invalidar createmeta persistido '{cache_key}': {e}")
+
+        logger.info(f"Createmeta invalidado para '{cache_key}'")
+
+    def clear(self) -> None:
+        """Limpia todas las entradas en memoria"""
+        with self._lock:
+            self._entries.clear()
+        logger.info("CreatemetaStore completamente limpiado")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Obtiene estadísticas del almacén
+
+        Returns:
+            Dict con entradas, aciertos y fallos
+        """
+        return {
+            'total_entries': len(self._entries),
+            'hits': self._hits,
+            'misses': self._misses,
+            'ttl_seconds': self._ttl_seconds,
+            'persist': self._persist
+        }
+
+    def _get_fresh(self, cache_key: str) -> Optional[Dict]:
+        """Retorna la entrada si existe y no ha expirado (memoria primero, luego BD)"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is not None:
+                if now - entry['timestamp'] <= self._ttl_seconds:
+                    self._hits += 1
+                    logger.debug(f"Createmeta hit (memoria) para '{cache_key}'")
+                    return entry['data']
+                del self._entries[cache_key]
+
+        if not self._persist:
+            return None
+
+        try:
+            row = self._get_repository().get(cache_key)
+        except Exception as e:
+            logger.warning(f"No se pudo leer createmeta persistido '{cache_key}': {e}")
+            return None
+
+        if not row:
+            return None
+
+        payload, fetched_at = row
+        if now - fetched_at > self._ttl_seconds:
+            return None
+
+        data = json.loads(payload)
+        with self._lock:
+            self._entries[cache_key] = {'data': data, 'timestamp': fetched_at}
+            self._hits += 1
+        logger.debug(f"Createmeta hit (BD) para '{cache_key}'")
+        return data
+
+    def _set(self, cache_key: str, data: Dict) -> None:
+        """Guarda una entrada en memoria y, si aplica, en BD"""
+        now = time.time()
+        with self._lock:
+            self._entries[cache_key] = {'data': data, 'timestamp': now}
+            if len(self._entries) > 100 and len(self._entries) % 100 == 0:
+                self._cleanup_expired(now)
+
+        if self._persist:
+            try:
+                self._get_repository().save(cache_key, json.dumps(data), now)
+            except Exception as e:
+                logger.warning(f"No se pudo persistir createmeta '{cache_key}': {e}")
+
+        logger.debug(f"Createmeta almacenado para '{cache_key}'")
+
+    def _cleanup_expired(self, now: float) -> None:
+        """Elimina entradas expiradas (se invoca con el lock tomado)"""
+        expired = [k for k, v in self._entries.items() if now - v['timestamp'] > self._ttl_seconds]
+        for k in expired:
+            del self._entries[k]
+
+    def _get_repository(self):
+        """Obtiene el repositorio de BD (import diferido para no acoplar el backend a la BD)"""
+        if self._repository is None:
+            from app.database.repositories.field_metadata_repository import FieldMetadataRepository
+            self._repository = FieldMetadataRepository()
+        return self._repository
+
+
+# Instancia global del almacén (singleton)
+_createmeta_store_instance: Optional[CreatemetaStore] = None
+
+
+def get_createmeta_store() -> CreatemetaStore:
+    """
+    Obtiene la instancia global del almacén de createmeta (singleton)
+
+    Returns:
+        CreatemetaStore: Instancia del almacén
+    """
+    global _createmeta_store_instance
+
+    if _createmeta_store_instance is None:
+        _createmeta_store_instance = CreatemetaStore()
+
+    return _createmeta_store_instance
@@ -1,11 +1,15 @@
 import logging
+from itertools import islice
 from typing import Dict, List, Optional
 from app.backend.jira.connection import JiraConnection
 from app.backend.jira.project_service import ProjectService
 from app.backend.jira.issue_fetcher import IssueFetcher
 from app.backend.jira.field_validator import FieldValidator
-from app.backend.jira.issue_creator import IssueCreator
+from app.backend.jira.dry_run_validator import DryRunValidator
+from app.backend.jira.upload_idempotency import UploadFingerprintIndex, compute_issue_fingerprint
 from app.core.config import Config
+from app.backend.jira.issue_creator import IssueCreator
+from app.utils.exceptions import UploadInProgressError
 
 logger = logging.getLogger(__name__)
 
@@ -29,127 +33,334 @@ class CSVIssueProcessor:
 
     def create_issues_from_csv(self, csv_data: List[Dict], project_key: str, 
                                field_mappings: Dict = None, default_values: Dict = None,
-                               filter_issue_types: bool = True) -> Dict:
+                               filter_issue_types: bool = True, dry_run: bool = False,
+                               job_id: str = None, result_sink=None) -> Dict:
         """
         Crea múltiples issues en Jira desde datos CSV.
         
         Args:
-            csv_data: Lista de diccionarios con datos de las filas del CSV.
+            csv_data: Lista (o iterable, p. ej. un parser en streaming) de diccionarios con las filas del CSV.
             project_key: Clave del proyecto en Jira.
             field_mappings: Mapeo de columnas CSV a campos Jira.
             default_values: Valores por defecto para campos.
             filter_issue_types: Si se deben filtrar los tipos de issue.
+            dry_run: Si es True, solo valida las filas contra createmeta (sin crear issues).
+            job_id: Identificador estable del job de carga. Si se indica, cada issue recibe una
+                    huella y los ya creados en un intento previo del mismo job se omiten.
+            result_sink: Objeto con método add(bucket, entry) que recibe cada resultado
+                         ('created'/'failed') en lugar de acumularlo en memoria.
             
         Returns:
             Dict con resultados de la operación (creados, fallidos, conteos).
+            
+        Raises:
+            UploadInProgressError: Si otra petición está procesando el mismo job_id.
         """
+        total = len(csv_data) if hasattr(csv_data, '__len__') else None
         results = {
             'success': True, 'created': [], 'failed': [],
-            'total': len(csv_data), 'success_count': 0, 'error_count': 0
+            'total': total, 'success_count': 0, 'error_count': 0, 'skipped_count': 0
         }
         
         available_types = self._project_service.get_issue_types(project_key, filter_types=filter_issue_types)
         if not available_types:
             return {
                 'success': False, 'error': 'No se pudieron obtener los tipos de issue del proyecto',
-                'created': [], 'failed': [], 'total': len(csv_data),
-                'success_count': 0, 'error_count': len(csv_data)
+                'created': [], 'failed': [], 'total': total or 0,
+                'success_count': 0, 'error_count': total or 0
             }
         
-        field_schemas_cache = {}
-        available_fields_by_type = {}
+        if dry_run:
+            return self._validate_rows(csv_data, project_key, field_mappings, default_values, available_types)
+        
+        context = {
+            'project_key': project_key,
+            'available_types': available_types,
+            'field_mappings': field_mappings,
+            'default_values': default_values,
+            'field_schemas_cache': {},
+            'available_fields_by_type': {},
+            'fingerprint_index': UploadFingerprintIndex(self._connection, project_key, job_id) if job_id else None,
+            'fingerprint_counts': {},
+            'result_sink': result_sink
+        }
+        
+        fingerprint_index = context['fingerprint_index']
+        if fingerprint_index and not fingerprint_index.claim():
+            raise UploadInProgressError(
+                'La carga ya se está procesando en otra petición; reintenta cuando termine'
+            )
+        
+        logger.info(f"Iniciando carga masiva de {total if total is not None else '(streaming)'} issues al proyecto {project_key}")
+        
+        # Las filas se consumen por lotes, por lo que csv_data puede ser un iterador incremental
+        batch_size = max(Config.JIRA_UPLOAD_BATCH_SIZE, 1)
+        indexed_rows = enumerate(csv_data, start=1)
+        try:
+            while True:
+                batch = list(islice(indexed_rows, batch_size))
+                if not batch:
+                    break
+                self._process_batch(batch, context, results)
+        finally:
+            if fingerprint_index:
+                fingerprint_index.release()
+            self._notify_upload_completed(project_key, results['success_count'] - results['skipped_count'])
+        
+        if total is None:
+            results['total'] = results['success_count'] + results['error_count']
+        results['success'] = results['error_count'] == 0
+        logger.info(f"Carga masiva completada: {results['success_count']}/{results['total']} exitosos")
+        return results
+
+    def _process_batch(self, indexed_rows, context: Dict, results: Dict) -> None:
+        """
+        Prepara un lote de filas, resuelve en una sola consulta cuáles ya fueron creadas
+        (si hay job de idempotencia) y crea el resto.
+        """
+        prepared_rows = []
+        for idx, row in indexed_rows:
+            try:
+                prepared = self._prepare_row(idx, row, context)
+            except Exception as e:
+                logger.error(f"Error al procesar fila {idx}: {str(e)}")
+                prepared = {'row': idx, 'error': str(e), 'summary': row.get('Resumen', row.get('Summary', 'N/A'))}
+            
+            if 'error' in prepared:
+                self._record(results, 'failed', prepared, context)
+                results['error_count'] += 1
+            else:
+                prepared_rows.append(prepared)
+        
+        fingerprint_index = context['fingerprint_index']
+        if fingerprint_index and prepared_rows:
+            fingerprint_index.heartbeat()
+            fingerprint_index.preload(p['fingerprint'] for p in prepared_rows)
+        
+        for prepared in prepared_rows:
+            try:
+                self._create_prepared(prepared, context, results)
+            except Exception as e:
+                logger.error(f"Error al procesar fila {prepared['row']}: {str(e)}")
+                self._record(results, 'failed', {'row': prepared['row'], 'error': str(e), 'summary': prepared['summary']}, context)
+                results['error_count'] += 1
+
+    def _prepare_row(self, idx: int, row: Dict, context: Dict) -> Dict:
+        """
+        Extrae, normaliza y valida una fila. Retorna el issue preparado (con su huella)
+        o un dict con 'error' si la fila no es válida.
+        """
+        project_key = context['project_key']
+        field_mappings = context['field_mappings']
+        available_types = context['available_types']
+        
+        mapped_issue_type = self._extract_issue_type(row, field_mappings)
+        if not mapped_issue_type:
+            mapped_issue_type = 'Story'
+        
+        csv_issue_type = mapped_issue_type
+        
+        summary = self._extract_summary(row, field_mappings)
         
-        logger.info(f"Iniciando carga masiva de {len(csv_data)} issues al proyecto {project_key}")
+        description = row.get('Descripción', row.get('Description', '')).strip()
+        assignee = row.get('Asignado', row.get('Assignee', '')).strip() or None
+        priority = row.get('Prioridad', row.get('Priority', '')).strip() or None
+        labels_str = row.get('Labels', row.get('Etiquetas', '')).strip()
+        labels = [l.strip() for l in labels_str.split(',')] if labels_str else None
+        
+        if not summary:
+            return {'row': idx, 'error': 'El campo "Resumen" o "Summary" es requerido.'}
+        
+        issue_type = FieldValidator.normalize_issue_type(csv_issue_type, available_types)
+        if not issue_type:
+            available_names = ', '.join([it.get('name', '') for it in available_types])
+            error_msg = f'Tipo de issue "{csv_issue_type}" no válido. Tipos disponibles: {available_names}'
+            return {'row': idx, 'error': error_msg, 'summary': summary}
+        
+        custom_fields, description, priority = self._process_custom_fields(
+            row, field_mappings, context['default_values'], description, priority
+        )
+        
+        # Validación de campos
+        available_fields_by_type = context['available_fields_by_type']
+        if issue_type not in available_fields_by_type:
+            available_fields_metadata = self._fetcher.get_available_fields_metadata(project_key, issue_type, use_cache=True)
+            available_fields_by_type[issue_type] = available_fields_metadata
+        else:
+            available_fields_metadata = available_fields_by_type[issue_type]
+        
+        if custom_fields and available_fields_metadata:
+            valid_custom_fields, filtered_fields = FieldValidator.validate_and_filter_custom_fields(
+                custom_fields, available_fields_metadata, idx
+            )
+            if filtered_fields:
+                custom_fields = valid_custom_fields
+        
+        prepared = {
+            'row': idx, 'issue_type': issue_type, 'summary': summary,
+            'description': description if description else None,
+            'assignee': assignee, 'priority': priority, 'labels': labels,
+            'custom_fields': custom_fields if custom_fields else None
+        }
+        
+        if context['fingerprint_index']:
+            content_fingerprint = compute_issue_fingerprint(
+                project_key, issue_type, summary, prepared['description'], assignee,
+                priority, labels, custom_fields
+            )
+            # Filas idénticas dentro de la misma carga siguen siendo issues distintos
+            occurrence = context['fingerprint_counts'].get(content_fingerprint, 0)
+            context['fingerprint_counts'][content_fingerprint] = occurrence + 1
+            prepared['fingerprint'] = compute_issue_fingerprint(
+                project_key, issue_type, summary, prepared['description'], assignee,
+                priority, labels, custom_fields, occurrence=occurrence
+            ) if occurrence else content_fingerprint
+        
+        return prepared
+
+    def _create_prepared(self, prepared: Dict, context: Dict, results: Dict) -> None:
+        """Crea un issue preparado (u omite su creación si ya existe) y registra el resultado."""
+        project_key = context['project_key']
+        idx = prepared['row']
+        issue_type = prepared['issue_type']
+        summary = prepared['summary']
+        fingerprint_index = context['fingerprint_index']
+        labels = prepared['labels']
+        
+        if fingerprint_index:
+            existing_key = fingerprint_index.get_existing_key(prepared['fingerprint'])
+            if existing_key:
+                self._record(results, 'created', {
+                    'row': idx, 'key': existing_key,
+                    'summary': summary, 'issue_type': issue_type, 'skipped': True
+                }, context)
+                results['success_count'] += 1
+                results['skipped_count'] += 1
+                logger.info(f"Fila {idx}: ⏭️ Issue ya creado en un intento previo: {existing_key}")
+                return
+            if fingerprint_index.use_labels:
+                labels = (labels or []) + [fingerprint_index.label_for(prepared['fingerprint'])]
+        
+        # Schemas
+        field_schemas = self._get_field_schemas(project_key, issue_type, context['field_schemas_cache'])
+        
+        issue_result = self._creator.create_issue(
+            project_key=project_key,
+            issue_type=issue_type,
+            summary=summary,
+            description=prepared['description'],
+            assignee=prepared['assignee'],
+            priority=prepared['priority'],
+            labels=labels,
+            custom_fields=prepared['custom_fields'],
+            field_schemas=field_schemas
+        )
+        
+        if issue_result.get('success'):
+            self._record(results, 'created', {
+                'row': idx, 'key': issue_result.get('key'),
+                'summary': summary, 'issue_type': issue_type
+            }, context)
+            results['success_count'] += 1
+            if fingerprint_index:
+                fingerprint_index.record(prepared['fingerprint'], issue_result.get('key'))
+            logger.info(f"Fila {idx}: ✅ Issue creado exitosamente: {issue_result.get('key')}")
+        else:
+            error_msg = issue_result.get('error', 'Error desconocido')
+            self._record(results, 'failed', {'row': idx, 'error': error_msg, 'summary': summary}, context)
+            results['error_count'] += 1
+            logger.error(f"Fila {idx}: ❌ Error al crear issue: {error_msg}")
+            
+            error_lower = error_msg.lower()
+            if any(k in error_lower for k in ['cannot be set', 'not on the appropriate screen', 'unknown field', 'field does not exist']):
+                self._fetcher.invalidate_metadata_cache(f"{project_key}:{issue_type}")
+                context['available_fields_by_type'].pop(issue_type, None)
+                context['field_schemas_cache'].pop(f"{project_key}:{issue_type}", None)
+
+    @staticmethod
+    def _notify_upload_completed(project_key: str, created_count: int) -> None:
+        """Emite el evento de fin de carga para que las métricas en caché del proyecto no queden obsoletas"""
+        if created_count <= 0:
+            return
+        try:
+            from app.services.metrics_cache import get_metrics_cache
+            get_metrics_cache(Config.JIRA_METRICS_CACHE_TTL_HOURS).notify_issues_created(project_key, created_count)
+        except Exception as e:
+            logger.warning(f"No se pudo invalidar el caché de métricas de {project_key}: {e}")
+
+    def _record(self, results: Dict, bucket: str, entry: Dict, context: Dict) -> None:
+        """Registra un resultado en el sink de streaming (si existe) o en la lista en memoria."""
+        sink = context.get('result_sink')
+        if sink is not None:
+            sink.add(bucket, entry)
+        else:
+            results[bucket].append(entry)
+
+    def _validate_rows(self, csv_data: List[Dict], project_key: str, field_mappings: Dict,
+                       default_values: Dict, available_types: List[Dict]) -> Dict:
+        """
+        Valida todas las filas localmente contra createmeta en caché, sin llamadas de creación.
+        
+        Returns:
+            Dict con el reporte completo de errores por fila.
+        """
+        results = {
+            'success': True, 'dry_run': True, 'created': [], 'valid': [], 'failed': [],
+            'total': 0, 'success_count': 0, 'error_count': 0
+        }
+        validator = DryRunValidator(available_types)
+        available_names = ', '.join([it.get('name', '') for it in available_types])
+        
+        logger.info(f"Validando (dry-run) filas para el proyecto {project_key}")
         
         for idx, row in enumerate(csv_data, start=1):
             try:
-                mapped_issue_type = self._extract_issue_type(row, field_mappings)
-                if not mapped_issue_type:
-                    mapped_issue_type = 'Story'
-                
-                csv_issue_type = mapped_issue_type
-                
+                errors = []
+                csv_issue_type = self._extract_issue_type(row, field_mappings) or 'Story'
                 summary = self._extract_summary(row, field_mappings)
-                
                 description = row.get('Descripción', row.get('Description', '')).strip()
                 assignee = row.get('Asignado', row.get('Assignee', '')).strip() or None
                 priority = row.get('Prioridad', row.get('Priority', '')).strip() or None
-                labels_str = row.get('Labels', row.get('Etiquetas', '')).strip()
-                labels = [l.strip() for l in labels_str.split(',')] if labels_str else None
+                labels = row.get('Labels', row.get('Etiquetas', '')).strip() or None
                 
                 if not summary:
-                    error_msg = 'El campo "Resumen" o "Summary" es requerido.'
-                    results['failed'].append({'row': idx, 'error': error_msg})
-                    results['error_count'] += 1
-                    continue
+                    errors.append('El campo "Resumen" o "Summary" es requerido.')
                 
-                issue_type = FieldValidator.normalize_issue_type(csv_issue_type, available_types)
+                issue_type = validator.resolve_issue_type(csv_issue_type)
                 if not issue_type:
-                    available_names = ', '.join([it.get('name', '') for it in available_types])
-                    error_msg = f'Tipo de issue "{csv_issue_type}" no válido. Tipos disponibles: {available_names}'
-                    results['failed'].append({'row': idx, 'error': error_msg, 'summary': summary})
-                    results['error_count'] += 1
-                    continue
-                
-                custom_fields, description, priority = self._process_custom_fields(
-                    row, field_mappings, default_values, description, priority
-                )
-                
-                # Validación de campos
-                if issue_type not in available_fields_by_type:
-                    available_fields_metadata = self._fetcher.get_available_fields_metadata(project_key, issue_type, use_cache=True)
-                    available_fields_by_type[issue_type] = available_fields_metadata
+                    errors.append(f'Tipo de issue "{csv_issue_type}" no válido. Tipos disponibles: {available_names}')
                 else:
-                    available_fields_metadata = available_fields_by_type[issue_type]
-                
-                if custom_fields and available_fields_metadata:
-                    valid_custom_fields, filtered_fields = FieldValidator.validate_and_filter_custom_fields(
-                        custom_fields, available_fields_metadata, idx
+                    custom_fields, description, priority = self._process_custom_fields(
+                        row, field_mappings, default_values, description, priority
                     )
-                    if filtered_fields:
-                        custom_fields = valid_custom_fields
-                
-                # Schemas
-                field_schemas = self._get_field_schemas(project_key, issue_type, field_schemas_cache)
-                
-                issue_result = self._creator.create_issue(
-                    project_key=project_key,
-                    issue_type=issue_type,
-                    summary=summary,
-                    description=description if description else None,
-                    assignee=assignee,
-                    priority=priority,
-                    labels=labels,
-                    custom_fields=custom_fields if custom_fields else None,
-                    field_schemas=field_schemas
-                )
+                    if not validator.has_profile(issue_type):
+                        validator.set_profile(
+                            issue_type,
+                            self._fetcher.get_available_fields_metadata(project_key, issue_type, use_cache=True)
+                        )
+                    provided_fields = dict(custom_fields)
+                    provided_fields.update({
+                        'summary': summary, 'description': description, 'priority': priority,
+                        'assignee': assignee, 'labels': labels
+                    })
+                    errors.extend(validator.validate_row(idx, issue_type, provided_fields))
                 
-                if issue_result.get('success'):
-                    results['created'].append({
-                        'row': idx, 'key': issue_result.get('key'),
-                        'summary': summary, 'issue_type': issue_type
+                if errors:
+                    results['failed'].append({
+                        'row': idx, 'error': '; '.join(errors), 'errors': errors, 'summary': summary
                     })
-                    results['success_count'] += 1
-                    logger.info(f"Fila {idx}: ✅ Issue creado exitosamente: {issue_result.get('key')}")
-                else:
-                    error_msg = issue_result.get('error', 'Error desconocido')
-                    results['failed'].append({'row': idx, 'error': error_msg, 'summary': summary})
                     results['error_count'] += 1
-                    logger.error(f"Fila {idx}: ❌ Error al crear issue: {error_msg}")
-                    
-                    error_lower = error_msg.lower()
-                    if any(k in error_lower for k in ['cannot be set', 'not on the appropriate screen', 'unknown field', 'field does not exist']):
-                         self._fetcher.invalidate_metadata_cache(f"{project_key}:{issue_type}")
-                         if issue_type in available_fields_by_type:
-                            del available_fields_by_type[issue_type]
-                            
+                else:
+                    results['valid'].append({'row': idx, 'summary': summary, 'issue_type': issue_type})
+                    results['success_count'] += 1
             except Exception as e:
-                logger.error(f"Error al procesar fila {idx}: {str(e)}")
-                results['failed'].append({'row': idx, 'error': str(e), 'summary': row.get('Resumen', row.get('Summary', 'N/A'))})
+                logger.error(f"Error al validar fila {idx}: {str(e)}")
+                results['failed'].append({'row': idx, 'error': str(e), 'errors': [str(e)], 'summary': row.get('Resumen', row.get('Summary', 'N/A'))})
                 results['error_count'] += 1
         
+        results['total'] = results['success_count'] + results['error_count']
         results['success'] = results['error_count'] == 0
-        logger.info(f"Carga masiva completada: {results['success_count']}/{results['total']} exitosos")
+        logger.info(f"Dry-run completado: {results['success_count']}/{results['total']} filas válidas")
         return results
 
     def _extract_issue_type(self, row: Dict, field_mappings: Dict) -> Optional[str]:
@@ -205,27 +416,17 @@ class CSVIssueProcessor:
         cache_key = f"{project_key}:{issue_type}"
         if cache_key in field_schemas_cache:
             return field_schemas_cache[cache_key]
-            
-        try:
-            url = f"{self._connection.base_url}/rest/api/3/issue/createmeta?projectKeys={project_key}&issuetypeNames={issue_type}&expand=projects.issuetypes.fields"
-            response = self._connection.session.get(url, timeout=Config.JIRA_TIMEOUT_SHORT)
-            if response.status_code == 200:
-                metadata = response.json()
-                projects = metadata.get('projects', [])
-                if projects and projects[0].get('issuetypes'):
-                    for it in projects[0]['issuetypes']:
-                        if it.get('name', '').lower() == issue_type.lower():
-                            fields = it.get('fields', {})
-                            field_schemas = {}
-                            for field_id, field_info in fields.items():
-                                field_schemas[field_id] = {
-                                    'schema': field_info.get('schema', {}),
-                                    'allowedValues': field_info.get('allowedValues', [])
-                                }
-                            field_schemas_cache[cache_key] = field_schemas
-                            return field_schemas
-            field_schemas_cache[cache_key] = None
-        except Exception:
-            field_schemas_cache[cache_key] = None
-            
-        return None
+        
+        # Deriva de la misma metadata (createmeta compartido) usada para validar campos
+        available_fields = self._fetcher.get_available_fields_metadata(project_key, issue_type, use_cache=True)
+        field_schemas = None
+        if available_fields:
+            field_schemas = {
+                field_id: {
+                    'schema': field_info.get('schema', {}),
+                    'allowedValues': field_info.get('allowedValues', [])
+                }
+                for field_id, field_info in available_fields.items()
+            }
+        field_schemas_cache[cache_key] = field_schemas
+        return field_schemas
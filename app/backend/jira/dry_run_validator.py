@@ -0,0 +1,180 @@
+"""
+Validación offline (dry-run) de cargas masivas
+Responsabilidad única: Validar filas contra createmeta en caché sin crear issues en Jira
+"""
+import logging
+from typing import Dict, List, Optional, Set
+
+from app.backend.jira.field_validator import FieldValidator
+from app.backend.jira.field_strategies.option_strategy import OptionFieldStrategy
+
+logger = logging.getLogger(__name__)
+
+# Campos que Jira completa por sí mismo o que la carga masiva siempre envía
+IMPLICIT_FIELDS = {'project', 'issuetype', 'reporter'}
+
+
+class DryRunValidator:
+    """
+    Valida filas de una carga masiva usando mapas de búsqueda precalculados.
+
+    Los mapas (tipos de issue normalizados y perfiles de campos por tipo) se construyen
+    una sola vez por carga, de modo que cada fila se valida con búsquedas O(1).
+    """
+
+    def __init__(self, available_types: List[Dict]):
+        """
+        Inicializa el validador
+
+        Args:
+            available_types: Tipos de issue disponibles en el proyecto
+        """
+        self._available_types = available_types
+        self._issue_type_lookup: Dict[str, Optional[str]] = {}
+        self._profiles: Dict[str, Optional[Dict]] = {}
+
+    def resolve_issue_type(self, csv_type: str) -> Optional[str]:
+        """
+        Normaliza el tipo de issue memorizando el resultado por valor del CSV
+
+        Args:
+            csv_type: Tipo de issue tal como viene en el CSV
+
+        Returns:
+            Nombre exacto del tipo en Jira o None si no es válido
+        """
+        key = (csv_type or '').strip().lower()
+        if key not in self._issue_type_lookup:
+            self._issue_type_lookup[key] = FieldValidator.normalize_issue_type(csv_type, self._available_types)
+        return self._issue_type_lookup[key]
+
+    def has_profile(self, issue_type: str) -> bool:
+        """Indica si ya se construyó el perfil de campos para un tipo de issue"""
+        return issue_type in self._profiles
+
+    def set_profile(self, issue_type: str, available_fields_metadata: Optional[Dict]) -> None:
+        """
+        Construye el perfil de validación de un tipo de issue a partir de su metadata
+
+        Args:
+            issue_type: Nombre del tipo de issue
+            available_fields_metadata: Metadata de campos (IssueFetcher.get_available_fields_metadata)
+        """
+        self._profiles[issue_type] = self.build_profile(available_fields_metadata) if available_fields_metadata else None
+
+    @staticmethod
+    def build_profile(available_fields_metadata: Dict) -> Dict:
+        """
+        Precalcula los mapas de búsqueda para un tipo de issue
+
+        Args:
+            available_fields_metadata: Metadata de campos por field_id
+
+        Returns:
+            Dict con 'metadata', 'allowed' ({field_id: set de valores en minúsculas}),
+            'required' (campos requeridos sin valor por defecto) y 'names'
+        """
+        allowed: Dict[str, Set[str]] = {}
+        required: Set[str] = set()
+        names: Dict[str, str] = {}
+
+        for field_id, field_info in available_fields_metadata.items():
+            names[field_id] = field_info.get('name', field_id)
+
+            values = set()
+            for av in field_info.get('allowedValues') or []:
+                if isinstance(av, dict):
+                    for attr in ('value', 'name'):
+                        if av.get(attr):
+                            values.add(str(av[attr]).lower())
+                elif isinstance(av, str):
+                    values.add(av.lower())
+            if values:
+                allowed[field_id] = values
+
+            if field_info.get('required') and not field_info.get('hasDefaultValue') and field_id not in IMPLICIT_FIELDS:
+                required.add(field_id)
+
+        return {
+            'metadata': available_fields_metadata,
+            'allowed': allowed,
+            'required': required,
+            'names': names
+        }
+
+    def validate_row(self, idx: int, issue_type: str, provided_fields: Dict) -> List[str]:
+        """
+        Valida los campos de una fila contra el perfil de su tipo de issue
+
+        Args:
+            idx: Número de fila (1-based)
+            issue_type: Tipo de issue ya normalizado
+            provided_fields: Campos con valor {field_id: valor}, incluyendo campos del sistema
+                             (summary, description, priority, assignee, labels)
+
+        Returns:
+            Lista de mensajes de error (vacía si la fila es válida). Sin metadata del tipo
+            de issue la fila no se puede validar y se reporta como error, no como válida.
+        """
+        profile = self._profiles.get(issue_type)
+        if not profile:
+            return [f"No se pudo obtener la metadata (createmeta) del tipo {issue_type}; la fila no fue validada"]
+
+        errors = []
+        system_fields = {'summary', 'description', 'priority', 'assignee', 'labels'}
+        custom_fields = {k: v for k, v in provided_fields.items() if k not in system_fields}
+
+        # Campos desconocidos o de solo lectura
+        valid_fields, filtered_fields = FieldValidator.validate_and_filter_custom_fields(
+            custom_fields, profile['metadata'], idx
+        )
+        for field_id in filtered_fields:
+            if field_id in profile['metadata']:
+                errors.append(f"Campo '{profile['names'].get(field_id, field_id)}' ({field_id}) es de solo lectura")
+            else:
+                errors.append(f"Campo '{field_id}' no existe en la pantalla de creación de {issue_type}")
+
+        # Valores permitidos
+        candidates = dict(valid_fields)
+        if provided_fields.get('priority'):
+            candidates['priority'] = provided_fields['priority']
+        for field_id, value in candidates.items():
+            allowed = profile['allowed'].get(field_id)
+            if not allowed or value is None:
+                continue
+            invalid = self._invalid_values(field_id, str(value), allowed, profile['metadata'].get(field_id, {}))
+            if invalid:
+                errors.append(
+                    f"Valor(es) no permitido(s) para '{profile['names'].get(field_id, field_id)}': {', '.join(invalid)}"
+                )
+
+        # Campos requeridos
+        missing = [
+            profile['names'].get(field_id, field_id)
+            for field_id in sorted(profile['required'])
+            if not provided_fields.get(field_id)
+        ]
+        if missing:
+            errors.append(f"Campos requeridos sin valor: {', '.join(missing)}")
+
+        return errors
+
+    @staticmethod
+    def _invalid_values(field_id: str, value: str, allowed: Set[str], field_info: Dict) -> List[str]:
+        """Retorna los valores que no existen en allowedValues (mismas reglas que las estrategias de formateo)"""
+        schema = field_info.get('schema', {}) or {}
+        if schema.get('type') == 'array':
+            values = [v.strip() for v in value.split(',') if v.strip()]
+        else:
+            values = [value.strip()] if value.strip() else []
+
+        invalid = [v for v in values if v.lower() not in allowed]
+
+        # OptionFieldStrategy recurre a un valor por defecto cuando el original no existe
+        if invalid and schema.get('type') == 'option':
+            field_id_lower = field_id.lower()
+            for key, default in OptionFieldStrategy.DEFAULT_VALUES_MAP.items():
+                if key in field_id_lower and default.lower() in allowed:
+                    return []
+
+        return invalid
@@ -2,6 +2,8 @@ import logging
 from typing import Dict, List, Optional
 from app.backend.jira.connection import JiraConnection
 from app.backend.jira.cache_manager import FieldMetadataCache
+from app.backend.jira.createmeta_store import get_createmeta_store
+from app.backend.jira.project_fetcher import ProjectFetcher
 from app.core.config import Config
 
 logger = logging.getLogger(__name__)
@@ -46,6 +48,7 @@ class IssueFetcher:
     def __init__(self, connection: JiraConnection, cache: FieldMetadataCache = None):
         self._connection = connection
         self._field_metadata_cache = cache or FieldMetadataCache()
+        self._project_fetcher = ProjectFetcher(connection)
 
     def get_issues_by_type(self, project_key: str, issue_type: str, max_results: int = None) -> List[Dict]:
         """
@@ -231,18 +234,10 @@ class IssueFetcher:
                 return cached_data
         
         try:
-            logger.info(f"Obteniendo metadata de campos para {cache_key} desde Jira API...")
-            url = f"{self._connection.base_url}/rest/api/3/issue/createmeta"
-            params = {
-                'projectKeys': project_key,
-                'issuetypeNames': issue_type,
-                'expand': 'projects.issuetypes.fields'
-            }
+            # createmeta se comparte entre peticiones y workers vía CreatemetaStore
+            metadata = self._project_fetcher.fetch_createmeta(project_key, issue_type, use_cache=use_cache)
             
-            response = self._connection.session.get(url, params=params, timeout=Config.JIRA_TIMEOUT_SHORT)
-            
-            if response.status_code == 200:
-                metadata = response.json()
+            if metadata is not None:
                 projects = metadata.get('projects', [])
                 
                 if projects and projects[0].get('issuetypes'):
@@ -255,6 +250,7 @@ class IssueFetcher:
                                 available_fields[field_id] = {
                                     'name': field_info.get('name', ''),
                                     'required': field_info.get('required', False),
+                                    'hasDefaultValue': field_info.get('hasDefaultValue', False),
                                     'schema': field_info.get('schema', {}),
                                     'operations': field_info.get('operations', []),
                                     'allowedValues': field_info.get('allowedValues', [])
@@ -267,7 +263,7 @@ class IssueFetcher:
                 logger.warning(f"No se encontró metadata para {cache_key} en la respuesta de Jira")
                 return None
             else:
-                logger.error(f"Error al obtener metadata para {cache_key}: {response.status_code} - {response.text}")
+                logger.error(f"Error al obtener metadata para {cache_key} desde createmeta")
                 return None
                 
         except Exception as e:
@@ -275,4 +271,7 @@ class IssueFetcher:
             return None
             
     def invalidate_metadata_cache(self, cache_key: str):
-         self._field_metadata_cache.invalidate(cache_key)
+        """Invalida la metadata local y la respuesta createmeta compartida ('PROYECTO:Tipo')"""
+        self._field_metadata_cache.invalidate(cache_key)
+        project_key, _, issue_type = cache_key.partition(':')
+        get_createmeta_store().invalidate(self._connection.base_url, project_key, issue_type or None)
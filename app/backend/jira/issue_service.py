@@ -83,10 +83,12 @@ class IssueService:
     
     def create_issues_from_csv(self, csv_data: List[Dict], project_key: str, 
                                field_mappings: Dict = None, default_values: Dict = None,
-                               filter_issue_types: bool = True) -> Dict:
-        """Crea múltiples issues en Jira desde datos CSV"""
+                               filter_issue_types: bool = True, dry_run: bool = False,
+                               job_id: str = None, result_sink=None) -> Dict:
+        """Crea múltiples issues en Jira desde datos CSV (o solo los valida si dry_run=True)"""
         return self._csv_processor.create_issues_from_csv(
-            csv_data, project_key, field_mappings, default_values, filter_issue_types
+            csv_data, project_key, field_mappings, default_values, filter_issue_types, dry_run, job_id,
+            result_sink=result_sink
         )
         
     def normalize_issue_type(self, csv_type: str, available_types: List[Dict]) -> Optional[str]:
@@ -299,13 +299,17 @@ class JiraClient:
     
     def create_issues_from_csv(self, csv_data: List[Dict], project_key: str,
                               field_mappings: Dict = None, default_values: Dict = None,
-                              filter_issue_types: bool = True) -> Dict:
-        """Crea múltiples issues en Jira desde datos CSV"""
+                              filter_issue_types: bool = True, dry_run: bool = False,
+                              job_id: str = None, result_sink=None) -> Dict:
+        """Crea múltiples issues en Jira desde datos CSV (o solo los valida si dry_run=True)"""
         return self._issue_service.create_issues_from_csv(
             csv_data=csv_data,
             project_key=project_key,
             field_mappings=field_mappings,
             default_values=default_values,
-            filter_issue_types=filter_issue_types
+            filter_issue_types=filter_issue_types,
+            dry_run=dry_run,
+            job_id=job_id,
+            result_sink=result_sink
         )
 
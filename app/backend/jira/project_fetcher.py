@@ -4,6 +4,7 @@ Componente para realizar peticiones HTTP a Jira relacionadas con proyectos
 import logging
 from typing import Dict, List, Optional
 from app.backend.jira.connection import JiraConnection
+from app.backend.jira.createmeta_store import get_createmeta_store
 from app.core.config import Config
 
 logger = logging.getLogger(__name__)
@@ -111,8 +112,18 @@ class ProjectFetcher:
             logger.warning(f"Error al obtener todos los campos: {str(e)}")
             return None
 
-    def fetch_createmeta(self, project_key: str, issue_type_names: Optional[str] = None) -> Optional[Dict]:
-        """Obtiene metadatos de creación (createmeta)"""
+    def fetch_createmeta(self, project_key: str, issue_type_names: Optional[str] = None, use_cache: bool = True) -> Optional[Dict]:
+        """Obtiene metadatos de creación (createmeta) a través del almacén compartido"""
+        return get_createmeta_store().get_or_load(
+            self._connection.base_url,
+            project_key,
+            issue_type_names,
+            lambda: self._request_createmeta(project_key, issue_type_names),
+            use_cache=use_cache
+        )
+
+    def _request_createmeta(self, project_key: str, issue_type_names: Optional[str] = None) -> Optional[Dict]:
+        """Realiza la petición HTTP de createmeta"""
         try:
             url = f"{self._connection.base_url}/rest/api/3/issue/createmeta?projectKeys={project_key}&expand=projects.issuetypes.fields"
             if issue_type_names:
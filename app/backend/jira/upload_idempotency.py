@@ -0,0 +1,262 @@
+"""
+Idempotencia de cargas masivas mediante huellas (fingerprints) de contenido
+Responsabilidad única: Evitar issues duplicados cuando una carga se reintenta
+
+Cada issue preparado recibe una huella estable (SHA256 de su contenido canónico). Las huellas
+se guardan junto al job de carga y la clave creada, de modo que un reintento del mismo job
+omite los issues que ya existen. Opcionalmente la huella (combinada con el job) se añade como
+label en Jira y se consulta en lote por JQL, lo que cubre issues creados cuyo registro local se
+perdió (p. ej. timeout después de que Jira ya respondiera 201).
+
+El job lo identifica la clave de idempotencia que el cliente genera por cada carga, así que
+volver a subir el mismo contenido a propósito crea issues nuevos. Las huellas se conservan solo
+durante la ventana de reintentos (JIRA_UPLOAD_FINGERPRINT_RETENTION_HOURS).
+
+Antes de crear nada el job se reserva (claim) en BD: si el cliente reintenta mientras la
+petición original sigue en curso, el reintento se rechaza en lugar de crear los mismos issues
+en paralelo. La reserva se mantiene con latidos y se considera abandonada si deja de recibirlos
+durante JIRA_UPLOAD_JOB_STALE_SECONDS.
+"""
+import hashlib
+import json
+import logging
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional
+
+from app.backend.jira.connection import JiraConnection
+from app.core.config import Config
+
+logger = logging.getLogger(__name__)
+
+FINGERPRINT_LABEL_PREFIX = 'nexus-fp-'
+LABEL_LOOKUP_BATCH_SIZE = 50
+HEARTBEAT_INTERVAL_SECONDS = 15
+
+
+def compute_issue_fingerprint(project_key: str, issue_type: str, summary: str, description: Optional[str] = None,
+                              assignee: Optional[str] = None, priority: Optional[str] = None,
+                              labels: Optional[List[str]] = None, custom_fields: Optional[Dict] = None,
+                              occurrence: int = 0) -> str:
+    """
+    Calcula la huella estable de un issue preparado
+
+    Args:
+        project_key: Clave del proyecto
+        issue_type: Tipo de issue normalizado
+        summary: Resumen
+        description: Descripción
+        assignee: Asignado
+        priority: Prioridad
+        labels: Etiquetas
+        custom_fields: Campos personalizados {field_id: valor}
+        occurrence: Número de filas idénticas previas en la misma carga (para no fusionarlas)
+
+    Returns:
+        str: Huella hexadecimal SHA256
+    """
+    canonical = {
+        'project': project_key,
+        'issuetype': (issue_type or '').strip().lower(),
+        'summary': (summary or '').strip(),
+        'description': (description or '').strip(),
+        'assignee': (assignee or '').strip().lower(),
+        'priority': (priority or '').strip().lower(),
+        'labels': sorted(l for l in (labels or []) if l),
+        'custom_fields': {k: str(v).strip() for k, v in (custom_fields or {}).items() if v not in (None, '')},
+        'occurrence': occurrence
+    }
+    payload = json.dumps(canonical, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def fingerprint_label(fingerprint: str, job_id: Optional[str] = None) -> str:
+    """
+    Label de Jira que identifica la huella dentro de un job (Jira no admite espacios en labels)
+
+    Con job_id el label solo coincide en reintentos del mismo job, no en una carga nueva
+    con el mismo contenido.
+    """
+    if job_id:
+        fingerprint = hashlib.sha256(f"{job_id}:{fingerprint}".encode('utf-8')).hexdigest()
+    return f"{FINGERPRINT_LABEL_PREFIX}{fingerprint[:24]}"
+
+
+class UploadFingerprintIndex:
+    """Índice de huellas de un job de carga: local (BD) y opcionalmente por labels en Jira"""
+
+    def __init__(self, connection: JiraConnection, project_key: str, job_id: str,
+                 use_labels: bool = None, repository=None):
+        """
+        Inicializa el índice
+
+        Args:
+            connection: Conexión con Jira (para la búsqueda por labels)
+            project_key: Clave del proyecto
+            job_id: Identificador estable del job de carga (igual en cada reintento)
+            use_labels: Si es True, etiqueta los issues con su huella y los busca por JQL
+                        (default: Config.JIRA_UPLOAD_FINGERPRINT_LABELS)
+            repository: Repositorio de huellas (default: UploadFingerprintRepository)
+        """
+        self._connection = connection
+        self._project_key = project_key
+        self._job_id = job_id
+        self._use_labels = Config.JIRA_UPLOAD_FINGERPRINT_LABELS if use_labels is None else use_labels
+        self._repository = repository
+        self._known: Dict[str, str] = {}
+        self._purged = False
+        self._owner = uuid.uuid4().hex
+        self._claimed = False
+        self._last_heartbeat = 0.0
+
+    @property
+    def use_labels(self) -> bool:
+        """Indica si las huellas se añaden como labels en Jira"""
+        return self._use_labels
+
+    def claim(self) -> bool:
+        """
+        Reserva el job para esta petición
+
+        Returns:
+            bool: False si otra petición está procesando el mismo job
+        """
+        stale_before = time.time() - Config.JIRA_UPLOAD_JOB_STALE_SECONDS
+        try:
+            self._claimed = self._get_repository().claim_job(self._job_id, self._project_key, self._owner, stale_before)
+        except Exception as e:
+            # Sin BD no hay reserva posible: se continúa como antes de existir la reserva
+            logger.warning(f"No se pudo reservar el job de carga {self._job_id}: {e}")
+            return True
+        if self._claimed:
+            self._last_heartbeat = time.time()
+        else:
+            logger.warning(f"Job de carga {self._job_id} ya en curso en otra petición")
+        return self._claimed
+
+    def heartbeat(self) -> None:
+        """Renueva la reserva del job (como mucho una vez cada HEARTBEAT_INTERVAL_SECONDS)"""
+        if not self._claimed or time.time() - self._last_heartbeat < HEARTBEAT_INTERVAL_SECONDS:
+            return
+        self._last_heartbeat = time.time()
+        try:
+            self._get_repository().heartbeat_job(self._job_id, self._owner)
+        except Exception as e:
+            logger.warning(f"No se pudo renovar la reserva del job {self._job_id}: {e}")
+
+    def release(self) -> None:
+        """Libera la reserva del job al terminar la carga (con o sin errores)"""
+        if not self._claimed:
+            return
+        self._claimed = False
+        try:
+            self._get_repository().release_job(self._job_id, self._owner)
+        except Exception as e:
+            logger.warning(f"No se pudo liberar la reserva del job {self._job_id}: {e}")
+
+    def label_for(self, fingerprint: str) -> str:
+        """Label de Jira de la huella en este job"""
+        return fingerprint_label(fingerprint, self._job_id)
+
+    def preload(self, fingerprints: Iterable[str]) -> int:
+        """
+        Resuelve en lote qué huellas ya tienen un issue creado
+
+        Args:
+            fingerprints: Huellas de los issues a crear
+
+        Returns:
+            int: Número de huellas que ya existían
+        """
+        pending = [fp for fp in dict.fromkeys(fingerprints) if fp not in self._known]
+        if not pending:
+            return 0
+
+        self._purge_expired()
+        found: Dict[str, str] = {}
+        try:
+            found.update(self._get_repository().get_existing(self._job_id, pending))
+        except Exception as e:
+            logger.warning(f"No se pudo consultar el índice local de huellas: {e}")
+
+        if self._use_labels:
+            missing = [fp for fp in pending if fp not in found]
+            for fp, key in self._lookup_labels(missing).items():
+                found[fp] = key
+                self._save(fp, key)
+
+        self._known.update(found)
+        if found:
+            logger.info(f"Job {self._job_id}: {len(found)} issue(s) ya creados en un intento previo serán omitidos")
+        return len(found)
+
+    def get_existing_key(self, fingerprint: str) -> Optional[str]:
+        """Retorna la clave del issue ya creado para la huella, si existe"""
+        return self._known.get(fingerprint)
+
+    def record(self, fingerprint: str, issue_key: str) -> None:
+        """
+        Registra un issue recién creado
+
+        Args:
+            fingerprint: Huella del issue
+            issue_key: Clave asignada por Jira
+        """
+        self._known[fingerprint] = issue_key
+        self._save(fingerprint, issue_key)
+        self.heartbeat()
+
+    def _save(self, fingerprint: str, issue_key: str) -> None:
+        try:
+            self._get_repository().save(self._job_id, self._project_key, fingerprint, issue_key)
+        except Exception as e:
+            logger.warning(f"No se pudo registrar la huella de {issue_key}: {e}")
+
+    def _lookup_labels(self, fingerprints: List[str]) -> Dict[str, str]:
+        """Busca issues existentes por label de huella, en lotes de una sola consulta JQL"""
+        by_label = {self.label_for(fp): fp for fp in fingerprints}
+        labels = list(by_label.keys())
+        found = {}
+        url = f"{self._connection.base_url}/rest/api/3/search/jql"
+
+        for start in range(0, len(labels), LABEL_LOOKUP_BATCH_SIZE):
+            batch = labels[start:start + LABEL_LOOKUP_BATCH_SIZE]
+            labels_jql = ', '.join(f'"{label}"' for label in batch)
+            params = {
+                'jql': f'project = "{self._project_key}" AND labels in ({labels_jql})',
+                'maxResults': len(batch) * 2,
+                'fields': 'labels'
+            }
+            try:
+                response = self._connection.session.get(url, params=params, timeout=Config.JIRA_TIMEOUT_LONG)
+                if response.status_code != 200:
+                    logger.warning(f"Búsqueda de huellas por label falló: {response.status_code} - {response.text[:200]}")
+                    continue
+                for issue in response.json().get('issues', []):
+                    for label in issue.get('fields', {}).get('labels', []):
+                        if label in by_label:
+                            found.setdefault(by_label[label], issue.get('key'))
+            except Exception as e:
+                logger.warning(f"Error al buscar huellas por label: {e}")
+
+        return found
+
+    def _purge_expired(self) -> None:
+        """Elimina (una vez por carga) las huellas fuera de la ventana de reintentos"""
+        if self._purged:
+            return
+        self._purged = True
+        cutoff = datetime.now() - timedelta(hours=Config.JIRA_UPLOAD_FINGERPRINT_RETENTION_HOURS)
+        try:
+            purged = self._get_repository().purge_older_than(cutoff)
+            if purged:
+                logger.info(f"{purged} huella(s) de cargas antiguas eliminadas")
+        except Exception as e:
+            logger.warning(f"No se pudieron eliminar huellas de cargas antiguas: {e}")
+
+    def _get_repository(self):
+        if self._repository is None:
+            from app.database.repositories.upload_fingerprint_repository import UploadFingerprintRepository
+            self._repository = UploadFingerprintRepository()
+        return self._repository
@@ -3,18 +3,23 @@ Módulo de generación para Matrix Backend.
 Contiene la lógica core de generación de matrices de prueba usando IA.
 """
 import os
-import time
 import logging
 import json
 import re
 import traceback
-import google.generativeai as genai
 from typing import List, Dict, Tuple, Optional
 
 from app.core.config import Config
 from app.utils.file_utils import extract_text_from_file
 from app.utils.retry_utils import call_with_retry
-from app.utils.document_chunker import DocumentChunker, ChunkingStrategy
+from app.utils.gemini_client import get_gemini_model
+from app.utils.llm_call import governed_generate_content
+from app.utils.adaptive_timeout import adaptive_timeout
+from app.utils.chunk_executor import ChunkExecutor, healing_executor, split_batches
+from app.utils.stream_parsers import IncrementalJSONArrayParser, stream_emitter
+from app.utils.progress_events import DEDUP_REMOVED, HEALING_STARTED, PHASE_STARTED, report_progress
+from app.utils.document_chunker import DocumentChunker, ChunkingStrategy, estimate_text_tokens
+from app.utils.request_packing import pack_segments, story_number
 from app.services.validator import Validator
 
 from app.backend.matrix.parser import clean_text, clean_json_response, extract_stories_from_text
@@ -60,13 +65,21 @@ def split_document_into_chunks(text, max_chunk_size=None):
     """
     Divide un texto largo en fragmentos más pequeños usando DocumentChunker.
     
+    Sin tamaño explícito (y con CHUNK_BY_TOKENS) el límite es un presupuesto de tokens
+    estimados (Config.MATRIX_MAX_CHUNK_TOKENS) en lugar de caracteres.
+    
     Args:
         text: Texto del documento a dividir
-        max_chunk_size: Tamaño máximo del chunk (default: Config.MATRIX_MAX_CHUNK_SIZE)
+        max_chunk_size: Tamaño máximo del chunk en caracteres (default: Config.MATRIX_MAX_CHUNK_SIZE)
         
     Returns:
         List[str]: Lista de chunks del documento
     """
+    if max_chunk_size is None and Config.CHUNK_BY_TOKENS:
+        chunker = DocumentChunker(strategy=ChunkingStrategy.TOKEN, max_chunk_tokens=Config.MATRIX_MAX_CHUNK_TOKENS,
+                                  overlap_tokens=Config.CHUNK_OVERLAP_TOKENS)
+        return chunker.split_document_into_chunks(text)
+
     if max_chunk_size is None:
         max_chunk_size = Config.MATRIX_MAX_CHUNK_SIZE
     
@@ -74,7 +87,8 @@ def split_document_into_chunks(text, max_chunk_size=None):
     return chunker.split_document_into_chunks(text, max_chunk_size)
 
 
-def generar_matriz_test(contexto, flujo, historia, texto_documento, tipos_prueba=['funcional', 'no_funcional'], skip_healing=False):
+def generar_matriz_test(contexto, flujo, historia, texto_documento, tipos_prueba=['funcional', 'no_funcional'], skip_healing=False,
+                        on_partial=None, on_progress=None):
     try:
         api_key = Config.GOOGLE_API_KEY
         if not api_key:
@@ -85,8 +99,7 @@ def generar_matriz_test(contexto, flujo, historia, texto_documento, tipos_prueba
             return {"status": "error",
                     "message": "El documento parece estar vacío o es demasiado corto. Verifica que el archivo contenga texto legible."}
 
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel(Config.GEMINI_MODEL)
+        model = get_gemini_model(api_key=api_key)
 
         # Definir prompt_base
         prompt_base = """
@@ -173,77 +186,118 @@ GENERA SOLO CASOS NO FUNCIONALES (no tengas un limite de casos generados, siempr
 
         # Dividir el documento por historias en lugar de solo por tamaño
         chunks = []
-        current_chunk = ""
         current_historia = historias[0] if historias else "Historia de usuario general"
         historia_chunks = {current_historia: []}
 
+        # ~60% del tamaño máximo para chunks internos, medido en tokens estimados o en caracteres
+        if Config.CHUNK_BY_TOKENS:
+            measure, budget = estimate_text_tokens, Config.MATRIX_MAX_CHUNK_TOKENS * 0.6
+        else:
+            measure, budget = (lambda text: len(text) + 1), Config.MATRIX_MAX_CHUNK_SIZE * 0.6
+        current_parts, current_size = [], 0
+
+        def cerrar_chunk():
+            chunk_text = "\n".join(current_parts).strip()
+            if chunk_text:
+                chunks.append((current_historia, chunk_text))
+                historia_chunks[current_historia].append(chunk_text)
+
         paragraphs = texto_documento.split('\n')
         for para in paragraphs:
             para = para.strip()
             if not para:
                 continue
+            size = measure(para)
             if re.match(r'HISTORIA #\d+:', para):
-                if current_chunk.strip():
-                    chunks.append((current_historia, current_chunk.strip()))
-                    historia_chunks[current_historia].append(current_chunk.strip())
+                cerrar_chunk()
                 current_historia = para
                 if current_historia not in historia_chunks:
                     historia_chunks[current_historia] = []  # Inicializar la nueva historia
-                current_chunk = para + "\n"
+                current_parts, current_size = [para], size
+            elif current_size + size < budget:
+                current_parts.append(para)
+                current_size += size
             else:
-                if len(current_chunk) + len(para) + 1 < (Config.MATRIX_MAX_CHUNK_SIZE * 0.6):  # ~60% del tamaño máximo para chunks internos
-                    current_chunk += para + "\n"
-                else:
-                    chunks.append((current_historia, current_chunk.strip()))
-                    historia_chunks[current_historia].append(current_chunk.strip())
-                    current_chunk = para + "\n"
+                cerrar_chunk()
+                current_parts, current_size = [para], size
 
-        if current_chunk.strip():
-            chunks.append((current_historia, current_chunk.strip()))
-            historia_chunks[current_historia].append(current_chunk.strip())
+        cerrar_chunk()
 
         logger.debug(f"Total de chunks generados: {len(chunks)}")
         logger.debug(f"Contenido de historia_chunks: {list(historia_chunks.keys())}")
 
+        # Fragmentos pequeños adyacentes (historias cortas) viajan juntos en una sola petición:
+        # la plantilla de instrucciones se paga una vez y los casos se separan después por historia
+        fragmentos = pack_segments(
+            chunks, lambda fragmento: measure(fragmento[0]) + measure(fragmento[1]),
+            Config.MATRIX_MAX_CHUNK_TOKENS if Config.CHUNK_BY_TOKENS else Config.MATRIX_MAX_CHUNK_SIZE,
+            Config.REQUEST_PACKING_MAX_SEGMENTS
+        )
+        if len(fragmentos) < len(chunks):
+            logger.info(f"Empaquetado: {len(chunks)} fragmentos agrupados en {len(fragmentos)} peticiones")
+
         all_cases = []
-        total_chunks = len(chunks)
+        total_chunks = len(fragmentos)
 
         logger.info(f"Procesando {total_chunks} fragmentos del documento...")
 
-        for i, (historia_chunk, chunk) in enumerate(chunks):
+        def procesar_fragmento(i, fragmento):
+            historias_fragmento = list(dict.fromkeys(historia for historia, _ in fragmento))
+            textos_por_historia = {
+                historia: clean_text("\n".join(texto for h, texto in fragmento if h == historia))
+                for historia in historias_fragmento
+            }
+            historia_chunk = historias_fragmento[0]
+            chunk = "\n".join(texto for _, texto in fragmento)
             if not chunk.strip():
                 logger.warning(f"Fragmento {i + 1}/{total_chunks} está vacío, omitiendo...")
-                continue
+                return []
 
-            logger.info(f"Procesando fragmento {i + 1}/{total_chunks} (Historia: {historia_chunk})")
-            
-            # Pacing: Obligar a un respiro entre fragmentos para no saturar RPM
-            if i > 0:
-                logger.info("Esperando 5 segundos para respetar cuota RPM...")
-                time.sleep(5)
-                
+            logger.info(f"Procesando fragmento {i + 1}/{total_chunks} (Historia: {', '.join(historias_fragmento)})")
             logger.debug(f"Tamaño del chunk: {len(chunk)} caracteres")
             chunk = clean_text(chunk)
             logger.debug(f"Tamaño del chunk limpio: {len(chunk)} caracteres")
 
+            if len(historias_fragmento) == 1:
+                seccion_documento = f"""HISTORIA DE USUARIO:
+{historia_chunk}
+FRAGMENTO DEL DOCUMENTO A ANALIZAR ({i + 1}/{total_chunks}):
+{chunk}"""
+                instruccion_historia = f"6. Usa '{historia_chunk}' como valor para el campo 'historia_de_usuario' en cada caso"
+            else:
+                seccion_documento = f"""HISTORIAS DE USUARIO ({len(historias_fragmento)} en esta petición):
+{chr(10).join(f"- {historia}" for historia in historias_fragmento)}
+FRAGMENTOS DEL DOCUMENTO A ANALIZAR ({i + 1}/{total_chunks}):
+{chr(10).join(f"[{historia}]{chr(10)}{texto}" for historia, texto in textos_por_historia.items())}"""
+                instruccion_historia = ("6. Genera casos para CADA una de las historias listadas y usa como valor del campo "
+                                        "'historia_de_usuario' EXACTAMENTE la historia del fragmento del que proviene el caso")
+
             prompt_completo = f"""{prompt_base}
 {prompt_tipos}
 CONTEXTO DEL SISTEMA:
 {contexto or 'Sistema de software a ser probado'}
 FLUJO ESPECÍFICO:
 {flujo or 'Flujos generales del sistema'}
-HISTORIA DE USUARIO:
-{historia_chunk}
-FRAGMENTO DEL DOCUMENTO A ANALIZAR ({i + 1}/{total_chunks}):
-{chunk}
+{seccion_documento}
 INSTRUCCIONES:
 1. Analiza este fragmento del documento
 2. Genera casos de prueba específicos para el contenido encontrado
 3. Asegúrate de que cada caso sea único y tenga valor específico
 4. Los pasos deben ser claros y ejecutables
 5. Los resultados esperados deben ser verificables
-6. Usa '{historia_chunk}' como valor para el campo 'historia_de_usuario' en cada caso
+{instruccion_historia}
 Responde ÚNICAMENTE con el array JSON de casos de prueba:"""
+
+            def asignar_historia(valor):
+                """Historia del fragmento a la que pertenece un caso (en una petición empaquetada, por su identificador)"""
+                if valor in textos_por_historia:
+                    return valor
+                numero = story_number(valor)
+                for historia in historias_fragmento:
+                    if numero is not None and story_number(historia) == numero:
+                        return historia
+                return historia_chunk
+
             logger.debug(f"Prompt enviado (primeros 500 caracteres): {prompt_completo[:500]}...")
 
             # Normalizar tipos_prueba ANTES de la función interna para que esté disponible en el scope del healing
@@ -260,10 +314,83 @@ Responde ÚNICAMENTE con el array JSON de casos de prueba:"""
             
             logger.debug(f"Tipos de prueba normalizados: {tipos_prueba_normalized}")
 
+            def normalizar_caso(j, case):
+                """Completa y normaliza en el sitio un caso generado (j: posición en el fragmento)"""
+                if not case.get('id_caso_prueba'):
+                    # Provisional: los IDs se reasignan secuencialmente al unir los fragmentos
+                    case['id_caso_prueba'] = f"TC{j + 1:03d}"
+                case['historia_de_usuario'] = asignar_historia(case.get('historia_de_usuario'))
+                
+                # Manejar cada campo con lógica específica
+                # TÍTULO: Generar un título significativo basado en descripción o tipo
+                titulo = case.get('titulo_caso_prueba', '')
+                if not titulo or titulo.strip() == '' or 'por definir' in titulo.lower() or 'título descriptivo' in titulo.lower():
+                    # Intentar generar título desde descripción
+                    descripcion = case.get('Descripcion', '')
+                    if descripcion and descripcion.strip() and 'por definir' not in descripcion.lower():
+                        # Usar primeros 60 caracteres de la descripción como título
+                        titulo = descripcion[:60].strip()
+                        if len(descripcion) > 60:
+                            titulo += '...'
+                    else:
+                        # Generar título basado en tipo de prueba y categoría
+                        tipo_prueba = case.get('Tipo_de_prueba', 'Funcional')
+                        categoria = case.get('Categoria', '')
+                        if categoria:
+                            titulo = f"Validar {categoria} - {tipo_prueba}"
+                        else:
+                            titulo = f"Caso de prueba {tipo_prueba} - {case['id_caso_prueba']}"
+                    case['titulo_caso_prueba'] = titulo
+                
+                # OTROS CAMPOS: Usar placeholders solo si es necesario
+                if not case.get('Descripcion') or not case['Descripcion']:
+                    case['Descripcion'] = f"Verificar funcionalidad según requerimientos"
+                if not case.get('Precondiciones') or not case['Precondiciones']:
+                    case['Precondiciones'] = "Sistema configurado y usuario autenticado"
+                if not case.get('Tipo_de_prueba') or not case['Tipo_de_prueba']:
+                    case['Tipo_de_prueba'] = "Funcional"
+                
+                # PASOS Y RESULTADOS: Asegurar formato de lista
+                if not isinstance(case.get('Pasos'), list):
+                    pasos = case.get('Pasos', '')
+                    if pasos:
+                        case['Pasos'] = [str(pasos)]
+                    else:
+                        case['Pasos'] = ["Ejecutar la funcionalidad especificada"]
+                if not isinstance(case.get('Resultado_esperado'), list):
+                    resultado = case.get('Resultado_esperado', '')
+                    if resultado:
+                        case['Resultado_esperado'] = [str(resultado)]
+                    else:
+                        case['Resultado_esperado'] = ["El sistema responde correctamente según especificación"]
+
+            # Casos ya entregados en streaming; un reintento no los vuelve a emitir
+            emitted = [0]
+
+            def stream_handler():
+                """Entrega cada caso completo al callback on_partial en cuanto cierra su objeto JSON"""
+                if not on_partial:
+                    return None
+                stream_parser = IncrementalJSONArrayParser()
+                emit = stream_emitter(on_partial, 'test_case', skip=emitted[0])
+                accepted = [0]
+
+                def on_text(text):
+                    for case in stream_parser.feed(text):
+                        if case.get('Tipo_de_prueba', '').lower() not in tipos_prueba_normalized:
+                            continue
+                        normalizar_caso(accepted[0], case)
+                        accepted[0] += 1
+                        emitted[0] = max(emitted[0], emit(case))
+
+                return on_text
+
             # Reintentos con backoff exponencial usando función reutilizable
             def generate_matrix_chunk():
-                timeout_seconds = Config.GEMINI_TIMEOUT_BASE + (i * Config.GEMINI_TIMEOUT_INCREMENT)
-                response = model.generate_content(prompt_completo, request_options={"timeout": timeout_seconds})
+                response = governed_generate_content(
+                    model, prompt_completo, on_text=stream_handler(),
+                    request_options={"timeout": adaptive_timeout(prompt_completo)}
+                )
                 
                 if not response or not hasattr(response, 'text') or not response.text:
                     raise ValueError("Respuesta vacía o inválida del modelo")
@@ -292,53 +419,8 @@ Responde ÚNICAMENTE con el array JSON de casos de prueba:"""
                 
                 # Normalizar casos
                 for j, case in enumerate(cases_chunk):
-                    if not case.get('id_caso_prueba'):
-                        case['id_caso_prueba'] = f"TC{len(all_cases) + j + 1:03d}"
-                    case['historia_de_usuario'] = historia_chunk
-                    
-                    # Manejar cada campo con lógica específica
-                    # TÍTULO: Generar un título significativo basado en descripción o tipo
-                    titulo = case.get('titulo_caso_prueba', '')
-                    if not titulo or titulo.strip() == '' or 'por definir' in titulo.lower() or 'título descriptivo' in titulo.lower():
-                        # Intentar generar título desde descripción
-                        descripcion = case.get('Descripcion', '')
-                        if descripcion and descripcion.strip() and 'por definir' not in descripcion.lower():
-                            # Usar primeros 60 caracteres de la descripción como título
-                            titulo = descripcion[:60].strip()
-                            if len(descripcion) > 60:
-                                titulo += '...'
-                        else:
-                            # Generar título basado en tipo de prueba y categoría
-                            tipo_prueba = case.get('Tipo_de_prueba', 'Funcional')
-                            categoria = case.get('Categoria', '')
-                            if categoria:
-                                titulo = f"Validar {categoria} - {tipo_prueba}"
-                            else:
-                                titulo = f"Caso de prueba {tipo_prueba} - {case['id_caso_prueba']}"
-                        case['titulo_caso_prueba'] = titulo
-                    
-                    # OTROS CAMPOS: Usar placeholders solo si es necesario
-                    if not case.get('Descripcion') or not case['Descripcion']:
-                        case['Descripcion'] = f"Verificar funcionalidad según requerimientos"
-                    if not case.get('Precondiciones') or not case['Precondiciones']:
-                        case['Precondiciones'] = "Sistema configurado y usuario autenticado"
-                    if not case.get('Tipo_de_prueba') or not case['Tipo_de_prueba']:
-                        case['Tipo_de_prueba'] = "Funcional"
-                    
-                    # PASOS Y RESULTADOS: Asegurar formato de lista
-                    if not isinstance(case.get('Pasos'), list):
-                        pasos = case.get('Pasos', '')
-                        if pasos:
-                            case['Pasos'] = [str(pasos)]
-                        else:
-                            case['Pasos'] = ["Ejecutar la funcionalidad especificada"]
-                    if not isinstance(case.get('Resultado_esperado'), list):
-                        resultado = case.get('Resultado_esperado', '')
-                        if resultado:
-                            case['Resultado_esperado'] = [str(resultado)]
-                        else:
-                            case['Resultado_esperado'] = ["El sistema responde correctamente según especificación"]
-                
+                    normalizar_caso(j, case)
+
                 return cases_chunk
             
             try:
@@ -348,9 +430,9 @@ Responde ÚNICAMENTE con el array JSON de casos de prueba:"""
                     retry_delay=Config.RETRY_DELAY,
                     timeout_base=Config.GEMINI_TIMEOUT_BASE,
                     timeout_increment=Config.GEMINI_TIMEOUT_INCREMENT,
-                    exceptions=(Exception,)
+                    exceptions=(Exception,),
+                    stage='chunk'
                 )
-                all_cases.extend(cases_chunk)
                 logger.info(f"Fragmento {i + 1}: {len(cases_chunk)} casos generados")
                 
                 # --- VALIDACIÓN SEMÁNTICA (SIEMPRE ACTIVA) ---
@@ -359,7 +441,8 @@ Responde ÚNICAMENTE con el array JSON de casos de prueba:"""
                 issues_list = []
                 
                 for idx_case, case in enumerate(cases_chunk):
-                    validation_result = validator.semantic_validate_case(case, chunk)
+                    validation_result = validator.semantic_validate_case(
+                        case, textos_por_historia.get(case.get('historia_de_usuario'), chunk))
                     if not validation_result["is_valid"]:
                         failed_indices.append(idx_case)
                         issues_list.append(f"Caso {idx_case + 1}: {', '.join(validation_result['issues'])}")
@@ -369,76 +452,96 @@ Responde ÚNICAMENTE con el array JSON de casos de prueba:"""
                     
                     # --- SELF-HEALING (SOLO SI NO ESTÁ DESACTIVADO) ---
                     if not skip_healing:
-                        # Pacing: Respiro antes de sanación
-                        logger.info("Esperando 5 segundos antes de proceso de sanación...")
-                        time.sleep(5)
+                        logger.warning(f"  🔧 Iniciando curación en sub-lotes para {len(failed_indices)} casos...")
+                        report_progress(on_progress, HEALING_STARTED, count=len(failed_indices), index=i, total=total_chunks)
                         
-                        logger.warning(f"  🔧 Iniciando curación en bloque para {len(failed_indices)} casos...")
-                        try:
-                            cases_to_heal = [cases_chunk[idx] for idx in failed_indices]
-                            
-                            # Preparar tipos permitidos para el prompt
-                            tipos_permitidos_str = ", ".join([
-                                "Funcional" if "funcional" in t.lower() and "no" not in t.lower() 
-                                else "No Funcional" if "no" in t.lower() and "funcional" in t.lower()
-                                else t.capitalize()
-                                for t in tipos_prueba
-                            ])
-                            
-                            logger.info(f"  🔧 Tipos de prueba permitidos para healing: {tipos_permitidos_str}")
-                            
+                        # Preparar tipos permitidos para el prompt
+                        tipos_permitidos_str = ", ".join([
+                            "Funcional" if "funcional" in t.lower() and "no" not in t.lower() 
+                            else "No Funcional" if "no" in t.lower() and "funcional" in t.lower()
+                            else t.capitalize()
+                            for t in tipos_prueba
+                        ])
+                        
+                        logger.info(f"  🔧 Tipos de prueba permitidos para healing: {tipos_permitidos_str}")
+                        issues_by_index = dict(zip(failed_indices, issues_list))
+                        
+                        def heal_sub_batch(_, batch_indices):
+                            """Sana un sub-lote; si falla, solo sus casos conservan la versión original"""
                             prompt_healing = HEALING_PROMPT_BATCH.format(
-                                batch_issues="\\\\n".join(issues_list),
-                                batch_cases=json.dumps(cases_to_heal, indent=2, ensure_ascii=False),
+                                batch_issues="\\\\n".join(issues_by_index[idx] for idx in batch_indices),
+                                batch_cases=json.dumps([cases_chunk[idx] for idx in batch_indices], indent=2, ensure_ascii=False),
                                 story_context=chunk,
                                 allowed_types=tipos_permitidos_str
                             )
                             
                             def heal_batch_op():
-                                response = model.generate_content(prompt_healing)
+                                response = governed_generate_content(model, prompt_healing)
                                 if not response or not response.text:
                                     return None
                                 return clean_json_response(response.text)
-
-                            healed_cases_list = call_with_retry(heal_batch_op, max_retries=2)
                             
-                            if healed_cases_list and isinstance(healed_cases_list, list):
-                                # Reemplazar los casos fallidos con los sanados
-                                # El modelo debería devolver la misma cantidad de casos
-                                for j, original_idx in enumerate(failed_indices):
-                                    if j < len(healed_cases_list):
-                                        healed_case = healed_cases_list[j]
-                                        original_case = cases_chunk[original_idx]
-                                        
-                                        # VALIDACIÓN POST-HEALING: Forzar que campos inmutables se mantengan
-                                        immutable_fields = [
-                                            'id_caso_prueba', 'Tipo_de_prueba', 'historia_de_usuario',
-                                            'Nivel_de_prueba', 'Tipo_de_ejecucion', 'Ambiente', 'Ciclo', 'issuetype'
-                                        ]
-                                        
-                                        for field in immutable_fields:
-                                            if field in original_case:
-                                                healed_case[field] = original_case[field]
-                                        
-                                        # Validar que el tipo de prueba esté en los tipos permitidos
-                                        tipo_healed = healed_case.get('Tipo_de_prueba', '').lower()
-                                        if tipo_healed not in tipos_prueba_normalized:
-                                            logger.warning(f"  ⚠️ Caso sanado tiene tipo '{healed_case.get('Tipo_de_prueba')}' no permitido. Restaurando tipo original.")
-                                            healed_case['Tipo_de_prueba'] = original_case.get('Tipo_de_prueba', 'Funcional')
-                                        
-                                        cases_chunk[original_idx] = healed_case
-                                logger.info(f"  ✅ Curación en bloque completada para {len(healed_cases_list)} casos.")
-                        except Exception as e:
-                            logger.error(f"  ❌ Error en curación en bloque (batch healing): {e}")
+                            return call_with_retry(heal_batch_op, max_retries=2, stage='healing')
+                        
+                        sub_batches = split_batches(failed_indices, Config.HEALING_BATCH_SIZE)
+                        healed_total = 0
+                        for batch in healing_executor().map_ordered(heal_sub_batch, sub_batches, label="sub-lote de sanación"):
+                            healed_cases_list = batch.value
+                            if not batch.ok or not healed_cases_list or not isinstance(healed_cases_list, list):
+                                logger.error(f"  ❌ Sub-lote de sanación {batch.index + 1} sin resultado: {batch.error}")
+                                continue
+                            # Reemplazar los casos fallidos con los sanados
+                            # El modelo debería devolver la misma cantidad de casos
+                            for j, original_idx in enumerate(sub_batches[batch.index]):
+                                if j < len(healed_cases_list) and isinstance(healed_cases_list[j], dict):
+                                    healed_case = healed_cases_list[j]
+                                    original_case = cases_chunk[original_idx]
+                                    
+                                    # VALIDACIÓN POST-HEALING: Forzar que campos inmutables se mantengan
+                                    immutable_fields = [
+                                        'id_caso_prueba', 'Tipo_de_prueba', 'historia_de_usuario',
+                                        'Nivel_de_prueba', 'Tipo_de_ejecucion', 'Ambiente', 'Ciclo', 'issuetype'
+                                    ]
+                                    
+                                    for field in immutable_fields:
+                                        if field in original_case:
+                                            healed_case[field] = original_case[field]
+                                    
+                                    # Validar que el tipo de prueba esté en los tipos permitidos
+                                    tipo_healed = healed_case.get('Tipo_de_prueba', '').lower()
+                                    if tipo_healed not in tipos_prueba_normalized:
+                                        logger.warning(f"  ⚠️ Caso sanado tiene tipo '{healed_case.get('Tipo_de_prueba')}' no permitido. Restaurando tipo original.")
+                                        healed_case['Tipo_de_prueba'] = original_case.get('Tipo_de_prueba', 'Funcional')
+                                    
+                                    cases_chunk[original_idx] = healed_case
+                                    healed_total += 1
+                        logger.info(f"  ✅ Curación en sub-lotes completada: {healed_total} de {len(failed_indices)} casos sanados.")
                     else:
                         logger.info(f"  ℹ️ Self-healing desactivado. Los casos se mantendrán con sus problemas detectados.")
                 else:
                     logger.info(f"  ✅ Todos los casos pasaron la validación semántica.")
                 # --- FIN VALIDACIÓN SEMÁNTICA Y HEALING ---
+
+                if len(historias_fragmento) > 1:
+                    # Separar la respuesta empaquetada por historia, en el orden del documento
+                    orden = {historia: k for k, historia in enumerate(historias_fragmento)}
+                    cases_chunk.sort(key=lambda case: orden.get(case.get('historia_de_usuario'), 0))
+                    sin_casos = [h for h in historias_fragmento if not any(c.get('historia_de_usuario') == h for c in cases_chunk)]
+                    if sin_casos:
+                        logger.warning(f"  ⚠️ Historias sin casos en la petición empaquetada: {', '.join(sin_casos)}")
+                return cases_chunk
                 
             except Exception as e:
                 logger.error(f"Fragmento {i + 1} falló después de {Config.MAX_RETRIES} intentos: {e}")
                 # Continuar con el siguiente fragmento
+                return []
+
+        # Los fragmentos se procesan en paralelo (concurrencia acotada) y se unen en orden
+        report_progress(on_progress, PHASE_STARTED, phase='generation', total=total_chunks)
+        for resultado in ChunkExecutor().map_ordered(procesar_fragmento, fragmentos, label="fragmento", on_progress=on_progress,
+                                                      resumable=True):
+            if resultado.ok and resultado.value:
+                all_cases.extend(resultado.value)
 
         if not all_cases:
             return {
@@ -456,6 +559,7 @@ Responde ÚNICAMENTE con el array JSON de casos de prueba:"""
         if duplicate_indices:
             all_cases = [c for idx, c in enumerate(all_cases) if idx not in duplicate_indices]
             logger.info(f"Se eliminaron {len(duplicate_indices)} casos duplicados/similares.")
+            report_progress(on_progress, DEDUP_REMOVED, removed=len(duplicate_indices), remaining=len(all_cases))
         # --- FIN ELIMINACIÓN DE DUPLICADOS ---
 
         # Reasignar todos los IDs secuencialmente para evitar saltos
@@ -9,49 +9,232 @@ from typing import List, Dict
 
 logger = logging.getLogger(__name__)
 
-def clean_json_response(response_text):
-    """Limpia y extrae JSON de la respuesta del modelo."""
-    if not response_text:
+# Tokens de la recuperación de JSON (patrones anclados sin retroceso: cada carácter se visita una vez)
+_WHITESPACE = re.compile(r'[ \t\r\n]*')
+_STRING_RUN = re.compile(r'[^"\\]*')
+_NUMBER = re.compile(r'-?(?:\d+)(?:\.\d+)?(?:[eE][+-]?\d+)?')
+_LITERALS = {'true': True, 'false': False, 'null': None, 'True': True, 'False': False, 'None': None}
+_ESCAPES = {'"': '"', '\\': '\\', '/': '/', 'b': '\b', 'f': '\f', 'n': '\n', 'r': '\r', 't': '\t'}
+_MAX_RECOVERY_ATTEMPTS = 3
+
+
+class _Truncated(Exception):
+    """La entrada terminó (o se volvió ilegible) antes de cerrar el valor actual"""
+
+
+class _JSONRecoveryParser:
+    """
+    Parser JSON tolerante de una sola pasada (O(n)) para respuestas del modelo.
+
+    Usa una pila explícita de contenedores en lugar de recursión. Tolera comas finales,
+    comas ausentes entre elementos, saltos de línea sin escapar dentro de cadenas y literales
+    de Python. Si la entrada se corta o aparece basura, cierra los contenedores abiertos y
+    conserva solo los elementos completos: un objeto sin cerrar dentro de un array se descarta.
+    """
+
+    def __init__(self, text: str, start: int):
+        self.text = text
+        self.pos = start
+        self.end = len(text)
+
+    def parse(self):
+        # Cada marco: [contenedor, clave pendiente (solo objetos), clave en el padre]
+        stack = []
+        try:
+            while True:
+                self._skip_whitespace()
+                if self.pos >= self.end:
+                    raise _Truncated()
+                char = self.text[self.pos]
+
+                if stack:
+                    container, pending_key, _ = stack[-1]
+                    if char == ',':
+                        self.pos += 1
+                        continue
+                    if char in ']}':
+                        self.pos += 1
+                        container, _, parent_key = stack.pop()
+                        if not stack:
+                            return container
+                        self._attach(stack, container, parent_key)
+                        continue
+                    if isinstance(container, dict) and pending_key is None:
+                        # Se espera una clave
+                        if char != '"':
+                            raise _Truncated()
+                        key = self._read_string()
+                        self._skip_whitespace()
+                        if self.pos >= self.end or self.text[self.pos] != ':':
+                            raise _Truncated()
+                        self.pos += 1
+                        stack[-1][1] = key
+                        continue
+
+                if char in '[{':
+                    self.pos += 1
+                    new = [] if char == '[' else {}
+                    key = stack[-1][1] if stack and isinstance(stack[-1][0], dict) else None
+                    stack.append([new, None, key])
+                    continue
+
+                value = self._read_scalar(char)
+                if not stack:
+                    return value
+                self._attach(stack, value, stack[-1][1])
+        except _Truncated:
+            return self._salvage(stack) if stack else None
+
+    def _attach(self, stack, value, key) -> None:
+        frame = stack[-1]
+        if isinstance(frame[0], list):
+            frame[0].append(value)
+        else:
+            frame[0][key] = value
+            frame[1] = None
+
+    @staticmethod
+    def _salvage(stack):
+        """Cierra los contenedores abiertos conservando solo lo completo"""
+        # Recorrer de dentro hacia fuera: un objeto abierto cuyo padre es un array se descarta
+        child = None
+        child_key = None
+        for index in range(len(stack) - 1, -1, -1):
+            container, _, parent_key = stack[index]
+            if child is not None:
+                if isinstance(container, list):
+                    container.append(child)
+                else:
+                    container[child_key] = child
+            parent = stack[index - 1][0] if index > 0 else None
+            if isinstance(container, dict) and isinstance(parent, list):
+                child = None
+            else:
+                child = container
+            child_key = parent_key
+        return stack[0][0]
+
+    def _skip_whitespace(self) -> None:
+        self.pos = _WHITESPACE.match(self.text, self.pos).end()
+
+    def _read_scalar(self, char: str):
+        if char == '"':
+            return self._read_string()
+        match = _NUMBER.match(self.text, self.pos)
+        if match and match.end() > self.pos:
+            self.pos = match.end()
+            number = match.group(0)
+            return float(number) if any(c in number for c in '.eE') else int(number)
+        for literal, value in _LITERALS.items():
+            if self.text.startswith(literal, self.pos):
+                self.pos += len(literal)
+                return value
+        raise _Truncated()
+
+    def _read_string(self) -> str:
+        """Lee una cadena desde la comilla de apertura; sin comilla de cierre la entrada está truncada"""
+        self.pos += 1
+        parts = []
+        while True:
+            run = _STRING_RUN.match(self.text, self.pos)
+            parts.append(run.group(0))
+            self.pos = run.end()
+            if self.pos >= self.end:
+                raise _Truncated()
+            if self.text[self.pos] == '"':
+                self.pos += 1
+                return ''.join(parts)
+            # Secuencia de escape
+            escape = self.text[self.pos + 1:self.pos + 2]
+            if not escape:
+                raise _Truncated()
+            if escape == 'u':
+                code = self.text[self.pos + 2:self.pos + 6]
+                if len(code) < 4:
+                    raise _Truncated()
+                try:
+                    parts.append(chr(int(code, 16)))
+                except ValueError:
+                    parts.append(code)
+                self.pos += 6
+            else:
+                parts.append(_ESCAPES.get(escape, escape))
+                self.pos += 2
+
+
+def _recovery_starts(text: str):
+    """Posiciones candidatas de inicio del JSON: primero tras un bloque ```, luego el primer [ o {"""
+    fence = text.find('```')
+    if fence != -1:
+        newline = text.find('\n', fence)
+        if newline != -1:
+            yield from _container_starts(text, newline + 1)
+    yield from _container_starts(text, 0)
+
+
+def _container_starts(text: str, pos: int):
+    while pos < len(text):
+        brackets = [i for i in (text.find('[', pos), text.find('{', pos)) if i != -1]
+        if not brackets:
+            return
+        pos = min(brackets)
+        yield pos
+        pos += 1
+
+
+def recover_json(text: str):
+    """
+    Recupera un valor JSON de una respuesta del modelo posiblemente mal formada
+
+    Quita bloques markdown y texto alrededor, corrige comas finales y cierra arrays u objetos
+    truncados conservando los elementos completos. Tiempo lineal en el tamaño de la respuesta.
+
+    Args:
+        text: Respuesta del modelo
+
+    Returns:
+        El valor recuperado (normalmente una lista) o None si no hay JSON aprovechable
+    """
+    if not text:
         return None
     try:
-        data = json.loads(response_text)
-        if isinstance(data, list):
-            return data
-        elif isinstance(data, dict) and 'matrix' in data:
-            return data['matrix']
-        elif isinstance(data, dict) and 'test_cases' in data:
-            return data['test_cases']
-    except json.JSONDecodeError:
-        pass
-    json_patterns = [
-        r'```json\s*\n([\s\S]*?)\n```',
-        r'```\s*\n([\s\S]*?)\n```',
-        r'\[[\s\S]*\]'
-    ]
-    for pattern in json_patterns:
-        match = re.search(pattern, response_text, re.MULTILINE)
-        if match:
-            json_str = match.group(1).strip()
-            try:
-                data = json.loads(json_str)
-                if isinstance(data, list):
-                    return data
-                elif isinstance(data, dict) and 'matrix' in data:
-                    return data['matrix']
-            except json.JSONDecodeError:
-                continue
-    try:
-        start = response_text.find('[')
-        end = response_text.rfind(']')
-        if start != -1 and end != -1 and end > start:
-            json_str = response_text[start:end + 1]
-            data = json.loads(json_str)
-            if isinstance(data, list):
-                return data
-    except json.JSONDecodeError:
+        return json.loads(text)
+    except (json.JSONDecodeError, TypeError):
         pass
+
+    # Un candidato vacío (p. ej. "[nota]" en prosa) da paso al siguiente; el número de intentos
+    # está acotado para mantener el coste lineal
+    seen = set()
+    for start in _recovery_starts(text):
+        if start in seen:
+            continue
+        seen.add(start)
+        value = _JSONRecoveryParser(text, start).parse()
+        if value not in (None, [], {}):
+            return value
+        if len(seen) >= _MAX_RECOVERY_ATTEMPTS:
+            break
     return None
 
+
+def _extract_cases(data):
+    """Lista de casos de un valor recuperado: el propio array, 'matrix'/'test_cases' o el único array de objetos"""
+    if isinstance(data, list):
+        return data
+    if isinstance(data, dict):
+        for key in ('matrix', 'test_cases'):
+            if isinstance(data.get(key), list):
+                return data[key]
+        lists = [v for v in data.values() if isinstance(v, list) and v and all(isinstance(i, dict) for i in v)]
+        if len(lists) == 1:
+            return lists[0]
+    return None
+
+
+def clean_json_response(response_text):
+    """Limpia y extrae JSON de la respuesta del modelo."""
+    return _extract_cases(recover_json(response_text))
+
 def clean_text(text):
     """Limpia el texto eliminando caracteres problemáticos."""
     text = re.sub(r'[^\x20-\x7E\n]', '', text)
@@ -6,11 +6,20 @@ utilizando IA.
 """
 
 import logging
+import time
 from typing import Dict, List
-import google.generativeai as genai
 
 from app.core.config import Config
 from app.utils.retry_utils import call_with_retry
+from app.utils.gemini_client import get_gemini_model
+from app.utils.llm_call import governed_generate_content
+from app.utils.adaptive_timeout import adaptive_timeout
+from app.utils.llm_telemetry import llm_stage
+from app.utils.stream_parsers import story_stream_handler
+from app.utils.progress_events import (
+    CHUNK_FINISHED, CHUNK_STARTED, DEDUP_REMOVED, HEALING_STARTED, PHASE_STARTED, report_progress
+)
+from app.services.text_processor import TextProcessor
 from app.backend.story_prompts import create_advanced_prompt, STORY_HEALING_PROMPT
 from app.backend.document_processor import process_large_document, split_document_into_chunks
 
@@ -22,7 +31,9 @@ def generate_story_from_chunk(
     role: str,
     story_type: str,
     business_context: str = None,
-    skip_healing: bool = False
+    skip_healing: bool = False,
+    on_partial=None,
+    on_progress=None
 ) -> Dict:
     """
     Genera una historia de usuario a partir de un fragmento de texto usando la API de Gemini.
@@ -33,6 +44,8 @@ def generate_story_from_chunk(
         story_type: Tipo de historia
         business_context: Contexto adicional de negocio
         skip_healing: Si se debe omitir la auto-curación
+        on_partial: Callback on_partial('story', historia) para entregar cada historia en cuanto se genera
+        on_progress: Callback on_progress(event, data) para los eventos de progreso (fragmentos, curación, duplicados)
         
     Returns:
         dict: Resultado con status y contenido generado
@@ -45,20 +58,23 @@ def generate_story_from_chunk(
                 "message": "API Key no configurada. Configura GOOGLE_API_KEY en el archivo .env"
             }
 
-        genai.configure(api_key=api_key)
-        model = genai.GenerativeModel(Config.GEMINI_MODEL)
+        model = get_gemini_model(api_key=api_key)
 
         # Crear prompt avanzado y detectar si necesita procesamiento especial
         prompt = create_advanced_prompt(chunk, role, story_type, business_context)
 
         # Si el documento requiere procesamiento por chunks
         if prompt == "CHUNK_PROCESSING_NEEDED":
-            return process_large_document(chunk, role, story_type, business_context, skip_healing)
+            return process_large_document(chunk, role, story_type, business_context, skip_healing,
+                                          on_partial=on_partial, on_progress=on_progress)
+
+        # Historias ya entregadas en streaming; un reintento no las vuelve a emitir
+        emitted = [0]
 
         # Reintentos con backoff exponencial
         def generate_content():
-            timeout_seconds = Config.GEMINI_TIMEOUT_BASE
-            response = model.generate_content(prompt, request_options={"timeout": timeout_seconds})
+            on_text, finish_stream = story_stream_handler(on_partial, emitted, TextProcessor.MIN_STORY_LENGTH)
+            response = governed_generate_content(model, prompt, on_text=on_text, request_options={"timeout": adaptive_timeout(prompt)})
             
             # Validar respuesta
             if not response or not hasattr(response, 'text') or not response.text:
@@ -74,6 +90,7 @@ def generate_story_from_chunk(
             if "La generación completa" in story_text or "Este ejemplo ilustra" in story_text:
                 logger.warning("Respuesta posiblemente incompleta detectada")
             
+            finish_stream()
             return story_text
         
         try:
@@ -83,12 +100,13 @@ def generate_story_from_chunk(
                 retry_delay=Config.RETRY_DELAY,
                 timeout_base=Config.GEMINI_TIMEOUT_BASE,
                 timeout_increment=Config.GEMINI_TIMEOUT_INCREMENT,
-                exceptions=(Exception,)
+                exceptions=(Exception,),
+                stage='chunk'
             )
             
             # Auto-curación para chunk individual
             if not skip_healing:
-                story_text = _heal_individual_stories(story_text, chunk, model)
+                story_text = _heal_individual_stories(story_text, chunk, model, on_progress=on_progress)
             
             return {"status": "success", "story": story_text}
             
@@ -108,7 +126,9 @@ def generate_story_from_text(
     role: str,
     story_type: str,
     business_context: str = None,
-    skip_healing: bool = False
+    skip_healing: bool = False,
+    on_partial=None,
+    on_progress=None
 ) -> Dict:
     """
     Función wrapper para mantener compatibilidad con la API existente.
@@ -120,6 +140,8 @@ def generate_story_from_text(
         story_type: Tipo de historia
         business_context: Contexto adicional de negocio
         skip_healing: Si se debe omitir la auto-curación
+        on_partial: Callback on_partial('story', historia) para entregar cada historia en cuanto se genera
+        on_progress: Callback on_progress(event, data) para los eventos de progreso (fragmentos, curación, duplicados)
         
     Returns:
         dict: Resultado con status y lista de historias
@@ -127,6 +149,7 @@ def generate_story_from_text(
     # [PASO 1] Análisis Global: Extraer "memoria compartida" del documento
     from app.backend.context_extractor import ContextExtractor
     
+    report_progress(on_progress, PHASE_STARTED, phase='context')
     context_extractor = ContextExtractor()
     global_context = context_extractor.extract_global_context(text)
     
@@ -137,20 +160,27 @@ def generate_story_from_text(
     
     chunks = split_document_into_chunks(text)
     stories = []
+    tp = TextProcessor()
 
     # [PASO 2] Generación Contextual: Cada chunk ahora "sabe" lo que dice el resto del doc
-    for chunk in chunks:
-        result = generate_story_from_chunk(chunk, role, story_type, enhanced_context, skip_healing)
-        if result['status'] == 'success':
+    report_progress(on_progress, PHASE_STARTED, phase='generation', total=len(chunks))
+    for index, chunk in enumerate(chunks):
+        report_progress(on_progress, CHUNK_STARTED, label="fragmento", index=index, total=len(chunks))
+        start = time.monotonic()
+        result = generate_story_from_chunk(chunk, role, story_type, enhanced_context, skip_healing,
+                                           on_partial=on_partial, on_progress=on_progress)
+        ok = result['status'] == 'success'
+        report_progress(on_progress, CHUNK_FINISHED, label="fragmento", index=index, total=len(chunks), ok=ok,
+                        items=len(tp.split_story_text_into_individual_stories(result['story'])) if ok else 0,
+                        elapsed_seconds=round(time.monotonic() - start, 3))
+        if ok:
             stories.append(result['story'])
         else:
             return result
 
     # Flattening and cleanup
-    from app.services.text_processor import TextProcessor
     from app.services.validator import Validator
     
-    tp = TextProcessor()
     validator = Validator()
     
     all_individual_stories = []
@@ -166,6 +196,7 @@ def generate_story_from_text(
         if duplicate_indices:
             stories = [s for idx, s in enumerate(stories) if idx not in duplicate_indices]
             logger.info(f"Se eliminaron {len(duplicate_indices)} historias duplicadas.")
+            report_progress(on_progress, DEDUP_REMOVED, removed=len(duplicate_indices), remaining=len(stories))
 
     return {"status": "success", "stories": stories}
 
@@ -175,7 +206,9 @@ def generate_stories_with_context(
     role: str,
     story_type: str,
     business_context: str = None,
-    skip_healing: bool = False
+    skip_healing: bool = False,
+    on_partial=None,
+    on_progress=None
 ) -> Dict:
     """
     Función principal para generar historias de usuario con contexto de negocio.
@@ -186,14 +219,17 @@ def generate_stories_with_context(
         story_type: Tipo de historias
         business_context: Contexto adicional de negocio
         skip_healing: Si se debe omitir la auto-curación
+        on_partial: Callback on_partial('story', historia) para entregar cada historia en cuanto se genera
+        on_progress: Callback on_progress(event, data) para los eventos de progreso (fragmentos, curación, duplicados)
         
     Returns:
         dict: Resultado de la generación con status y contenido
     """
-    return generate_story_from_text(document_text, role, story_type, business_context, skip_healing)
+    return generate_story_from_text(document_text, role, story_type, business_context, skip_healing,
+                                    on_partial=on_partial, on_progress=on_progress)
 
 
-def _heal_individual_stories(story_text: str, chunk: str, model) -> str:
+def _heal_individual_stories(story_text: str, chunk: str, model, on_progress=None) -> str:
     """
     Realiza auto-curación de historias individuales.
     
@@ -201,11 +237,11 @@ def _heal_individual_stories(story_text: str, chunk: str, model) -> str:
         story_text: Texto de las historias generadas
         chunk: Fragmento de texto original
         model: Modelo de IA para curación
+        on_progress: Callback on_progress(event, data) para informar la curación
         
     Returns:
         str: Texto de historias curadas
     """
-    from app.services.text_processor import TextProcessor
     from app.services.validator import Validator
     
     tp = TextProcessor()
@@ -218,13 +254,15 @@ def _heal_individual_stories(story_text: str, chunk: str, model) -> str:
         val_res = validator.semantic_validate_story(individual_story, chunk[:1000])
         if not val_res["is_valid"]:
             logger.warning(f"  ❌ Historia detectada con baja calidad. Intentando sanación...")
+            report_progress(on_progress, HEALING_STARTED, count=1)
             try:
                 prompt_heal = STORY_HEALING_PROMPT.format(
                     issues="\n- ".join(val_res["issues"]),
                     original_story=individual_story,
                     doc_context=chunk[:1000]
                 )
-                response_heal = model.generate_content(prompt_heal)
+                with llm_stage('healing'):
+                    response_heal = governed_generate_content(model, prompt_heal)
                 if response_heal and response_heal.text:
                     # Si mejora el score o es válida, aceptamos
                     second_val = validator.semantic_validate_story(response_heal.text, chunk[:1000])
@@ -103,7 +103,8 @@ def create_story_generation_prompt(
     role: str,
     business_context: str,
     start_index: int,
-    batch_size: int = 5
+    batch_size: int = 5,
+    reference_text: str = None
 ) -> str:
     """
     Crea prompt para generar historias de usuario por lotes.
@@ -115,6 +116,8 @@ def create_story_generation_prompt(
         business_context: Contexto adicional de negocio
         start_index: Índice de inicio del lote
         batch_size: Tamaño del lote
+        reference_text: Pasajes del documento relevantes para el lote (si no se indica,
+            se usa el inicio del documento)
         
     Returns:
         str: Prompt formateado para generación de historias
@@ -140,7 +143,7 @@ FUNCIONALIDADES A DESARROLLAR (Lote {start_index + 1} a {end_index}):
 {func_text}
 
 DOCUMENTO DE REFERENCIA (para contexto adicional):
-{document_text[:2000]}...
+{reference_text or document_text[:2000] + '...'}
 {context_section}
 FORMATO OBLIGATORIO para CADA funcionalidad:
 
@@ -363,3 +366,45 @@ Formato:
 [Tu resumen aquí]
 --- FIN CONTEXTO GLOBAL ---
 """
+
+# Fase "map": cada ventana de un documento extenso se resume por separado
+WINDOW_ANALYSIS_PROMPT = """
+Eres un Arquitecto de Soluciones experto. Estás leyendo el FRAGMENTO {window_number} de {total_windows} de un documento extenso.
+Extrae únicamente lo que aporte al CONTEXTO GLOBAL del sistema; otros fragmentos se analizan por separado.
+
+FRAGMENTO:
+{document_text}
+
+Extrae, si aparecen en este fragmento:
+
+1. GLOSARIO Y DEFINICIONES: términos de negocio, roles de usuario y jerarquías.
+2. REGLAS DE NEGOCIO GLOBALES: reglas transversales y restricciones técnicas o de seguridad.
+3. DEPENDENCIAS Y FLUJOS MACRO: conexiones entre módulos y pre-condiciones globales.
+
+SALIDA ESPERADA:
+Una lista concisa (máximo 300 palabras) agrupada por los tres apartados. Omite los apartados sin información.
+No inventes nada que no esté en el fragmento.
+"""
+
+# Fase "reduce": los resúmenes parciales se fusionan en un único contexto acotado
+GLOBAL_CONTEXT_MERGE_PROMPT = """
+Eres un Arquitecto de Soluciones experto. Recibes resúmenes parciales del CONTEXTO GLOBAL de un mismo documento,
+cada uno extraído de una parte distinta y en el orden del documento.
+
+RESÚMENES PARCIALES:
+{partial_contexts}
+
+Fusiónalos en un único contexto global:
+- Unifica términos, roles y reglas repetidos; conserva la definición más completa.
+- Si dos partes se contradicen, conserva ambas versiones indicando la contradicción.
+- No agregues información que no esté en los resúmenes.
+
+SALIDA ESPERADA:
+Un resumen estructurado y conciso (máximo 500 palabras) con los apartados GLOSARIO Y DEFINICIONES,
+REGLAS DE NEGOCIO GLOBALES y DEPENDENCIAS Y FLUJOS MACRO, que sirva como "Memoria de Proyecto".
+
+Formato:
+--- INICIO CONTEXTO GLOBAL ---
+[Tu resumen aquí]
+--- FIN CONTEXTO GLOBAL ---
+"""
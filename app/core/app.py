@@ -24,6 +24,7 @@ from app.utils.decorators import validate_file_upload, handle_errors
 # Imports de autenticación
 from app.auth.routes import auth_bp, init_rate_limiter
 from app.auth.decorators import login_required
+from app.auth.session_service import SessionService
 from app.services.jira.api.routes import jira_bp
 from app.auth.dashboard_routes import dashboard_bp
 from app.services.feedback.api.routes import feedback_bp
@@ -108,9 +109,10 @@ def inject_csrf_token():
     return dict(csrf_token=lambda: generate_csrf())
 
 # Inicializar servicios y orquestador (vía Dependency Injection)
-from app.core.dependencies import get_file_manager, get_generation_orchestrator
+from app.core.dependencies import get_file_manager, get_generation_orchestrator, get_generation_job_service
 file_manager = get_file_manager(UPLOAD_FOLDER)
 orchestrator = get_generation_orchestrator(file_manager)
+generation_jobs = get_generation_job_service(orchestrator, simple_agent_processing, story_backend)
 
 
 # Inicializar base de datos
@@ -120,6 +122,22 @@ try:
 except Exception as e:
     logger.error(f"Error al inicializar base de datos: {e}")
 
+
+def resume_generation_jobs() -> None:
+    """
+    Retoma los jobs de generación que un worker anterior dejó a medias (deploy, timeout)
+
+    Se llama de forma explícita desde el punto de entrada del servidor (run.py), no al importar
+    la aplicación, para que los tests y scripts que importan app no lancen hilos de generación.
+    """
+    try:
+        resumed_jobs = generation_jobs.resume_stale_jobs()
+        if resumed_jobs:
+            logger.info(f"{resumed_jobs} jobs de generación retomados")
+    except Exception as e:
+        logger.warning(f"No se pudieron retomar jobs de generación: {e}")
+
+
 # Inicializar rate limiter
 init_rate_limiter(app)
 
@@ -269,6 +287,20 @@ def overview():
 # FUNCIONES AUXILIARES
 # ============================================================================
 
+def generation_event_stream(job_id, last_event_id=0):
+    """Respuesta SSE con los eventos persistidos de un job de generación"""
+    return Response(
+        stream_with_context(generation_jobs.stream_events(job_id, last_event_id)),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'Connection': 'keep-alive',
+            'X-Accel-Buffering': 'no',
+            'X-Generation-Job-Id': job_id
+        }
+    )
+
+
 def clean_temp_files(filepath):
     """Limpia archivos temporales de forma segura"""
     try:
@@ -318,7 +350,7 @@ def generate_stories():
         document_text = extract_text_from_file(filepath)
         logger.info(f"Texto extraído: {len(document_text)} caracteres")
 
-        # Generar historias usando el orquestador con SSE
+        # Generar historias en un job persistido; la respuesta SSE lee sus eventos
         parameters = {
             'role': role,
             'business_context': business_context,
@@ -326,23 +358,10 @@ def generate_stories():
             'area': request.form.get('area', 'General')
         }
         
-        return Response(
-            stream_with_context(orchestrator.stream_generation_pipeline(
-                'story', 
-                document_text, 
-                parameters, 
-                output_filename, 
-                filepath, 
-                simple_agent_processing,
-                story_backend
-            )),
-            mimetype='text/event-stream',
-            headers={
-                'Cache-Control': 'no-cache',
-                'Connection': 'keep-alive',
-                'X-Accel-Buffering': 'no'
-            }
+        job_id = generation_jobs.submit(
+            'story', document_text, parameters, output_filename, filepath, SessionService.get_current_user_id()
         )
+        return generation_event_stream(job_id)
 
     except Exception as e:
         logger.error(f"Error en generate_stories: {e}", exc_info=True)
@@ -384,7 +403,7 @@ def generate_tests():
         text = extract_text_from_file(filepath)
         logger.info(f"Texto extraído: {len(text)} caracteres")
 
-        # Generar pruebas usando el orquestador con SSE
+        # Generar pruebas en un job persistido; la respuesta SSE lee sus eventos
         parameters = {
             'contexto': context,
             'flujo': flow,
@@ -392,22 +411,10 @@ def generate_tests():
             'area': request.form.get('area', 'General')
         }
         
-        return Response(
-            stream_with_context(orchestrator.stream_generation_pipeline(
-                'matrix', 
-                text, 
-                parameters, 
-                'matriz_pruebas', 
-                filepath, 
-                simple_agent_processing
-            )),
-            mimetype='text/event-stream',
-            headers={
-                'Cache-Control': 'no-cache',
-                'Connection': 'keep-alive',
-                'X-Accel-Buffering': 'no'
-            }
+        job_id = generation_jobs.submit(
+            'matrix', text, parameters, 'matriz_pruebas', filepath, SessionService.get_current_user_id()
         )
+        return generation_event_stream(job_id)
 
     except Exception as e:
         logger.error(f"Error en generate_tests: {e}", exc_info=True)
@@ -416,6 +423,28 @@ def generate_tests():
         return jsonify({"error": f"Error en el procesamiento: {str(e)}"}), 500
 
 
+@app.route('/api/generation-jobs/<job_id>/events', methods=['GET'])
+@login_required
+def generation_job_events(job_id):
+    """
+    Reconecta con los eventos SSE de un job de generación
+
+    El cliente indica el último evento recibido con la cabecera Last-Event-ID (o el parámetro
+    last_event_id) y recibe solo los posteriores; si el job sigue en curso, la conexión
+    continúa hasta su evento final.
+    """
+    job = generation_jobs.get_job(job_id)
+    if not job or job['user_id'] != SessionService.get_current_user_id():
+        return jsonify({"error": "Job de generación no encontrado"}), 404
+
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id') or '0'
+    try:
+        last_event_id = int(last_event_id)
+    except ValueError:
+        return jsonify({"error": "Last-Event-ID inválido"}), 400
+    return generation_event_stream(job_id, last_event_id)
+
+
 @app.route('/api/story', methods=['POST'])
 @login_required
 @validate_file_upload
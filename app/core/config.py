@@ -25,23 +25,78 @@ class Config:
     GEMINI_TIMEOUT_BASE = int(os.getenv('GEMINI_TIMEOUT_BASE', '180'))
     GEMINI_TIMEOUT_INCREMENT = int(os.getenv('GEMINI_TIMEOUT_INCREMENT', '60'))
     GEMINI_TIMEOUT_ANALYSIS = int(os.getenv('GEMINI_TIMEOUT_ANALYSIS', '90'))
+    # Timeouts adaptativos: p95/p99 de la latencia reciente por tamaño de prompt (sin muestras: BASE + intento × INCREMENT)
+    GEMINI_TIMEOUT_ADAPTIVE = os.getenv('GEMINI_TIMEOUT_ADAPTIVE', 'True').lower() == 'true'
+    GEMINI_TIMEOUT_MIN = float(os.getenv('GEMINI_TIMEOUT_MIN', '30'))
+    GEMINI_TIMEOUT_MAX = float(os.getenv('GEMINI_TIMEOUT_MAX', '600'))
+    GEMINI_TIMEOUT_MARGIN = float(os.getenv('GEMINI_TIMEOUT_MARGIN', '1.5'))  # Factor sobre el percentil
+    GEMINI_TIMEOUT_MIN_SAMPLES = int(os.getenv('GEMINI_TIMEOUT_MIN_SAMPLES', '20'))
+    GEMINI_TIMEOUT_WINDOW = int(os.getenv('GEMINI_TIMEOUT_WINDOW', '200'))  # Muestras por tamaño de prompt
     GEMINI_TEMPERATURE = float(os.getenv('GEMINI_TEMPERATURE', '0.2'))  # Baja temperatura para mayor consistencia
     
+    # Gobernador de cuota (compartido entre workers vía archivo SQLite local)
+    GEMINI_QUOTA_RPM = int(os.getenv('GEMINI_QUOTA_RPM', '10'))  # Peticiones por minuto (0 = sin límite)
+    GEMINI_QUOTA_TPM = int(os.getenv('GEMINI_QUOTA_TPM', '250000'))  # Tokens estimados por minuto (0 = sin límite)
+    GEMINI_QUOTA_OUTPUT_TOKENS = int(os.getenv('GEMINI_QUOTA_OUTPUT_TOKENS', '2000'))  # Tokens de salida estimados por llamada
+    GEMINI_QUOTA_COOLDOWN_SECONDS = float(os.getenv('GEMINI_QUOTA_COOLDOWN_SECONDS', '15'))  # Pausa global tras un 429
+    GEMINI_QUOTA_MAX_WAIT_SECONDS = float(os.getenv('GEMINI_QUOTA_MAX_WAIT_SECONDS', '300'))  # Espera máxima antes de enviar igualmente
+    GEMINI_QUOTA_STORE_PATH = os.getenv('GEMINI_QUOTA_STORE_PATH', '')  # Default: directorio temporal del sistema
+    
+    # Caché de respuestas del modelo (SHA256 de modelo + prompt + configuración, archivo SQLite local)
+    LLM_CACHE_ENABLED = os.getenv('LLM_CACHE_ENABLED', 'True').lower() == 'true'
+    LLM_CACHE_TTL_HOURS = float(os.getenv('LLM_CACHE_TTL_HOURS', '24'))  # Vigencia de una respuesta
+    LLM_CACHE_MAX_ENTRIES = int(os.getenv('LLM_CACHE_MAX_ENTRIES', '5000'))  # Máximo de respuestas (expulsión LRU)
+    LLM_CACHE_PATH = os.getenv('LLM_CACHE_PATH', '')  # Default: directorio temporal del sistema
+    
+    # Telemetría de llamadas al modelo (tiempos, tokens y reintentos por etapa, archivo SQLite local)
+    LLM_TELEMETRY_ENABLED = os.getenv('LLM_TELEMETRY_ENABLED', 'True').lower() == 'true'
+    LLM_TELEMETRY_MAX_ROWS = int(os.getenv('LLM_TELEMETRY_MAX_ROWS', '20000'))  # Registros conservados
+    LLM_TELEMETRY_PATH = os.getenv('LLM_TELEMETRY_PATH', '')  # Default: directorio temporal del sistema
+    
+    # Cassettes de llamadas al modelo (grabar/reproducir para benchmarks y regresión sin red)
+    LLM_CASSETTE_MODE = os.getenv('LLM_CASSETTE_MODE', '').lower()  # '', 'record' o 'replay'
+    LLM_CASSETTE_PATH = os.getenv('LLM_CASSETTE_PATH', 'llm_cassette.jsonl')
+    LLM_CASSETTE_LATENCY_SCALE = float(os.getenv('LLM_CASSETTE_LATENCY_SCALE', '0'))  # 1 = latencia grabada
+    LLM_CASSETTE_ERROR_RATE = float(os.getenv('LLM_CASSETTE_ERROR_RATE', '0'))  # Probabilidad de 429 simulado
+    LLM_CASSETTE_SEED = int(os.getenv('LLM_CASSETTE_SEED', '0'))
+    
     # ============================================================================
     # Reintentos
     # ============================================================================
     MAX_RETRIES = int(os.getenv('MAX_RETRIES', '3'))
     RETRY_DELAY = int(os.getenv('RETRY_DELAY', '5'))  # Aumentado para manejar mejor el rate limit
+    GEMINI_MAX_CONCURRENT_CALLS = int(os.getenv('GEMINI_MAX_CONCURRENT_CALLS', '4'))  # Fragmentos en paralelo
+    GEMINI_MIN_CALL_INTERVAL = float(os.getenv('GEMINI_MIN_CALL_INTERVAL', '1.0'))  # Segundos entre inicios de llamada
+    HEALING_BATCH_SIZE = int(os.getenv('HEALING_BATCH_SIZE', '5'))  # Ítems por sub-lote de sanación
+    HEALING_MAX_CONCURRENT_CALLS = int(os.getenv('HEALING_MAX_CONCURRENT_CALLS', '3'))  # Sub-lotes de sanación en paralelo
     
     # ============================================================================
     # Procesamiento de Documentos
     # ============================================================================
     STORY_MAX_CHUNK_SIZE = int(os.getenv('STORY_MAX_CHUNK_SIZE', '3000'))
     MATRIX_MAX_CHUNK_SIZE = int(os.getenv('MATRIX_MAX_CHUNK_SIZE', '4000'))
+    # Chunking por tokens estimados (mide tablas y prosa en español mejor que los caracteres)
+    CHUNK_BY_TOKENS = os.getenv('CHUNK_BY_TOKENS', 'True').lower() == 'true'
+    STORY_MAX_CHUNK_TOKENS = int(os.getenv('STORY_MAX_CHUNK_TOKENS', '850'))  # ~3000 caracteres de prosa
+    MATRIX_MAX_CHUNK_TOKENS = int(os.getenv('MATRIX_MAX_CHUNK_TOKENS', '1100'))  # ~4000 caracteres de prosa
+    CHUNK_OVERLAP_TOKENS = int(os.getenv('CHUNK_OVERLAP_TOKENS', '0'))  # Tokens repetidos entre chunks consecutivos
     LARGE_DOCUMENT_THRESHOLD = int(os.getenv('LARGE_DOCUMENT_THRESHOLD', '5000'))
     STORY_BATCH_SIZE = int(os.getenv('STORY_BATCH_SIZE', '5'))
+    # Empaquetado de segmentos pequeños (historias de la matriz, lotes de funcionalidades) en una sola petición
+    REQUEST_PACKING_MAX_SEGMENTS = int(os.getenv('REQUEST_PACKING_MAX_SEGMENTS', '4'))  # 1 = sin empaquetar
+    STORY_PACK_MAX_TOKENS = int(os.getenv('STORY_PACK_MAX_TOKENS', '300'))  # Tokens de funcionalidades por lote empaquetado
+    STORY_PACK_MAX_STORIES = int(os.getenv('STORY_PACK_MAX_STORIES', '10'))  # Historias por petición (acota la respuesta)
     MIN_DOCUMENT_LENGTH = int(os.getenv('MIN_DOCUMENT_LENGTH', '50'))
     MIN_RESPONSE_LENGTH = int(os.getenv('MIN_RESPONSE_LENGTH', '50'))
+    GENERATION_MEMO_ENABLED = os.getenv('GENERATION_MEMO_ENABLED', 'True').lower() == 'true'  # Reutilizar resultados del mismo documento
+    GENERATION_JOB_STALE_SECONDS = float(os.getenv('GENERATION_JOB_STALE_SECONDS', '60'))  # Sin actividad = job abandonado (se reanuda)
+    GENERATION_JOB_MAX_ATTEMPTS = int(os.getenv('GENERATION_JOB_MAX_ATTEMPTS', '3'))  # Intentos de un job antes de darlo por fallido
+    GENERATION_JOB_RETENTION_HOURS = float(os.getenv('GENERATION_JOB_RETENTION_HOURS', '24'))  # Conservación de jobs terminados
+    CONTEXT_WINDOW_SIZE = int(os.getenv('CONTEXT_WINDOW_SIZE', '30000'))  # Caracteres por ventana del análisis global
+    CONTEXT_MAX_LENGTH = int(os.getenv('CONTEXT_MAX_LENGTH', '6000'))  # Máximo del contexto global fusionado
+    RETRIEVAL_PASSAGE_SIZE = int(os.getenv('RETRIEVAL_PASSAGE_SIZE', '800'))  # Caracteres por pasaje del índice BM25
+    RETRIEVAL_TOP_K = int(os.getenv('RETRIEVAL_TOP_K', '4'))  # Pasajes del documento por lote de historias
+    RETRIEVAL_MAX_CHARS = int(os.getenv('RETRIEVAL_MAX_CHARS', '2500'))  # Presupuesto de referencia por prompt
     
     # ============================================================================
     # Configuración de Jira
@@ -75,12 +130,19 @@ class Config:
     
     # Caché de metadata de campos (para carga masiva)
     JIRA_FIELD_METADATA_CACHE_TTL_SECONDS = int(os.getenv('JIRA_FIELD_METADATA_CACHE_TTL_SECONDS', '300'))  # 5 minutos
+    JIRA_FIELD_METADATA_CACHE_PERSIST = os.getenv('JIRA_FIELD_METADATA_CACHE_PERSIST', 'False').lower() == 'true'  # Compartir entre workers vía BD
     
     # Rate Limiting para creación de issues
     JIRA_CREATE_ISSUE_DELAY_SECONDS = float(os.getenv('JIRA_CREATE_ISSUE_DELAY_SECONDS', '0.5'))  # Delay entre issues
     JIRA_CREATE_ISSUE_BACKOFF_MULTIPLIER = float(os.getenv('JIRA_CREATE_ISSUE_BACKOFF_MULTIPLIER', '1.5'))  # Multiplicador de backoff
     JIRA_CREATE_ISSUE_MAX_DELAY_SECONDS = float(os.getenv('JIRA_CREATE_ISSUE_MAX_DELAY_SECONDS', '5.0'))  # Delay máximo
     
+    # Idempotencia de cargas masivas
+    JIRA_UPLOAD_BATCH_SIZE = int(os.getenv('JIRA_UPLOAD_BATCH_SIZE', '100'))  # Filas preparadas por lote antes de crear
+    JIRA_UPLOAD_FINGERPRINT_LABELS = os.getenv('JIRA_UPLOAD_FINGERPRINT_LABELS', 'False').lower() == 'true'  # Label nexus-fp-* + búsqueda JQL
+    JIRA_UPLOAD_FINGERPRINT_RETENTION_HOURS = float(os.getenv('JIRA_UPLOAD_FINGERPRINT_RETENTION_HOURS', '24'))  # Ventana de reintentos de una carga
+    JIRA_UPLOAD_JOB_STALE_SECONDS = float(os.getenv('JIRA_UPLOAD_JOB_STALE_SECONDS', '120'))  # Carga sin actividad = abandonada
+    
     # ============================================================================
     # Flask
     # ============================================================================
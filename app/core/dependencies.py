@@ -21,6 +21,7 @@ from app.services.text_processor import TextProcessor
 from app.services.validator import Validator
 from app.services.file_generator import FileGenerator
 from app.services.generation_orchestrator import GenerationOrchestrator
+from app.services.generation_jobs import GenerationJobService
 from app.services.feedback_service import FeedbackService
 from app.services.pdf.infrastructure.playwright_generator import PlaywrightPdfGenerator
 from app.services.pdf.infrastructure.weasyprint_generator import WeasyPrintPdfGenerator
@@ -90,3 +91,7 @@ def get_generation_orchestrator(file_manager: FileManager) -> GenerationOrchestr
         validator=get_validator(),
         file_generator=get_file_generator()
     )
+
+def get_generation_job_service(orchestrator: GenerationOrchestrator, agent_processing_func, story_backend=None) -> GenerationJobService:
+    """Retorna una instancia de GenerationJobService sobre el orquestador"""
+    return GenerationJobService(orchestrator, agent_processing_func, story_backend)
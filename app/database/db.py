@@ -303,6 +303,91 @@ class Database:
                 
                 conn.execute(text(bulk_uploads_sql))
                 
+                # Huellas de issues creados por cargas masivas (reintentos idempotentes)
+                conn.execute(text('''
+                    CREATE TABLE IF NOT EXISTS bulk_upload_fingerprints (
+                        job_id TEXT NOT NULL,
+                        project_key TEXT NOT NULL,
+                        fingerprint TEXT NOT NULL,
+                        issue_key TEXT NOT NULL,
+                        created_at {} NOT NULL,
+                        PRIMARY KEY (job_id, fingerprint)
+                    )
+                '''.format('TEXT' if self.is_sqlite else 'TIMESTAMP')))
+                # Jobs de carga en curso: un reintento concurrente del mismo job no crea duplicados
+                conn.execute(text('''
+                    CREATE TABLE IF NOT EXISTS bulk_upload_jobs (
+                        job_id TEXT PRIMARY KEY,
+                        project_key TEXT NOT NULL,
+                        status TEXT NOT NULL,
+                        owner TEXT NOT NULL,
+                        updated_at {} NOT NULL
+                    )
+                '''.format('REAL' if self.is_sqlite else 'DOUBLE PRECISION')))
+                
+                # Caché compartido de metadata de creación (createmeta) entre workers
+                conn.execute(text('''
+                    CREATE TABLE IF NOT EXISTS jira_field_metadata_cache (
+                        cache_key TEXT PRIMARY KEY,
+                        payload TEXT NOT NULL,
+                        fetched_at {} NOT NULL
+                    )
+                '''.format('REAL' if self.is_sqlite else 'DOUBLE PRECISION')))
+                
+                # Invalidaciones del caché de métricas (compartidas entre workers)
+                conn.execute(text('''
+                    CREATE TABLE IF NOT EXISTS metrics_cache_invalidations (
+                        project_key TEXT PRIMARY KEY,
+                        invalidated_at {} NOT NULL
+                    )
+                '''.format('REAL' if self.is_sqlite else 'DOUBLE PRECISION')))
+                
+                # Huellas de documentos ya generados -> registro en user_stories / test_cases
+                conn.execute(text('''
+                    CREATE TABLE IF NOT EXISTS generation_fingerprints (
+                        fingerprint TEXT PRIMARY KEY,
+                        task_type TEXT NOT NULL,
+                        record_id INTEGER NOT NULL,
+                        created_at {} NOT NULL
+                    )
+                '''.format('REAL' if self.is_sqlite else 'DOUBLE PRECISION')))
+                
+                # Jobs de generación persistidos: eventos SSE para reconectar y puntos de control para reanudar
+                time_type = 'REAL' if self.is_sqlite else 'DOUBLE PRECISION'
+                conn.execute(text('''
+                    CREATE TABLE IF NOT EXISTS generation_jobs (
+                        id TEXT PRIMARY KEY,
+                        user_id TEXT,
+                        task_type TEXT NOT NULL,
+                        status TEXT NOT NULL,
+                        parameters TEXT NOT NULL,
+                        document_text TEXT NOT NULL,
+                        output_filename TEXT NOT NULL,
+                        filepath TEXT,
+                        attempts INTEGER NOT NULL DEFAULT 1,
+                        created_at {0} NOT NULL,
+                        updated_at {0} NOT NULL
+                    )
+                '''.format(time_type)))
+                conn.execute(text('''
+                    CREATE TABLE IF NOT EXISTS generation_job_events (
+                        job_id TEXT NOT NULL,
+                        seq INTEGER NOT NULL,
+                        payload TEXT NOT NULL,
+                        created_at {0} NOT NULL,
+                        PRIMARY KEY (job_id, seq)
+                    )
+                '''.format(time_type)))
+                conn.execute(text('''
+                    CREATE TABLE IF NOT EXISTS generation_job_checkpoints (
+                        job_id TEXT NOT NULL,
+                        checkpoint_key TEXT NOT NULL,
+                        result TEXT NOT NULL,
+                        created_at {0} NOT NULL,
+                        PRIMARY KEY (job_id, checkpoint_key)
+                    )
+                '''.format(time_type)))
+                
                 # Índices para mejorar rendimiento
                 conn.execute(text('CREATE INDEX IF NOT EXISTS idx_users_email ON users(email)'))
                 conn.execute(text('CREATE INDEX IF NOT EXISTS idx_users_role ON users(role)'))
@@ -316,6 +401,7 @@ class Database:
                 conn.execute(text('CREATE INDEX IF NOT EXISTS idx_jira_reports_project ON jira_reports(project_key)'))
                 conn.execute(text('CREATE INDEX IF NOT EXISTS idx_bulk_uploads_user ON bulk_uploads(user_id)'))
                 conn.execute(text('CREATE INDEX IF NOT EXISTS idx_bulk_uploads_project ON bulk_uploads(project_key)'))
+                conn.execute(text('CREATE INDEX IF NOT EXISTS idx_generation_jobs_status ON generation_jobs(status, updated_at)'))
                 
                 conn.commit()
                 
@@ -9,6 +9,11 @@ from app.database.repositories.user_story_repository import UserStoryRepository
 from app.database.repositories.test_case_repository import TestCaseRepository
 from app.database.repositories.jira_report_repository import JiraReportRepository
 from app.database.repositories.bulk_upload_repository import BulkUploadRepository
+from app.database.repositories.field_metadata_repository import FieldMetadataRepository
+from app.database.repositories.upload_fingerprint_repository import UploadFingerprintRepository
+from app.database.repositories.metrics_invalidation_repository import MetricsInvalidationRepository
+from app.database.repositories.generation_fingerprint_repository import GenerationFingerprintRepository
+from app.database.repositories.generation_job_repository import GenerationJobRepository
 
 __all__ = [
     'UserRepository',
@@ -17,7 +22,12 @@ __all__ = [
     'UserStoryRepository',
     'TestCaseRepository',
     'JiraReportRepository',
-    'BulkUploadRepository'
+    'BulkUploadRepository',
+    'FieldMetadataRepository',
+    'UploadFingerprintRepository',
+    'MetricsInvalidationRepository',
+    'GenerationFingerprintRepository',
+    'GenerationJobRepository'
 ]
 
 
@@ -0,0 +1,78 @@
+"""
+Repositorio de metadata de campos de Jira (createmeta)
+Responsabilidad única: Persistir respuestas de createmeta para compartirlas entre workers
+"""
+import logging
+import time
+from typing import Optional, Tuple
+
+from app.database.db import get_db
+
+logger = logging.getLogger(__name__)
+
+
+class FieldMetadataRepository:
+    """
+    Repositorio para la tabla jira_field_metadata_cache
+
+    Métodos:
+        - get: Obtiene el payload y su marca de tiempo
+        - save: Inserta o actualiza un payload
+        - delete: Elimina una entrada
+    """
+
+    def __init__(self):
+        """Inicializa el repositorio"""
+        self.db = get_db()
+
+    def get(self, cache_key: str) -> Optional[Tuple[str, float]]:
+        """
+        Obtiene una entrada persistida
+
+        Args:
+            cache_key: Clave del caché
+
+        Returns:
+            Tupla (payload JSON, fetched_at epoch) o None si no existe
+        """
+        with self.db.get_cursor() as cursor:
+            cursor.execute(
+                'SELECT payload, fetched_at FROM jira_field_metadata_cache WHERE cache_key = ?',
+                (cache_key,)
+            )
+            row = cursor.fetchone()
+            if not row:
+                return None
+            return row['payload'], float(row['fetched_at'])
+
+    def save(self, cache_key: str, payload: str, fetched_at: Optional[float] = None) -> None:
+        """
+        Inserta o reemplaza una entrada
+
+        Args:
+            cache_key: Clave del caché
+            payload: Respuesta de createmeta serializada como JSON
+            fetched_at: Marca de tiempo epoch (default: ahora)
+        """
+        with self.db.get_cursor() as cursor:
+            cursor.execute('''
+                INSERT INTO jira_field_metadata_cache (cache_key, payload, fetched_at)
+                VALUES (?, ?, ?)
+                ON CONFLICT (cache_key) DO UPDATE SET
+                    payload = excluded.payload,
+                    fetched_at = excluded.fetched_at
+            ''', (cache_key, payload, fetched_at or time.time()))
+
+    def delete(self, cache_key: str) -> bool:
+        """
+        Elimina una entrada
+
+        Args:
+            cache_key: Clave del caché
+
+        Returns:
+            True si se eliminó alguna fila
+        """
+        with self.db.get_cursor() as cursor:
+            cursor.execute('DELETE FROM jira_field_metadata_cache WHERE cache_key = ?', (cache_key,))
+            return cursor.rowcount > 0
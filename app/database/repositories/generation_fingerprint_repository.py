@@ -0,0 +1,74 @@
+"""
+Repositorio de huellas de generación
+Responsabilidad única: Asociar la huella de un documento y sus parámetros con el registro
+(user_stories / test_cases) que guarda el resultado ya generado
+"""
+import logging
+import time
+from typing import Dict, Optional
+
+from app.database.db import get_db
+
+logger = logging.getLogger(__name__)
+
+
+class GenerationFingerprintRepository:
+    """
+    Repositorio para la tabla generation_fingerprints
+
+    Métodos:
+        - get: Obtiene el registro asociado a una huella
+        - save: Asocia una huella con un registro
+        - delete: Elimina una huella (p. ej. si su registro ya no existe)
+    """
+
+    def __init__(self):
+        """Inicializa el repositorio"""
+        self.db = get_db()
+
+    def get(self, fingerprint: str) -> Optional[Dict]:
+        """
+        Obtiene el registro asociado a la huella
+
+        Args:
+            fingerprint: Huella de documento + parámetros
+
+        Returns:
+            Dict con task_type y record_id, o None si no existe
+        """
+        with self.db.get_cursor() as cursor:
+            cursor.execute(
+                'SELECT task_type, record_id FROM generation_fingerprints WHERE fingerprint = ?',
+                (fingerprint,)
+            )
+            row = cursor.fetchone()
+            return {'task_type': row['task_type'], 'record_id': int(row['record_id'])} if row else None
+
+    def save(self, fingerprint: str, task_type: str, record_id: int) -> None:
+        """
+        Asocia la huella con el registro (el más reciente reemplaza al anterior)
+
+        Args:
+            fingerprint: Huella de documento + parámetros
+            task_type: 'story' o 'matrix'
+            record_id: ID en user_stories o test_cases
+        """
+        with self.db.get_cursor() as cursor:
+            cursor.execute('''
+                INSERT INTO generation_fingerprints (fingerprint, task_type, record_id, created_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (fingerprint) DO UPDATE SET
+                    task_type = excluded.task_type,
+                    record_id = excluded.record_id,
+                    created_at = excluded.created_at
+            ''', (fingerprint, task_type, record_id, time.time()))
+
+    def delete(self, fingerprint: str) -> None:
+        """
+        Elimina una huella
+
+        Args:
+            fingerprint: Huella a eliminar
+        """
+        with self.db.get_cursor() as cursor:
+            cursor.execute('DELETE FROM generation_fingerprints WHERE fingerprint = ?', (fingerprint,))
@@ -0,0 +1,212 @@
+"""
+Repositorio de jobs de generación
+Responsabilidad única: Persistir los jobs de generación (historias / matriz), los eventos SSE
+que emiten y los puntos de control de los pasos ya completados
+"""
+import logging
+import time
+from typing import Dict, List, Optional, Tuple
+
+from app.database.db import get_db
+
+logger = logging.getLogger(__name__)
+
+
+class GenerationJobRepository:
+    """
+    Repositorio para las tablas generation_jobs, generation_job_events y generation_job_checkpoints
+
+    Métodos:
+        - create / get: Alta y consulta de un job
+        - set_status: Cambia el estado (running, completed, error)
+        - claim: Toma un job abandonado (sin actividad reciente) para reanudarlo
+        - list_stale: Jobs en ejecución sin actividad reciente
+        - append_event / get_events / last_seq: Eventos SSE del job
+        - touch: Registra actividad sin guardar un evento (latidos)
+        - load_checkpoint / save_checkpoint: Resultados de pasos completados
+        - purge_older_than: Elimina jobs terminados antiguos
+    """
+
+    def __init__(self):
+        """Inicializa el repositorio"""
+        self.db = get_db()
+
+    def create(self, job_id: str, user_id: Optional[str], task_type: str, parameters: str, document_text: str,
+               output_filename: str, filepath: Optional[str]) -> None:
+        """
+        Registra un job nuevo en estado 'running'
+
+        Args:
+            job_id: Identificador del job
+            user_id: Usuario que lo solicitó
+            task_type: 'story' o 'matrix'
+            parameters: Parámetros de generación serializados en JSON
+            document_text: Texto del documento (necesario para reanudar)
+            output_filename: Nombre base de los archivos de salida
+            filepath: Archivo temporal subido
+        """
+        now = time.time()
+        with self.db.get_cursor() as cursor:
+            cursor.execute('''
+                INSERT INTO generation_jobs
+                    (id, user_id, task_type, status, parameters, document_text, output_filename, filepath,
+                     attempts, created_at, updated_at)
+                VALUES (?, ?, ?, 'running', ?, ?, ?, ?, 1, ?, ?)
+            ''', (job_id, user_id, task_type, parameters, document_text, output_filename, filepath, now, now))
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """
+        Obtiene un job
+
+        Args:
+            job_id: Identificador del job
+
+        Returns:
+            Dict con las columnas del job o None si no existe
+        """
+        with self.db.get_cursor() as cursor:
+            cursor.execute('SELECT * FROM generation_jobs WHERE id = ?', (job_id,))
+            row = cursor.fetchone()
+            return dict(row) if row else None
+
+    def set_status(self, job_id: str, status: str) -> None:
+        """
+        Cambia el estado de un job. Al terminar se libera el documento y sus puntos de control.
+
+        Args:
+            job_id: Identificador del job
+            status: Nuevo estado
+        """
+        with self.db.get_cursor() as cursor:
+            if status in ('completed', 'error'):
+                cursor.execute(
+                    "UPDATE generation_jobs SET status = ?, document_text = '', updated_at = ? WHERE id = ?",
+                    (status, time.time(), job_id)
+                )
+                cursor.execute('DELETE FROM generation_job_checkpoints WHERE job_id = ?', (job_id,))
+            else:
+                cursor.execute('UPDATE generation_jobs SET status = ?, updated_at = ? WHERE id = ?',
+                               (status, time.time(), job_id))
+
+    def claim(self, job_id: str, stale_before: float) -> bool:
+        """
+        Toma un job en ejecución cuya última actividad es anterior a stale_before
+
+        La actualización es condicional, así que solo un worker puede tomarlo.
+
+        Returns:
+            bool: True si este worker lo tomó
+        """
+        with self.db.get_cursor() as cursor:
+            cursor.execute('''
+                UPDATE generation_jobs SET attempts = attempts + 1, updated_at = ?
+                WHERE id = ? AND status = 'running' AND updated_at < ?
+            ''', (time.time(), job_id, stale_before))
+            return cursor.rowcount == 1
+
+    def list_stale(self, stale_before: float) -> List[str]:
+        """
+        Lista los jobs en ejecución sin actividad desde stale_before
+
+        Returns:
+            List[str]: Identificadores de los jobs
+        """
+        with self.db.get_cursor() as cursor:
+            cursor.execute(
+                "SELECT id FROM generation_jobs WHERE status = 'running' AND updated_at < ?", (stale_before,)
+            )
+            return [row['id'] for row in cursor.fetchall()]
+
+    def append_event(self, job_id: str, seq: int, payload: str) -> bool:
+        """
+        Guarda un evento SSE y registra la actividad del job
+
+        Args:
+            job_id: Identificador del job
+            seq: Número de secuencia del evento (id del evento SSE)
+            payload: Contenido JSON del evento
+
+        Returns:
+            bool: False si el número de secuencia ya estaba ocupado (otro worker retomó el job)
+        """
+        now = time.time()
+        with self.db.get_cursor() as cursor:
+            cursor.execute('''
+                INSERT INTO generation_job_events (job_id, seq, payload, created_at) VALUES (?, ?, ?, ?)
+                ON CONFLICT (job_id, seq) DO NOTHING
+            ''', (job_id, seq, payload, now))
+            if cursor.rowcount != 1:
+                return False
+            cursor.execute('UPDATE generation_jobs SET updated_at = ? WHERE id = ?', (now, job_id))
+            return True
+
+    def touch(self, job_id: str) -> None:
+        """
+        Registra actividad de un job en ejecución sin guardar un evento (latidos del pipeline)
+
+        Args:
+            job_id: Identificador del job
+        """
+        with self.db.get_cursor() as cursor:
+            cursor.execute(
+                "UPDATE generation_jobs SET updated_at = ? WHERE id = ? AND status = 'running'", (time.time(), job_id)
+            )
+
+    def get_events(self, job_id: str, after_seq: int = 0, limit: int = 500) -> List[Tuple[int, str]]:
+        """
+        Obtiene los eventos posteriores a after_seq
+
+        Returns:
+            List[Tuple[int, str]]: (seq, payload) en orden
+        """
+        with self.db.get_cursor() as cursor:
+            cursor.execute('''
+                SELECT seq, payload FROM generation_job_events
+                WHERE job_id = ? AND seq > ? ORDER BY seq LIMIT ?
+            ''', (job_id, after_seq, limit))
+            return [(int(row['seq']), row['payload']) for row in cursor.fetchall()]
+
+    def last_seq(self, job_id: str) -> int:
+        """Número de secuencia del último evento del job (0 si no tiene)"""
+        with self.db.get_cursor() as cursor:
+            cursor.execute('SELECT MAX(seq) AS last_seq FROM generation_job_events WHERE job_id = ?', (job_id,))
+            row = cursor.fetchone()
+            return int(row['last_seq']) if row and row['last_seq'] is not None else 0
+
+    def load_checkpoint(self, job_id: str, key: str) -> Optional[str]:
+        """Resultado JSON guardado para el paso (None si no existe)"""
+        with self.db.get_cursor() as cursor:
+            cursor.execute(
+                'SELECT result FROM generation_job_checkpoints WHERE job_id = ? AND checkpoint_key = ?', (job_id, key)
+            )
+            row = cursor.fetchone()
+            return row['result'] if row else None
+
+    def save_checkpoint(self, job_id: str, key: str, result: str) -> None:
+        """Guarda el resultado JSON de un paso completado"""
+        with self.db.get_cursor() as cursor:
+            cursor.execute('''
+                INSERT INTO generation_job_checkpoints (job_id, checkpoint_key, result, created_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (job_id, checkpoint_key) DO UPDATE SET
+                    result = excluded.result,
+                    created_at = excluded.created_at
+            ''', (job_id, key, result, time.time()))
+
+    def purge_older_than(self, cutoff: float) -> int:
+        """
+        Elimina los jobs terminados antes de cutoff junto con sus eventos
+
+        Returns:
+            int: Jobs eliminados
+        """
+        with self.db.get_cursor() as cursor:
+            cursor.execute('''
+                DELETE FROM generation_job_events WHERE job_id IN (
+                    SELECT id FROM generation_jobs WHERE status IN ('completed', 'error') AND updated_at < ?
+                )
+            ''', (cutoff,))
+            cursor.execute(
+                "DELETE FROM generation_jobs WHERE status IN ('completed', 'error') AND updated_at < ?", (cutoff,)
+            )
+            return cursor.rowcount
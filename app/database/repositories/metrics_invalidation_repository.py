@@ -0,0 +1,60 @@
+"""
+Repositorio de invalidaciones del caché de métricas
+Responsabilidad única: Registrar cuándo cambiaron los issues de un proyecto para que todos los
+workers descarten sus métricas en caché anteriores a ese momento
+"""
+import logging
+import time
+from typing import Optional
+
+from app.database.db import get_db
+
+logger = logging.getLogger(__name__)
+
+
+class MetricsInvalidationRepository:
+    """
+    Repositorio para la tabla metrics_cache_invalidations
+
+    Métodos:
+        - get: Obtiene la última invalidación de un proyecto
+        - touch: Registra una invalidación
+    """
+
+    def __init__(self):
+        """Inicializa el repositorio"""
+        self.db = get_db()
+
+    def get(self, project_key: str) -> Optional[float]:
+        """
+        Obtiene la marca de tiempo de la última invalidación
+
+        Args:
+            project_key: Clave del proyecto
+
+        Returns:
+            Marca de tiempo epoch o None si el proyecto nunca se invalidó
+        """
+        with self.db.get_cursor() as cursor:
+            cursor.execute(
+                'SELECT invalidated_at FROM metrics_cache_invalidations WHERE project_key = ?',
+                (project_key,)
+            )
+            row = cursor.fetchone()
+            return float(row['invalidated_at']) if row else None
+
+    def touch(self, project_key: str, invalidated_at: Optional[float] = None) -> None:
+        """
+        Registra una invalidación para el proyecto
+
+        Args:
+            project_key: Clave del proyecto
+            invalidated_at: Marca de tiempo epoch (default: ahora)
+        """
+        with self.db.get_cursor() as cursor:
+            cursor.execute('''
+                INSERT INTO metrics_cache_invalidations (project_key, invalidated_at)
+                VALUES (?, ?)
+                ON CONFLICT (project_key) DO UPDATE SET
+                    invalidated_at = excluded.invalidated_at
+            ''', (project_key, invalidated_at or time.time()))
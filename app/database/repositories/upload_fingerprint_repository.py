@@ -0,0 +1,148 @@
+"""
+Repositorio de huellas de cargas masivas
+Responsabilidad única: Persistir la relación (job, huella) -> issue creado y el estado de cada
+job de carga para reintentos idempotentes
+"""
+import logging
+import time
+from datetime import datetime
+from typing import Dict, List
+
+from app.database.db import get_db
+
+logger = logging.getLogger(__name__)
+
+# Límite de parámetros por consulta IN (SQLite admite 999 por defecto)
+QUERY_BATCH_SIZE = 500
+
+
+class UploadFingerprintRepository:
+    """
+    Repositorio para las tablas bulk_upload_fingerprints y bulk_upload_jobs
+
+    Métodos:
+        - get_existing: Obtiene en lote las huellas ya registradas de un job
+        - save: Registra la clave creada para una huella
+        - purge_older_than: Elimina huellas y jobs antiguos (fuera de la ventana de reintentos)
+        - claim_job / heartbeat_job / release_job: Reserva de un job mientras se procesa
+    """
+
+    def __init__(self):
+        """Inicializa el repositorio"""
+        self.db = get_db()
+
+    def get_existing(self, job_id: str, fingerprints: List[str]) -> Dict[str, str]:
+        """
+        Obtiene las huellas que ya tienen un issue creado en el job
+
+        Args:
+            job_id: Identificador del job de carga
+            fingerprints: Huellas a consultar
+
+        Returns:
+            Dict {huella: clave del issue}
+        """
+        found = {}
+        with self.db.get_cursor() as cursor:
+            for start in range(0, len(fingerprints), QUERY_BATCH_SIZE):
+                batch = fingerprints[start:start + QUERY_BATCH_SIZE]
+                placeholders = ', '.join('?' for _ in batch)
+                cursor.execute(
+                    f'SELECT fingerprint, issue_key FROM bulk_upload_fingerprints '
+                    f'WHERE job_id = ? AND fingerprint IN ({placeholders})',
+                    (job_id, *batch)
+                )
+                for row in cursor.fetchall():
+                    found[row['fingerprint']] = row['issue_key']
+        return found
+
+    def save(self, job_id: str, project_key: str, fingerprint: str, issue_key: str) -> None:
+        """
+        Registra (o actualiza) la clave creada para una huella
+
+        Args:
+            job_id: Identificador del job de carga
+            project_key: Clave del proyecto
+            fingerprint: Huella del issue
+            issue_key: Clave asignada por Jira
+        """
+        with self.db.get_cursor() as cursor:
+            cursor.execute('''
+                INSERT INTO bulk_upload_fingerprints (job_id, project_key, fingerprint, issue_key, created_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (job_id, fingerprint) DO UPDATE SET issue_key = excluded.issue_key
+            ''', (job_id, project_key, fingerprint, issue_key, datetime.now().isoformat()))
+
+    def purge_older_than(self, cutoff: datetime) -> int:
+        """
+        Elimina las huellas registradas antes de cutoff
+
+        Args:
+            cutoff: Fecha límite; los reintentos posteriores a la ventana se tratan como cargas nuevas
+
+        Returns:
+            int: Huellas eliminadas
+        """
+        with self.db.get_cursor() as cursor:
+            cursor.execute('DELETE FROM bulk_upload_fingerprints WHERE created_at < ?', (cutoff.isoformat(),))
+            purged = cursor.rowcount
+            cursor.execute(
+                "DELETE FROM bulk_upload_jobs WHERE status != 'running' AND updated_at < ?", (cutoff.timestamp(),)
+            )
+            return purged
+
+    def claim_job(self, job_id: str, project_key: str, owner: str, stale_before: float) -> bool:
+        """
+        Reserva un job de carga para procesarlo
+
+        La reserva es condicional: solo se obtiene si el job no existe, ya terminó o quien lo
+        procesaba dejó de dar señales antes de stale_before.
+
+        Args:
+            job_id: Identificador del job de carga
+            project_key: Clave del proyecto
+            owner: Identificador de esta petición
+            stale_before: Marca de tiempo; una reserva sin actividad desde entonces se considera abandonada
+
+        Returns:
+            bool: True si esta petición obtuvo el job
+        """
+        with self.db.get_cursor() as cursor:
+            cursor.execute('''
+                INSERT INTO bulk_upload_jobs (job_id, project_key, status, owner, updated_at)
+                VALUES (?, ?, 'running', ?, ?)
+                ON CONFLICT (job_id) DO UPDATE SET
+                    status = 'running', owner = excluded.owner, updated_at = excluded.updated_at
+                WHERE bulk_upload_jobs.status != 'running' OR bulk_upload_jobs.updated_at < ?
+            ''', (job_id, project_key, owner, time.time(), stale_before))
+            cursor.execute('SELECT owner FROM bulk_upload_jobs WHERE job_id = ?', (job_id,))
+            row = cursor.fetchone()
+            return bool(row) and row['owner'] == owner
+
+    def heartbeat_job(self, job_id: str, owner: str) -> None:
+        """
+        Registra actividad del job reservado (evita que otra petición lo dé por abandonado)
+
+        Args:
+            job_id: Identificador del job de carga
+            owner: Identificador de la petición que lo reservó
+        """
+        with self.db.get_cursor() as cursor:
+            cursor.execute(
+                "UPDATE bulk_upload_jobs SET updated_at = ? WHERE job_id = ? AND owner = ? AND status = 'running'",
+                (time.time(), job_id, owner)
+            )
+
+    def release_job(self, job_id: str, owner: str) -> None:
+        """
+        Libera la reserva al terminar (un reintento posterior omitirá lo ya creado)
+
+        Args:
+            job_id: Identificador del job de carga
+            owner: Identificador de la petición que lo reservó
+        """
+        with self.db.get_cursor() as cursor:
+            cursor.execute(
+                "UPDATE bulk_upload_jobs SET status = 'done', updated_at = ? WHERE job_id = ? AND owner = ?",
+                (time.time(), job_id, owner)
+            )
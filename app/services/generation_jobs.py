@@ -0,0 +1,263 @@
+"""
+Jobs de generación persistidos
+Responsabilidad única: Ejecutar el pipeline de generación fuera de la petición HTTP, guardando
+cada evento SSE y los puntos de control de sus pasos en la base de datos
+
+- El cliente recibe los eventos leyendo la base de datos, así que puede reconectarse con
+  Last-Event-ID y recibir solo lo que le faltó.
+- Si el worker que ejecutaba el job muere (deploy, timeout), el job queda sin actividad y otro
+  worker lo retoma; los análisis, fragmentos y lotes ya completados se toman de sus puntos de
+  control en lugar de volver a llamar al modelo.
+"""
+import json
+import logging
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from app.core.config import Config
+from app.database.repositories.generation_job_repository import GenerationJobRepository
+
+logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = ('completed', 'error')
+KEEPALIVE_INTERVAL = 15.0
+
+
+class JobCheckpointStore:
+    """Puntos de control de un job guardados en generation_job_checkpoints (JSON)"""
+
+    def __init__(self, repository: GenerationJobRepository, job_id: str):
+        self.repository = repository
+        self.job_id = job_id
+
+    def load(self, key: str) -> Optional[Any]:
+        raw = self.repository.load_checkpoint(self.job_id, key)
+        return json.loads(raw) if raw else None
+
+    def save(self, key: str, value: Any) -> None:
+        self.repository.save_checkpoint(self.job_id, key, json.dumps(value, ensure_ascii=False))
+
+
+class _JobTakenOver(Exception):
+    """Otro worker retomó el job (su evento ya ocupa el número de secuencia)"""
+
+
+def _event_payload(message: str, progress: int, status: str) -> str:
+    """Evento propio del job con el mismo formato que los del orquestador"""
+    return json.dumps({"message": message, "progress": progress, "status": status,
+                       "terminal": status in TERMINAL_STATUSES}, ensure_ascii=False)
+
+
+class GenerationJobService:
+    """Crea, ejecuta, reanuda y transmite jobs de generación"""
+
+    def __init__(
+        self,
+        orchestrator,
+        agent_processing_func: Callable,
+        story_backend=None,
+        repository: Optional[GenerationJobRepository] = None,
+        poll_interval: float = 0.5,
+        stale_seconds: float = None,
+        max_attempts: int = None
+    ):
+        """
+        Inicializa el servicio
+
+        Args:
+            orchestrator: GenerationOrchestrator que ejecuta el pipeline
+            agent_processing_func: Función de generación con IA (simple_agent_processing)
+            story_backend: Backend de historias para el ensamblaje
+            repository: Repositorio de jobs (default: GenerationJobRepository)
+            poll_interval: Segundos entre lecturas de eventos nuevos al transmitir
+            stale_seconds: Sin actividad durante este tiempo el job se considera abandonado
+                           (default: Config.GENERATION_JOB_STALE_SECONDS)
+            max_attempts: Intentos antes de dar el job por fallido (default: Config.GENERATION_JOB_MAX_ATTEMPTS)
+        """
+        self.orchestrator = orchestrator
+        self.agent_processing_func = agent_processing_func
+        self.story_backend = story_backend
+        self.repository = repository or GenerationJobRepository()
+        self.poll_interval = poll_interval
+        self.stale_seconds = Config.GENERATION_JOB_STALE_SECONDS if stale_seconds is None else stale_seconds
+        self.max_attempts = Config.GENERATION_JOB_MAX_ATTEMPTS if max_attempts is None else max_attempts
+
+    def submit(self, task_type: str, document_text: str, parameters: Dict, output_filename: str,
+               filepath: Optional[str], user_id: Optional[str]) -> str:
+        """
+        Registra un job y lo inicia en segundo plano
+
+        Args:
+            task_type: 'story' o 'matrix'
+            document_text: Texto del documento
+            parameters: Parámetros de generación (serializables a JSON)
+            output_filename: Nombre base de los archivos de salida
+            filepath: Archivo temporal subido
+            user_id: Usuario que lo solicita
+
+        Returns:
+            str: Identificador del job
+        """
+        self._purge_finished()
+        job_id = uuid.uuid4().hex
+        self.repository.create(job_id, user_id, task_type, json.dumps(parameters, ensure_ascii=False),
+                               document_text, output_filename, filepath)
+        logger.info(f"Job de generación {job_id} ({task_type}) creado")
+        self._start(job_id)
+        return job_id
+
+    def get_job(self, job_id: str) -> Optional[Dict]:
+        """Obtiene un job (None si no existe)"""
+        return self.repository.get(job_id)
+
+    def stream_events(self, job_id: str, last_event_id: int = 0) -> Iterator[str]:
+        """
+        Transmite los eventos SSE del job a partir de last_event_id
+
+        Cada evento lleva su número de secuencia como id, para que el cliente pueda reconectarse
+        con Last-Event-ID. Si el job quedó abandonado mientras se espera, se reanuda.
+
+        Args:
+            job_id: Identificador del job
+            last_event_id: Último evento ya recibido por el cliente (0 = desde el principio)
+
+        Yields:
+            str: Eventos en formato SSE (id + data) o comentarios de keepalive
+        """
+        after = last_event_id
+        idle_since = time.monotonic()
+        while True:
+            events = self.repository.get_events(job_id, after)
+            for seq, payload in events:
+                after = seq
+                yield f"id: {seq}\ndata: {payload}\n\n"
+                if json.loads(payload).get('terminal'):
+                    return
+            if events:
+                idle_since = time.monotonic()
+                continue
+
+            job = self.repository.get(job_id)
+            if job is None or job['status'] in TERMINAL_STATUSES:
+                return
+            self.resume_if_stale(job)
+            if time.monotonic() - idle_since >= KEEPALIVE_INTERVAL:
+                # Comentario SSE: mantiene viva la conexión sin generar un evento
+                yield ": keepalive\n\n"
+                idle_since = time.monotonic()
+            time.sleep(self.poll_interval)
+
+    def resume_if_stale(self, job: Dict) -> bool:
+        """
+        Retoma un job en ejecución que lleva stale_seconds sin actividad
+
+        Args:
+            job: Job leído del repositorio
+
+        Returns:
+            bool: True si este worker lo retomó
+        """
+        if job['status'] != 'running':
+            return False
+        stale_before = time.time() - self.stale_seconds
+        if job['updated_at'] >= stale_before or not self.repository.claim(job['id'], stale_before):
+            return False
+
+        if job['attempts'] >= self.max_attempts:
+            logger.error(f"Job de generación {job['id']} abandonado tras {job['attempts']} intentos")
+            self._finish_with_error(job['id'], f"La generación se interrumpió {job['attempts']} veces y no pudo completarse.")
+            return False
+
+        logger.warning(f"Job de generación {job['id']} sin actividad: se reanuda (intento {job['attempts'] + 1})")
+        self._start(job['id'])
+        return True
+
+    def resume_stale_jobs(self) -> int:
+        """
+        Retoma todos los jobs abandonados (p. ej. al iniciar un worker tras un deploy)
+
+        Returns:
+            int: Jobs retomados
+        """
+        resumed = 0
+        for job_id in self.repository.list_stale(time.time() - self.stale_seconds):
+            job = self.repository.get(job_id)
+            if job and self.resume_if_stale(job):
+                resumed += 1
+        return resumed
+
+    def _start(self, job_id: str) -> None:
+        thread = threading.Thread(target=self._run, args=(job_id,), daemon=True, name=f"generation-job-{job_id[:8]}")
+        thread.start()
+
+    def _run(self, job_id: str) -> None:
+        """Ejecuta (o reanuda) el pipeline del job guardando cada evento"""
+        job = self.repository.get(job_id)
+        if job is None:
+            return
+        seq = self.repository.last_seq(job_id)
+
+        def emit(payload: str) -> Dict:
+            nonlocal seq
+            # Solo un número de secuencia ocupado indica que otro worker retomó el job; cualquier
+            # otro error al guardar el evento termina el job con error
+            if not self.repository.append_event(job_id, seq + 1, payload):
+                raise _JobTakenOver(f"evento {seq + 1} ya registrado")
+            seq += 1
+            return json.loads(payload)
+
+        pipeline = None
+        try:
+            if seq > 0:
+                emit(_event_payload("Reanudando la generación desde el último paso completado...", 2, "Reanudación"))
+            pipeline = self.orchestrator.stream_generation_pipeline(
+                job['task_type'],
+                job['document_text'],
+                json.loads(job['parameters']),
+                job['output_filename'],
+                job['filepath'],
+                self.agent_processing_func,
+                self.story_backend,
+                checkpoints=JobCheckpointStore(self.repository, job_id),
+                user_id=job['user_id']
+            )
+            status = None
+            for message in pipeline:
+                payload = message[len('data: '):].strip()
+                if json.loads(payload).get('heartbeat'):
+                    # Los latidos solo indican que el job sigue vivo: no se guardan ni se reenvían
+                    # (stream_events mantiene la conexión con comentarios de keepalive)
+                    self.repository.touch(job_id)
+                    continue
+                event = emit(payload)
+                if event.get('terminal'):
+                    status = event.get('status')
+            if status not in TERMINAL_STATUSES:
+                emit(_event_payload("La generación terminó sin resultado.", 0, "error"))
+                status = 'error'
+            self.repository.set_status(job_id, status)
+            logger.info(f"Job de generación {job_id} terminado ({status})")
+        except _JobTakenOver as e:
+            logger.warning(f"Job de generación {job_id} retomado por otro worker; se detiene este intento: {e}")
+            if pipeline is not None:
+                pipeline.close()
+        except Exception as e:
+            logger.error(f"Error en job de generación {job_id}: {e}", exc_info=True)
+            self._finish_with_error(job_id, f"Error inesperado: {str(e)}")
+
+    def _finish_with_error(self, job_id: str, message: str) -> None:
+        try:
+            self.repository.append_event(job_id, self.repository.last_seq(job_id) + 1, _event_payload(message, 0, "error"))
+            self.repository.set_status(job_id, 'error')
+        except Exception as e:
+            logger.error(f"No se pudo registrar el error del job {job_id}: {e}")
+
+    def _purge_finished(self) -> None:
+        try:
+            purged = self.repository.purge_older_than(time.time() - Config.GENERATION_JOB_RETENTION_HOURS * 3600)
+            if purged:
+                logger.info(f"{purged} jobs de generación antiguos eliminados")
+        except Exception as e:
+            logger.warning(f"No se pudieron eliminar jobs de generación antiguos: {e}")
@@ -0,0 +1,175 @@
+"""
+Memoización de resultados de generación por huella de documento
+Responsabilidad única: Reconocer un documento ya procesado con los mismos parámetros y
+devolver las historias o casos guardados, sin volver a llamar al modelo
+
+La huella es el SHA256 del texto extraído normalizado (espacios colapsados) más el usuario, los
+parámetros de generación y la configuración que cambia los prompts (modelo, estrategia y tamaños
+de fragmento, lotes, recuperación de pasajes y empaquetado). El valor no se duplica: la huella apunta al registro ya persistido en user_stories /
+test_cases, cuyo JSON conserva el texto de cada historia (raw_text) y cada caso (raw_data).
+Cada usuario solo reutiliza sus propios registros.
+"""
+import hashlib
+import json
+import logging
+import re
+from typing import Any, Dict, List, Optional
+
+from app.core.config import Config
+
+logger = logging.getLogger(__name__)
+
+# Incrementar cuando cambien los prompts o el post-procesado para invalidar huellas anteriores
+MEMO_VERSION = 1
+
+# Parámetros que no afectan al contenido generado
+_IGNORED_PARAMETERS = {'area', 'on_partial', 'on_progress'}
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+def compute_generation_fingerprint(task_type: str, document_text: str, parameters: Optional[Dict] = None,
+                                   user_id: Optional[str] = None) -> str:
+    """
+    Calcula la huella de una generación
+
+    Args:
+        task_type: 'story' o 'matrix'
+        document_text: Texto extraído del documento
+        parameters: Parámetros de generación
+        user_id: Usuario dueño de la generación (dos usuarios nunca comparten huella)
+
+    Returns:
+        str: Huella hexadecimal SHA256
+    """
+    normalized_text = _WHITESPACE.sub(' ', document_text or '').strip()
+    relevant = {
+        key: sorted(value) if isinstance(value, (list, tuple, set)) else value
+        for key, value in (parameters or {}).items()
+        if key not in _IGNORED_PARAMETERS and not callable(value)
+    }
+    payload = json.dumps({
+        'version': MEMO_VERSION,
+        'task_type': task_type,
+        'user_id': str(user_id) if user_id is not None else None,
+        'text_sha256': hashlib.sha256(normalized_text.encode('utf-8')).hexdigest(),
+        'parameters': relevant,
+        'model': Config.GEMINI_MODEL,
+        'chunking': {
+            'story_chunk': Config.STORY_MAX_CHUNK_SIZE,
+            'matrix_chunk': Config.MATRIX_MAX_CHUNK_SIZE,
+            'by_tokens': Config.CHUNK_BY_TOKENS,
+            'story_chunk_tokens': Config.STORY_MAX_CHUNK_TOKENS,
+            'matrix_chunk_tokens': Config.MATRIX_MAX_CHUNK_TOKENS,
+            'overlap_tokens': Config.CHUNK_OVERLAP_TOKENS,
+            'large_document': Config.LARGE_DOCUMENT_THRESHOLD,
+            'story_batch': Config.STORY_BATCH_SIZE,
+        },
+        'retrieval': {
+            'passage_size': Config.RETRIEVAL_PASSAGE_SIZE,
+            'top_k': Config.RETRIEVAL_TOP_K,
+            'max_chars': Config.RETRIEVAL_MAX_CHARS,
+        },
+        'packing': {
+            'max_segments': Config.REQUEST_PACKING_MAX_SEGMENTS,
+            'story_pack_tokens': Config.STORY_PACK_MAX_TOKENS,
+            'story_pack_stories': Config.STORY_PACK_MAX_STORIES,
+        },
+    }, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class GenerationMemo:
+    """Índice huella -> resultado guardado de historias y matrices"""
+
+    def __init__(self, repository=None, story_repository=None, test_case_repository=None, enabled: bool = None):
+        """
+        Inicializa la memoización
+
+        Args:
+            repository: Repositorio de huellas (default: GenerationFingerprintRepository)
+            story_repository: Repositorio de historias (default: UserStoryRepository)
+            test_case_repository: Repositorio de casos (default: TestCaseRepository)
+            enabled: Activa la memoización (default: Config.GENERATION_MEMO_ENABLED)
+        """
+        self._repository = repository
+        self._story_repository = story_repository
+        self._test_case_repository = test_case_repository
+        self.enabled = Config.GENERATION_MEMO_ENABLED if enabled is None else enabled
+
+    def lookup(self, fingerprint: str, task_type: str, user_id: Optional[str] = None) -> Optional[List[Any]]:
+        """
+        Obtiene el resultado guardado para la huella
+
+        Args:
+            fingerprint: Huella de la generación
+            task_type: 'story' o 'matrix'
+            user_id: Si se indica, el registro debe pertenecer a este usuario
+
+        Returns:
+            Lista de historias (texto) o casos de prueba (dict), o None si no hay resultado previo
+        """
+        if not self.enabled or task_type not in ('story', 'matrix'):
+            return None
+        try:
+            entry = self._get_repository().get(fingerprint)
+            if not entry or entry['task_type'] != task_type:
+                return None
+
+            if task_type == 'story':
+                record = self._get_story_repository().get_by_id(entry['record_id'])
+                content, field = (record.story_content if record else None), 'raw_text'
+            else:
+                record = self._get_test_case_repository().get_by_id(entry['record_id'])
+                content, field = (record.test_case_content if record else None), 'raw_data'
+
+            if record and user_id is not None and str(record.user_id) != str(user_id):
+                logger.warning(f"El registro {entry['record_id']} de la huella pertenece a otro usuario; no se reutiliza")
+                return None
+
+            items = [item.get(field) for item in json.loads(content or '[]') if isinstance(item, dict)]
+            items = [item for item in items if item]
+            if not items:
+                # El registro se eliminó o no conserva el contenido original
+                self._get_repository().delete(fingerprint)
+                return None
+
+            logger.info(f"Documento ya procesado: se reutilizan {len(items)} resultado(s) del registro {entry['record_id']}")
+            return items
+        except Exception as e:
+            logger.warning(f"No se pudo consultar la memoización de generación: {e}")
+            return None
+
+    def remember(self, fingerprint: Optional[str], task_type: str, record_id: Optional[int]) -> None:
+        """
+        Asocia la huella con el registro recién guardado
+
+        Args:
+            fingerprint: Huella de la generación (None = no memoizar)
+            task_type: 'story' o 'matrix'
+            record_id: ID del registro en user_stories / test_cases
+        """
+        if not self.enabled or not fingerprint or not record_id:
+            return
+        try:
+            self._get_repository().save(fingerprint, task_type, record_id)
+        except Exception as e:
+            logger.warning(f"No se pudo registrar la huella de generación: {e}")
+
+    def _get_repository(self):
+        if self._repository is None:
+            from app.database.repositories.generation_fingerprint_repository import GenerationFingerprintRepository
+            self._repository = GenerationFingerprintRepository()
+        return self._repository
+
+    def _get_story_repository(self):
+        if self._story_repository is None:
+            from app.database.repositories.user_story_repository import UserStoryRepository
+            self._story_repository = UserStoryRepository()
+        return self._story_repository
+
+    def _get_test_case_repository(self):
+        if self._test_case_repository is None:
+            from app.database.repositories.test_case_repository import TestCaseRepository
+            self._test_case_repository = TestCaseRepository()
+        return self._test_case_repository
@@ -5,8 +5,9 @@ Responsabilidad única: Orquestar el proceso de generación completo
 import logging
 import os
 import json
+import queue
 import threading
-import time
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, Tuple, Optional, Any, List
 from datetime import datetime
 
@@ -14,6 +15,10 @@ from app.services.file_manager import FileManager
 from app.services.data_transformer import DataTransformer
 from app.services.validator import Validator
 from app.services.file_generator import FileGenerator
+from app.services.generation_memo import GenerationMemo, compute_generation_fingerprint
+from app.services.pipeline_progress import PipelineProgress
+from app.utils.job_checkpoints import CheckpointStore, checkpoint_scope, current_checkpoints
+from app.utils.progress_events import ARTIFACT_WRITTEN
 from app.utils.matrix_utils import extract_matrix_data
 from app.backend.matrix_backend import generate_test_cases_html_document, parse_test_cases_to_dict
 
@@ -26,6 +31,9 @@ from app.auth.session_service import SessionService
 
 logger = logging.getLogger(__name__)
 
+# Sin eventos, un latido mantiene viva la conexión SSE (proxies como Nginx cortan a los 60s sin datos)
+HEARTBEAT_INTERVAL = 2.0
+
 
 class GenerationOrchestrator:
     """Orquesta el proceso completo de generación de historias y matrices"""
@@ -52,6 +60,10 @@ class GenerationOrchestrator:
         self.file_generator = file_generator
         self.user_story_repo = UserStoryRepository()
         self.test_case_repo = TestCaseRepository()
+        self.generation_memo = GenerationMemo(
+            story_repository=self.user_story_repo,
+            test_case_repository=self.test_case_repo
+        )
 
     def stream_generation_pipeline(
         self,
@@ -61,85 +73,97 @@ class GenerationOrchestrator:
         output_filename: str,
         filepath: str,
         agent_processing_func,
-        story_backend=None
+        story_backend=None,
+        checkpoints: Optional[CheckpointStore] = None,
+        user_id: Optional[str] = None
     ):
         """
         Generador de eventos SSE para el pipeline de 6 pasos.
+
+        Si el mismo usuario ya procesó el mismo documento con los mismos parámetros, los archivos
+        se reconstruyen desde su resultado guardado sin volver a llamar al modelo ni crear otro
+        registro en la base de datos.
+
+        Args:
+            task_type: 'story', 'matrix' o 'both' (historias y matriz en paralelo)
+            checkpoints: Puntos de control del job que ejecuta el pipeline; los pasos que ya
+                         completó un intento anterior no vuelven a llamar al modelo
+            user_id: Usuario dueño de la generación (default: el de la sesión actual)
         """
+        if task_type == 'both':
+            yield from self._stream_both_generation(document_text, parameters, output_filename, filepath,
+                                                    agent_processing_func, story_backend, checkpoints, user_id)
+            return
+        if task_type not in ('story', 'matrix'):
+            yield self._format_sse(f"Tipo de generación no soportado: {task_type}", 0, "error")
+            return
+
         try:
+            fingerprint = None
+            owner_id = self._resolve_user_id(user_id)
+            if task_type in ('story', 'matrix') and owner_id:
+                fingerprint = compute_generation_fingerprint(task_type, document_text, parameters, user_id=owner_id)
+                memoized = self.generation_memo.lookup(fingerprint, task_type, user_id=owner_id)
+                if memoized:
+                    yield self._format_sse("Documento ya procesado: reutilizando el resultado guardado...", 50, "Reutilización")
+                    # El resultado ya está guardado: solo se regeneran los archivos, sin otro registro en BD
+                    if task_type == 'story':
+                        result_data, error = self.process_story_generation(memoized, output_filename, filepath, story_backend, parameters,
+                                                                           user_id=owner_id, persist=False)
+                    else:
+                        result_data, error = self.process_matrix_generation(memoized, output_filename, filepath, parameters,
+                                                                            user_id=owner_id, persist=False)
+                    if not error:
+                        result_data["memoized"] = True
+                        yield self._format_sse("¡Generación completada desde un resultado previo!", 100, "completed", result_data)
+                        return
+                    logger.warning(f"No se pudo reconstruir el resultado memoizado, se genera de nuevo: {error}")
+
             # --- PASO 1: GENERACIÓN INICIAL (LLM) ---
-            # Para evitar que la barra se congele, ejecutamos la IA en un hilo
-            # y simulamos progreso mientras esperamos la respuesta real.
-            
-            # Definir mensajes para la simulación
-            if task_type == 'story':
-                # AJUSTE: Incluir pasos de la nueva estrategia "Dos Pasadas"
-                sim_steps = [
-                    ("Iniciando análisis profundo del documento...", 5, "Inicio"),
-                    ("Extrayendo Contexto Global y Reglas de Negocio...", 15, "Contexto Global"),  # Nuevo paso crítico
-                    ("Identificando actores y perfiles de usuario...", 25, "Análisis"),
-                    ("Estructurando criterios de aceptación por lotes...", 35, "Estructura"),
-                    ("Aplicando contexto de negocio a cada historia...", 45, "Fusión Contextual"), # Nuevo paso
-                    ("Generando historias de usuario detalladas...", 55, "Generación"),
-                    ("Verificando consistencia de criterios de aceptación...", 65, "Verificación"),
-                    ("Refinando detalles técnicos y narrativos...", 75, "Refinamiento"),
-                    ("Validando reglas de negocio...", 85, "Validación"),
-                    ("Estandarizando formato de salida...", 92, "Formato"),
-                    ("Finalizando procesamiento...", 97, "Finalizando")
-                ]
-            else:
-                sim_steps = [
-                    ("Analizando flujos y precondiciones...", 15, "Análisis"),
-                    ("Identificando casos de éxito y flujos alternos...", 25, "Casos"),
-                    ("Diseñando validaciones de entrada y salida...", 42, "Validación"),
-                    ("Mapeando resultados esperados detallados...", 55, "Estructura"),
-                    ("Finalizando borrador de matriz técnica...", 65, "Finalización"),
-                    ("Verificando cobertura de escenarios...", 72, "Cobertura"),
-                    ("Generando datos de prueba sintéticos...", 80, "Datos"),
-                    ("Validando lógica secuencial de pasos...", 87, "Lógica"),
-                    ("Optimizando redacción de resultados esperados...", 93, "Optimización"),
-                    ("Finalizando procesamiento...", 95, "Finalizando")
-                ]
-
-            result_container = {"data": None, "error": None, "completed": False}
+            # La IA se ejecuta en un hilo; los generadores informan su avance real (fragmentos,
+            # curación, duplicados) y sus resultados parciales a través de una cola segura entre hilos.
+            result_container = {"data": None, "error": None}
+            events = queue.Queue()
+            tracker = PipelineProgress()
             
             def run_ia_task():
                 try:
                     parameters_with_skip = parameters.copy()
                     parameters_with_skip['skip_healing'] = True
-                    result_container["data"] = agent_processing_func(task_type, document_text, parameters_with_skip)
+                    parameters_with_skip['on_partial'] = lambda kind, item: events.put(('partial', kind, item))
+                    parameters_with_skip['on_progress'] = lambda event, data: events.put(('progress', event, data))
+                    with checkpoint_scope(checkpoints):
+                        result_container["data"] = agent_processing_func(task_type, document_text, parameters_with_skip)
                 except Exception as ex:
                     logger.error(f"Error en hilo de IA: {str(ex)}")
                     result_container["error"] = str(ex)
                 finally:
-                    result_container["completed"] = True
+                    events.put(('done', None, None))
 
             # Iniciar hilo de IA
             ia_thread = threading.Thread(target=run_ia_task)
             ia_thread.start()
+            yield self._format_sse("Iniciando análisis del documento...", 2, "Inicio")
 
-            # Bucle de progreso fluido (Simulado pero sincronizado)
-            sim_index = 0
-            # Aumentamos el heartbeat para evitar timeouts de red en proxies (ej. Nginx corta a los 60s si no hay datos)
-            HEARTBEAT_INTERVAL = 2.0 
+            # Cada evento se envía en cuanto llega. Si no llega ninguno, un latido mantiene viva la
+            # conexión e indica cuánto lleva sin novedades.
+            partial_count = 0
             
-            while not result_container["completed"]:
-                if sim_index < len(sim_steps):
-                    msg, prog, phase = sim_steps[sim_index]
-                    yield self._format_sse(msg, prog, phase)
-                    # Avanzamos más lento en los primeros pasos que son los pesados (Context Extraction)
-                    steps_delay = 5 if sim_index < 3 else 3
-                    
-                    # Esperar N segundos pero enviando "latidos" si es necesario (para mantener viva conexión)
-                    for _ in range(steps_delay):
-                        if result_container["completed"]: break
-                        time.sleep(1)
-                    
-                    sim_index += 1
+            while True:
+                try:
+                    channel, name, payload = events.get(timeout=HEARTBEAT_INTERVAL)
+                except queue.Empty:
+                    yield self._format_sse(tracker.heartbeat(), tracker.progress, "Procesando", heartbeat=True)
+                    continue
+
+                if channel == 'done':
+                    break
+                if channel == 'partial':
+                    partial_count += 1
+                    yield self._format_partial_sse(name, payload, partial_count, tracker.progress)
                 else:
-                    # Si la IA tarda más de lo esperado (fase de generación masiva), mantenemos viva la conexión
-                    yield self._format_sse("Procesando lotes de historias con IA...", 98, "Procesando")
-                    time.sleep(HEARTBEAT_INTERVAL)
+                    message, phase, data = tracker.apply(name, payload)
+                    yield self._format_sse(message, tracker.progress, phase, data)
 
             # Verificar si hubo error
             if result_container["error"]:
@@ -156,18 +180,16 @@ class GenerationOrchestrator:
             # Extraer contenido inicial
             if task_type == 'story':
                 content = self.data_transformer.extract_stories_from_result(result)
-            elif task_type == 'matrix':
+            else:
                 matrix_data = extract_matrix_data(result)
                 content = self.data_transformer.clean_matrix_data(matrix_data) if matrix_data else []
-            else:
-                content = []
 
             # --- PASO 2: EVALUACIÓN POR LLM CRITIC ---
-            yield self._format_sse("Ejecutando evaluación por LLM Critic...", 30, "Crítica")
+            yield self._format_sse("Ejecutando evaluación por LLM Critic...", 90, "Crítica")
             # En este flujo granular, el Critic se activa al detectar fallos en el Paso 3
             
             # --- PASO 3: VALIDACIÓN SEMÁNTICA ---
-            yield self._format_sse("Realizando validación semántica profunda...", 45, "Validación")
+            yield self._format_sse("Realizando validación semántica profunda...", 92, "Validación")
             
             issues_found = []
             if task_type == 'story':
@@ -175,7 +197,7 @@ class GenerationOrchestrator:
                     v_res = self.validator.semantic_validate_story(s, document_text[:1000])
                     if not v_res["is_valid"]:
                         issues_found.append(f"Historia: {', '.join(v_res['issues'])}")
-            elif task_type == 'matrix':
+            else:
                 for c in content:
                     v_res = self.validator.semantic_validate_case(c, document_text[:1000])
                     if not v_res["is_valid"]:
@@ -185,32 +207,35 @@ class GenerationOrchestrator:
             # --- PASO 4: VERIFICACIÓN DE CALIDAD (SIN HEALING) ---
             # La validación semántica ya se ejecutó en el backend
             # Aquí solo mostramos un mensaje de progreso visual
-            yield self._format_sse("Verificando calidad de casos generados...", 70, "Calidad")
+            yield self._format_sse("Verificando calidad de casos generados...", 94, "Calidad")
 
 
             # --- PASO 5: VALIDACIÓN FINAL DE INTEGRIDAD ---
-            yield self._format_sse("Realizando validación final de integridad...", 85, "Integridad")
+            yield self._format_sse("Realizando validación final de integridad...", 96, "Integridad")
             if task_type == 'story':
                 final_content = self.data_transformer.extract_stories_from_result(result)
                 valid_stories, _ = self.validator.validate_stories(final_content)
-            elif task_type == 'matrix':
+            else:
                 matrix_data = extract_matrix_data(result)
                 final_content = self.data_transformer.clean_matrix_data(matrix_data)
                 valid_test_cases, _ = self.validator.validate_test_cases(final_content)
 
             # --- PASO 6: ENSAMBLAJE PROTEGIDO ---
-            yield self._format_sse("Ensamblando archivos finales y base de datos...", 95, "Ensamblaje")
+            yield self._format_sse("Ensamblando archivos finales y base de datos...", 97, "Ensamblaje")
             
             if task_type == 'story':
-                result_data, error = self.process_story_generation(result, output_filename, filepath, story_backend, parameters)
-            elif task_type == 'matrix':
-                result_data, error = self.process_matrix_generation(result, output_filename, filepath, parameters)
+                result_data, error = self.process_story_generation(result, output_filename, filepath, story_backend, parameters,
+                                                                   document_fingerprint=fingerprint, user_id=user_id)
             else:
-                result_data, error = self.process_both_generation(document_text, parameters, output_filename, filepath, agent_processing_func, story_backend)
+                result_data, error = self.process_matrix_generation(result, output_filename, filepath, parameters,
+                                                                    document_fingerprint=fingerprint, user_id=user_id)
 
             if error:
                 yield self._format_sse(f"Error en ensamblaje: {error.get('error', 'Error desconocido')}", 0, "error")
                 return
+            if result_data.get("filename"):
+                message, phase, data = tracker.apply(ARTIFACT_WRITTEN, {"filename": result_data["filename"]})
+                yield self._format_sse(message, 99, phase, data)
 
             # Éxito final
             yield self._format_sse("¡Generación y validación completadas con éxito!", 100, "completed", result_data)
@@ -219,8 +244,69 @@ class GenerationOrchestrator:
             logger.error(f"Error en pipeline SSE: {e}", exc_info=True)
             yield self._format_sse(f"Error inesperado: {str(e)}", 0, "error")
 
-    def _format_sse(self, message: str, progress: int, status: str = "", data: Any = None) -> str:
-        """Formatea un mensaje para SSE siguiendo el estándar data: {...}\n\n"""
+    def _stream_both_generation(self, document_text: str, parameters: Dict, output_filename: str, filepath: str,
+                                agent_processing_func, story_backend, checkpoints: Optional[CheckpointStore],
+                                user_id: Optional[str]):
+        """
+        Eventos SSE de la generación combinada
+
+        process_both_generation ya ejecuta los dos pipelines en paralelo y arma el ZIP, así que aquí
+        solo se lanza en un hilo y se emiten latidos hasta que termina.
+        """
+        owner_id = self._resolve_user_id(user_id)
+        outcome = {}
+        finished = threading.Event()
+
+        def run_both():
+            try:
+                with checkpoint_scope(checkpoints):
+                    outcome['result'] = self.process_both_generation(document_text, parameters, output_filename, filepath,
+                                                                     agent_processing_func, story_backend, user_id=owner_id)
+            finally:
+                finished.set()
+
+        threading.Thread(target=run_both, daemon=True, name='both-generation-stream').start()
+        tracker = PipelineProgress()
+        tracker.activity = "Generando historias y matriz en paralelo"
+        yield self._format_sse("Iniciando generación de historias y matriz...", 2, "Inicio")
+
+        while not finished.wait(HEARTBEAT_INTERVAL):
+            yield self._format_sse(tracker.heartbeat(), tracker.progress, "Procesando", heartbeat=True)
+
+        result_data, error = outcome.get('result') or (None, {"error": "La generación combinada no devolvió resultado"})
+        if error:
+            yield self._format_sse(f"Error en ensamblaje: {error.get('error', 'Error desconocido')}", 0, "error")
+            return
+        message, phase, data = tracker.apply(ARTIFACT_WRITTEN, {"filename": result_data["filename"]})
+        yield self._format_sse(message, 99, phase, data)
+        yield self._format_sse("¡Generación y validación completadas con éxito!", 100, "completed", result_data)
+
+    @staticmethod
+    def _resolve_user_id(user_id: Optional[str]) -> Optional[str]:
+        """Usuario indicado o, dentro de una petición, el de la sesión (None si no hay ninguno)"""
+        if user_id:
+            return user_id
+        try:
+            return SessionService.get_current_user_id()
+        except RuntimeError:
+            # Fuera de un contexto de petición (jobs sin usuario, tests)
+            return None
+
+    def _format_partial_sse(self, kind: str, item: Any, count: int, progress: int) -> str:
+        """Formatea un resultado parcial (caso de prueba o historia) recibido en streaming"""
+        if kind == 'test_case':
+            title = item.get('titulo_caso_prueba') if isinstance(item, dict) else None
+            message = f"Caso de prueba {count} generado: {title}" if title else f"Caso de prueba {count} generado"
+        else:
+            message = f"Historia {count} generada"
+        return self._format_sse(message, progress, "partial", {"type": kind, "index": count, "item": item})
+
+    def _format_sse(self, message: str, progress: int, status: str = "", data: Any = None, heartbeat: bool = False) -> str:
+        """
+        Formatea un mensaje para SSE siguiendo el estándar data: {...}\n\n
+
+        Los latidos se marcan con "heartbeat" para que los jobs no los guarden como eventos.
+        """
         payload = {
             "message": message,
             "progress": progress,
@@ -229,6 +315,8 @@ class GenerationOrchestrator:
         }
         if data:
             payload["data"] = data
+        if heartbeat:
+            payload["heartbeat"] = True
         return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n"
     
     def process_story_generation(
@@ -237,9 +325,19 @@ class GenerationOrchestrator:
         output_filename: str, 
         filepath: str,
         story_backend,
-        parameters: Dict = None
+        parameters: Dict = None,
+        document_fingerprint: Optional[str] = None,
+        user_id: Optional[str] = None,
+        persist: bool = True
     ) -> Tuple[Optional[Dict], Optional[Dict]]:
-        """Procesa la generación de historias de usuario"""
+        """
+        Procesa la generación de historias de usuario
+
+        Si se indica document_fingerprint, el registro guardado queda asociado a la huella
+        para reutilizarlo cuando se vuelva a enviar el mismo documento. user_id permite guardar
+        el resultado fuera de una petición (jobs de generación); por defecto se usa el de la sesión.
+        Con persist=False (resultado memoizado, ya guardado) no se crea otro registro.
+        """
         try:
             stories_content = self.data_transformer.extract_stories_from_result(result)
             valid_stories, error_msg = self.validator.validate_stories(stories_content)
@@ -263,8 +361,10 @@ class GenerationOrchestrator:
             
             # --- GUARDAR EN BASE DE DATOS ---
             try:
-                user_id = SessionService.get_current_user_id()
-                if user_id:
+                user_id = user_id or SessionService.get_current_user_id()
+                if not persist:
+                    logger.info("Resultado reutilizado: ya está guardado en la base de datos, no se duplica")
+                elif user_id:
                     area = parameters.get('area', 'General') if parameters else 'General'
                     story_record = UserStory(
                         user_id=user_id,
@@ -278,6 +378,7 @@ class GenerationOrchestrator:
                     )
                     self.user_story_repo.create(story_record)
                     logger.info("Historias guardadas en base de datos correctamente")
+                    self.generation_memo.remember(document_fingerprint, 'story', story_record.id)
                 else:
                     logger.warning("No se pudo obtener user_id para guardar historias")
             except Exception as db_err:
@@ -303,9 +404,19 @@ class GenerationOrchestrator:
         result: Any, 
         output_filename: str, 
         filepath: str,
-        parameters: Dict = None
+        parameters: Dict = None,
+        document_fingerprint: Optional[str] = None,
+        user_id: Optional[str] = None,
+        persist: bool = True
     ) -> Tuple[Optional[Dict], Optional[Dict]]:
-        """Procesa la generación de matriz de pruebas"""
+        """
+        Procesa la generación de matriz de pruebas
+
+        Si se indica document_fingerprint, el registro guardado queda asociado a la huella
+        para reutilizarlo cuando se vuelva a enviar el mismo documento. user_id permite guardar
+        el resultado fuera de una petición (jobs de generación); por defecto se usa el de la sesión.
+        Con persist=False (resultado memoizado, ya guardado) no se crea otro registro.
+        """
         try:
             matrix_data = extract_matrix_data(result)
             cleaned_matrix_data = self.data_transformer.clean_matrix_data(matrix_data) if matrix_data else []
@@ -336,8 +447,10 @@ class GenerationOrchestrator:
             
             # --- GUARDAR EN BASE DE DATOS ---
             try:
-                user_id = SessionService.get_current_user_id()
-                if user_id:
+                user_id = user_id or SessionService.get_current_user_id()
+                if not persist:
+                    logger.info("Resultado reutilizado: ya está guardado en la base de datos, no se duplica")
+                elif user_id:
                     area = parameters.get('area', 'General') if parameters else 'General'
                     # El repositorio espera un objeto TestCases
                     test_case_record = TestCase(
@@ -352,6 +465,7 @@ class GenerationOrchestrator:
                     )
                     self.test_case_repo.create(test_case_record)
                     logger.info("Casos de prueba guardados en base de datos correctamente")
+                    self.generation_memo.remember(document_fingerprint, 'matrix', test_case_record.id)
                 else:
                     logger.warning("No se pudo obtener user_id para guardar casos de prueba")
             except Exception as db_err:
@@ -378,17 +492,33 @@ class GenerationOrchestrator:
         output_filename: str, 
         filepath: str,
         simple_agent_processing,
-        story_backend
+        story_backend,
+        user_id: Optional[str] = None
     ) -> Tuple[Optional[Dict], Optional[Dict]]:
-        """Procesa la generación simultánea de historias y matriz"""
+        """
+        Procesa la generación simultánea de historias y matriz
+
+        Los dos pipelines son independientes hasta el empaquetado: se ejecutan en paralelo sobre el
+        mismo texto ya extraído del documento (la única extracción de contexto global la hace el de
+        historias) y el ZIP se arma cuando ambos terminan. La cuota de Gemini la sigue repartiendo
+        el gobernador global, por lo que correr en paralelo no excede el límite de peticiones.
+        """
         try:
-            # Generar historias
-            stories_result = simple_agent_processing('story', document_text, parameters)
-            stories_data, s_error = self.process_story_generation(stories_result, f"{output_filename}_stories", filepath, story_backend, parameters)
-            
-            # Generar matriz
-            matrix_result = simple_agent_processing('matrix', document_text, parameters)
-            matrix_data, m_error = self.process_matrix_generation(matrix_result, f"{output_filename}_matrix", filepath, parameters)
+            # Los hilos no tienen contexto de petición ni el almacén de puntos de control del job
+            user_id = self._resolve_user_id(user_id)
+            checkpoints = current_checkpoints()
+
+            def run_pipeline(task_type: str, assemble):
+                with checkpoint_scope(checkpoints):
+                    return assemble(simple_agent_processing(task_type, document_text, parameters))
+
+            with ThreadPoolExecutor(max_workers=2, thread_name_prefix='both-generation') as executor:
+                stories_future = executor.submit(run_pipeline, 'story', lambda result: self.process_story_generation(
+                    result, f"{output_filename}_stories", filepath, story_backend, parameters, user_id=user_id))
+                matrix_future = executor.submit(run_pipeline, 'matrix', lambda result: self.process_matrix_generation(
+                    result, f"{output_filename}_matrix", filepath, parameters, user_id=user_id))
+                stories_data, s_error = stories_future.result()
+                matrix_data, m_error = matrix_future.result()
             
             if s_error or m_error:
                 return None, {"error": "Error en generación combinada"}
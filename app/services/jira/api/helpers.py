@@ -1,7 +1,8 @@
 import logging
 from datetime import datetime
-from typing import Dict
+from typing import Dict, Optional
 import base64
+import hashlib
 
 logger = logging.getLogger(__name__)
 
@@ -125,3 +126,15 @@ def generate_test_cases_upload_summary_txt(results: Dict, project_key: str, tota
         lines.append(f'PROJECT = {project_key}')
     
     return '\n'.join(lines)
+
+def build_upload_job_id(user_id: str, client_key: Optional[str]) -> Optional[str]:
+    """
+    Identificador del job de carga a partir de la clave de idempotencia del cliente.
+    El cliente genera una clave por cada carga y la reutiliza solo al reintentar; se
+    combina con el usuario para que dos usuarios nunca compartan un job.
+    Sin clave no hay idempotencia (cada petición es una carga nueva).
+    """
+    client_key = (client_key or '').strip()
+    if not client_key:
+        return None
+    return hashlib.sha256(f"{user_id}:{client_key}".encode('utf-8')).hexdigest()
@@ -1,7 +1,8 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, jsonify, request, send_file
 import logging
 import json
 import io
+import os
 import csv
 import base64
 from datetime import datetime
@@ -12,12 +13,17 @@ from app.backend.jira.issue_service import IssueService
 from app.database.repositories.bulk_upload_repository import BulkUploadRepository
 from app.models.bulk_upload import BulkUpload
 from app.core.dependencies import get_user_service, get_jira_token_manager, get_jira_client
+from app.utils.exceptions import UploadInProgressError
 from app.services.jira.api.helpers import (
     generate_upload_summary_txt, 
     generate_stories_upload_summary_txt, 
-    generate_test_cases_upload_summary_txt
+    generate_test_cases_upload_summary_txt,
+    build_upload_job_id
 )
 from app.services.jira.utils.text_normalizer import normalize
+from app.services.jira.utils.upload_stream import (
+    StopOnParseError, StreamingUploadSummary, iter_csv_rows, iter_ndjson_rows
+)
 
 logger = logging.getLogger(__name__)
 
@@ -32,6 +38,7 @@ def upload_stories_to_jira():
         stories = data.get('stories', [])
         project_key = data.get('project_key', '').strip()
         assignee_email = data.get('assignee_email', '').strip() or None
+        dry_run = bool(data.get('dry_run', False))
         
         if not stories:
             return jsonify({"success": False, "error": "No se proporcionaron historias"}), 400
@@ -75,9 +82,14 @@ def upload_stories_to_jira():
             project_key=project_key,
             field_mappings=field_mappings,
             default_values={},
-            filter_issue_types=False
+            filter_issue_types=False,
+            dry_run=dry_run,
+            job_id=build_upload_job_id(get_current_user_id(), data.get('upload_job_id'))
         )
         
+        if dry_run:
+            return jsonify({"success": results['success'], "dry_run": True, "results": results})
+        
         txt_content = generate_stories_upload_summary_txt(results, project_key, len(stories))
         txt_base64 = base64.b64encode(txt_content.encode('utf-8')).decode('utf-8')
         
@@ -88,6 +100,8 @@ def upload_stories_to_jira():
             "txt_content": txt_base64,
             "txt_filename": f"stories_upload_{project_key}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
         })
+    except UploadInProgressError as e:
+        return jsonify({"success": False, "error": str(e), "in_progress": True}), 409
     except Exception as e:
         logger.error(f"Error al subir historias: {e}", exc_info=True)
         return jsonify({"success": False, "error": str(e)}), 500
@@ -101,6 +115,7 @@ def upload_test_cases_to_jira():
         test_cases = data.get('test_cases', [])
         project_key = data.get('project_key', '').strip()
         assignee_email = data.get('assignee_email', '').strip() or None
+        dry_run = bool(data.get('dry_run', False))
         
         # Valores de campos select desde el modal
         custom_fields_data = data.get('custom_fields', {})
@@ -143,8 +158,14 @@ def upload_test_cases_to_jira():
             project_key=project_key,
             field_mappings=field_mappings,
             default_values={},
-            filter_issue_types=False
+            filter_issue_types=False,
+            dry_run=dry_run,
+            job_id=build_upload_job_id(get_current_user_id(), data.get('upload_job_id'))
         )
+        
+        if dry_run:
+            return jsonify({"success": results['success'], "dry_run": True, "results": results})
+        
         txt_content = generate_test_cases_upload_summary_txt(results, project_key, len(test_cases))
         txt_base64 = base64.b64encode(txt_content.encode('utf-8')).decode('utf-8')
         
@@ -154,6 +175,8 @@ def upload_test_cases_to_jira():
             "txt_content": txt_base64,
             "txt_filename": f"test_cases_upload_{project_key}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
         })
+    except UploadInProgressError as e:
+        return jsonify({"success": False, "error": str(e), "in_progress": True}), 409
     except Exception as e:
         logger.error(f"Error al subir casos de prueba: {e}", exc_info=True)
         return jsonify({"success": False, "error": str(e)}), 500
@@ -249,6 +272,7 @@ def jira_upload_csv():
         file = request.files['file']
         project_key = request.form.get('project_key')
         field_mappings_raw = request.form.get('field_mappings')
+        dry_run = request.form.get('dry_run', 'false').lower() == 'true'
         
         if not project_key:
             return jsonify({"success": False, "error": "No se proporcionó la clave del proyecto"}), 400
@@ -277,8 +301,16 @@ def jira_upload_csv():
                 if isinstance(v, dict): field_mappings[k] = v.get('jira_field_id')
                 else: field_mappings[k] = v
         
+        # La clave la genera el cliente por cada carga y la reutiliza solo al reintentar
+        job_id = build_upload_job_id(get_current_user_id(), request.form.get('upload_job_id'))
+        
         client = get_jira_client(base_url=jira_config.base_url, email=jira_config.email, api_token=jira_config.token)
-        results = client.create_issues_from_csv(csv_data, project_key, field_mappings, filter_issue_types=False)
+        results = client.create_issues_from_csv(
+            csv_data, project_key, field_mappings, filter_issue_types=False, dry_run=dry_run, job_id=job_id
+        )
+        
+        if dry_run:
+            return jsonify({"success": results['success'], "dry_run": True, "results": results})
         
         # Métricas y resumen
         issue_types_distribution = {}
@@ -311,6 +343,99 @@ def jira_upload_csv():
             "txt_content": txt_base64,
             "txt_filename": file.filename.replace('.csv', '') + '.txt'
         })
+    except UploadInProgressError as e:
+        return jsonify({"success": False, "error": str(e), "in_progress": True}), 409
     except Exception as e:
         logger.error(f"Error en upload_csv: {e}", exc_info=True)
         return jsonify({"success": False, "error": str(e)}), 500
+
+@jira_upload_bp.route('/upload-stream', methods=['POST'])
+@login_required
+def jira_upload_stream():
+    """
+    Crea issues en Jira desde un cuerpo NDJSON o CSV leído en streaming.
+    Pensado para cargas muy grandes: las filas se procesan por lotes a medida que llegan y el
+    resumen TXT se devuelve como archivo en lugar de JSON con base64.
+    Endpoint solo de API (integraciones y scripts); la interfaz web usa /upload-csv.
+
+    Si una línea está malformada la carga se detiene ahí: se responde 422 con el resumen de
+    lo ya creado y el error, y el historial se guarda igualmente.
+    """
+    summary = None
+    try:
+        project_key = request.args.get('project_key', '').strip()
+        if not project_key:
+            return jsonify({"success": False, "error": "No se proporcionó la clave del proyecto"}), 400
+        
+        field_mappings = {}
+        field_mappings_raw = request.args.get('field_mappings')
+        if field_mappings_raw:
+            for k, v in json.loads(field_mappings_raw).items():
+                field_mappings[k] = v.get('jira_field_id') if isinstance(v, dict) else v
+        
+        if request.mimetype in ('application/x-ndjson', 'application/jsonl'):
+            rows = iter_ndjson_rows(request.stream)
+        elif request.mimetype == 'text/csv':
+            rows = iter_csv_rows(request.stream, encoding=request.args.get('encoding', 'utf-8-sig'))
+        else:
+            return jsonify({"success": False, "error": "Content-Type no soportado (use application/x-ndjson o text/csv)"}), 415
+        
+        # El cuerpo no se guarda, así que el job de idempotencia debe indicarlo el cliente
+        job_id = build_upload_job_id(
+            get_current_user_id(), request.args.get('upload_job_id') or request.headers.get('X-Upload-Job-Id')
+        )
+        filename = request.args.get('filename', f"upload_{project_key}")
+        
+        user = get_user_service().get_user_by_id(get_current_user_id())
+        jira_config = get_jira_token_manager().get_token_for_user(user, project_key)
+        client = get_jira_client(base_url=jira_config.base_url, email=jira_config.email, api_token=jira_config.token)
+        
+        summary = StreamingUploadSummary()
+        guarded_rows = StopOnParseError(rows)
+        results = client.create_issues_from_csv(
+            guarded_rows, project_key, field_mappings, filter_issue_types=False, job_id=job_id, result_sink=summary
+        )
+        if guarded_rows.error:
+            results['parse_error'] = guarded_rows.error
+            results['success'] = False
+        
+        try:
+            upload_repo = BulkUploadRepository()
+            upload_repo.create(BulkUpload(
+                user_id=get_current_user_id(),
+                project_key=project_key,
+                upload_type='csv_upload',
+                total_items=results['total'],
+                successful_items=results['success_count'],
+                failed_items=results['error_count'],
+                upload_details=json.dumps({
+                    'filename': filename, 'streamed': True,
+                    'issue_types_distribution': summary.issue_types_distribution,
+                    'parse_error': guarded_rows.error
+                })
+            ))
+        except Exception as e:
+            logger.error(f"Error al guardar historial local: {e}")
+        
+        txt_path = summary.write_summary(filename, results, project_key)
+        response = send_file(
+            txt_path, mimetype='text/plain', as_attachment=True,
+            download_name=f"{os.path.splitext(filename)[0]}.txt"
+        )
+        if guarded_rows.error:
+            response.status_code = 422
+            response.headers['X-Upload-Parse-Error'] = guarded_rows.error.encode('ascii', 'replace').decode('ascii')
+        response.headers['X-Upload-Total'] = str(results['total'])
+        response.headers['X-Upload-Success-Count'] = str(results['success_count'])
+        response.headers['X-Upload-Error-Count'] = str(results['error_count'])
+        response.headers['X-Upload-Skipped-Count'] = str(results.get('skipped_count', 0))
+        response.call_on_close(lambda: os.remove(txt_path))
+        return response
+    except UploadInProgressError as e:
+        return jsonify({"success": False, "error": str(e), "in_progress": True}), 409
+    except Exception as e:
+        logger.error(f"Error en upload_stream: {e}", exc_info=True)
+        return jsonify({"success": False, "error": str(e)}), 500
+    finally:
+        if summary is not None:
+            summary.close()
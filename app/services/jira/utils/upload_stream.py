@@ -0,0 +1,216 @@
+"""
+Ingesta en streaming de cargas masivas muy grandes
+Responsabilidad única: Leer filas de un cuerpo NDJSON/CSV de forma incremental y escribir
+el resumen TXT en archivos temporales, sin mantener la carga completa en memoria.
+"""
+import codecs
+import csv
+import io
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+from datetime import datetime
+from typing import Dict, IO, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+_ISSUE_KEY_PATTERN = re.compile(r'^(.*?)-(\d+)$')
+
+
+def iter_ndjson_rows(stream: IO[bytes], encoding: str = 'utf-8') -> Iterator[Dict]:
+    """
+    Itera las filas de un cuerpo NDJSON (un objeto JSON por línea)
+
+    Args:
+        stream: Flujo binario de la petición
+        encoding: Codificación del cuerpo
+
+    Yields:
+        Dict con los valores de la fila (columna -> valor)
+
+    Raises:
+        ValueError: Si una línea no es un objeto JSON válido
+    """
+    reader = codecs.getreader(encoding)(stream, errors='replace')
+    for line_no, line in enumerate(reader, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Línea {line_no}: JSON inválido ({e.msg})")
+        if not isinstance(row, dict):
+            raise ValueError(f"Línea {line_no}: se esperaba un objeto JSON")
+        yield {k: '' if v is None else str(v) for k, v in row.items()}
+
+
+def iter_csv_rows(stream: IO[bytes], encoding: str = 'utf-8-sig') -> Iterator[Dict]:
+    """
+    Itera las filas de un cuerpo CSV con cabecera
+
+    Args:
+        stream: Flujo binario de la petición
+        encoding: Codificación del CSV
+
+    Yields:
+        Dict con los valores de la fila (columna -> valor)
+    """
+    text_stream = io.TextIOWrapper(_ReadableStream(stream), encoding=encoding, errors='replace', newline='')
+    for row in csv.DictReader(text_stream):
+        yield row
+
+
+class StopOnParseError:
+    """
+    Envuelve un iterador de filas y lo detiene en la primera línea malformada.
+
+    Las filas se consumen de forma perezosa durante la carga, así que un error de formato
+    puede aparecer cuando ya se crearon issues. En lugar de propagarlo (y perder el resumen de
+    lo creado), la iteración termina y el error queda en `error` para informarlo.
+    """
+
+    def __init__(self, rows: Iterator[Dict]):
+        """
+        Inicializa el envoltorio
+
+        Args:
+            rows: Iterador de filas (iter_ndjson_rows / iter_csv_rows)
+        """
+        self._rows = rows
+        self.error: Optional[str] = None
+
+    def __iter__(self) -> Iterator[Dict]:
+        try:
+            yield from self._rows
+        except (ValueError, csv.Error) as e:
+            self.error = str(e)
+            logger.warning(f"Carga detenida por una fila malformada: {e}")
+
+
+class _ReadableStream(io.RawIOBase):
+    """Adapta un flujo de solo lectura (p. ej. wsgi.input) para usarlo con io.TextIOWrapper"""
+
+    def __init__(self, stream: IO[bytes]):
+        self._stream = stream
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        data = self._stream.read(len(buffer))
+        if not data:
+            return 0
+        buffer[:len(data)] = data
+        return len(data)
+
+
+class StreamingUploadSummary:
+    """
+    Resumen TXT de una carga escrito en disco a medida que llegan los resultados.
+
+    Se usa como result_sink de CSVIssueProcessor: los issues creados y los errores se escriben
+    en dos archivos temporales y al finalizar se combinan con el mismo formato que
+    generate_upload_summary_txt.
+    """
+
+    def __init__(self, directory: Optional[str] = None):
+        """
+        Inicializa el resumen
+
+        Args:
+            directory: Directorio para los archivos temporales (default: el del sistema)
+        """
+        self._directory = directory
+        self._created = tempfile.TemporaryFile(mode='w+', encoding='utf-8', dir=directory)
+        self._failed = tempfile.TemporaryFile(mode='w+', encoding='utf-8', dir=directory)
+        self.created_count = 0
+        self.failed_count = 0
+        self.issue_types_distribution: Dict[str, int] = {}
+        self._first_key: Optional[str] = None
+        self._last_key: Optional[str] = None
+
+    def add(self, bucket: str, entry: Dict) -> None:
+        """
+        Registra un resultado
+
+        Args:
+            bucket: 'created' o 'failed'
+            entry: Resultado de la fila (mismo formato que results['created'/'failed'])
+        """
+        if bucket == 'created':
+            self.created_count += 1
+            key = entry.get('key') or 'N/A'
+            self._created.write(f"{self.created_count}. [OK] {entry.get('summary', 'Sin resumen')} --> {key}\n")
+            issue_type = entry.get('issue_type', 'Unknown')
+            self.issue_types_distribution[issue_type] = self.issue_types_distribution.get(issue_type, 0) + 1
+            if entry.get('key'):
+                self._track_key(entry['key'])
+        else:
+            self.failed_count += 1
+            self._failed.write(
+                f"[ERROR] Fila {entry.get('row', '?')}: {entry.get('summary', 'Sin resumen')} "
+                f"--> Error: {entry.get('error', 'Error desconocido')}\n"
+            )
+
+    def write_summary(self, filename: str, results: Dict, project_key: str) -> str:
+        """
+        Combina los resultados en el archivo TXT final
+
+        Args:
+            filename: Nombre del archivo de origen (para la cabecera)
+            results: Resultados de create_issues_from_csv (contadores)
+            project_key: Clave del proyecto
+
+        Returns:
+            str: Ruta del archivo TXT generado (el llamador debe eliminarlo)
+        """
+        fd, path = tempfile.mkstemp(suffix='.txt', dir=self._directory)
+        with os.fdopen(fd, 'w', encoding='utf-8') as out:
+            out.write(f"Procesado: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n")
+            out.write(f"Archivo: {filename}\n")
+            out.write("--------------------------------------------------\n")
+
+            self._created.seek(0)
+            shutil.copyfileobj(self._created, out)
+
+            if self.failed_count:
+                out.write("\n")
+                self._failed.seek(0)
+                shutil.copyfileobj(self._failed, out)
+            if results.get('parse_error'):
+                out.write(f"\n[ERROR] Carga detenida: {results['parse_error']}\n")
+
+            out.write("\n--------------------------------------------------\n")
+            out.write(f"Resumen del procesamiento de {filename}:\n")
+            out.write(f"  [OK] Exitos: {results.get('success_count', 0)}\n")
+            out.write(f"  [ERROR] Errores: {results.get('error_count', 0)}\n")
+            out.write(f"  [OK] Total de registros: {results.get('total', 0)}\n")
+            out.write("\n--------------------------------------------------\n")
+            out.write("Query para buscar en Jira\n\n")
+            if self._first_key:
+                out.write(f'PROJECT = {project_key} and key <= "{self._last_key}" and key >= "{self._first_key}"')
+            else:
+                out.write(f'PROJECT = {project_key}')
+        return path
+
+    def close(self) -> None:
+        """Elimina los archivos temporales intermedios"""
+        self._created.close()
+        self._failed.close()
+
+    def _track_key(self, key: str) -> None:
+        """Mantiene la primera y última clave creada (comparando el número del issue)"""
+        sort_key = self._key_order(key)
+        if self._first_key is None or sort_key < self._key_order(self._first_key):
+            self._first_key = key
+        if self._last_key is None or sort_key > self._key_order(self._last_key):
+            self._last_key = key
+
+    @staticmethod
+    def _key_order(key: str):
+        match = _ISSUE_KEY_PATTERN.match(key)
+        return (match.group(1), int(match.group(2))) if match else (key, 0)
@@ -15,15 +15,18 @@ logger = logging.getLogger(__name__)
 class MetricsCache:
     """Servicio de caché en memoria para métricas de reportes"""
     
-    def __init__(self, ttl_hours: int = 6):
+    def __init__(self, ttl_hours: int = 6, invalidation_repository=None):
         """
         Inicializa el servicio de caché
         
         Args:
             ttl_hours: Tiempo de vida del caché en horas (default: 6)
+            invalidation_repository: Repositorio de invalidaciones compartidas entre workers
+                                     (default: MetricsInvalidationRepository)
         """
         self._cache: Dict[str, Dict[str, Any]] = {}
         self._ttl_seconds = ttl_hours * 3600
+        self._invalidation_repository = invalidation_repository
         logger.info(f"MetricsCache inicializado con TTL de {ttl_hours} horas")
     
     def _generate_cache_key(
@@ -94,6 +97,13 @@ class MetricsCache:
             del self._cache[cache_key]
             return None
         
+        # Verificar si otro worker registró cambios en el proyecto después de cachear
+        invalidated_at = self._get_invalidated_at(project_key)
+        if invalidated_at is not None and invalidated_at >= cached_time:
+            logger.info(f"Cache invalidado por carga masiva para clave: {cache_key[:16]}...")
+            del self._cache[cache_key]
+            return None
+        
         logger.info(f"Cache hit para clave: {cache_key[:16]}... (edad: {age_seconds/60:.1f} min)")
         return cached_data.get('metrics')
     
@@ -153,6 +163,39 @@ class MetricsCache:
         logger.info(f"Caché invalidado para proyecto {project_key}: {len(keys_to_delete)} entradas eliminadas")
         return len(keys_to_delete)
     
+    def notify_issues_created(self, project_key: str, created_count: int) -> int:
+        """
+        Evento de fin de carga: descarta las métricas del proyecto en este worker y registra
+        la invalidación para que el resto de workers también las descarten
+        
+        Args:
+            project_key: Clave del proyecto
+            created_count: Número de issues nuevos creados
+            
+        Returns:
+            int: Número de entradas locales eliminadas
+        """
+        logger.info(f"Carga masiva completada en {project_key} ({created_count} issues nuevos): invalidando métricas")
+        removed = self.invalidate(project_key)
+        try:
+            self._get_invalidation_repository().touch(project_key)
+        except Exception as e:
+            logger.warning(f"No se pudo registrar la invalidación de métricas de {project_key}: {e}")
+        return removed
+    
+    def _get_invalidated_at(self, project_key: str) -> Optional[float]:
+        try:
+            return self._get_invalidation_repository().get(project_key)
+        except Exception as e:
+            logger.debug(f"No se pudo consultar invalidaciones de métricas: {e}")
+            return None
+    
+    def _get_invalidation_repository(self):
+        if self._invalidation_repository is None:
+            from app.database.repositories.metrics_invalidation_repository import MetricsInvalidationRepository
+            self._invalidation_repository = MetricsInvalidationRepository()
+        return self._invalidation_repository
+    
     def _cleanup_expired(self) -> int:
         """
         Limpia todas las entradas expiradas del caché
@@ -0,0 +1,138 @@
+"""
+Seguimiento del progreso real del pipeline de generación
+Responsabilidad única: Convertir los eventos de progreso de los generadores en mensajes,
+porcentaje y ETA para el stream SSE
+"""
+import logging
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from app.utils.progress_events import (
+    ARTIFACT_WRITTEN, CHUNK_FINISHED, CHUNK_STARTED, DEDUP_REMOVED, HEALING_STARTED, PHASE_STARTED
+)
+
+logger = logging.getLogger(__name__)
+
+# Tramo de la barra que ocupa la generación con IA; el resto es validación y ensamblaje
+GENERATION_START = 10
+GENERATION_END = 88
+
+_PHASES = {
+    'context': ("Extrayendo contexto global y reglas de negocio...", 5, "Contexto Global"),
+    'analysis': ("Identificando funcionalidades del documento...", 8, "Análisis"),
+    'generation': ("Generando contenido con IA...", GENERATION_START, "Generación"),
+}
+
+
+class PipelineProgress:
+    """
+    Acumula los eventos de un pipeline y calcula el porcentaje y la ETA
+
+    El porcentaje de la generación se deriva de los fragmentos terminados. Si un fragmento se
+    divide a su vez en lotes (documentos grandes), los lotes completan la parte proporcional
+    de ese fragmento. El porcentaje nunca retrocede.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        """
+        Inicializa el seguimiento
+
+        Args:
+            clock: Reloj monotónico (inyectable para tests)
+        """
+        self._clock = clock
+        self.progress = 0
+        self.activity = "Procesando documento con IA..."
+        self._primary_label: Optional[str] = None
+        self._finished: Dict[str, int] = {}
+        self._totals: Dict[str, int] = {}
+        self._generation_started_at: Optional[float] = None
+        self._last_event_at = clock()
+
+    def apply(self, event: str, data: Dict[str, Any]) -> Tuple[str, str, Dict[str, Any]]:
+        """
+        Registra un evento
+
+        Args:
+            event: Nombre del evento (app.utils.progress_events)
+            data: Datos del evento
+
+        Returns:
+            Tuple: (mensaje, fase, datos para el evento SSE)
+        """
+        self._last_event_at = self._clock()
+        payload = dict(data, event=event)
+        phase = "Generación"
+
+        if event == PHASE_STARTED:
+            message, progress, phase = _PHASES.get(data.get('phase'), (self.activity, self.progress, "Procesando"))
+            self._advance(progress)
+        elif event == CHUNK_STARTED:
+            label = data.get('label', 'fragmento')
+            if self._primary_label is None:
+                self._primary_label = label
+                self._generation_started_at = self._last_event_at
+            self._totals[label] = data.get('total') or 1
+            message = f"Procesando {label} {data.get('index', 0) + 1}/{self._totals[label]}..."
+        elif event == CHUNK_FINISHED:
+            message = self._chunk_finished(data)
+            eta = self.eta_seconds()
+            if eta is not None:
+                payload['eta_seconds'] = eta
+        elif event == HEALING_STARTED:
+            message, phase = f"Curando {data.get('count', 0)} resultado(s) con problemas de calidad...", "Curación"
+        elif event == DEDUP_REMOVED:
+            message = f"Se eliminaron {data.get('removed', 0)} duplicado(s); quedan {data.get('remaining', 0)}"
+            phase = "Deduplicación"
+            self._advance(GENERATION_END)
+        elif event == ARTIFACT_WRITTEN:
+            message, phase = f"Archivo generado: {data.get('filename', '')}", "Ensamblaje"
+        else:
+            message = self.activity
+
+        self.activity = message
+        return message, phase, payload
+
+    def heartbeat(self) -> str:
+        """Mensaje de latido: la última actividad y el tiempo sin novedades"""
+        idle = int(self._clock() - self._last_event_at)
+        return f"{self.activity} (sin novedades hace {idle}s)" if idle else self.activity
+
+    def eta_seconds(self) -> Optional[float]:
+        """Tiempo restante estimado de la generación según el ritmo observado (None si no se sabe)"""
+        fraction = self._generation_fraction()
+        if not self._generation_started_at or fraction <= 0 or fraction >= 1:
+            return None
+        elapsed = self._clock() - self._generation_started_at
+        return round(elapsed / fraction * (1 - fraction), 1)
+
+    def _chunk_finished(self, data: Dict[str, Any]) -> str:
+        label = data.get('label', 'fragmento')
+        total = self._totals.setdefault(label, data.get('total') or 1)
+        self._finished[label] = self._finished.get(label, 0) + 1
+        if label == self._primary_label:
+            # Los lotes internos pertenecían a este fragmento
+            for nested in [key for key in self._finished if key != label]:
+                self._finished.pop(nested)
+        self._advance(GENERATION_START + (GENERATION_END - GENERATION_START) * self._generation_fraction())
+
+        elapsed = data.get('elapsed_seconds')
+        logger.info(f"{label} {data.get('index', 0) + 1}/{total} terminado en {elapsed}s (ok={data.get('ok', True)})")
+        if not data.get('ok', True):
+            return f"{label.capitalize()} {data.get('index', 0) + 1}/{total} terminó con error"
+        items = data.get('items')
+        detail = f": {items} resultado(s)" if items is not None else ""
+        return f"{label.capitalize()} {self._finished[label]}/{total} completado{detail}"
+
+    def _generation_fraction(self) -> float:
+        if not self._primary_label:
+            return 0.0
+        primary_total = self._totals.get(self._primary_label, 1)
+        done = self._finished.get(self._primary_label, 0)
+        for label, finished in self._finished.items():
+            if label != self._primary_label:
+                done += finished / self._totals.get(label, 1)
+        return min(1.0, done / primary_total)
+
+    def _advance(self, progress: float) -> None:
+        self.progress = max(self.progress, int(progress))
@@ -3,13 +3,44 @@ Servicio para validación de datos
 Responsabilidad única: Validar historias de usuario y casos de prueba
 """
 import logging
-from typing import List, Dict, Tuple, Optional, Any
+import re
+from functools import lru_cache
+from itertools import islice
+from typing import List, Dict, Tuple, Optional, Any, Pattern
 
 from app.core.config import Config
 
 logger = logging.getLogger(__name__)
 
 
+def _compile_terms(terms: List[str]) -> Pattern:
+    """
+    Compila una lista de términos en una sola expresión regular que reconoce cualquiera de ellos
+    como subcadena (misma semántica que `term in texto`), recorriendo el texto una sola vez
+    """
+    return re.compile('|'.join(re.escape(term) for term in sorted(terms, key=len, reverse=True)))
+
+
+def _compile_term_scanner(terms: List[str]) -> Pattern:
+    """
+    Como _compile_terms, pero con lookahead para reportar también términos solapados.
+    Un término que empieza en la misma posición que otro más largo del que es prefijo no se reporta.
+    """
+    return re.compile('(?=(' + '|'.join(re.escape(term) for term in sorted(terms, key=len, reverse=True)) + '))')
+
+
+@lru_cache(maxsize=64)
+def _keyword_pattern(context: str, limit: int) -> Optional[Pattern]:
+    """
+    Patrón con las primeras `limit` palabras clave (más de 5 caracteres) de un contexto
+
+    Se compila una vez por contexto: al validar una matriz todos los casos de una historia
+    comparten el mismo story_context.
+    """
+    keywords = list(islice((word for word in context.lower().split() if len(word) > 5), limit))
+    return _compile_terms(keywords) if keywords else None
+
+
 class Validator:
     """Valida historias de usuario y casos de prueba"""
     
@@ -31,6 +62,14 @@ class Validator:
         'arrastrar', 'soltar', 'comparar', 'revisar', 'autenticar', 'cerrar'
     ]
 
+    # Términos que hacen vago un resultado esperado corto
+    VAGUE_RESULT_TERMS = ['correctamente', 'bien', 'exitoso', 'esperado', 'funciona', 'ok', 'normal']
+
+    # Vocabularios compilados una sola vez al cargar la clase
+    _ACTION_VERB_PATTERN = _compile_terms(ACTION_VERBS)
+    _RED_FLAG_SCANNER = _compile_term_scanner(RED_FLAGS)
+    _VAGUE_RESULT_PATTERN = _compile_terms(VAGUE_RESULT_TERMS)
+
 
     def validate_stories(
         self, 
@@ -180,14 +219,13 @@ class Validator:
         # 1. Validar verbos de acción y composición (Acción + Objeto)
         steps_without_verb = 0
         steps_too_short = 0
+        has_action_verb = self._ACTION_VERB_PATTERN.search
         for paso in pasos:
             paso_lower = str(paso).lower()
             words = paso_lower.split()
             
-            # Verificación de verbo usando la lista de clase
-            has_verb = any(verb in paso_lower for verb in self.ACTION_VERBS)
-            
-            if not has_verb:
+            # Verificación de verbo en una sola pasada sobre el paso
+            if not has_action_verb(paso_lower):
                 steps_without_verb += 1
             
             # Verificación de composición (Acción + Objeto)
@@ -201,21 +239,18 @@ class Validator:
             issues.append(f"Se detectaron {steps_too_short} pasos demasiado cortos (posible falta de objeto de la acción).")
 
         # 2. Validar Red Flags (Pereza de IA)
-        red_flags_found = []
         full_text = f"{titulo} {' '.join(str(p) for p in pasos)} {' '.join(str(r) for r in resultados)}".lower()
-        for flag in self.RED_FLAGS:
-            if flag in full_text:
-                red_flags_found.append(flag)
+        flags_in_text = {match.group(1) for match in self._RED_FLAG_SCANNER.finditer(full_text)}
+        red_flags_found = [flag for flag in self.RED_FLAGS if flag in flags_in_text]
         
         if red_flags_found:
             issues.append(f"Se detectaron términos vagos o incompletos (Red Flags): {', '.join(red_flags_found)}")
 
         # 3. Validar resultados vagos
-        vague_terms = ['correctamente', 'bien', 'exitoso', 'esperado', 'funciona', 'ok', 'normal']
         vague_results = 0
         for res in resultados:
             res_lower = str(res).lower()
-            if any(term in res_lower for term in vague_terms) and len(res_lower.split()) < 4:
+            if len(res_lower.split()) < 4 and self._VAGUE_RESULT_PATTERN.search(res_lower):
                 vague_results += 1
         
         if vague_results > 0:
@@ -226,8 +261,8 @@ class Validator:
             issues.append("El caso de prueba tiene muy pocos pasos para ser exhaustivo.")
             
         if story_context and titulo:
-            story_keywords = [w for w in story_context.lower().split() if len(w) > 5]
-            if story_keywords and not any(kw in titulo.lower() for kw in story_keywords[:15]):
+            story_keywords = _keyword_pattern(story_context, 15)
+            if story_keywords and not story_keywords.search(titulo.lower()):
                 issues.append("El título del caso de prueba no parece estar alineado con los conceptos clave de la historia.")
 
         return {
@@ -258,8 +293,8 @@ class Validator:
             
         # 4. Keyword check contra el documento
         if doc_context:
-            doc_keywords = [w for w in doc_context.lower().split() if len(w) > 5]
-            if doc_keywords and not any(kw in story_lower for kw in doc_keywords[:20]):
+            doc_keywords = _keyword_pattern(doc_context, 20)
+            if doc_keywords and not doc_keywords.search(story_lower):
                 issues.append("La historia parece no estar alineada con el contexto del documento proporcionado.")
 
         return {
@@ -272,27 +307,35 @@ class Validator:
         """
         Identifica índices de ítems que son duplicados o muy similares.
         Útil para limpiar matrices de prueba o listas de historias.
+
+        Un ítem j es duplicado si su similitud (SequenceMatcher) con un ítem anterior no duplicado
+        supera threshold. Solo se comparan los pares que MinHash/LSH señala como candidatos, lo que
+        evita las n² comparaciones en matrices de cientos de casos.
         """
         from difflib import SequenceMatcher
+        from app.utils.near_duplicates import candidate_pairs
         
+        texts = [str(item).lower() for item in items]
+        candidates = candidate_pairs(texts)
         duplicates = []
-        n = len(items)
+        duplicate_set = set()
         
-        for i in range(n):
-            if i in duplicates:
+        for i in range(len(texts)):
+            if i in duplicate_set or i not in candidates:
                 continue
-                
-            item_i = str(items[i]).lower()
-            for j in range(i + 1, n):
-                if j in duplicates:
+            
+            for j in candidates[i]:
+                if j in duplicate_set:
                     continue
-                    
-                item_j = str(items[j]).lower()
                 
-                # Comparación de similitud básica
-                similarity = SequenceMatcher(None, item_i, item_j).ratio()
+                matcher = SequenceMatcher(None, texts[i], texts[j])
+                # Cotas superiores baratas antes de la comparación completa
+                if matcher.real_quick_ratio() <= threshold or matcher.quick_ratio() <= threshold:
+                    continue
+                similarity = matcher.ratio()
                 if similarity > threshold:
                     duplicates.append(j)
+                    duplicate_set.add(j)
                     logger.info(f"Detectado ítem similar (índice {j}) a ítem {i} (Similitud: {similarity:.2f})")
         
         return duplicates
@@ -0,0 +1,155 @@
+"""
+Timeouts adaptativos para llamadas al modelo
+Responsabilidad única: Calcular el timeout de cada llamada a partir de la latencia observada
+recientemente en llamadas de tamaño parecido
+
+Con un timeout fijo por posición (base + índice del fragmento × incremento) el fragmento 20
+puede esperar varios minutos una respuesta que tarda segundos, mientras que un fragmento temprano
+con un prompt grande se corta antes de tiempo y dispara reintentos. Aquí cada llamada exitosa
+registra su duración en una ventana móvil por tamaño de prompt (cubetas de potencias de dos en
+caracteres) y el timeout se deriva del p95 (primer intento) o del p99 (reintentos) con un margen.
+Mientras no haya muestras suficientes se usa el esquema configurado, avanzando por intento.
+"""
+import logging
+import math
+import threading
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+from app.core.config import Config
+from app.utils.llm_telemetry import current_attempt
+
+logger = logging.getLogger(__name__)
+
+_MIN_BUCKET_CHARS_BITS = 12  # Primera cubeta: prompts de menos de 4096 caracteres
+_MAX_BUCKET = 8
+
+
+def prompt_bucket(prompt_chars: int) -> int:
+    """Cubeta de tamaño de un prompt (0: < 4K caracteres, 1: < 8K, 2: < 16K, ...)"""
+    return min(_MAX_BUCKET, max(0, int(prompt_chars).bit_length() - _MIN_BUCKET_CHARS_BITS))
+
+
+def _percentile(ordered: List[float], fraction: float) -> float:
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))]
+
+
+class LatencyTracker:
+    """Ventanas móviles de latencia por cubeta de tamaño de prompt (en memoria, por proceso)"""
+
+    def __init__(self, window: int = None, min_samples: int = None, margin: float = None,
+                 floor: float = None, ceiling: float = None):
+        """
+        Inicializa el registro de latencias
+
+        Args:
+            window: Muestras conservadas por cubeta (default: Config.GEMINI_TIMEOUT_WINDOW)
+            min_samples: Muestras necesarias para usar percentiles (default: Config.GEMINI_TIMEOUT_MIN_SAMPLES)
+            margin: Factor aplicado al percentil (default: Config.GEMINI_TIMEOUT_MARGIN)
+            floor: Timeout mínimo en segundos (default: Config.GEMINI_TIMEOUT_MIN)
+            ceiling: Timeout máximo en segundos (default: Config.GEMINI_TIMEOUT_MAX)
+        """
+        self.window = Config.GEMINI_TIMEOUT_WINDOW if window is None else window
+        self.min_samples = Config.GEMINI_TIMEOUT_MIN_SAMPLES if min_samples is None else min_samples
+        self.margin = Config.GEMINI_TIMEOUT_MARGIN if margin is None else margin
+        self.floor = Config.GEMINI_TIMEOUT_MIN if floor is None else floor
+        self.ceiling = Config.GEMINI_TIMEOUT_MAX if ceiling is None else ceiling
+        self._samples: Dict[int, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, prompt_chars: int, seconds: float) -> None:
+        """
+        Registra la duración de una llamada
+
+        Args:
+            prompt_chars: Tamaño del prompt en caracteres
+            seconds: Duración de la llamada (en un timeout, el tiempo esperado hasta cortarla)
+        """
+        if seconds < 0:
+            return
+        bucket = prompt_bucket(prompt_chars)
+        with self._lock:
+            samples = self._samples.get(bucket)
+            if samples is None:
+                samples = self._samples[bucket] = deque(maxlen=max(1, self.window))
+            samples.append(seconds)
+
+    def timeout_for(self, prompt_chars: int, attempt: int = 0) -> float:
+        """
+        Timeout para una llamada
+
+        Args:
+            prompt_chars: Tamaño del prompt en caracteres
+            attempt: Número de reintento (0 = primer intento)
+
+        Returns:
+            float: Segundos
+        """
+        ordered = self._reference_samples(prompt_bucket(prompt_chars))
+        if ordered is None:
+            return float(Config.GEMINI_TIMEOUT_BASE + attempt * Config.GEMINI_TIMEOUT_INCREMENT)
+        if attempt == 0:
+            timeout = _percentile(ordered, 0.95) * self.margin
+        else:
+            # Si el intento anterior se cortó, el siguiente recibe la cola de la distribución
+            timeout = _percentile(ordered, 0.99) * self.margin * attempt
+        return round(min(self.ceiling, max(self.floor, timeout)), 1)
+
+    def snapshot(self) -> Dict[int, Dict[str, Any]]:
+        """Muestras, p95 y p99 por cubeta"""
+        with self._lock:
+            buckets = {bucket: sorted(samples) for bucket, samples in self._samples.items()}
+        return {
+            bucket: {'samples': len(ordered), 'p95': _percentile(ordered, 0.95), 'p99': _percentile(ordered, 0.99)}
+            for bucket, ordered in sorted(buckets.items()) if ordered
+        }
+
+    def _reference_samples(self, bucket: int) -> Optional[List[float]]:
+        """
+        Muestras ordenadas de la cubeta o, si aún tiene pocas, de la cubeta mayor más cercana
+        (un prompt más grande tarda al menos lo mismo, así que su latencia es una cota segura)
+        """
+        with self._lock:
+            for candidate in range(bucket, _MAX_BUCKET + 1):
+                samples = self._samples.get(candidate)
+                if samples is not None and len(samples) >= max(1, self.min_samples):
+                    return sorted(samples)
+        return None
+
+
+_tracker_instance: Optional[LatencyTracker] = None
+_tracker_lock = threading.Lock()
+
+
+def get_latency_tracker() -> LatencyTracker:
+    """
+    Obtiene el registro global de latencias (singleton por proceso)
+
+    Returns:
+        LatencyTracker: Instancia del registro
+    """
+    global _tracker_instance
+    if _tracker_instance is None:
+        with _tracker_lock:
+            if _tracker_instance is None:
+                _tracker_instance = LatencyTracker()
+    return _tracker_instance
+
+
+def adaptive_timeout(prompt: Any) -> float:
+    """
+    Timeout para enviar un prompt, según la latencia reciente y el intento en curso
+
+    Dentro de call_with_retry el intento se toma de la operación activa, por lo que un
+    reintento recibe más margen sin que el llamador lo indique.
+
+    Args:
+        prompt: Prompt que se va a enviar
+
+    Returns:
+        float: Segundos para request_options={"timeout": ...}
+    """
+    prompt_chars = len(prompt) if isinstance(prompt, str) else len(str(prompt))
+    if not Config.GEMINI_TIMEOUT_ADAPTIVE:
+        return float(Config.GEMINI_TIMEOUT_BASE + current_attempt() * Config.GEMINI_TIMEOUT_INCREMENT)
+    return get_latency_tracker().timeout_for(prompt_chars, current_attempt())
@@ -0,0 +1,176 @@
+"""
+Ejecutor de fragmentos con concurrencia acotada
+Responsabilidad única: Ejecutar llamadas de IA por fragmento en paralelo, respetando
+un límite de llamadas simultáneas y de ritmo, y devolver los resultados en orden
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterable, List, NamedTuple, Optional
+
+from app.core.config import Config
+from app.utils.job_checkpoints import checkpoint_key, current_checkpoints, load_checkpoint, save_checkpoint
+from app.utils.llm_cassette import is_replaying
+from app.utils.llm_telemetry import record_pause
+from app.utils.progress_events import CHUNK_FINISHED, CHUNK_STARTED, ProgressCallback, report_progress
+
+logger = logging.getLogger(__name__)
+
+
+class ChunkResult(NamedTuple):
+    """Resultado de un fragmento: valor o excepción, en la posición original"""
+    index: int
+    value: Any
+    error: Optional[BaseException]
+
+    @property
+    def ok(self) -> bool:
+        """Indica si el fragmento se procesó sin excepción"""
+        return self.error is None
+
+
+class ChunkExecutor:
+    """
+    Ejecuta una función sobre una secuencia de fragmentos con concurrencia acotada.
+
+    - max_workers limita las llamadas simultáneas al modelo.
+    - min_interval separa el inicio de dos llamadas consecutivas (cuota RPM), en lugar
+      de dormir un tiempo fijo después de cada fragmento.
+    - Los resultados se devuelven en el orden de entrada, sin importar cuál termina antes.
+    - Con resumable=True, dentro de un job de generación los elementos ya completados en un
+      intento anterior se toman de su punto de control sin volver a ejecutarse.
+    """
+
+    def __init__(self, max_workers: int = None, min_interval: float = None):
+        """
+        Inicializa el ejecutor
+
+        Args:
+            max_workers: Llamadas simultáneas (default: Config.GEMINI_MAX_CONCURRENT_CALLS)
+            min_interval: Segundos mínimos entre inicios de llamada (default: Config.GEMINI_MIN_CALL_INTERVAL)
+        """
+        self.max_workers = max(1, max_workers or Config.GEMINI_MAX_CONCURRENT_CALLS)
+        self.min_interval = Config.GEMINI_MIN_CALL_INTERVAL if min_interval is None else max(0.0, min_interval)
+        self._pace_lock = threading.Lock()
+        self._next_start = 0.0
+
+    def map_ordered(self, func: Callable[..., Any], items: Iterable[Any], label: str = "fragmento",
+                    on_progress: Optional[ProgressCallback] = None,
+                    count_items: Optional[Callable[[Any], Optional[int]]] = None,
+                    resumable: bool = False) -> List[ChunkResult]:
+        """
+        Ejecuta func(index, item) para cada elemento
+
+        Args:
+            func: Función a ejecutar; recibe el índice (0-based) y el elemento
+            items: Elementos a procesar
+            label: Nombre del elemento para los logs
+            on_progress: Callback on_progress(event, data) para los eventos chunk_started/chunk_finished
+            count_items: Cuenta los resultados producidos por un elemento (default: len de listas)
+            resumable: Guarda y reutiliza el resultado de cada elemento en los puntos de control del
+                       job activo (solo para el nivel superior del pipeline; resultados serializables a JSON)
+
+        Returns:
+            List[ChunkResult]: Un resultado por elemento, en el orden de entrada
+        """
+        items = list(items)
+        if not items:
+            return []
+
+        workers = min(self.max_workers, len(items))
+        logger.info(f"Procesando {len(items)} {label}(s) con {workers} llamada(s) simultánea(s)")
+        start = time.time()
+
+        total = len(items)
+        # El almacén es local al hilo que llama: se captura aquí y se pasa a los hilos del pool
+        store = current_checkpoints() if resumable else None
+
+        def run(index: int, item: Any) -> ChunkResult:
+            return self._run(func, index, item, label, total, on_progress, count_items, store)
+
+        if workers == 1:
+            results = [run(index, item) for index, item in enumerate(items)]
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                futures = [executor.submit(run, index, item) for index, item in enumerate(items)]
+                results = [future.result() for future in futures]
+
+        failed = sum(1 for r in results if not r.ok)
+        logger.info(f"{len(items)} {label}(s) procesados en {time.time() - start:.1f}s ({failed} con error)")
+        return results
+
+    def _run(self, func: Callable[..., Any], index: int, item: Any, label: str, total: int,
+             on_progress: Optional[ProgressCallback], count_items: Optional[Callable[[Any], Optional[int]]],
+             store=None) -> ChunkResult:
+        key = checkpoint_key(label, index, item) if store is not None else None
+        cached = load_checkpoint(store, key) if key else None
+        if cached is not None:
+            logger.info(f"{label.capitalize()} {index + 1} reanudado desde su punto de control")
+            report_progress(on_progress, CHUNK_STARTED, label=label, index=index, total=total)
+            report_progress(on_progress, CHUNK_FINISHED, label=label, index=index, total=total, ok=True,
+                            items=_count(cached, count_items), elapsed_seconds=0.0, resumed=True)
+            return ChunkResult(index, cached, None)
+
+        self._wait_turn()
+        report_progress(on_progress, CHUNK_STARTED, label=label, index=index, total=total)
+        start = time.monotonic()
+        try:
+            result = ChunkResult(index, func(index, item), None)
+        except Exception as e:
+            logger.error(f"Error procesando {label} {index + 1}: {e}")
+            result = ChunkResult(index, None, e)
+        report_progress(on_progress, CHUNK_FINISHED, label=label, index=index, total=total, ok=result.ok,
+                        items=_count(result.value, count_items) if result.ok else 0,
+                        elapsed_seconds=round(time.monotonic() - start, 3))
+        if key and result.ok:
+            save_checkpoint(store, key, result.value)
+        return result
+
+    def _wait_turn(self) -> None:
+        """Reserva el siguiente hueco de inicio respetando min_interval (sin ritmo al reproducir un cassette)"""
+        if self.min_interval <= 0 or is_replaying():
+            return
+        with self._pace_lock:
+            now = time.monotonic()
+            start_at = max(now, self._next_start)
+            self._next_start = start_at + self.min_interval
+        delay = start_at - now
+        if delay > 0:
+            record_pause('pacing', delay)
+            time.sleep(delay)
+
+
+def split_batches(items: List[Any], size: int) -> List[List[Any]]:
+    """
+    Divide una lista en sub-lotes consecutivos de como mucho `size` elementos
+
+    Args:
+        items: Elementos a dividir
+        size: Tamaño máximo de cada sub-lote (< 1 = un solo lote)
+
+    Returns:
+        List[List]: Sub-lotes en el orden original
+    """
+    if size < 1:
+        return [list(items)] if items else []
+    return [items[start:start + size] for start in range(0, len(items), size)]
+
+
+def healing_executor() -> 'ChunkExecutor':
+    """
+    Ejecutor para los sub-lotes de sanación
+
+    Sin pausa entre inicios: el ritmo lo impone el gobernador de cuota en cada llamada.
+    """
+    return ChunkExecutor(max_workers=Config.HEALING_MAX_CONCURRENT_CALLS, min_interval=0)
+
+
+def _count(value: Any, count_items: Optional[Callable[[Any], Optional[int]]]) -> Optional[int]:
+    """Número de resultados de un elemento para el evento chunk_finished (None si no se sabe)"""
+    try:
+        if count_items:
+            return count_items(value)
+        return len(value) if isinstance(value, (list, tuple)) else None
+    except Exception:
+        return None
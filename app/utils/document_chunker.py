@@ -4,31 +4,72 @@ Responsabilidad única: División de documentos en fragmentos manejables
 """
 import re
 import logging
-from typing import List, Optional
+from collections import deque
+from typing import Deque, Iterator, List, Optional, Tuple
 from enum import Enum
 
 from app.core.config import Config
 
 logger = logging.getLogger(__name__)
 
+_SECTION_PATTERN = re.compile(
+    r'\n\s*(?:[0-9]+\.|\b(?:CAPÍTULO|SECCIÓN|MÓDULO|FUNCIONALIDAD|CHAPTER|SECTION|MODULE|FUNCTIONALITY)\b)',
+    re.IGNORECASE
+)
+_SENTENCE_PATTERN = re.compile(r'(?<=[.!?])\s+')
+# Piezas que un tokenizador BPE separa: palabras, números y cada signo suelto (|, -, :, etc.)
+_TOKEN_PIECE_PATTERN = re.compile(r'[^\W\d_]+|\d+|[^\w\s]|_')
+
+
+def estimate_text_tokens(text: str) -> int:
+    """
+    Estima los tokens de un texto sin tokenizador externo
+
+    Cuenta ~4 letras por token en las palabras, ~3 dígitos por token en los números y un token
+    por cada signo de puntuación o símbolo. A diferencia de len(text) / 4, no subestima las
+    tablas (barras, guiones, cifras) ni sobreestima la prosa con espacios de relleno.
+
+    Args:
+        text: Texto a medir
+
+    Returns:
+        int: Tokens estimados
+    """
+    tokens = 0
+    for match in _TOKEN_PIECE_PATTERN.finditer(text):
+        piece = match.group()
+        if piece[0].isdigit():
+            tokens += (len(piece) + 2) // 3
+        elif piece[0].isalpha():
+            tokens += (len(piece) + 3) // 4
+        else:
+            tokens += 1
+    return tokens
+
 
 class ChunkingStrategy(Enum):
     """Estrategias de chunking disponibles"""
     SMART = "smart"  # Intenta dividir por secciones, luego párrafos
     LINEAR = "linear"  # División lineal por líneas/párrafos
     SENTENCE = "sentence"  # División por oraciones
+    TOKEN = "token"  # Presupuesto de tokens estimados, con solapamiento entre chunks
 
 
 class DocumentChunker:
     """Divide documentos en chunks de tamaño manejable"""
     
-    def __init__(self, max_chunk_size: int = None, strategy: ChunkingStrategy = ChunkingStrategy.SMART):
+    def __init__(self, max_chunk_size: int = None, strategy: ChunkingStrategy = ChunkingStrategy.SMART,
+                 max_chunk_tokens: int = None, overlap_tokens: int = None):
         """
         Inicializa el chunker de documentos
         
         Args:
             max_chunk_size: Tamaño máximo del chunk en caracteres (default: Config.STORY_MAX_CHUNK_SIZE)
             strategy: Estrategia de chunking a usar
+            max_chunk_tokens: Presupuesto de tokens por chunk para la estrategia TOKEN
+                              (default: Config.STORY_MAX_CHUNK_TOKENS)
+            overlap_tokens: Tokens del final de un chunk que se repiten al inicio del siguiente
+                            (estrategia TOKEN, default: Config.CHUNK_OVERLAP_TOKENS)
         """
         # Usar el tamaño máximo por defecto basado en la estrategia
         if max_chunk_size is None:
@@ -36,6 +77,8 @@ class DocumentChunker:
             max_chunk_size = Config.STORY_MAX_CHUNK_SIZE
         self.max_chunk_size = max_chunk_size
         self.strategy = strategy
+        self.max_chunk_tokens = Config.STORY_MAX_CHUNK_TOKENS if max_chunk_tokens is None else max_chunk_tokens
+        self.overlap_tokens = Config.CHUNK_OVERLAP_TOKENS if overlap_tokens is None else overlap_tokens
     
     def split_document_into_chunks(self, text: str, max_chunk_size: int = None) -> List[str]:
         """
@@ -51,6 +94,11 @@ class DocumentChunker:
         if not text or not text.strip():
             return []
         
+        if self.strategy == ChunkingStrategy.TOKEN:
+            if estimate_text_tokens(text) <= self.max_chunk_tokens:
+                return [text]
+            return self._split_by_tokens(text, self.max_chunk_tokens, self.overlap_tokens)
+
         chunk_size = max_chunk_size or self.max_chunk_size
         
         # Si el texto es más pequeño que el tamaño máximo, retornarlo completo
@@ -70,25 +118,19 @@ class DocumentChunker:
     def _split_smart(self, text: str, chunk_size: int) -> List[str]:
         """Estrategia inteligente: divide por secciones, luego párrafos"""
         # Primero intentar dividir por secciones/capítulos
-        sections = re.split(
-            r'\n\s*(?:[0-9]+\.|\b(?:CAPÍTULO|SECCIÓN|MÓDULO|FUNCIONALIDAD|CHAPTER|SECTION|MODULE|FUNCTIONALITY)\b)',
-            text,
-            flags=re.IGNORECASE
-        )
+        sections = _SECTION_PATTERN.split(text)
 
         chunks = []
-        current_chunk = ""
+        current_chunk = _ChunkBuffer()
 
         for section in sections:
-            if len(current_chunk) + len(section) < chunk_size:
-                current_chunk += section
+            if current_chunk.length + len(section) < chunk_size:
+                current_chunk.add(section)
             else:
-                if current_chunk.strip():
-                    chunks.append(current_chunk.strip())
-                current_chunk = section
+                current_chunk.flush_into(chunks)
+                current_chunk.reset(section)
 
-        if current_chunk.strip():
-            chunks.append(current_chunk.strip())
+        current_chunk.flush_into(chunks)
 
         # Si no hay divisiones claras, dividir por párrafos
         if len(chunks) == 1 and len(text) > chunk_size:
@@ -99,54 +141,128 @@ class DocumentChunker:
     def _split_linear(self, text: str, chunk_size: int) -> List[str]:
         """Estrategia lineal: divide por párrafos/líneas"""
         chunks = []
-        current_chunk = ""
+        current_chunk = _ChunkBuffer()
         paragraphs = text.split('\n')
 
         for paragraph in paragraphs:
             if len(paragraph) > chunk_size:
                 # Dividir párrafo largo por oraciones
-                sentences = re.split(r'(?<=[.!?])\s+', paragraph)
+                sentences = _SENTENCE_PATTERN.split(paragraph)
                 for sentence in sentences:
-                    if len(current_chunk) + len(sentence) + 1 < chunk_size:
-                        current_chunk += sentence + " "
+                    if current_chunk.length + len(sentence) + 1 < chunk_size:
+                        current_chunk.add(sentence, " ")
                     else:
-                        if current_chunk.strip():
-                            chunks.append(current_chunk.strip())
-                        current_chunk = sentence + " "
+                        current_chunk.flush_into(chunks)
+                        current_chunk.reset(sentence, " ")
             else:
-                if len(current_chunk) + len(paragraph) + 1 < chunk_size:
-                    current_chunk += paragraph + "\n"
+                if current_chunk.length + len(paragraph) + 1 < chunk_size:
+                    current_chunk.add(paragraph, "\n")
                 else:
-                    if current_chunk.strip():
-                        chunks.append(current_chunk.strip())
-                    current_chunk = paragraph + "\n"
+                    current_chunk.flush_into(chunks)
+                    current_chunk.reset(paragraph, "\n")
 
-        if current_chunk.strip():
-            chunks.append(current_chunk.strip())
+        current_chunk.flush_into(chunks)
 
         return chunks if chunks else [text]
     
     def _split_by_sentences(self, text: str, chunk_size: int) -> List[str]:
         """Estrategia por oraciones: divide respetando límites de oración"""
         # Dividir por oraciones
-        sentences = re.split(r'(?<=[.!?])\s+', text)
+        sentences = _SENTENCE_PATTERN.split(text)
         
         chunks = []
-        current_chunk = ""
+        current_chunk = _ChunkBuffer()
         
         for sentence in sentences:
-            if len(current_chunk) + len(sentence) + 1 < chunk_size:
-                current_chunk += sentence + " "
+            if current_chunk.length + len(sentence) + 1 < chunk_size:
+                current_chunk.add(sentence, " ")
             else:
-                if current_chunk.strip():
-                    chunks.append(current_chunk.strip())
-                current_chunk = sentence + " "
+                current_chunk.flush_into(chunks)
+                current_chunk.reset(sentence, " ")
         
-        if current_chunk.strip():
-            chunks.append(current_chunk.strip())
+        current_chunk.flush_into(chunks)
         
         return chunks if chunks else [text]
 
+    def _split_by_tokens(self, text: str, max_tokens: int, overlap_tokens: int) -> List[str]:
+        """
+        Estrategia por presupuesto de tokens: agrupa párrafos (y, si no caben, sus oraciones o
+        palabras) hasta max_tokens según la estimación local. Cada chunk repite al inicio las
+        últimas unidades del anterior hasta overlap_tokens, para no cortar un requisito en dos
+        sin contexto.
+        """
+        max_tokens = max(1, max_tokens)
+        overlap_tokens = max(0, min(overlap_tokens, max_tokens // 2))
+
+        chunks = []
+        window: Deque[Tuple[str, int]] = deque()
+        window_tokens = 0
+        fresh = False  # Hay unidades nuevas (no solo solapamiento) pendientes de emitir
+
+        for unit, tokens in self._token_units(text, max_tokens):
+            if fresh and window_tokens + tokens > max_tokens:
+                chunk = ''.join(part for part, _ in window).strip()
+                if chunk:
+                    chunks.append(chunk)
+                # Conservar la cola del chunk como solapamiento, dejando lugar a la unidad nueva
+                while window and (window_tokens > overlap_tokens or window_tokens + tokens > max_tokens):
+                    window_tokens -= window.popleft()[1]
+                fresh = False
+            window.append((unit, tokens))
+            window_tokens += tokens
+            fresh = True
+
+        if fresh:
+            chunk = ''.join(part for part, _ in window).strip()
+            if chunk:
+                chunks.append(chunk)
+
+        return chunks if chunks else [text]
+
+    @staticmethod
+    def _token_units(text: str, max_tokens: int) -> Iterator[Tuple[str, int]]:
+        """Unidades indivisibles (con su separador) y sus tokens estimados, de mayor a menor granularidad"""
+        for paragraph in text.split('\n'):
+            tokens = estimate_text_tokens(paragraph)
+            if tokens <= max_tokens:
+                yield paragraph + '\n', tokens
+                continue
+            sentences = _SENTENCE_PATTERN.split(paragraph)
+            for index, sentence in enumerate(sentences):
+                separator = '\n' if index == len(sentences) - 1 else ' '
+                tokens = estimate_text_tokens(sentence)
+                if tokens <= max_tokens:
+                    yield sentence + separator, tokens
+                    continue
+                # Oración sin puntuación más larga que el presupuesto (p. ej. una tabla aplanada)
+                words = sentence.split(' ')
+                for position, word in enumerate(words):
+                    yield word + (separator if position == len(words) - 1 else ' '), estimate_text_tokens(word)
+
+
+class _ChunkBuffer:
+    """Partes de un chunk en construcción; se unen una sola vez al cerrarlo (sin concatenar en cada paso)"""
+
+    def __init__(self):
+        self.parts: List[str] = []
+        self.length = 0
+
+    def add(self, *parts: str) -> None:
+        for part in parts:
+            self.parts.append(part)
+            self.length += len(part)
+
+    def reset(self, *parts: str) -> None:
+        self.parts = []
+        self.length = 0
+        self.add(*parts)
+
+    def flush_into(self, chunks: List[str]) -> None:
+        """Agrega el chunk (sin espacios en los extremos) a la lista si no está vacío"""
+        chunk = ''.join(self.parts).strip()
+        if chunk:
+            chunks.append(chunk)
+
 
 # Funciones helper para compatibilidad hacia atrás
 def split_document_into_chunks(text: str, max_chunk_size: int = None, strategy: str = "smart") -> List[str]:
@@ -156,7 +272,7 @@ def split_document_into_chunks(text: str, max_chunk_size: int = None, strategy:
     Args:
         text: Texto del documento
         max_chunk_size: Tamaño máximo del chunk
-        strategy: Estrategia de chunking ('smart', 'linear', 'sentence')
+        strategy: Estrategia de chunking ('smart', 'linear', 'sentence', 'token')
         
     Returns:
         List[str]: Lista de chunks
@@ -52,6 +52,11 @@ class JiraAPIError(NexusAIException):
         self.response = response
 
 
+class UploadInProgressError(NexusAIException):
+    """Error cuando otra petición ya está procesando el mismo job de carga masiva"""
+    pass
+
+
 class DocumentTooLargeError(NexusAIException):
     """Error cuando el documento es demasiado grande"""
     def __init__(self, message: str, size_mb: Optional[float] = None):
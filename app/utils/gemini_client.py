@@ -0,0 +1,107 @@
+"""
+Registro de clientes de Gemini por proceso
+Responsabilidad única: Configurar el SDK de Gemini una sola vez por API key y reutilizar las
+instancias de GenerativeModel por (modelo, configuración de generación)
+
+genai.configure modifica estado global del SDK. Llamarlo en cada generación reconstruye los
+transportes y, con peticiones concurrentes de distintos usuarios, un hilo puede reconfigurar el
+SDK mientras otro está creando su modelo. El registro serializa la configuración con un lock y
+entrega modelos ya construidos, que el SDK permite usar desde varios hilos.
+"""
+import json
+import logging
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+import google.generativeai as genai
+
+from app.core.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class GeminiClientRegistry:
+    """Configuración única del SDK y caché de modelos, segura entre hilos"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._configured_key: Optional[str] = None
+        self._models: Dict[Tuple[str, str], Any] = {}
+
+    def get_model(self, model_name: str = None, generation_config: Optional[Dict[str, Any]] = None,
+                  api_key: str = None):
+        """
+        Obtiene un modelo listo para usar
+
+        Args:
+            model_name: Nombre del modelo (default: Config.GEMINI_MODEL)
+            generation_config: Configuración de generación (temperatura, etc.)
+            api_key: API key (default: Config.GOOGLE_API_KEY)
+
+        Returns:
+            genai.GenerativeModel: Instancia compartida para (modelo, configuración)
+
+        Raises:
+            ValueError: Si no hay API key configurada
+        """
+        api_key = api_key or Config.GOOGLE_API_KEY
+        if not api_key:
+            raise ValueError("API Key no configurada. Configura GOOGLE_API_KEY en el archivo .env")
+        model_name = model_name or Config.GEMINI_MODEL
+        key = (model_name, json.dumps(generation_config or {}, sort_keys=True, default=str))
+
+        with self._lock:
+            if api_key != self._configured_key:
+                if self._configured_key is not None:
+                    logger.info("API key de Gemini cambiada: se reconfigura el SDK y se descartan los modelos")
+                genai.configure(api_key=api_key)
+                self._configured_key = api_key
+                self._models.clear()
+
+            model = self._models.get(key)
+            if model is None:
+                model = genai.GenerativeModel(model_name, generation_config=generation_config)
+                self._models[key] = model
+                logger.debug(f"Modelo {model_name} creado (configuración: {key[1]})")
+            return model
+
+    def reset(self) -> None:
+        """Descarta la configuración y los modelos (la próxima llamada vuelve a configurar)"""
+        with self._lock:
+            self._configured_key = None
+            self._models.clear()
+
+
+_registry_instance: Optional[GeminiClientRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_gemini_registry() -> GeminiClientRegistry:
+    """
+    Obtiene la instancia global del registro de clientes (singleton por proceso)
+
+    Returns:
+        GeminiClientRegistry: Instancia del registro
+    """
+    global _registry_instance
+    if _registry_instance is None:
+        with _registry_lock:
+            if _registry_instance is None:
+                _registry_instance = GeminiClientRegistry()
+    return _registry_instance
+
+
+def get_gemini_model(model_name: str = None, generation_config: Optional[Dict[str, Any]] = None,
+                     api_key: str = None):
+    """
+    Atajo para obtener un modelo del registro global
+
+    Args:
+        model_name: Nombre del modelo (default: Config.GEMINI_MODEL)
+        generation_config: Configuración de generación
+        api_key: API key (default: Config.GOOGLE_API_KEY)
+
+    Returns:
+        genai.GenerativeModel: Instancia compartida
+    """
+    return get_gemini_registry().get_model(model_name, generation_config, api_key)
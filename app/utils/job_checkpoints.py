@@ -0,0 +1,102 @@
+"""
+Puntos de control de un job de generación
+Responsabilidad única: Reutilizar el resultado de los pasos (análisis, fragmentos, lotes) que un
+job ya completó antes de que se interrumpiera, en lugar de volver a llamar al modelo
+
+El job activa un almacén con checkpoint_scope() en el hilo que ejecuta el pipeline. Los pasos
+reanudables lo consultan con resumable_step() o a través de ChunkExecutor.map_ordered(resumable=True).
+Sin almacén activo (generación fuera de un job) todo se ejecuta normalmente.
+"""
+import hashlib
+import json
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Optional, Protocol
+
+logger = logging.getLogger(__name__)
+
+_thread_state = threading.local()
+
+
+class CheckpointStore(Protocol):
+    """Almacén de resultados de pasos por clave"""
+
+    def load(self, key: str) -> Optional[Any]:
+        ...
+
+    def save(self, key: str, value: Any) -> None:
+        ...
+
+
+@contextmanager
+def checkpoint_scope(store: Optional[CheckpointStore]):
+    """
+    Activa el almacén de puntos de control dentro del bloque (en el hilo actual)
+
+    Args:
+        store: Almacén del job (None = sin puntos de control)
+    """
+    previous = getattr(_thread_state, 'store', None)
+    _thread_state.store = store
+    try:
+        yield
+    finally:
+        _thread_state.store = previous
+
+
+def current_checkpoints() -> Optional[CheckpointStore]:
+    """Almacén activo en el hilo actual (None fuera de un job)"""
+    return getattr(_thread_state, 'store', None)
+
+
+def checkpoint_key(label: str, index: int, item: Any) -> str:
+    """
+    Clave de un elemento procesado por ChunkExecutor
+
+    Incluye una huella del elemento para no reutilizar un resultado si el fragmento cambió.
+    """
+    payload = json.dumps(item, sort_keys=True, ensure_ascii=False, default=str)
+    return f"{label}:{index}:{hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]}"
+
+
+def load_checkpoint(store: Optional[CheckpointStore], key: str) -> Optional[Any]:
+    """Resultado guardado para la clave (None si no hay o no se pudo leer)"""
+    if store is None:
+        return None
+    try:
+        return store.load(key)
+    except Exception as e:
+        logger.warning(f"No se pudo leer el punto de control '{key}': {e}")
+        return None
+
+
+def save_checkpoint(store: Optional[CheckpointStore], key: str, value: Any) -> None:
+    """Guarda el resultado de un paso (solo resultados no vacíos; los errores solo se registran)"""
+    if store is None or not value:
+        return
+    try:
+        store.save(key, value)
+    except Exception as e:
+        logger.warning(f"No se pudo guardar el punto de control '{key}': {e}")
+
+
+def resumable_step(key: str, func: Callable[[], Any]) -> Any:
+    """
+    Ejecuta un paso único del pipeline reutilizando su resultado si el job ya lo completó
+
+    Args:
+        key: Clave del paso dentro del job (p. ej. 'analysis')
+        func: Función que produce el resultado (debe ser serializable a JSON)
+
+    Returns:
+        Resultado guardado o el producido por func
+    """
+    store = current_checkpoints()
+    cached = load_checkpoint(store, key)
+    if cached is not None:
+        logger.info(f"Paso '{key}' reanudado desde su punto de control")
+        return cached
+    value = func()
+    save_checkpoint(store, key, value)
+    return value
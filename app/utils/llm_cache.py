@@ -0,0 +1,231 @@
+"""
+Caché de respuestas del modelo direccionada por contenido
+Responsabilidad única: Reutilizar la respuesta de Gemini para un prompt idéntico
+
+La clave es el SHA256 de (modelo, prompt, configuración de generación), de modo que regenerar
+desde el mismo documento tras ajustar un parámetro de salida o tras una descarga fallida no
+vuelve a pagar la latencia ni la cuota de los fragmentos que no cambiaron. Las entradas viven
+en un archivo SQLite compartido por los workers, con TTL, un máximo de entradas con expulsión
+LRU y contadores de aciertos/fallos.
+"""
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+from app.core.config import Config
+from app.utils.sqlite_store import SQLiteFileStore, process_singleton, resolve_store_path
+
+logger = logging.getLogger(__name__)
+
+
+_thread_state = threading.local()
+
+
+@contextmanager
+def skip_cache_reads(active: bool = True):
+    """
+    Ignora las respuestas guardadas dentro del bloque (en el hilo actual)
+
+    Lo usan los reintentos: si la respuesta anterior no sirvió, volver a leerla de caché
+    repetiría el mismo fallo. La respuesta nueva sí se guarda y reemplaza a la anterior.
+    """
+    previous = getattr(_thread_state, 'skip_reads', False)
+    _thread_state.skip_reads = previous or active
+    try:
+        yield
+    finally:
+        _thread_state.skip_reads = previous
+
+
+def compute_cache_key(model_name: str, prompt: Any, generation_config: Any = None) -> str:
+    """
+    Calcula la clave de caché de una llamada
+
+    Args:
+        model_name: Nombre del modelo
+        prompt: Prompt enviado
+        generation_config: Configuración de generación (temperatura, etc.)
+
+    Returns:
+        str: Huella hexadecimal SHA256
+    """
+    payload = json.dumps(
+        {'model': model_name or '', 'prompt': prompt, 'config': generation_config or {}},
+        sort_keys=True, ensure_ascii=False, default=str
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class CachedResponse:
+    """Respuesta servida desde caché con la misma interfaz que usan los generadores (text)"""
+
+    usage_metadata = None
+
+    def __init__(self, text: str):
+        self.text = text
+
+
+class LLMResponseCache(SQLiteFileStore):
+    """Caché de respuestas en un archivo SQLite compartido por procesos"""
+
+    SCHEMA = (
+        '''
+        CREATE TABLE IF NOT EXISTS llm_response_cache (
+            key TEXT PRIMARY KEY,
+            model TEXT NOT NULL,
+            response TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            last_access REAL NOT NULL
+        )
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_llm_response_cache_last_access ON llm_response_cache (last_access)',
+        '''
+        CREATE TABLE IF NOT EXISTS llm_cache_stats (
+            name TEXT PRIMARY KEY,
+            value INTEGER NOT NULL
+        )
+        ''',
+    )
+
+    def __init__(self, path: str = None, ttl_hours: float = None, max_entries: int = None, enabled: bool = None):
+        """
+        Inicializa la caché
+
+        Args:
+            path: Archivo SQLite (default: Config.LLM_CACHE_PATH o temporal)
+            ttl_hours: Vigencia de una respuesta (default: Config.LLM_CACHE_TTL_HOURS)
+            max_entries: Máximo de respuestas guardadas (default: Config.LLM_CACHE_MAX_ENTRIES)
+            enabled: Activa la caché (default: Config.LLM_CACHE_ENABLED)
+        """
+        super().__init__(resolve_store_path(path, Config.LLM_CACHE_PATH, 'nexus_ai_llm_cache.db'))
+        self.ttl_seconds = (Config.LLM_CACHE_TTL_HOURS if ttl_hours is None else ttl_hours) * 3600
+        self.max_entries = Config.LLM_CACHE_MAX_ENTRIES if max_entries is None else max_entries
+        self.enabled = Config.LLM_CACHE_ENABLED if enabled is None else enabled
+
+    def get(self, key: str) -> Optional[str]:
+        """
+        Obtiene la respuesta guardada para la clave
+
+        Args:
+            key: Clave de caché
+
+        Returns:
+            str o None si no existe, expiró o el hilo está reintentando (skip_cache_reads)
+        """
+        if not self.enabled or getattr(_thread_state, 'skip_reads', False):
+            return None
+        now = time.time()
+        try:
+            with self._transaction() as conn:
+                row = conn.execute('SELECT response, created_at FROM llm_response_cache WHERE key = ?', (key,)).fetchone()
+                if row and now - row[1] <= self.ttl_seconds:
+                    conn.execute('UPDATE llm_response_cache SET last_access = ? WHERE key = ?', (now, key))
+                    self._count(conn, 'hits')
+                    return row[0]
+                if row:
+                    conn.execute('DELETE FROM llm_response_cache WHERE key = ?', (key,))
+                self._count(conn, 'misses')
+        except Exception as e:
+            logger.warning(f"Caché de respuestas no disponible: {e}")
+        return None
+
+    def set(self, key: str, model_name: str, response: str) -> None:
+        """
+        Guarda una respuesta y expulsa las menos usadas si se supera el máximo
+
+        Args:
+            key: Clave de caché
+            model_name: Nombre del modelo (informativo)
+            response: Texto de la respuesta
+        """
+        if not self.enabled or not response:
+            return
+        now = time.time()
+        try:
+            with self._transaction() as conn:
+                conn.execute('''
+                    INSERT INTO llm_response_cache (key, model, response, created_at, last_access)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT (key) DO UPDATE SET
+                        response = excluded.response,
+                        created_at = excluded.created_at,
+                        last_access = excluded.last_access
+                ''', (key, model_name or '', response, now, now))
+                conn.execute('DELETE FROM llm_response_cache WHERE created_at < ?', (now - self.ttl_seconds,))
+                if self.max_entries > 0:
+                    conn.execute('''
+                        DELETE FROM llm_response_cache WHERE key IN (
+                            SELECT key FROM llm_response_cache ORDER BY last_access DESC LIMIT -1 OFFSET ?
+                        )
+                    ''', (self.max_entries,))
+        except Exception as e:
+            logger.warning(f"No se pudo guardar la respuesta en caché: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Obtiene los contadores de la caché (compartidos entre workers)
+
+        Returns:
+            Dict con hits, misses, hit_rate y entries
+        """
+        stats = {'enabled': self.enabled, 'hits': 0, 'misses': 0, 'hit_rate': 0.0, 'entries': 0}
+        if not self.enabled:
+            return stats
+        try:
+            with self._transaction() as conn:
+                for name, value in conn.execute('SELECT name, value FROM llm_cache_stats'):
+                    stats[name] = value
+                stats['entries'] = conn.execute('SELECT COUNT(*) FROM llm_response_cache').fetchone()[0]
+        except Exception as e:
+            logger.warning(f"No se pudieron leer las estadísticas de la caché: {e}")
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+        return stats
+
+    def clear(self) -> None:
+        """Elimina todas las respuestas y reinicia los contadores"""
+        with self._transaction() as conn:
+            conn.execute('DELETE FROM llm_response_cache')
+            conn.execute('DELETE FROM llm_cache_stats')
+
+    @staticmethod
+    def _count(conn: sqlite3.Connection, name: str) -> None:
+        conn.execute('''
+            INSERT INTO llm_cache_stats (name, value) VALUES (?, 1)
+            ON CONFLICT (name) DO UPDATE SET value = value + 1
+        ''', (name,))
+
+
+_cache_singleton = process_singleton(LLMResponseCache)
+
+
+def get_llm_cache() -> LLMResponseCache:
+    """
+    Obtiene la instancia global de la caché de respuestas (singleton por proceso;
+    las entradas se comparten entre procesos a través del archivo SQLite)
+
+    Returns:
+        LLMResponseCache: Instancia de la caché
+    """
+    return _cache_singleton()
+
+
+def cache_key_for_call(model, prompt: Any, kwargs: Dict[str, Any]) -> str:
+    """
+    Clave de caché de una llamada a model.generate_content
+
+    La configuración de generación se toma del argumento generation_config o, si no se pasa,
+    de la configurada en el modelo. request_options (timeouts) no forma parte de la clave.
+    """
+    model_name = getattr(model, 'model_name', None) or Config.GEMINI_MODEL
+    generation_config = kwargs.get('generation_config')
+    if generation_config is None:
+        generation_config = getattr(model, '_generation_config', None)
+    if generation_config is not None and not isinstance(generation_config, dict):
+        generation_config = str(generation_config)
+    return compute_cache_key(str(model_name), prompt, generation_config)
@@ -0,0 +1,119 @@
+"""
+Llamadas al modelo
+Responsabilidad única: Recorrer el camino de cada llamada a Gemini (caché de respuestas o
+cassette, cuota, llamada real, latencia observada, consumo de tokens y telemetría)
+
+El gobernador de cuota (quota_governor) solo decide cuándo se admite una llamada; este módulo
+compone esa admisión con el resto de piezas alrededor de model.generate_content.
+"""
+import logging
+import time
+from typing import Any, Callable, Optional
+
+from app.core.config import Config
+from app.utils.adaptive_timeout import get_latency_tracker
+from app.utils.llm_cache import CachedResponse, cache_key_for_call, get_llm_cache
+from app.utils.llm_cassette import REPLAY, get_active_cassette
+from app.utils.llm_telemetry import record_model_call
+from app.utils.quota_governor import (
+    estimate_tokens, get_quota_governor, is_quota_error, is_timeout_error, parse_retry_delay
+)
+
+logger = logging.getLogger(__name__)
+
+
+def governed_generate_content(model, prompt, on_text: Optional[Callable[[str], None]] = None, **kwargs):
+    """
+    Llama a model.generate_content pasando antes por el gobernador de cuota
+
+    Args:
+        model: Instancia de GenerativeModel
+        prompt: Prompt a enviar
+        on_text: Si se indica, la respuesta se pide en streaming y cada fragmento de texto
+                 se entrega a on_text a medida que llega
+        **kwargs: Argumentos adicionales para generate_content (p. ej. request_options)
+
+    Returns:
+        Respuesta del modelo (en streaming, ya consumida: response.text contiene el texto completo).
+        Si el mismo prompt ya se respondió, se devuelve la respuesta de la caché sin consumir cuota.
+        Con un cassette activo (grabación/reproducción) la caché no interviene, para que cada
+        llamada quede grabada y la reproducción sea determinista. Al reproducir no se espera cuota
+        ni se registra latencia (solo los 429 simulados llegan al gobernador).
+    """
+    model_name = getattr(model, 'model_name', None) or Config.GEMINI_MODEL
+    cassette = get_active_cassette()
+    cache = get_llm_cache()
+    cache_key = cache_key_for_call(model, prompt, kwargs) if cache.enabled and cassette is None else None
+    if cache_key:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            logger.debug(f"Respuesta servida desde caché ({cache_key[:12]})")
+            record_model_call(model_name, 0.0, 0.0, 0, 0, False, cache_hit=True)
+            if on_text is not None:
+                on_text(cached)
+            return CachedResponse(cached)
+
+    replaying = cassette is not None and cassette.mode == REPLAY
+    governor = get_quota_governor()
+    estimated = estimate_tokens(prompt) + Config.GEMINI_QUOTA_OUTPUT_TOKENS
+    quota_wait = 0.0 if replaying else governor.acquire(estimated)
+    started = time.monotonic()
+    try:
+        if cassette is None:
+            response = _invoke_model(model, prompt, on_text, kwargs)
+        else:
+            response = cassette.call(cache_key_for_call(model, prompt, kwargs), model_name, prompt,
+                                     lambda: _invoke_model(model, prompt, on_text, kwargs), _chunk_text, on_text)
+    except Exception as e:
+        if is_quota_error(e):
+            governor.report_quota_exceeded(parse_retry_delay(e))
+        elif is_timeout_error(e) and not replaying:
+            # La llamada tardó al menos esto: sin esta muestra la latencia observada quedaría sesgada a la baja
+            get_latency_tracker().observe(_prompt_chars(prompt), time.monotonic() - started)
+        record_model_call(model_name, time.monotonic() - started, quota_wait, estimate_tokens(prompt), 0, True,
+                          success=False)
+        raise
+    model_seconds = time.monotonic() - started
+    if not replaying:
+        get_latency_tracker().observe(_prompt_chars(prompt), model_seconds)
+
+    usage = getattr(response, 'usage_metadata', None)
+    actual = getattr(usage, 'total_token_count', None) if usage is not None else None
+    if isinstance(actual, int) and not replaying:
+        governor.record_usage(estimated, actual)
+    prompt_tokens = getattr(usage, 'prompt_token_count', None) if usage is not None else None
+    response_tokens = getattr(usage, 'candidates_token_count', None) if usage is not None else None
+    tokens_estimated = not (isinstance(prompt_tokens, int) and isinstance(response_tokens, int))
+    if tokens_estimated:
+        prompt_tokens, response_tokens = estimate_tokens(prompt), estimate_tokens(_chunk_text(response))
+    record_model_call(model_name, model_seconds, quota_wait, prompt_tokens, response_tokens, tokens_estimated)
+
+    if cache_key:
+        text = _chunk_text(response)
+        if text:
+            cache.set(cache_key, model_name, text)
+    return response
+
+
+def _invoke_model(model, prompt, on_text: Optional[Callable[[str], None]], kwargs):
+    """Llamada real a model.generate_content (en streaming, consume la respuesta entregando cada fragmento)"""
+    if on_text is None:
+        return model.generate_content(prompt, **kwargs)
+    response = model.generate_content(prompt, stream=True, **kwargs)
+    for chunk in response:
+        text = _chunk_text(chunk)
+        if text:
+            on_text(text)
+    return response
+
+
+def _prompt_chars(prompt: Any) -> int:
+    return len(prompt) if isinstance(prompt, str) else len(str(prompt))
+
+
+def _chunk_text(chunk) -> str:
+    """Texto de una respuesta o fragmento (puede no tener partes, p. ej. si fue bloqueada)"""
+    try:
+        return chunk.text or ''
+    except (ValueError, AttributeError):
+        return ''
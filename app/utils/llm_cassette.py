@@ -0,0 +1,234 @@
+"""
+Grabación y reproducción de llamadas al modelo (cassettes)
+Responsabilidad única: Sustituir el transporte de Gemini por respuestas grabadas, para medir y
+probar el pipeline completo sin red ni consumo de cuota
+
+En modo 'record' cada llamada real se guarda (prompt, respuesta y latencia observada) como una
+línea JSON del cassette. En modo 'replay' la misma llamada se responde desde el cassette de forma
+determinista, opcionalmente con la latencia grabada (escalada) y con errores 429 simulados que
+recorren el mismo camino que uno real (gobernador de cuota, reintentos, telemetría). Fuera de esos
+429, la reproducción no espera cuota ni ritmo entre llamadas y no alimenta la latencia observada:
+mide el pipeline, no los límites de la API.
+
+Las llamadas se identifican con la misma clave que la caché de respuestas (modelo, prompt y
+configuración de generación), por lo que un cambio en un prompt aparece como una llamada no
+grabada (CassetteMissError) en lugar de reutilizar en silencio una respuesta que ya no corresponde.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+
+from app.core.config import Config
+
+logger = logging.getLogger(__name__)
+
+RECORD = 'record'
+REPLAY = 'replay'
+
+
+class CassetteMissError(LookupError):
+    """La llamada no está en el cassette que se está reproduciendo"""
+
+
+class SimulatedQuotaError(Exception):
+    """Error 429 inyectado durante la reproducción (lo reconoce is_quota_error)"""
+
+
+class CassetteResponse:
+    """Respuesta reproducida con la misma interfaz que usan los generadores (text, iteración en streaming)"""
+
+    usage_metadata = None
+
+    def __init__(self, text: str):
+        self.text = text
+
+    def __iter__(self):
+        return iter([self])
+
+
+class LLMCassette:
+    """Cassette de llamadas al modelo en un archivo JSON Lines"""
+
+    def __init__(self, path: str, mode: str = REPLAY, latency_scale: float = None, error_rate: float = None,
+                 seed: int = None, retry_after_seconds: float = 1.0):
+        """
+        Inicializa el cassette
+
+        Args:
+            path: Archivo del cassette (una interacción por línea)
+            mode: 'record' (llama al modelo y graba) o 'replay' (responde desde el archivo)
+            latency_scale: Fracción de la latencia grabada que se simula al reproducir
+                           (0 = instantáneo, 1 = tiempo real; default: Config.LLM_CASSETTE_LATENCY_SCALE)
+            error_rate: Probabilidad de responder un 429 simulado en cada llamada reproducida
+                        (default: Config.LLM_CASSETTE_ERROR_RATE)
+            seed: Semilla de los 429 simulados (default: Config.LLM_CASSETTE_SEED)
+            retry_after_seconds: Espera sugerida en el mensaje del 429 simulado
+        """
+        if mode not in (RECORD, REPLAY):
+            raise ValueError(f"Modo de cassette desconocido: {mode}")
+        self.path = path
+        self.mode = mode
+        self.latency_scale = Config.LLM_CASSETTE_LATENCY_SCALE if latency_scale is None else latency_scale
+        self.error_rate = Config.LLM_CASSETTE_ERROR_RATE if error_rate is None else error_rate
+        self.seed = Config.LLM_CASSETTE_SEED if seed is None else seed
+        self.retry_after_seconds = retry_after_seconds
+        self._lock = threading.Lock()
+        self._interactions: Dict[str, List[Dict[str, Any]]] = defaultdict(list)
+        self._served: Dict[str, int] = defaultdict(int)
+        self._attempts: Dict[str, int] = defaultdict(int)
+        if mode == REPLAY:
+            self._load()
+
+    def call(self, key: str, model_name: str, prompt: Any, invoke: Callable[[], Any],
+             response_text: Callable[[Any], str], on_text: Optional[Callable[[str], None]] = None):
+        """
+        Ejecuta una llamada al modelo a través del cassette
+
+        Args:
+            key: Clave de la llamada (cache_key_for_call)
+            model_name: Nombre del modelo
+            prompt: Prompt enviado
+            invoke: Llamada real al modelo (solo se usa al grabar)
+            response_text: Extrae el texto de la respuesta real
+            on_text: Listener de streaming (al reproducir recibe la respuesta completa de una vez)
+
+        Returns:
+            Respuesta del modelo (al grabar) o CassetteResponse (al reproducir)
+        """
+        if self.mode == RECORD:
+            started = time.monotonic()
+            response = invoke()
+            self._append({
+                'key': key,
+                'model': model_name,
+                'prompt': prompt,
+                'response': response_text(response),
+                'latency_seconds': round(time.monotonic() - started, 4),
+                'stream': on_text is not None,
+            })
+            return response
+        return self._replay(key, on_text)
+
+    def _replay(self, key: str, on_text: Optional[Callable[[str], None]]) -> CassetteResponse:
+        with self._lock:
+            recorded = self._interactions.get(key)
+            if not recorded:
+                raise CassetteMissError(f"Llamada no grabada en el cassette {self.path} (clave {key[:12]})")
+            attempt = self._attempts[key]
+            self._attempts[key] += 1
+            inject_error = self._should_inject_error(key, attempt)
+            if not inject_error:
+                # Prompts idénticos repetidos se responden en el orden en que se grabaron
+                interaction = recorded[min(self._served[key], len(recorded) - 1)]
+                self._served[key] += 1
+
+        if inject_error:
+            raise SimulatedQuotaError(
+                f"429 Resource exhausted (simulado por el cassette). Please retry in {self.retry_after_seconds}s."
+            )
+        if self.latency_scale > 0:
+            time.sleep(interaction.get('latency_seconds', 0.0) * self.latency_scale)
+        text = interaction.get('response', '')
+        if on_text is not None and text:
+            on_text(text)
+        return CassetteResponse(text)
+
+    def _should_inject_error(self, key: str, attempt: int) -> bool:
+        """
+        Decide si el intento recibe un 429 simulado
+
+        Depende solo de la semilla, la clave y el número de intento (no del orden en que los
+        hilos llegan), de modo que dos reproducciones del mismo pipeline fallan igual.
+        """
+        if self.error_rate <= 0:
+            return False
+        digest = hashlib.sha256(f"{self.seed}:{key}:{attempt}".encode('utf-8')).digest()
+        return int.from_bytes(digest[:8], 'big') / 2 ** 64 < self.error_rate
+
+    def _append(self, interaction: Dict[str, Any]) -> None:
+        line = json.dumps(interaction, ensure_ascii=False, default=str)
+        with self._lock:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n')
+            self._interactions[interaction['key']].append(interaction)
+
+    def _load(self) -> None:
+        if not os.path.exists(self.path):
+            raise FileNotFoundError(f"Cassette no encontrado: {self.path}")
+        with open(self.path, encoding='utf-8') as f:
+            for number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    interaction = json.loads(line)
+                except json.JSONDecodeError as e:
+                    logger.warning(f"Línea {number} del cassette {self.path} ignorada: {e}")
+                    continue
+                self._interactions[interaction['key']].append(interaction)
+        logger.info(f"Cassette cargado: {sum(len(v) for v in self._interactions.values())} llamadas de {self.path}")
+
+
+_active_cassette: Optional[LLMCassette] = None
+_configured = False
+_cassette_lock = threading.Lock()
+
+
+@contextmanager
+def use_cassette(path: str, mode: str = REPLAY, **options):
+    """
+    Activa un cassette para todas las llamadas al modelo del proceso dentro del bloque
+
+    Es global al proceso (no por hilo) porque el pipeline reparte las llamadas entre hilos
+    (fragmentos, curación, ventanas de contexto).
+
+    Args:
+        path: Archivo del cassette
+        mode: 'record' o 'replay'
+        **options: latency_scale, error_rate, seed, retry_after_seconds
+
+    Yields:
+        LLMCassette: Cassette activo
+    """
+    global _active_cassette
+    cassette = LLMCassette(path, mode, **options)
+    with _cassette_lock:
+        previous = _active_cassette
+        _active_cassette = cassette
+    try:
+        yield cassette
+    finally:
+        with _cassette_lock:
+            _active_cassette = previous
+
+
+def get_active_cassette() -> Optional[LLMCassette]:
+    """
+    Obtiene el cassette activo (use_cassette o, si no, LLM_CASSETTE_MODE/LLM_CASSETTE_PATH)
+
+    Returns:
+        LLMCassette o None si las llamadas van directo al modelo
+    """
+    global _active_cassette, _configured
+    if _active_cassette is None and not _configured:
+        with _cassette_lock:
+            if _active_cassette is None and not _configured:
+                _configured = True
+                if Config.LLM_CASSETTE_MODE:
+                    _active_cassette = LLMCassette(Config.LLM_CASSETTE_PATH, Config.LLM_CASSETTE_MODE)
+                    logger.warning(f"Llamadas al modelo en modo cassette '{Config.LLM_CASSETTE_MODE}' ({Config.LLM_CASSETTE_PATH})")
+    return _active_cassette
+
+
+def is_replaying() -> bool:
+    """Indica si las llamadas al modelo se están respondiendo desde un cassette"""
+    cassette = get_active_cassette()
+    return cassette is not None and cassette.mode == REPLAY
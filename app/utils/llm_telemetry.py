@@ -0,0 +1,307 @@
+"""
+Telemetría de llamadas al modelo
+Responsabilidad única: Registrar por cada operación con Gemini cuánto tiempo fue del modelo,
+de la espera de cuota, de los backoff entre reintentos y de las pausas entre fragmentos, junto
+con los tokens usados, para saber a dónde se va el tiempo de una generación lenta
+
+Una operación es una llamada a call_with_retry (con todos sus intentos) o una llamada directa a
+governed_generate_content. Cada una se etiqueta con la etapa del pipeline (analysis, chunk,
+healing, context) y se guarda en un archivo SQLite local compartido por los workers.
+"""
+import logging
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+from app.core.config import Config
+from app.utils.sqlite_store import SQLiteFileStore, process_singleton, resolve_store_path
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STAGE = 'other'
+
+_thread_state = threading.local()
+
+
+@contextmanager
+def llm_stage(stage: Optional[str]):
+    """
+    Etiqueta con la etapa indicada las llamadas al modelo del bloque (en el hilo actual)
+
+    Args:
+        stage: Etapa del pipeline (None = mantener la actual)
+    """
+    previous = getattr(_thread_state, 'stage', None)
+    _thread_state.stage = stage or previous
+    try:
+        yield
+    finally:
+        _thread_state.stage = previous
+
+
+def current_stage() -> str:
+    """Etapa activa en el hilo actual"""
+    return getattr(_thread_state, 'stage', None) or DEFAULT_STAGE
+
+
+def current_attempt() -> int:
+    """Reintento en curso de la operación activa en el hilo (0 = primer intento o sin operación)"""
+    operation = getattr(_thread_state, 'operation', None)
+    return max(0, operation.attempts - 1) if operation is not None else 0
+
+
+class LLMOperation:
+    """Acumulador de una operación (todos sus intentos)"""
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        self.model = ''
+        self.started = time.monotonic()
+        self.success = False
+        self.attempts = 0
+        self.backoff_seconds = 0.0
+        self.model_seconds = 0.0
+        self.quota_wait_seconds = 0.0
+        self.prompt_tokens = 0
+        self.response_tokens = 0
+        self.tokens_estimated = False
+        self.cache_hits = 0
+
+    def add_call(self, model: str, model_seconds: float, quota_wait_seconds: float, prompt_tokens: int,
+                 response_tokens: int, tokens_estimated: bool, cache_hit: bool) -> None:
+        """Suma una llamada al modelo a la operación"""
+        self.model = model or self.model
+        self.model_seconds += model_seconds
+        self.quota_wait_seconds += quota_wait_seconds
+        self.prompt_tokens += prompt_tokens
+        self.response_tokens += response_tokens
+        self.tokens_estimated = self.tokens_estimated or tokens_estimated
+        self.cache_hits += 1 if cache_hit else 0
+
+    def as_row(self) -> Dict[str, Any]:
+        return {
+            'stage': self.stage, 'model': self.model, 'success': int(self.success),
+            'attempts': self.attempts, 'retries': max(0, self.attempts - 1),
+            'wall_seconds': round(time.monotonic() - self.started, 4),
+            'model_seconds': round(self.model_seconds, 4),
+            'quota_wait_seconds': round(self.quota_wait_seconds, 4),
+            'backoff_seconds': round(self.backoff_seconds, 4),
+            'prompt_tokens': self.prompt_tokens, 'response_tokens': self.response_tokens,
+            'tokens_estimated': int(self.tokens_estimated), 'cache_hits': self.cache_hits,
+        }
+
+
+@contextmanager
+def track_operation(stage: Optional[str] = None):
+    """
+    Agrupa los intentos de una operación y la registra al terminar
+
+    Si ya hay una operación activa en el hilo (reintentos anidados), se reutiliza.
+
+    Args:
+        stage: Etapa del pipeline (default: la activa en el hilo)
+
+    Yields:
+        LLMOperation: Operación en curso (el llamador cuenta intentos y backoff)
+    """
+    active = getattr(_thread_state, 'operation', None)
+    if active is not None:
+        yield active
+        return
+
+    with llm_stage(stage):
+        operation = LLMOperation(current_stage())
+        _thread_state.operation = operation
+        try:
+            yield operation
+        finally:
+            _thread_state.operation = None
+            telemetry = get_llm_telemetry()
+            if telemetry.enabled:
+                telemetry.record(operation.as_row())
+
+
+def record_model_call(model: str, model_seconds: float, quota_wait_seconds: float, prompt_tokens: int,
+                      response_tokens: int, tokens_estimated: bool, cache_hit: bool = False,
+                      success: bool = True) -> None:
+    """
+    Registra una llamada a generate_content
+
+    Dentro de una operación (call_with_retry) se acumula en ella; fuera, se registra sola.
+    """
+    operation = getattr(_thread_state, 'operation', None)
+    if operation is not None:
+        operation.add_call(model, model_seconds, quota_wait_seconds, prompt_tokens, response_tokens,
+                           tokens_estimated, cache_hit)
+        return
+
+    telemetry = get_llm_telemetry()
+    if not telemetry.enabled:
+        return
+    operation = LLMOperation(current_stage())
+    operation.started -= model_seconds + quota_wait_seconds
+    operation.attempts = 1
+    operation.success = success
+    operation.add_call(model, model_seconds, quota_wait_seconds, prompt_tokens, response_tokens,
+                       tokens_estimated, cache_hit)
+    telemetry.record(operation.as_row())
+
+
+def record_pause(stage: str, seconds: float) -> None:
+    """
+    Registra una pausa deliberada fuera del modelo (p. ej. el ritmo entre fragmentos)
+
+    Args:
+        stage: Nombre de la pausa (p. ej. 'pacing')
+        seconds: Duración de la pausa
+    """
+    telemetry = get_llm_telemetry()
+    if seconds <= 0 or not telemetry.enabled:
+        return
+    telemetry.record({
+        'stage': stage, 'model': '', 'success': 1, 'attempts': 0, 'retries': 0,
+        'wall_seconds': round(seconds, 4), 'model_seconds': 0.0, 'quota_wait_seconds': 0.0,
+        'backoff_seconds': 0.0, 'prompt_tokens': 0, 'response_tokens': 0, 'tokens_estimated': 0, 'cache_hits': 0,
+    })
+
+
+_COLUMNS = ('stage', 'model', 'success', 'attempts', 'retries', 'wall_seconds', 'model_seconds',
+            'quota_wait_seconds', 'backoff_seconds', 'prompt_tokens', 'response_tokens',
+            'tokens_estimated', 'cache_hits')
+
+
+class LLMTelemetryStore(SQLiteFileStore):
+    """Registros de telemetría en un archivo SQLite compartido por procesos"""
+
+    SCHEMA = (
+        '''
+        CREATE TABLE IF NOT EXISTS llm_call_telemetry (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            created_at REAL NOT NULL,
+            stage TEXT NOT NULL,
+            model TEXT,
+            success INTEGER NOT NULL,
+            attempts INTEGER NOT NULL,
+            retries INTEGER NOT NULL,
+            wall_seconds REAL NOT NULL,
+            model_seconds REAL NOT NULL,
+            quota_wait_seconds REAL NOT NULL,
+            backoff_seconds REAL NOT NULL,
+            prompt_tokens INTEGER NOT NULL,
+            response_tokens INTEGER NOT NULL,
+            tokens_estimated INTEGER NOT NULL,
+            cache_hits INTEGER NOT NULL
+        )
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_llm_call_telemetry_created_at ON llm_call_telemetry (created_at)',
+    )
+
+    def __init__(self, path: str = None, enabled: bool = None, max_rows: int = None):
+        """
+        Inicializa el almacén
+
+        Args:
+            path: Archivo SQLite (default: Config.LLM_TELEMETRY_PATH o temporal)
+            enabled: Activa la telemetría (default: Config.LLM_TELEMETRY_ENABLED)
+            max_rows: Registros conservados; los más antiguos se descartan (default: Config.LLM_TELEMETRY_MAX_ROWS)
+        """
+        super().__init__(resolve_store_path(path, Config.LLM_TELEMETRY_PATH, 'nexus_ai_llm_telemetry.db'))
+        self.enabled = Config.LLM_TELEMETRY_ENABLED if enabled is None else enabled
+        self.max_rows = Config.LLM_TELEMETRY_MAX_ROWS if max_rows is None else max_rows
+
+    def record(self, row: Dict[str, Any]) -> None:
+        """
+        Guarda un registro (los errores solo se registran en el log)
+
+        Args:
+            row: Valores de las columnas de telemetría
+        """
+        if not self.enabled:
+            return
+        try:
+            with self._connection() as conn:
+                conn.execute(
+                    f"INSERT INTO llm_call_telemetry (created_at, {', '.join(_COLUMNS)}) "
+                    f"VALUES (?, {', '.join('?' for _ in _COLUMNS)})",
+                    (time.time(), *(row.get(column) for column in _COLUMNS))
+                )
+                if self.max_rows > 0:
+                    conn.execute('DELETE FROM llm_call_telemetry WHERE id <= (SELECT MAX(id) FROM llm_call_telemetry) - ?',
+                                 (self.max_rows,))
+        except Exception as e:
+            logger.warning(f"No se pudo registrar la telemetría de la llamada: {e}")
+
+    def summary(self, since_seconds: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Agrega los registros por etapa
+
+        Args:
+            since_seconds: Solo registros de los últimos N segundos (None = todos)
+
+        Returns:
+            Dict con 'stages' (por etapa: llamadas, fallos, reintentos, tiempos y tokens) y 'totals'
+        """
+        result = {'enabled': self.enabled, 'stages': {}, 'totals': {}}
+        if not self.enabled:
+            return result
+        since = time.time() - since_seconds if since_seconds else 0
+        with self._connection() as conn:
+            rows = conn.execute(
+                f"SELECT {', '.join(_COLUMNS)} FROM llm_call_telemetry WHERE created_at >= ? ORDER BY id", (since,)
+            ).fetchall()
+
+        grouped: Dict[str, List[Dict[str, Any]]] = {}
+        for values in rows:
+            row = dict(zip(_COLUMNS, values))
+            grouped.setdefault(row['stage'], []).append(row)
+        result['stages'] = {stage: _aggregate(items) for stage, items in sorted(grouped.items())}
+        result['totals'] = _aggregate([dict(zip(_COLUMNS, values)) for values in rows])
+        return result
+
+    def clear(self) -> None:
+        """Elimina todos los registros"""
+        with self._connection() as conn:
+            conn.execute('DELETE FROM llm_call_telemetry')
+
+def _percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))]
+
+
+def _aggregate(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Resumen de un grupo de registros"""
+    wall = [row['wall_seconds'] for row in rows]
+    total = lambda column: sum(row[column] for row in rows)
+    return {
+        'operations': len(rows),
+        'failures': sum(1 for row in rows if not row['success']),
+        'retries': total('retries'),
+        'cache_hits': total('cache_hits'),
+        'wall_seconds': round(sum(wall), 3),
+        'wall_p50_seconds': round(_percentile(wall, 0.5), 3),
+        'wall_p95_seconds': round(_percentile(wall, 0.95), 3),
+        'model_seconds': round(total('model_seconds'), 3),
+        'quota_wait_seconds': round(total('quota_wait_seconds'), 3),
+        'backoff_seconds': round(total('backoff_seconds'), 3),
+        'prompt_tokens': total('prompt_tokens'),
+        'response_tokens': total('response_tokens'),
+        'estimated_token_operations': total('tokens_estimated'),
+    }
+
+
+_telemetry_singleton = process_singleton(LLMTelemetryStore)
+
+
+def get_llm_telemetry() -> LLMTelemetryStore:
+    """
+    Obtiene la instancia global del almacén de telemetría (singleton por proceso;
+    los registros se comparten entre procesos a través del archivo SQLite)
+
+    Returns:
+        LLMTelemetryStore: Instancia del almacén
+    """
+    return _telemetry_singleton()
@@ -0,0 +1,106 @@
+"""
+Detección de casi-duplicados con MinHash y LSH
+Responsabilidad única: Encontrar en tiempo casi lineal los pares de textos candidatos a ser
+duplicados, para verificar solo esos pares en lugar de comparar todos contra todos
+
+Cada texto se reduce a una firma MinHash sobre sus shingles; la firma se divide en bandas y dos
+textos son candidatos si coinciden en al menos una banda completa. Los parámetros se eligen para
+que los pares con similitud de Jaccard moderada (~0.6) ya sean candidatos con alta probabilidad,
+de modo que la verificación exacta posterior decide con el umbral original.
+
+La firma usa "one permutation hashing" densificado: cada shingle se hashea una sola vez y cae en
+una de las posiciones de la firma, en lugar de aplicar cada permutación a todos los shingles.
+Los hashes son deterministas (no dependen de PYTHONHASHSEED), así que el resultado es estable.
+"""
+import hashlib
+import re
+from collections import defaultdict
+from typing import Dict, List, Optional, Sequence, Set
+
+_WHITESPACE = re.compile(r'\s+')
+
+# 25 bandas de 4 filas: P(candidato) ≈ 0.99 con Jaccard 0.63 y ≈ 0.18 con Jaccard 0.3
+LSH_BANDS = 25
+LSH_ROWS = 4
+SIGNATURE_SIZE = LSH_BANDS * LSH_ROWS
+# Shingles de 4 caracteres: su Jaccard sigue de cerca a la similitud de SequenceMatcher
+SHINGLE_SIZE = 4
+# Desplazamiento para posiciones vacías densificadas (distinto de cualquier hash real / SIGNATURE_SIZE)
+_DENSIFY_OFFSET = 1 << 64
+
+
+def shingles(text: str, size: int = SHINGLE_SIZE) -> Set[str]:
+    """
+    Obtiene los shingles de caracteres de un texto con los espacios colapsados
+
+    Args:
+        text: Texto normalizado
+        size: Caracteres por shingle (los textos más cortos forman un único shingle)
+
+    Returns:
+        Set[str]: Shingles del texto (vacío si el texto está vacío)
+    """
+    text = _WHITESPACE.sub(' ', text).strip()
+    if len(text) <= size:
+        return {text} if text else set()
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+def minhash_signature(text_shingles: Set[str]) -> List[int]:
+    """
+    Calcula la firma MinHash (one permutation hashing densificado) de un conjunto de shingles
+
+    Args:
+        text_shingles: Shingles del texto (no vacío)
+
+    Returns:
+        List[int]: SIGNATURE_SIZE valores; dos firmas coinciden en cada posición con
+        probabilidad ≈ similitud de Jaccard de los conjuntos
+    """
+    signature: List[Optional[int]] = [None] * SIGNATURE_SIZE
+    for shingle in text_shingles:
+        value = int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'big')
+        rank, position = divmod(value, SIGNATURE_SIZE)
+        if signature[position] is None or rank < signature[position]:
+            signature[position] = rank
+
+    # Densificación: una posición vacía toma el valor de la siguiente ocupada (circular),
+    # marcado con la distancia para que solo coincida con textos con el mismo hueco
+    filled = list(signature)
+    for position in range(SIGNATURE_SIZE):
+        if signature[position] is not None:
+            continue
+        for distance in range(1, SIGNATURE_SIZE):
+            source = signature[(position + distance) % SIGNATURE_SIZE]
+            if source is not None:
+                filled[position] = source + distance * _DENSIFY_OFFSET
+                break
+    return filled
+
+
+def candidate_pairs(texts: Sequence[str]) -> Dict[int, List[int]]:
+    """
+    Agrupa los textos en cubetas LSH y devuelve los candidatos de cada uno
+
+    Args:
+        texts: Textos normalizados
+
+    Returns:
+        Dict[int, List[int]]: Para cada índice i con candidatos, los índices j > i (ordenados)
+    """
+    buckets: Dict[tuple, List[int]] = defaultdict(list)
+    for index, text in enumerate(texts):
+        text_shingles = shingles(text)
+        if not text_shingles:
+            # Los textos vacíos solo pueden parecerse entre sí
+            buckets[('empty',)].append(index)
+            continue
+        signature = minhash_signature(text_shingles)
+        for band in range(LSH_BANDS):
+            buckets[(band, *signature[band * LSH_ROWS:(band + 1) * LSH_ROWS])].append(index)
+
+    candidates: Dict[int, Set[int]] = defaultdict(set)
+    for members in buckets.values():
+        for position, i in enumerate(members):
+            candidates[i].update(members[position + 1:])
+    return {i: sorted(js) for i, js in candidates.items() if js}
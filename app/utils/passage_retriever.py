@@ -0,0 +1,185 @@
+"""
+Recuperación local de pasajes con BM25
+Responsabilidad única: Seleccionar los párrafos del documento más relevantes para un lote
+de funcionalidades, sin red ni dependencias externas
+
+En lugar de incluir un prefijo fijo del documento en cada prompt (que sesga al modelo hacia
+el inicio y consume cuota de tokens), cada lote recibe solo los pasajes que mejor coinciden
+con sus funcionalidades, en el orden en que aparecen en el documento.
+"""
+import logging
+import math
+import re
+import unicodedata
+from collections import Counter
+from typing import Dict, List, Tuple
+
+from app.core.config import Config
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_PATTERN = re.compile(r'\w+')
+
+# Palabras vacías frecuentes en los documentos de requerimientos (ya sin tildes)
+_STOPWORDS = frozenset("""
+a al algo como con cual cuando de del desde donde dos el ella en entre era es esa ese eso esta este esto
+estos estas fue ha hay la las le les lo los mas me mi muy no o para pero por que se sea segun ser si sin
+sobre son su sus tambien te tiene todo todos tu un una uno unos unas y ya debe deben puede pueden
+the and of to in for is on with
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Normaliza y divide un texto en términos (minúsculas, sin tildes ni palabras vacías)
+
+    Args:
+        text: Texto a tokenizar
+
+    Returns:
+        List[str]: Términos en orden de aparición
+    """
+    normalized = unicodedata.normalize('NFKD', (text or '').lower())
+    normalized = ''.join(char for char in normalized if not unicodedata.combining(char))
+    return [token for token in _TOKEN_PATTERN.findall(normalized)
+            if len(token) > 1 and token not in _STOPWORDS and not token.isdigit()]
+
+
+def split_into_passages(text: str, passage_size: int) -> List[str]:
+    """
+    Divide el documento en pasajes de párrafos consecutivos de hasta passage_size caracteres
+
+    Un párrafo más largo que passage_size se divide en líneas y, si hace falta, se corta.
+
+    Args:
+        text: Texto del documento
+        passage_size: Tamaño máximo aproximado de cada pasaje
+
+    Returns:
+        List[str]: Pasajes en el orden del documento
+    """
+    units = []
+    for paragraph in re.split(r'\n\s*\n', text or ''):
+        paragraph = paragraph.strip()
+        if len(paragraph) <= passage_size:
+            units.append(paragraph)
+            continue
+        for line in paragraph.split('\n'):
+            units.extend(line[i:i + passage_size] for i in range(0, len(line), passage_size))
+
+    passages = []
+    current: List[str] = []
+    length = 0
+    for unit in units:
+        unit = unit.strip()
+        if not unit:
+            continue
+        if current and length + len(unit) > passage_size:
+            passages.append('\n'.join(current))
+            current, length = [], 0
+        current.append(unit)
+        length += len(unit) + 1
+    if current:
+        passages.append('\n'.join(current))
+    return passages
+
+
+class BM25Index:
+    """Índice BM25 en memoria sobre los pasajes de un documento"""
+
+    def __init__(self, passages: List[str], k1: float = 1.5, b: float = 0.75):
+        """
+        Construye el índice
+
+        Args:
+            passages: Pasajes a indexar
+            k1: Saturación de la frecuencia de término
+            b: Normalización por longitud del pasaje
+        """
+        self.passages = passages
+        self.k1 = k1
+        self.b = b
+        self._term_frequencies: List[Counter] = [Counter(tokenize(p)) for p in passages]
+        self._lengths = [sum(tf.values()) for tf in self._term_frequencies]
+        self._average_length = (sum(self._lengths) / len(self._lengths)) if self._lengths else 0.0
+
+        document_frequency: Counter = Counter()
+        for tf in self._term_frequencies:
+            document_frequency.update(tf.keys())
+        total = len(passages)
+        self._idf: Dict[str, float] = {
+            term: math.log(1 + (total - df + 0.5) / (df + 0.5)) for term, df in document_frequency.items()
+        }
+
+    @classmethod
+    def from_document(cls, text: str, passage_size: int = None) -> 'BM25Index':
+        """
+        Construye el índice a partir del texto completo del documento
+
+        Args:
+            text: Texto del documento
+            passage_size: Tamaño de pasaje (default: Config.RETRIEVAL_PASSAGE_SIZE)
+
+        Returns:
+            BM25Index: Índice listo para consultar
+        """
+        passage_size = passage_size or Config.RETRIEVAL_PASSAGE_SIZE
+        index = cls(split_into_passages(text, passage_size))
+        logger.info(f"Índice BM25 construido con {len(index.passages)} pasajes")
+        return index
+
+    def search(self, query: str, top_k: int) -> List[Tuple[int, float]]:
+        """
+        Busca los pasajes más relevantes para la consulta
+
+        Args:
+            query: Texto de la consulta
+            top_k: Número máximo de pasajes
+
+        Returns:
+            List[Tuple[int, float]]: (índice del pasaje, puntuación) de mayor a menor puntuación;
+            solo pasajes con al menos un término en común
+        """
+        terms = [term for term in set(tokenize(query)) if term in self._idf]
+        if not terms or top_k <= 0:
+            return []
+
+        scores = []
+        for index, tf in enumerate(self._term_frequencies):
+            norm = self.k1 * (1 - self.b + self.b * self._lengths[index] / (self._average_length or 1))
+            score = 0.0
+            for term in terms:
+                frequency = tf.get(term)
+                if frequency:
+                    score += self._idf[term] * frequency * (self.k1 + 1) / (frequency + norm)
+            if score > 0:
+                scores.append((index, score))
+
+        scores.sort(key=lambda item: (-item[1], item[0]))
+        return scores[:top_k]
+
+    def retrieve(self, query: str, top_k: int = None, max_chars: int = None) -> str:
+        """
+        Obtiene el texto de referencia para un prompt: los pasajes más relevantes, en el orden
+        del documento y sin superar max_chars
+
+        Args:
+            query: Texto de la consulta (p. ej. las funcionalidades de un lote)
+            top_k: Número máximo de pasajes (default: Config.RETRIEVAL_TOP_K)
+            max_chars: Presupuesto de caracteres (default: Config.RETRIEVAL_MAX_CHARS)
+
+        Returns:
+            str: Pasajes separados por '[...]', o cadena vacía si ninguno es relevante
+        """
+        top_k = Config.RETRIEVAL_TOP_K if top_k is None else top_k
+        max_chars = Config.RETRIEVAL_MAX_CHARS if max_chars is None else max_chars
+
+        selected = []
+        used = 0
+        for index, _score in self.search(query, top_k):
+            passage = self.passages[index]
+            if selected and used + len(passage) > max_chars:
+                continue
+            selected.append(index)
+            used += len(passage)
+        return '\n[...]\n'.join(self.passages[index][:max_chars] for index in sorted(selected))
@@ -0,0 +1,42 @@
+"""
+Eventos de progreso reales del pipeline de generación
+Responsabilidad única: Definir los eventos que emiten los generadores y entregarlos de forma
+segura al callback on_progress(event, data) que los lleva al stream SSE
+"""
+import logging
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Inicio de una fase (data: phase)
+PHASE_STARTED = 'phase_started'
+# Inicio y fin de un fragmento/lote (data: label, index, total; al terminar también items, ok, elapsed_seconds)
+CHUNK_STARTED = 'chunk_started'
+CHUNK_FINISHED = 'chunk_finished'
+# Auto-curación de resultados que no pasaron la validación (data: count)
+HEALING_STARTED = 'healing_started'
+# Duplicados eliminados (data: removed, remaining)
+DEDUP_REMOVED = 'dedup_removed'
+# Archivo de salida escrito (data: filename)
+ARTIFACT_WRITTEN = 'artifact_written'
+
+ProgressCallback = Callable[[str, Dict[str, Any]], None]
+
+
+def report_progress(on_progress: Optional[ProgressCallback], event: str, **data: Any) -> None:
+    """
+    Entrega un evento de progreso al callback, si existe
+
+    Un fallo del callback no debe interrumpir la generación, solo se registra.
+
+    Args:
+        on_progress: Callback on_progress(event, data) o None
+        event: Nombre del evento (constantes de este módulo)
+        **data: Datos del evento
+    """
+    if not on_progress:
+        return
+    try:
+        on_progress(event, data)
+    except Exception as e:
+        logger.warning(f"No se pudo emitir evento de progreso '{event}': {e}")
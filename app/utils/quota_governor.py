@@ -0,0 +1,275 @@
+"""
+Gobernador de cuota para llamadas a Gemini
+Responsabilidad única: Admitir llamadas al modelo solo cuando hay cuota disponible (RPM/TPM),
+compartiendo el estado entre todos los workers de gunicorn
+
+Cada llamada consume una petición y sus tokens estimados de dos token buckets que se rellenan
+de forma continua. El estado vive en un archivo SQLite local, de modo que los workers del mismo
+host se reparten la cuota en lugar de descubrirla por separado con un 429. Cuando aun así llega
+un 429, se registra una pausa global que respetan todos los workers.
+"""
+import logging
+import re
+import sqlite3
+import time
+from typing import Any, Optional
+
+from app.core.config import Config
+from app.utils.sqlite_store import SQLiteFileStore, process_singleton, resolve_store_path
+
+logger = logging.getLogger(__name__)
+
+_EPSILON = 1e-6
+_MIN_WAIT_STEP = 0.05
+
+_RETRY_DELAY_PATTERNS = (
+    re.compile(r'retry in ([\d.]+)\s*s', re.IGNORECASE),
+    re.compile(r'retry_delay\s*\{\s*seconds:\s*(\d+)', re.IGNORECASE),
+)
+
+
+def is_quota_error(error: BaseException) -> bool:
+    """Indica si una excepción corresponde a un límite de cuota (429)"""
+    message = str(error).lower()
+    return "429" in message or "quota" in message or "rate limit" in message or "resource exhausted" in message
+
+
+def is_timeout_error(error: BaseException) -> bool:
+    """Indica si una excepción corresponde a una llamada cortada por timeout"""
+    message = str(error).lower()
+    return "timeout" in message or "timed out" in message or "deadline" in message
+
+
+def parse_retry_delay(error: BaseException) -> Optional[float]:
+    """Extrae el tiempo de espera sugerido por la API en un error 429, si viene informado"""
+    message = str(error)
+    for pattern in _RETRY_DELAY_PATTERNS:
+        match = pattern.search(message)
+        if match:
+            return float(match.group(1))
+    return None
+
+
+def estimate_tokens(text: Any) -> int:
+    """Estimación rápida de tokens de un prompt (~4 caracteres por token)"""
+    if not text:
+        return 0
+    if not isinstance(text, str):
+        text = str(text)
+    return len(text) // 4 + 1
+
+
+class SQLiteQuotaStore(SQLiteFileStore):
+    """Estado de los token buckets en un archivo SQLite compartido por procesos"""
+
+    SCHEMA = (
+        '''
+        CREATE TABLE IF NOT EXISTS quota_buckets (
+            bucket TEXT PRIMARY KEY,
+            requests REAL NOT NULL,
+            tokens REAL NOT NULL,
+            updated_at REAL NOT NULL,
+            blocked_until REAL NOT NULL DEFAULT 0
+        )
+        ''',
+    )
+
+    def try_acquire(self, bucket: str, rpm: int, tpm: int, tokens: int, now: float) -> float:
+        """
+        Intenta consumir una petición y los tokens indicados
+
+        Args:
+            bucket: Nombre del bucket (p. ej. el modelo)
+            rpm: Capacidad de peticiones por minuto (0 = sin límite)
+            tpm: Capacidad de tokens por minuto (0 = sin límite)
+            tokens: Tokens estimados de la llamada
+            now: Marca de tiempo actual
+
+        Returns:
+            float: 0 si la llamada fue admitida; si no, segundos estimados hasta que haya cuota
+        """
+        with self._transaction() as conn:
+            requests, available_tokens, blocked_until = self._refill(conn, bucket, rpm, tpm, now)
+            needed_tokens = min(tokens, tpm) if tpm > 0 else 0
+
+            wait = 0.0
+            if blocked_until > now:
+                wait = blocked_until - now
+            else:
+                if rpm > 0 and requests < 1 - _EPSILON:
+                    wait = max(wait, (1 - requests) * 60.0 / rpm)
+                if tpm > 0 and available_tokens < needed_tokens - _EPSILON:
+                    wait = max(wait, (needed_tokens - available_tokens) * 60.0 / tpm)
+
+            if wait <= 0:
+                requests -= 1 if rpm > 0 else 0
+                available_tokens -= needed_tokens
+            self._save(conn, bucket, requests, available_tokens, now, blocked_until)
+        return wait
+
+    def adjust_tokens(self, bucket: str, rpm: int, tpm: int, delta: int, now: float) -> None:
+        """Corrige el bucket de tokens con el consumo real (delta = real - estimado)"""
+        if tpm <= 0 or not delta:
+            return
+        with self._transaction() as conn:
+            requests, available_tokens, blocked_until = self._refill(conn, bucket, rpm, tpm, now)
+            self._save(conn, bucket, requests, available_tokens - delta, now, blocked_until)
+
+    def block_until(self, bucket: str, rpm: int, tpm: int, until: float, now: float) -> None:
+        """Registra una pausa global del bucket hasta la marca de tiempo indicada"""
+        with self._transaction() as conn:
+            requests, available_tokens, blocked_until = self._refill(conn, bucket, rpm, tpm, now)
+            # Tras un 429 la cuota real está agotada: se vacía el bucket de peticiones
+            self._save(conn, bucket, min(requests, 0), available_tokens, now, max(blocked_until, until))
+
+    @staticmethod
+    def _refill(conn: sqlite3.Connection, bucket: str, rpm: int, tpm: int, now: float):
+        row = conn.execute(
+            'SELECT requests, tokens, updated_at, blocked_until FROM quota_buckets WHERE bucket = ?',
+            (bucket,)
+        ).fetchone()
+        if not row:
+            return float(rpm), float(tpm), 0.0
+
+        requests, tokens, updated_at, blocked_until = row
+        elapsed = max(0.0, now - updated_at)
+        if rpm > 0:
+            requests = min(float(rpm), requests + elapsed * rpm / 60.0)
+        if tpm > 0:
+            tokens = min(float(tpm), tokens + elapsed * tpm / 60.0)
+        return requests, tokens, blocked_until
+
+    @staticmethod
+    def _save(conn: sqlite3.Connection, bucket: str, requests: float, tokens: float,
+              now: float, blocked_until: float) -> None:
+        conn.execute('''
+            INSERT INTO quota_buckets (bucket, requests, tokens, updated_at, blocked_until)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT (bucket) DO UPDATE SET
+                requests = excluded.requests,
+                tokens = excluded.tokens,
+                updated_at = excluded.updated_at,
+                blocked_until = excluded.blocked_until
+        ''', (bucket, requests, tokens, now, blocked_until))
+
+
+class QuotaGovernor:
+    """Admite llamadas al modelo según la cuota RPM/TPM compartida"""
+
+    def __init__(self, rpm: int = None, tpm: int = None, store_path: str = None, bucket: str = None,
+                 max_wait: float = None, cooldown: float = None):
+        """
+        Inicializa el gobernador
+
+        Args:
+            rpm: Peticiones por minuto (default: Config.GEMINI_QUOTA_RPM; 0 = sin límite)
+            tpm: Tokens por minuto (default: Config.GEMINI_QUOTA_TPM; 0 = sin límite)
+            store_path: Archivo SQLite compartido (default: Config.GEMINI_QUOTA_STORE_PATH o temporal)
+            bucket: Nombre del bucket (default: Config.GEMINI_MODEL)
+            max_wait: Espera máxima antes de enviar igualmente (default: Config.GEMINI_QUOTA_MAX_WAIT_SECONDS)
+            cooldown: Pausa global tras un 429 sin tiempo sugerido (default: Config.GEMINI_QUOTA_COOLDOWN_SECONDS)
+        """
+        self.rpm = Config.GEMINI_QUOTA_RPM if rpm is None else rpm
+        self.tpm = Config.GEMINI_QUOTA_TPM if tpm is None else tpm
+        self.bucket = bucket or Config.GEMINI_MODEL
+        self.max_wait = Config.GEMINI_QUOTA_MAX_WAIT_SECONDS if max_wait is None else max_wait
+        self.cooldown = Config.GEMINI_QUOTA_COOLDOWN_SECONDS if cooldown is None else cooldown
+        self._store_path = resolve_store_path(store_path, Config.GEMINI_QUOTA_STORE_PATH, 'nexus_ai_gemini_quota.db')
+        self._store: Optional[SQLiteQuotaStore] = None
+
+    @property
+    def enabled(self) -> bool:
+        """Indica si hay algún límite configurado"""
+        return self.rpm > 0 or self.tpm > 0
+
+    def acquire(self, estimated_tokens: int = 0) -> float:
+        """
+        Bloquea hasta que la llamada tenga cuota disponible
+
+        Args:
+            estimated_tokens: Tokens estimados (entrada + salida) de la llamada
+
+        Returns:
+            float: Segundos esperados
+        """
+        if not self.enabled:
+            return 0.0
+
+        waited = 0.0
+        while True:
+            try:
+                wait = self._get_store().try_acquire(self.bucket, self.rpm, self.tpm, estimated_tokens, time.time())
+            except Exception as e:
+                logger.warning(f"Gobernador de cuota no disponible, se envía la llamada sin control: {e}")
+                return waited
+
+            if wait <= 0:
+                if waited > 0:
+                    logger.info(f"Cuota de Gemini disponible tras esperar {waited:.1f}s")
+                return waited
+
+            if waited + wait > self.max_wait:
+                logger.warning(f"Espera de cuota supera {self.max_wait:.0f}s; se envía la llamada igualmente")
+                return waited
+
+            # Se duerme en tramos cortos para reevaluar si otro worker liberó o consumió cuota
+            step = min(max(wait, _MIN_WAIT_STEP), 5.0)
+            time.sleep(step)
+            waited += step
+
+    def record_usage(self, estimated_tokens: int, actual_tokens: Optional[int]) -> None:
+        """
+        Ajusta el bucket de tokens con el consumo real informado por la API
+
+        Args:
+            estimated_tokens: Tokens reservados en acquire
+            actual_tokens: Tokens reales (usage_metadata.total_token_count)
+        """
+        if not self.enabled or not actual_tokens:
+            return
+        try:
+            self._get_store().adjust_tokens(
+                self.bucket, self.rpm, self.tpm, int(actual_tokens) - int(estimated_tokens), time.time()
+            )
+        except Exception as e:
+            logger.debug(f"No se pudo ajustar el consumo de tokens: {e}")
+
+    def report_quota_exceeded(self, retry_after: Optional[float] = None) -> float:
+        """
+        Registra un 429 para que todos los workers pausen las llamadas
+
+        Args:
+            retry_after: Segundos sugeridos por la API (default: self.cooldown)
+
+        Returns:
+            float: Segundos de pausa aplicados
+        """
+        pause = retry_after if retry_after is not None else self.cooldown
+        if not self.enabled:
+            return pause
+        now = time.time()
+        try:
+            self._get_store().block_until(self.bucket, self.rpm, self.tpm, now + pause, now)
+            logger.warning(f"⚠️ Cuota de Gemini agotada (429): pausa global de {pause:.0f}s para todos los workers")
+        except Exception as e:
+            logger.warning(f"No se pudo registrar la pausa de cuota: {e}")
+        return pause
+
+    def _get_store(self) -> SQLiteQuotaStore:
+        if self._store is None:
+            self._store = SQLiteQuotaStore(self._store_path)
+        return self._store
+
+
+_governor_singleton = process_singleton(QuotaGovernor)
+
+
+def get_quota_governor() -> QuotaGovernor:
+    """
+    Obtiene la instancia global del gobernador de cuota (singleton por proceso;
+    el estado de cuota se comparte entre procesos a través del archivo SQLite)
+
+    Returns:
+        QuotaGovernor: Instancia del gobernador
+    """
+    return _governor_singleton()
@@ -0,0 +1,71 @@
+"""
+Empaquetado de segmentos pequeños en una sola petición al modelo
+Responsabilidad única: Agrupar segmentos adyacentes (fragmentos de historia, lotes de
+funcionalidades) mientras quepan en el presupuesto de tokens
+
+Muchos documentos tienen decenas de historias cortas: enviarlas una por una paga por cada
+una la plantilla de instrucciones completa, un viaje de ida y vuelta y la pausa entre llamadas.
+Agrupadas, el modelo responde todas en una llamada y el resultado se separa después por el
+identificador de cada historia.
+"""
+import re
+from typing import Callable, List, Optional, Sequence, TypeVar
+
+T = TypeVar('T')
+
+_STORY_NUMBER_PATTERN = re.compile(r'HISTORIA\s+(?:NO\s+FUNCIONAL\s*)?#\s*(\d+)', re.IGNORECASE)
+
+
+def pack_segments(segments: Sequence[T], measure: Callable[[T], int], budget: int,
+                  max_segments: int, count: Optional[Callable[[T], int]] = None,
+                  max_count: Optional[int] = None) -> List[List[T]]:
+    """
+    Agrupa segmentos adyacentes en paquetes que no superan el presupuesto
+
+    El orden se conserva. Un segmento que por sí solo supera el presupuesto forma su propio
+    paquete (nunca se divide aquí).
+
+    Args:
+        segments: Segmentos en orden del documento
+        measure: Tamaño de un segmento (tokens estimados)
+        budget: Tamaño máximo de un paquete
+        max_segments: Máximo de segmentos por paquete (1 = sin empaquetar)
+        count: Resultados que se piden por segmento (p. ej. historias de un lote)
+        max_count: Máximo de resultados por paquete; acota el tamaño de la respuesta, que
+            crece con los resultados pedidos y no con el tamaño de la entrada
+
+    Returns:
+        List[List[T]]: Paquetes de segmentos
+    """
+    packs: List[List[T]] = []
+    current: List[T] = []
+    current_size = current_count = 0
+    for segment in segments:
+        size = measure(segment)
+        items = count(segment) if count else 0
+        if current and (len(current) >= max(1, max_segments) or current_size + size > budget
+                        or (max_count is not None and current_count + items > max_count)):
+            packs.append(current)
+            current, current_size, current_count = [], 0, 0
+        current.append(segment)
+        current_size += size
+        current_count += items
+    if current:
+        packs.append(current)
+    return packs
+
+
+def story_number(text: Optional[str]) -> Optional[int]:
+    """
+    Número de la historia en un identificador o texto ("HISTORIA #12: ..." -> 12)
+
+    Args:
+        text: Identificador de historia o texto que empieza con su cabecera
+
+    Returns:
+        int o None si no tiene cabecera de historia
+    """
+    if not text:
+        return None
+    match = _STORY_NUMBER_PATTERN.search(str(text))
+    return int(match.group(1)) if match else None
@@ -7,16 +7,37 @@ import inspect
 from typing import Callable, Any, Optional
 from functools import wraps
 
+from app.utils.quota_governor import get_quota_governor, is_quota_error
+from app.utils.llm_cache import skip_cache_reads
+from app.utils.llm_telemetry import track_operation
+
 logger = logging.getLogger(__name__)
 
 
+def _quota_retry_delay(delay: float) -> float:
+    """
+    Delay antes de reintentar tras un 429.
+
+    Con el gobernador de cuota activo, el 429 ya quedó registrado como pausa global y el
+    siguiente intento espera en QuotaGovernor.acquire() lo justo hasta que haya cuota, por lo
+    que aquí basta el backoff normal. Sin gobernador se mantiene el enfriamiento de 30 s.
+    """
+    if get_quota_governor().enabled:
+        logger.error(f"⚠️ LÍMITE DE CUOTA ALCANZADO (429). Reintentando en {delay}s tras la pausa global de cuota...")
+        return delay
+    delay = max(delay, 30)  # Esperar al menos 30 segundos para resetear cuota
+    logger.error(f"⚠️ LÍMITE DE CUOTA ALCANZADO (429). Esperando {delay}s para enfriamiento...")
+    return delay
+
+
 def retry_with_backoff(
     max_retries: int = 3,
     retry_delay: int = 2,
     timeout_base: int = 180,
     timeout_increment: int = 60,
     exceptions: tuple = (Exception,),
-    on_retry: Optional[Callable] = None
+    on_retry: Optional[Callable] = None,
+    stage: Optional[str] = None
 ):
     """
     Decorador para reintentos con backoff exponencial.
@@ -28,6 +49,7 @@ def retry_with_backoff(
         timeout_increment (int): Incremento de timeout por intento
         exceptions (tuple): Tupla de excepciones que deben activar reintento
         on_retry (callable): Función opcional a llamar antes de cada reintento
+        stage (str): Etapa del pipeline para la telemetría (analysis, chunk, healing, context)
         
     Returns:
         callable: Función decorada
@@ -35,93 +57,98 @@ def retry_with_backoff(
     def decorator(func: Callable) -> Callable:
         @wraps(func)
         def wrapper(*args, **kwargs) -> Any:
-            last_exception = None
+            with track_operation(stage) as operation:
+                last_exception = None
             
-            for retry in range(max_retries):
-                try:
-                    # Calcular timeout progresivo
-                    timeout_seconds = timeout_base + (retry * timeout_increment)
+                for retry in range(max_retries):
+                    operation.attempts += 1
+                    try:
+                        # Calcular timeout progresivo
+                        timeout_seconds = timeout_base + (retry * timeout_increment)
                     
-                    # Verificar si la función acepta timeout como parámetro
-                    if 'timeout' not in kwargs and 'timeout_seconds' not in kwargs:
-                        try:
-                            sig = inspect.signature(func)
-                            params = sig.parameters
-                            # Solo pasar timeout si la función realmente lo acepta
-                            if 'timeout' in params or 'timeout_seconds' in params:
-                                param_name = 'timeout' if 'timeout' in params else 'timeout_seconds'
-                                kwargs[param_name] = timeout_seconds
-                        except (ValueError, TypeError):
-                            # Si no se puede inspeccionar la firma, no pasar timeout
-                            pass
-                    else:
-                        # Si ya está en kwargs, actualizar el valor
-                        if 'timeout' in kwargs:
-                            kwargs['timeout'] = timeout_seconds
-                        elif 'timeout_seconds' in kwargs:
-                            kwargs['timeout_seconds'] = timeout_seconds
+                        # Verificar si la función acepta timeout como parámetro
+                        if 'timeout' not in kwargs and 'timeout_seconds' not in kwargs:
+                            try:
+                                sig = inspect.signature(func)
+                                params = sig.parameters
+                                # Solo pasar timeout si la función realmente lo acepta
+                                if 'timeout' in params or 'timeout_seconds' in params:
+                                    param_name = 'timeout' if 'timeout' in params else 'timeout_seconds'
+                                    kwargs[param_name] = timeout_seconds
+                            except (ValueError, TypeError):
+                                # Si no se puede inspeccionar la firma, no pasar timeout
+                                pass
+                        else:
+                            # Si ya está en kwargs, actualizar el valor
+                            if 'timeout' in kwargs:
+                                kwargs['timeout'] = timeout_seconds
+                            elif 'timeout_seconds' in kwargs:
+                                kwargs['timeout_seconds'] = timeout_seconds
                     
-                    # Ejecutar función
-                    result = func(*args, **kwargs)
+                        # Ejecutar función (un reintento no reutiliza la respuesta en caché que falló)
+                        with skip_cache_reads(retry > 0):
+                            result = func(*args, **kwargs)
                     
-                    # Si hay resultado válido, retornarlo
-                    if result is not None:
-                        return result
+                        # Si hay resultado válido, retornarlo
+                        if result is not None:
+                            operation.success = True
+                            return result
                         
-                    # Si llegamos aquí y no es el último intento, reintentar
-                    if retry < max_retries - 1:
-                        delay = retry_delay * (2 ** retry)
-                        logger.warning(
-                            f"{func.__name__}: Resultado vacío, reintentando en {delay}s "
-                            f"(intento {retry + 1}/{max_retries})"
-                        )
-                        if on_retry:
-                            on_retry(retry + 1, max_retries)
-                        time.sleep(delay)
+                        # Si llegamos aquí y no es el último intento, reintentar
+                        if retry < max_retries - 1:
+                            delay = retry_delay * (2 ** retry)
+                            logger.warning(
+                                f"{func.__name__}: Resultado vacío, reintentando en {delay}s "
+                                f"(intento {retry + 1}/{max_retries})"
+                            )
+                            if on_retry:
+                                on_retry(retry + 1, max_retries)
+                            operation.backoff_seconds += delay
+                            time.sleep(delay)
                     
-                except exceptions as e:
-                    last_exception = e
-                    error_msg = str(e).lower()
+                    except exceptions as e:
+                        last_exception = e
+                        error_msg = str(e).lower()
                     
-                    # Si es el último intento, lanzar la excepción
-                    if retry == max_retries - 1:
-                        logger.error(
-                            f"{func.__name__}: Falló después de {max_retries} intentos: {e}"
-                        )
-                        raise
+                        # Si es el último intento, lanzar la excepción
+                        if retry == max_retries - 1:
+                            logger.error(
+                                f"{func.__name__}: Falló después de {max_retries} intentos: {e}"
+                            )
+                            raise
                     
-                    # Calcular delay para backoff exponencial
-                    delay = retry_delay * (2 ** retry)
+                        # Calcular delay para backoff exponencial
+                        delay = retry_delay * (2 ** retry)
                     
-                    # Si el error es específicamente de cuota (429), forzar un delay más largo
-                    if "429" in error_msg or "quota" in error_msg or "rate limit" in error_msg:
-                        delay = max(delay, 30) # Esperar al menos 30 segundos para resetear cuota
-                        logger.error(
-                            f"⚠️ LÍMITE DE CUOTA ALCANZADO (429). Esperando {delay}s para enfriamiento..."
-                        )
+                        # Si el error es específicamente de cuota (429), la pausa la coordina el gobernador
+                        if is_quota_error(e):
+                            delay = _quota_retry_delay(delay)
 
-                    # Mensaje especial para timeouts
-                    if "timeout" in error_msg or "timed out" in error_msg:
-                        logger.warning(
-                            f"{func.__name__}: Timeout detectado, reintentando en {delay}s "
-                            f"(intento {retry + 1}/{max_retries})"
-                        )
-                    else:
-                        logger.warning(
-                            f"{func.__name__}: Error detectado, reintentando en {delay}s "
-                            f"(intento {retry + 1}/{max_retries}): {e}"
-                        )
+                        # Mensaje especial para timeouts
+                        if "timeout" in error_msg or "timed out" in error_msg:
+                            logger.warning(
+                                f"{func.__name__}: Timeout detectado, reintentando en {delay}s "
+                                f"(intento {retry + 1}/{max_retries})"
+                            )
+                        else:
+                            logger.warning(
+                                f"{func.__name__}: Error detectado, reintentando en {delay}s "
+                                f"(intento {retry + 1}/{max_retries}): {e}"
+                            )
+                    
+                        if on_retry:
+                            on_retry(retry + 1, max_retries, e)
                     
-                    if on_retry:
-                        on_retry(retry + 1, max_retries, e)
+                        operation.backoff_seconds += delay
                     
-                    time.sleep(delay)
+                        time.sleep(delay)
             
-            # Si llegamos aquí sin éxito, lanzar última excepción o error genérico
-            if last_exception:
-                raise last_exception
-            raise RuntimeError(f"{func.__name__}: Falló después de {max_retries} intentos sin excepción")
+                # Si llegamos aquí sin éxito, lanzar última excepción o error genérico
+                if last_exception:
+                    raise last_exception
+                raise RuntimeError(f"{func.__name__}: Falló después de {max_retries} intentos sin excepción")
         
+
         return wrapper
     return decorator
 
@@ -134,6 +161,7 @@ def call_with_retry(
     timeout_base: int = 180,
     timeout_increment: int = 60,
     exceptions: tuple = (Exception,),
+    stage: Optional[str] = None,
     **kwargs
 ) -> Any:
     """
@@ -149,88 +177,92 @@ def call_with_retry(
         timeout_base (int): Timeout base en segundos
         timeout_increment (int): Incremento de timeout por intento
         exceptions (tuple): Excepciones que activan reintento
+        stage (str): Etapa del pipeline para la telemetría (analysis, chunk, healing, context)
         **kwargs: Argumentos con nombre para la función
         
     Returns:
         Any: Resultado de la función
     """
-    last_exception = None
+    with track_operation(stage) as operation:
+        last_exception = None
     
-    for retry in range(max_retries):
-        try:
-            # Calcular timeout progresivo
-            timeout_seconds = timeout_base + (retry * timeout_increment)
+        for retry in range(max_retries):
+            operation.attempts += 1
+            try:
+                # Calcular timeout progresivo
+                timeout_seconds = timeout_base + (retry * timeout_increment)
             
-            # Verificar si la función acepta timeout como parámetro
-            if 'timeout' not in kwargs and 'timeout_seconds' not in kwargs:
-                try:
-                    sig = inspect.signature(func)
-                    params = sig.parameters
-                    # Solo pasar timeout si la función realmente lo acepta
-                    if 'timeout' in params or 'timeout_seconds' in params:
-                        param_name = 'timeout' if 'timeout' in params else 'timeout_seconds'
-                        kwargs[param_name] = timeout_seconds
-                except (ValueError, TypeError):
-                    # Si no se puede inspeccionar la firma, no pasar timeout
-                    pass
+                # Verificar si la función acepta timeout como parámetro
+                if 'timeout' not in kwargs and 'timeout_seconds' not in kwargs:
+                    try:
+                        sig = inspect.signature(func)
+                        params = sig.parameters
+                        # Solo pasar timeout si la función realmente lo acepta
+                        if 'timeout' in params or 'timeout_seconds' in params:
+                            param_name = 'timeout' if 'timeout' in params else 'timeout_seconds'
+                            kwargs[param_name] = timeout_seconds
+                    except (ValueError, TypeError):
+                        # Si no se puede inspeccionar la firma, no pasar timeout
+                        pass
             
-            # Ejecutar función
-            result = func(*args, **kwargs)
+                # Ejecutar función (un reintento no reutiliza la respuesta en caché que falló)
+                with skip_cache_reads(retry > 0):
+                    result = func(*args, **kwargs)
             
-            # Si hay resultado válido, retornarlo
-            if result is not None:
-                return result
+                # Si hay resultado válido, retornarlo
+                if result is not None:
+                    operation.success = True
+                    return result
                 
-            # Si llegamos aquí y no es el último intento, reintentar
-            if retry < max_retries - 1:
-                delay = retry_delay * (2 ** retry)
-                logger.warning(
-                    f"{func.__name__ if hasattr(func, '__name__') else 'function'}: "
-                    f"Resultado vacío, reintentando en {delay}s (intento {retry + 1}/{max_retries})"
-                )
-                time.sleep(delay)
+                # Si llegamos aquí y no es el último intento, reintentar
+                if retry < max_retries - 1:
+                    delay = retry_delay * (2 ** retry)
+                    logger.warning(
+                        f"{func.__name__ if hasattr(func, '__name__') else 'function'}: "
+                        f"Resultado vacío, reintentando en {delay}s (intento {retry + 1}/{max_retries})"
+                    )
+                    operation.backoff_seconds += delay
+                    time.sleep(delay)
                 
-        except exceptions as e:
-            last_exception = e
-            error_msg = str(e).lower()
+            except exceptions as e:
+                last_exception = e
+                error_msg = str(e).lower()
+            
+                # Si es el último intento, lanzar la excepción
+                if retry == max_retries - 1:
+                    logger.error(
+                        f"{func.__name__ if hasattr(func, '__name__') else 'function'}: "
+                        f"Falló después de {max_retries} intentos: {e}"
+                    )
+                    raise
             
-            # Si es el último intento, lanzar la excepción
-            if retry == max_retries - 1:
-                logger.error(
-                    f"{func.__name__ if hasattr(func, '__name__') else 'function'}: "
-                    f"Falló después de {max_retries} intentos: {e}"
-                )
-                raise
+                # Calcular delay para backoff exponencial
+                delay = retry_delay * (2 ** retry)
             
-            # Calcular delay para backoff exponencial
-            delay = retry_delay * (2 ** retry)
+                # Si el error es específicamente de cuota (429), la pausa la coordina el gobernador
+                if is_quota_error(e):
+                    delay = _quota_retry_delay(delay)
             
-            # Si el error es específicamente de cuota (429), forzar un delay más largo
-            if "429" in error_msg or "quota" in error_msg or "rate limit" in error_msg:
-                delay = max(delay, 30) # Esperar al menos 30 segundos para resetear cuota
-                logger.error(
-                    f"⚠️ LÍMITE DE CUOTA ALCANZADO (429). Esperando {delay}s para enfriamiento..."
-                )
+                # Mensaje especial para timeouts
+                if "timeout" in error_msg or "timed out" in error_msg:
+                    logger.warning(
+                        f"{func.__name__ if hasattr(func, '__name__') else 'function'}: "
+                        f"Timeout detectado, reintentando en {delay}s (intento {retry + 1}/{max_retries})"
+                    )
+                else:
+                    logger.warning(
+                        f"{func.__name__ if hasattr(func, '__name__') else 'function'}: "
+                        f"Error detectado, reintentando en {delay}s (intento {retry + 1}/{max_retries}): {e}"
+                    )
             
-            # Mensaje especial para timeouts
-            if "timeout" in error_msg or "timed out" in error_msg:
-                logger.warning(
-                    f"{func.__name__ if hasattr(func, '__name__') else 'function'}: "
-                    f"Timeout detectado, reintentando en {delay}s (intento {retry + 1}/{max_retries})"
-                )
-            else:
-                logger.warning(
-                    f"{func.__name__ if hasattr(func, '__name__') else 'function'}: "
-                    f"Error detectado, reintentando en {delay}s (intento {retry + 1}/{max_retries}): {e}"
-                )
+                operation.backoff_seconds += delay
             
-            time.sleep(delay)
+                time.sleep(delay)
     
-    # Si llegamos aquí sin éxito, lanzar última excepción o error genérico
-    if last_exception:
-        raise last_exception
-    raise RuntimeError(
-        f"{func.__name__ if hasattr(func, '__name__') else 'function'}: "
-        f"Falló después de {max_retries} intentos sin excepción"
-    )
-
+        # Si llegamos aquí sin éxito, lanzar última excepción o error genérico
+        if last_exception:
+            raise last_exception
+        raise RuntimeError(
+            f"{func.__name__ if hasattr(func, '__name__') else 'function'}: "
+            f"Falló después de {max_retries} intentos sin excepción"
+        )
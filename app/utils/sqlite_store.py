@@ -0,0 +1,116 @@
+"""
+Almacenes en archivos SQLite locales
+Responsabilidad única: Conexión, transacciones y creación del esquema de los almacenes que
+comparten estado entre los workers de gunicorn a través de un archivo SQLite (caché de
+respuestas, cuota de Gemini y telemetría)
+"""
+import os
+import sqlite3
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Callable, Optional, Sequence, TypeVar
+
+T = TypeVar('T')
+
+
+def resolve_store_path(path: Optional[str], configured: Optional[str], filename: str) -> str:
+    """
+    Ruta del archivo de un almacén
+
+    Args:
+        path: Ruta explícita
+        configured: Ruta configurada (Config)
+        filename: Nombre del archivo en el directorio temporal si no hay ninguna de las anteriores
+
+    Returns:
+        str: Ruta del archivo SQLite
+    """
+    return path or configured or os.path.join(tempfile.gettempdir(), filename)
+
+
+class SQLiteFileStore:
+    """Base de los almacenes en un archivo SQLite compartido por procesos"""
+
+    # Sentencias CREATE TABLE / CREATE INDEX IF NOT EXISTS del almacén
+    SCHEMA: Sequence[str] = ()
+
+    def __init__(self, path: str):
+        """
+        Inicializa el almacén (el esquema se crea en el primer acceso)
+
+        Args:
+            path: Ruta del archivo SQLite
+        """
+        self.path = path
+        self._initialized = False
+        self._init_lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    @contextmanager
+    def _connection(self):
+        """Conexión en modo autocommit (lecturas y escrituras de una sola sentencia)"""
+        self._ensure_schema()
+        conn = self._connect()
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    @contextmanager
+    def _transaction(self):
+        """Transacción exclusiva de escritura (serializa los workers que comparten el archivo)"""
+        self._ensure_schema()
+        conn = self._connect()
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            yield conn
+            conn.execute('COMMIT')
+        except Exception:
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+            raise
+        finally:
+            conn.close()
+
+    def _ensure_schema(self) -> None:
+        if self._initialized:
+            return
+        with self._init_lock:
+            if self._initialized:
+                return
+            conn = self._connect()
+            try:
+                for statement in self.SCHEMA:
+                    conn.execute(statement)
+            finally:
+                conn.close()
+            self._initialized = True
+
+
+def process_singleton(factory: Callable[[], T]) -> Callable[[], T]:
+    """
+    Crea un accesor a una instancia única por proceso (creada en el primer uso)
+
+    El estado compartido entre procesos vive en el archivo SQLite del almacén; la instancia
+    solo evita reabrir la configuración en cada llamada.
+
+    Args:
+        factory: Constructor de la instancia
+
+    Returns:
+        Callable: Función sin argumentos que retorna la instancia
+    """
+    instance = []
+    lock = threading.Lock()
+
+    def get() -> T:
+        if not instance:
+            with lock:
+                if not instance:
+                    instance.append(factory())
+        return instance[0]
+
+    return get
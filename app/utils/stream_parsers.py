@@ -0,0 +1,227 @@
+"""
+Parsers incrementales para respuestas del modelo en streaming
+Responsabilidad única: Detectar cada objeto (caso de prueba o historia) en cuanto termina de
+llegar, sin esperar a la respuesta completa
+"""
+import json
+import logging
+import re
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Mismo patrón de cabecera que TextProcessor.split_story_text_into_individual_stories
+_STORY_HEADER_PATTERN = re.compile(r'HISTORIA\s+NO\s+FUNCIONAL\s*#\s*\d+|HISTORIA\s*#\s*\d+', re.IGNORECASE)
+
+
+class IncrementalJSONArrayParser:
+    """
+    Extrae los objetos de nivel superior de un array JSON que llega por fragmentos.
+
+    Recorre cada carácter una sola vez llevando la profundidad de anidamiento y el estado de
+    cadena/escape, por lo que tolera texto o bloques ```json antes del array y objetos partidos
+    entre fragmentos. Un objeto que no se puede decodificar se descarta (el parseo completo de
+    la respuesta sigue siendo la fuente de verdad).
+    """
+
+    def __init__(self):
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._started = False
+        self._buffer: List[str] = []
+        self._capturing = False
+
+    def feed(self, text: str) -> List[Dict]:
+        """
+        Procesa un fragmento de la respuesta
+
+        Args:
+            text: Texto recibido
+
+        Returns:
+            List[Dict]: Objetos completados dentro de este fragmento, en orden
+        """
+        completed = []
+        if not text:
+            return completed
+
+        capture_from = 0 if self._capturing else None
+        for pos, char in enumerate(text):
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == '\\':
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if not self._started:
+                if char == '[':
+                    self._started = True
+                    self._depth = 1
+                continue
+
+            if char == '"':
+                self._in_string = True
+            elif char in '[{':
+                if char == '{' and self._depth == 1:
+                    self._capturing = True
+                    self._buffer = []
+                    capture_from = pos
+                self._depth += 1
+            elif char in ']}':
+                self._depth -= 1
+                if char == '}' and self._depth == 1 and self._capturing:
+                    self._buffer.append(text[capture_from:pos + 1])
+                    self._capturing = False
+                    capture_from = None
+                    item = self._decode(''.join(self._buffer))
+                    if item is not None:
+                        completed.append(item)
+                elif self._depth <= 0:
+                    # Fin del array de nivel superior: ignorar lo que venga después
+                    self._started = False
+                    self._depth = 0
+
+        if self._capturing and capture_from is not None:
+            self._buffer.append(text[capture_from:])
+        return completed
+
+    @staticmethod
+    def _decode(raw: str) -> Optional[Dict]:
+        try:
+            item = json.loads(raw)
+        except json.JSONDecodeError as e:
+            logger.debug(f"Objeto parcial no decodificable en streaming: {e}")
+            return None
+        return item if isinstance(item, dict) else None
+
+
+class IncrementalStorySplitter:
+    """
+    Separa historias de usuario en texto libre a medida que llegan.
+
+    Una historia se considera completa cuando aparece la cabecera "HISTORIA #" siguiente;
+    la última se entrega al llamar a close().
+    """
+
+    def __init__(self, min_length: int = 0):
+        """
+        Inicializa el separador
+
+        Args:
+            min_length: Longitud mínima para entregar una historia (descarta fragmentos sueltos)
+        """
+        self._min_length = min_length
+        self._text = ''
+        self._current_start: Optional[int] = None
+        self._scan_from = 0
+
+    def feed(self, text: str) -> List[str]:
+        """
+        Procesa un fragmento de la respuesta
+
+        Args:
+            text: Texto recibido
+
+        Returns:
+            List[str]: Historias completadas con este fragmento
+        """
+        if not text:
+            return []
+        self._text += text
+        completed = []
+        # Una cabecera puede quedar partida entre fragmentos: solo se analiza hasta la última línea completa
+        limit = self._text.rfind('\n') + 1
+        for match in _STORY_HEADER_PATTERN.finditer(self._text, self._scan_from, limit):
+            if self._current_start is not None:
+                self._emit(self._text[self._current_start:match.start()], completed)
+            self._current_start = match.start()
+        if limit > self._scan_from:
+            self._scan_from = limit
+        if self._current_start is not None and self._current_start > 0:
+            # Descartar el texto ya entregado para no acumular la respuesta completa dos veces
+            self._text = self._text[self._current_start:]
+            self._scan_from -= self._current_start
+            self._current_start = 0
+        return completed
+
+    def close(self) -> List[str]:
+        """
+        Entrega la última historia pendiente
+
+        Returns:
+            List[str]: Historias restantes (como mucho una)
+        """
+        completed = []
+        # Cabeceras en la última línea (sin salto final) aún no analizadas
+        for match in _STORY_HEADER_PATTERN.finditer(self._text, self._scan_from):
+            if self._current_start is not None:
+                self._emit(self._text[self._current_start:match.start()], completed)
+            self._current_start = match.start()
+        if self._current_start is not None:
+            self._emit(self._text[self._current_start:], completed)
+        self._text = ''
+        self._current_start = None
+        self._scan_from = 0
+        return completed
+
+    def _emit(self, story: str, completed: List[str]) -> None:
+        story = story.strip()
+        if story and len(story) > self._min_length:
+            completed.append(story)
+
+
+def stream_emitter(on_partial: Optional[Callable[[str, Any], None]], kind: str,
+                   skip: int = 0) -> Callable[[Any], int]:
+    """
+    Construye una función que entrega resultados parciales al callback de forma segura
+
+    Args:
+        on_partial: Callback on_partial(kind, item) o None
+        kind: Tipo de resultado ('test_case' o 'story')
+        skip: Resultados ya entregados en un intento previo (evita duplicados al reintentar)
+
+    Returns:
+        Callable: emit(item) -> número de resultados vistos en este intento
+    """
+    seen = [0]
+
+    def emit(item: Any) -> int:
+        seen[0] += 1
+        if on_partial and seen[0] > skip:
+            try:
+                on_partial(kind, item)
+            except Exception as e:
+                logger.warning(f"No se pudo emitir resultado parcial: {e}")
+        return seen[0]
+
+    return emit
+
+
+def story_stream_handler(on_partial: Optional[Callable[[str, Any], None]], emitted: List[int],
+                         min_length: int = 0) -> Tuple[Optional[Callable[[str], None]], Callable[[], None]]:
+    """
+    Prepara el streaming de historias de un intento de generación
+
+    Args:
+        on_partial: Callback on_partial('story', historia) o None
+        emitted: Contador compartido entre reintentos ([n]) de historias ya entregadas
+        min_length: Longitud mínima de una historia
+
+    Returns:
+        Tuple: (on_text para governed_generate_content o None, finish() para entregar la última historia)
+    """
+    if not on_partial:
+        return None, lambda: None
+
+    splitter = IncrementalStorySplitter(min_length=min_length)
+    emit = stream_emitter(on_partial, 'story', skip=emitted[0])
+
+    def deliver(stories: List[str]) -> None:
+        for story in stories:
+            emitted[0] = max(emitted[0], emit(story))
+
+    return (lambda text: deliver(splitter.feed(text))), (lambda: deliver(splitter.close()))
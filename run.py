@@ -14,9 +14,14 @@ warnings.filterwarnings('ignore', category=UserWarning, module='weasyprint')
 BASE_DIR = pathlib.Path(__file__).parent
 sys.path.insert(0, str(BASE_DIR))
 
-from app.core.app import app
+from app.core.app import app, resume_generation_jobs
 from app.core.config import Config
 
+# Gunicorn importa este módulo en cada worker; con el reloader de Flask solo el proceso hijo
+# (WERKZEUG_RUN_MAIN) sirve peticiones, así que el proceso vigilante no retoma jobs
+if __name__ != '__main__' or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+    resume_generation_jobs()
+
 if __name__ == '__main__':
     app.run(
         host=Config.FLASK_HOST,
@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+"""
+Script para medir el pipeline de generación con llamadas al modelo grabadas (cassettes)
+Uso:
+    python scripts/benchmark_generation.py documento.txt --task matrix --mode record --cassette matriz.jsonl
+    python scripts/benchmark_generation.py documento.txt --task matrix --cassette matriz.jsonl --runs 5
+
+En modo record se llama a Gemini una vez y se graban las respuestas. En modo replay (default)
+todo el pipeline (fragmentación, parseo de JSON, curación, duplicados, formateo) se ejecuta sin
+red ni cuota; --latency-scale y --error-rate simulan la latencia grabada y errores 429.
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Agregar el directorio raíz al path
+ROOT_DIR = Path(__file__).parent.parent
+sys.path.insert(0, str(ROOT_DIR))
+
+from app.backend.agent_manager import simple_agent_processing
+from app.core.config import Config
+from app.utils.llm_cassette import RECORD, REPLAY, use_cassette
+
+
+def unwrap(result) -> dict:
+    """Resultado del generador dentro de la respuesta del agente ({"tool_used", "result"})"""
+    payload = result.get('result', result) if isinstance(result, dict) else {}
+    return payload if isinstance(payload, dict) else {}
+
+
+def count_items(result) -> int:
+    """Cantidad de historias o casos de prueba de un resultado del agente"""
+    payload = unwrap(result)
+    for key in ('matrix', 'stories'):
+        if isinstance(payload.get(key), list):
+            return len(payload[key])
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark del pipeline de generación con cassettes")
+    parser.add_argument('document', help="Archivo de texto con el documento a procesar")
+    parser.add_argument('--task', choices=['story', 'matrix'], default='matrix')
+    parser.add_argument('--cassette', default=Config.LLM_CASSETTE_PATH)
+    parser.add_argument('--mode', choices=[RECORD, REPLAY], default=REPLAY)
+    parser.add_argument('--runs', type=int, default=3, help="Ejecuciones en modo replay")
+    parser.add_argument('--latency-scale', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    text = Path(args.document).read_text(encoding='utf-8')
+    if args.mode == REPLAY and not Config.GOOGLE_API_KEY:
+        # Los generadores exigen una API key aunque en replay no se llame a la red
+        Config.GOOGLE_API_KEY = os.environ['GOOGLE_API_KEY'] = 'replay'
+
+    runs = 1 if args.mode == RECORD else max(1, args.runs)
+    timings = []
+    for run in range(runs):
+        with use_cassette(args.cassette, args.mode, latency_scale=args.latency_scale,
+                          error_rate=args.error_rate, seed=args.seed):
+            start = time.perf_counter()
+            result = simple_agent_processing(args.task, text, {})
+            elapsed = time.perf_counter() - start
+        payload = unwrap(result)
+        if result.get('error') or payload.get('status') == 'error':
+            print(f"❌ Error en la ejecución {run + 1}: {result.get('error') or payload.get('message')}")
+            sys.exit(1)
+        timings.append(elapsed)
+        print(f"Ejecución {run + 1}: {elapsed:.3f}s, {count_items(result)} resultado(s)")
+
+    if args.mode == RECORD:
+        print(f"✅ Cassette grabado en {args.cassette}")
+    else:
+        print(f"\n📊 {len(text)} caracteres | mediana {statistics.median(timings):.3f}s | "
+              f"mínimo {min(timings):.3f}s | {len(text) / statistics.median(timings):,.0f} caracteres/s")
+
+
+if __name__ == '__main__':
+    main()
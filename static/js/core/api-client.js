@@ -42,6 +42,38 @@
             });
         },
 
+        /**
+         * Genera una clave de idempotencia para un intento de carga
+         * @returns {string} Clave única
+         */
+        newIdempotencyKey() {
+            if (window.crypto && window.crypto.randomUUID) return window.crypto.randomUUID();
+            return `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+        },
+
+        /**
+         * Ejecuta send(key) con una clave de idempotencia nueva por intento del usuario.
+         * Solo los reintentos automáticos (sin respuesta, timeout o 502/503/504) reutilizan la
+         * clave, de modo que el servidor omite lo ya creado; una carga nueva genera otra clave.
+         * Un 409 indica que la petición original con esa clave sigue en curso: se espera y se reintenta.
+         * @param {Function} send - Función async que recibe la clave y realiza la petición
+         * @param {number} retries - Reintentos ante errores transitorios
+         * @returns {Promise<any>} Resultado de send
+         */
+        async withIdempotencyKey(send, retries = 2) {
+            const key = this.newIdempotencyKey();
+            for (let attempt = 0; ; attempt++) {
+                try {
+                    return await send(key);
+                } catch (error) {
+                    const transient = !error.status || [409, 502, 503, 504].includes(error.status);
+                    if (attempt >= retries || !transient) throw error;
+                    console.warn(`Reintentando carga (${attempt + 1}/${retries}) con la misma clave de idempotencia`, error);
+                    await new Promise(resolve => setTimeout(resolve, 1000 * (attempt + 1)));
+                }
+            }
+        },
+
         /**
          * Función genérica de petición con timeout
          */
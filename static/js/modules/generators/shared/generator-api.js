@@ -16,10 +16,58 @@
          * Genera contenido (Historias o Tests) usando Server-Sent Events
          * @param {string} endpoint - URL del API
          * @param {FormData} formData - Datos del formulario
-         * @param {Object} callbacks - Objeto con callbacks: onProgress, onTerminal, onError
+         * @param {Object} callbacks - Objeto con callbacks: onProgress, onTerminal, onError, onPartial
+         *                             (onPartial recibe cada caso/historia en cuanto se genera)
          */
         async generateStream(endpoint, formData, callbacks) {
-            const { onProgress, onTerminal, onError } = callbacks;
+            const { onProgress, onTerminal, onError, onPartial } = callbacks;
+            const MAX_RECONNECTS = 5;
+
+            const handleEvent = (data) => {
+                if (data.terminal) {
+                    if (data.error) {
+                        if (onError) onError(new Error(data.error));
+                    } else if (onTerminal) {
+                        onTerminal(data.data);
+                    }
+                } else if (data.status === 'partial' && onPartial) {
+                    onPartial(data.data, data);
+                } else if (onProgress) {
+                    onProgress(data);
+                }
+            };
+
+            // Lee un stream SSE; devuelve true si llegó el evento final
+            const readStream = async (response, state) => {
+                const reader = response.body.getReader();
+                const decoder = new TextDecoder();
+                let buffer = '';
+
+                while (true) {
+                    const { value, done } = await reader.read();
+                    if (done) return false;
+
+                    buffer += decoder.decode(value, { stream: true });
+                    const blocks = buffer.split('\n\n');
+                    buffer = blocks.pop();
+
+                    for (const block of blocks) {
+                        let dataLine = null;
+                        for (const field of block.split('\n')) {
+                            if (field.startsWith('id: ')) state.lastEventId = field.substring(4).trim();
+                            else if (field.trim().startsWith('data: ')) dataLine = field.trim().substring(6);
+                        }
+                        if (dataLine === null) continue;  // keepalive
+                        try {
+                            const data = JSON.parse(dataLine);
+                            handleEvent(data);
+                            if (data.terminal) return true;
+                        } catch (e) {
+                            console.error('Error parsing SSE data:', e, block);
+                        }
+                    }
+                }
+            };
 
             try {
                 const response = await fetch(endpoint, {
@@ -34,38 +82,36 @@
                     throw new Error(`Error en la respuesta del servidor: ${response.status}`);
                 }
 
-                const reader = response.body.getReader();
-                const decoder = new TextDecoder();
-                let buffer = '';
-
-                while (true) {
-                    const { value, done } = await reader.read();
-                    if (done) break;
+                // La generación corre en un job del servidor: si la conexión se corta,
+                // se reconecta y se reciben solo los eventos que faltaban
+                const jobId = response.headers.get('X-Generation-Job-Id');
+                const state = { lastEventId: '0' };
+                let finished = false;
+                try {
+                    finished = await readStream(response, state);
+                } catch (streamError) {
+                    if (!jobId) throw streamError;
+                    console.warn('Conexión SSE interrumpida, reconectando...', streamError);
+                }
 
-                    buffer += decoder.decode(value, { stream: true });
-                    const lines = buffer.split('\n\n');
-                    buffer = lines.pop();
-
-                    for (const line of lines) {
-                        if (line.trim().startsWith('data: ')) {
-                            try {
-                                const data = JSON.parse(line.trim().substring(6));
-
-                                if (data.terminal) {
-                                    if (data.error) {
-                                        if (onError) onError(new Error(data.error));
-                                    } else if (onTerminal) {
-                                        onTerminal(data.data);
-                                    }
-                                } else if (onProgress) {
-                                    onProgress(data);
-                                }
-                            } catch (e) {
-                                console.error('Error parsing SSE data:', e, line);
-                            }
+                for (let attempt = 1; !finished && jobId && attempt <= MAX_RECONNECTS; attempt++) {
+                    await new Promise(resolve => setTimeout(resolve, 1000 * attempt));
+                    try {
+                        const retry = await fetch(`/api/generation-jobs/${jobId}/events`, {
+                            headers: { 'Last-Event-ID': state.lastEventId }
+                        });
+                        if (!retry.ok) {
+                            throw new Error(`Error en la respuesta del servidor: ${retry.status}`);
                         }
+                        finished = await readStream(retry, state);
+                    } catch (retryError) {
+                        console.warn(`Reconexión ${attempt}/${MAX_RECONNECTS} fallida`, retryError);
                     }
                 }
+
+                if (!finished) {
+                    throw new Error('Se perdió la conexión con el servidor antes de terminar la generación');
+                }
             } catch (error) {
                 if (onError) onError(error);
                 else throw error;
@@ -99,7 +145,8 @@
             // Map types to correct backend endpoints
             // Backend routes: /api/jira/stories/upload-to-jira, /api/jira/tests/upload-to-jira
             const endpoint = `/api/jira/${type}/upload-to-jira`;
-            return window.NexusApi.client.post(endpoint, data);
+            const client = window.NexusApi.client;
+            return client.withIdempotencyKey(key => client.post(endpoint, { ...data, upload_job_id: key }));
         }
     };
 
@@ -119,19 +119,28 @@
     }
 
     async function uploadCsv(file, projectKey, fieldMappings, defaultValues) {
-        const formData = new FormData();
-        formData.append('file', file);
-        formData.append('project_key', projectKey);
-        formData.append('field_mappings', JSON.stringify(fieldMappings));
-        formData.append('default_values', JSON.stringify(defaultValues));
-
-        const response = await fetch('/api/jira/upload-csv', {
-            method: 'POST',
-            headers: { 'X-CSRFToken': window.getCsrfToken() },
-            body: formData
-        });
+        // Cada carga usa una clave nueva; solo los reintentos automáticos la reutilizan
+        return window.NexusApi.client.withIdempotencyKey(async (uploadJobId) => {
+            const formData = new FormData();
+            formData.append('file', file);
+            formData.append('project_key', projectKey);
+            formData.append('field_mappings', JSON.stringify(fieldMappings));
+            formData.append('default_values', JSON.stringify(defaultValues));
+            formData.append('upload_job_id', uploadJobId);
+
+            const response = await fetch('/api/jira/upload-csv', {
+                method: 'POST',
+                headers: { 'X-CSRFToken': window.getCsrfToken() },
+                body: formData
+            });
 
-        return await response.json();
+            if ([409, 502, 503, 504].includes(response.status)) {
+                const error = new Error(`Error HTTP ${response.status}`);
+                error.status = response.status;
+                throw error;
+            }
+            return await response.json();
+        });
     }
 
     function getCurrentUserInfo() {
@@ -0,0 +1,150 @@
+"""
+Tests unitarios para el almacén compartido de createmeta
+"""
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+from app.backend.jira.createmeta_store import CreatemetaStore
+from app.backend.jira.issue_fetcher import IssueFetcher
+
+
+CREATEMETA_RESPONSE = {
+    'projects': [{
+        'key': 'QA',
+        'issuetypes': [{
+            'name': 'Test Case',
+            'fields': {
+                'summary': {'name': 'Summary', 'required': True, 'schema': {'type': 'string'}, 'operations': ['set']},
+                'customfield_100': {
+                    'name': 'Ambiente', 'required': False, 'schema': {'type': 'option'},
+                    'operations': ['set'], 'allowedValues': [{'value': 'QA'}]
+                }
+            }
+        }]
+    }]
+}
+
+
+class TestCreatemetaStore(unittest.TestCase):
+    """Tests para CreatemetaStore"""
+
+    def setUp(self):
+        """Configuración inicial para cada test"""
+        self.store = CreatemetaStore(ttl_seconds=60, persist=False)
+
+    def test_reuses_loaded_response(self):
+        """Test que la segunda lectura no vuelve a llamar a Jira"""
+        loader = MagicMock(return_value=CREATEMETA_RESPONSE)
+
+        first = self.store.get_or_load('https://jira', 'QA', 'Test Case', loader)
+        second = self.store.get_or_load('https://jira/', 'QA', 'Test Case', loader)
+
+        self.assertEqual(first, CREATEMETA_RESPONSE)
+        self.assertIs(first, second)
+        loader.assert_called_once()
+        self.assertEqual(self.store.get_stats()['hits'], 1)
+
+    def test_keys_are_isolated_by_instance_and_issue_type(self):
+        """Test que instancias de Jira o tipos distintos no comparten entrada"""
+        loader = MagicMock(return_value=CREATEMETA_RESPONSE)
+
+        self.store.get_or_load('https://a.jira', 'QA', 'Test Case', loader)
+        self.store.get_or_load('https://b.jira', 'QA', 'Test Case', loader)
+        self.store.get_or_load('https://a.jira', 'QA', 'Bug', loader)
+
+        self.assertEqual(loader.call_count, 3)
+
+    def test_expired_entry_is_reloaded(self):
+        """Test que una entrada expirada se vuelve a cargar"""
+        loader = MagicMock(return_value=CREATEMETA_RESPONSE)
+        self.store.get_or_load('https://jira', 'QA', 'Test Case', loader)
+
+        with patch('app.backend.jira.createmeta_store.time.time', return_value=time.time() + 120):
+            self.store.get_or_load('https://jira', 'QA', 'Test Case', loader)
+
+        self.assertEqual(loader.call_count, 2)
+
+    def test_failed_load_is_not_cached(self):
+        """Test que una respuesta None no se almacena"""
+        loader = MagicMock(side_effect=[None, CREATEMETA_RESPONSE])
+
+        self.assertIsNone(self.store.get_or_load('https://jira', 'QA', 'Test Case', loader))
+        self.assertEqual(self.store.get_or_load('https://jira', 'QA', 'Test Case', loader), CREATEMETA_RESPONSE)
+
+    def test_invalidate_forces_reload(self):
+        """Test que invalidar una entrada obliga a recargarla"""
+        loader = MagicMock(return_value=CREATEMETA_RESPONSE)
+        self.store.get_or_load('https://jira', 'QA', 'Test Case', loader)
+
+        self.store.invalidate('https://jira', 'QA', 'Test Case')
+        self.store.get_or_load('https://jira', 'QA', 'Test Case', loader)
+
+        self.assertEqual(loader.call_count, 2)
+
+    def test_concurrent_requests_load_once(self):
+        """Test single-flight: peticiones concurrentes ejecutan una sola carga"""
+        calls = []
+
+        def slow_loader():
+            calls.append(1)
+            time.sleep(0.05)
+            return CREATEMETA_RESPONSE
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(
+                self.store.get_or_load('https://jira', 'QA', 'Test Case', slow_loader)))
+            for _ in range(8)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(results), 8)
+
+
+class TestIssueFetcherSharedMetadata(unittest.TestCase):
+    """Tests para la integración de IssueFetcher con el almacén compartido"""
+
+    def setUp(self):
+        """Configuración inicial para cada test"""
+        self.store = CreatemetaStore(ttl_seconds=60, persist=False)
+        patcher_fetcher = patch('app.backend.jira.project_fetcher.get_createmeta_store', return_value=self.store)
+        patcher_issue = patch('app.backend.jira.issue_fetcher.get_createmeta_store', return_value=self.store)
+        patcher_fetcher.start()
+        patcher_issue.start()
+        self.addCleanup(patcher_fetcher.stop)
+        self.addCleanup(patcher_issue.stop)
+
+        self.connection = MagicMock()
+        self.connection.base_url = 'https://jira'
+        response = MagicMock(status_code=200)
+        response.json.return_value = CREATEMETA_RESPONSE
+        self.connection.session.get.return_value = response
+
+    def test_fetchers_share_createmeta_across_instances(self):
+        """Test que dos fetchers (dos peticiones) hacen una sola llamada createmeta"""
+        first = IssueFetcher(self.connection).get_available_fields_metadata('QA', 'Test Case')
+        second = IssueFetcher(self.connection).get_available_fields_metadata('QA', 'Test Case')
+
+        self.assertIn('customfield_100', first)
+        self.assertEqual(first, second)
+        self.assertEqual(self.connection.session.get.call_count, 1)
+
+    def test_invalidate_metadata_cache_clears_shared_entry(self):
+        """Test que la invalidación por error limpia también el almacén compartido"""
+        fetcher = IssueFetcher(self.connection)
+        fetcher.get_available_fields_metadata('QA', 'Test Case')
+
+        fetcher.invalidate_metadata_cache('QA:Test Case')
+        IssueFetcher(self.connection).get_available_fields_metadata('QA', 'Test Case')
+
+        self.assertEqual(self.connection.session.get.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
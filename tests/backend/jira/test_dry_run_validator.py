@@ -0,0 +1,104 @@
+"""
+Tests unitarios para la validación offline (dry-run) de cargas masivas
+"""
+import unittest
+from unittest.mock import MagicMock
+
+from app.backend.jira.csv_issue_processor import CSVIssueProcessor
+
+
+FIELDS_METADATA = {
+    'summary': {'name': 'Summary', 'required': True, 'schema': {'type': 'string'}, 'operations': ['set']},
+    'priority': {
+        'name': 'Priority', 'required': False, 'schema': {'type': 'priority'}, 'operations': ['set'],
+        'allowedValues': [{'name': 'High', 'id': '1'}, {'name': 'Medium', 'id': '2'}]
+    },
+    'customfield_100': {
+        'name': 'Ambiente', 'required': True, 'schema': {'type': 'option'}, 'operations': ['set'],
+        'allowedValues': [{'value': 'QA', 'id': '10'}, {'value': 'UAT', 'id': '11'}]
+    },
+    'customfield_200': {'name': 'Calculado', 'required': False, 'schema': {'type': 'string'}, 'operations': []},
+    'customfield_300': {
+        'name': 'Componentes', 'required': False, 'schema': {'type': 'array', 'items': 'option'},
+        'operations': ['set'], 'allowedValues': [{'value': 'API'}, {'value': 'Web'}]
+    },
+}
+
+
+class TestDryRunUpload(unittest.TestCase):
+    """Tests para create_issues_from_csv en modo dry_run"""
+
+    def setUp(self):
+        """Configuración inicial para cada test"""
+        self.project_service = MagicMock()
+        self.project_service.get_issue_types.return_value = [{'name': 'Test Case'}, {'name': 'Bug'}]
+        self.fetcher = MagicMock()
+        self.fetcher.get_available_fields_metadata.return_value = FIELDS_METADATA
+        self.creator = MagicMock()
+        self.processor = CSVIssueProcessor(MagicMock(), self.project_service, self.fetcher, self.creator)
+        self.mappings = {
+            'Summary': 'summary', 'Issuetype': 'issuetype', 'Priority': 'priority',
+            'Ambiente': 'customfield_100', 'Calculado': 'customfield_200',
+            'Componentes': 'customfield_300', 'Extra': 'customfield_999'
+        }
+
+    def _run(self, rows):
+        return self.processor.create_issues_from_csv(
+            rows, 'QA', self.mappings, {}, filter_issue_types=False, dry_run=True
+        )
+
+    def test_valid_rows_make_no_create_calls(self):
+        """Test que filas válidas se reportan sin crear issues"""
+        rows = [
+            {'Summary': 'Login', 'Issuetype': 'test case', 'Priority': 'High', 'Ambiente': 'qa'},
+            {'Summary': 'Logout', 'Issuetype': 'Test Case', 'Ambiente': 'UAT', 'Componentes': 'API, web'},
+        ]
+
+        result = self._run(rows)
+
+        self.assertTrue(result['success'])
+        self.assertTrue(result['dry_run'])
+        self.assertEqual(result['success_count'], 2)
+        self.creator.create_issue.assert_not_called()
+        self.fetcher.get_available_fields_metadata.assert_called_once_with('QA', 'Test Case', use_cache=True)
+
+    def test_reports_every_problem_in_one_pass(self):
+        """Test que se reportan todos los errores de todas las filas"""
+        rows = [
+            {'Summary': '', 'Issuetype': 'Epic'},
+            {'Summary': 'Sin ambiente', 'Issuetype': 'Test Case', 'Priority': 'Urgent'},
+            {'Summary': 'Campos malos', 'Issuetype': 'Test Case', 'Ambiente': 'PROD',
+             'Calculado': 'x', 'Extra': 'y', 'Componentes': 'API, Mobile'},
+        ]
+
+        result = self._run(rows)
+
+        self.assertFalse(result['success'])
+        self.assertEqual(result['error_count'], 3)
+        first, second, third = result['failed']
+        self.assertEqual(len(first['errors']), 2)
+        self.assertTrue(any('Priority' in e for e in second['errors']))
+        self.assertTrue(any('requeridos' in e and 'Ambiente' in e for e in second['errors']))
+        joined = ' | '.join(third['errors'])
+        self.assertIn('PROD', joined)
+        self.assertIn('solo lectura', joined)
+        self.assertIn('customfield_999', joined)
+        components_error = next(e for e in third['errors'] if 'Componentes' in e)
+        self.assertTrue(components_error.endswith(': Mobile'))
+        self.creator.create_issue.assert_not_called()
+
+    def test_missing_createmeta_is_not_reported_as_valid(self):
+        """Test que sin metadata del tipo de issue las filas se reportan como no validadas"""
+        self.fetcher.get_available_fields_metadata.return_value = None
+        rows = [{'Summary': 'Login', 'Issuetype': 'Test Case', 'Ambiente': 'QA'}]
+
+        result = self._run(rows)
+
+        self.assertFalse(result['success'])
+        self.assertEqual(result['success_count'], 0)
+        self.assertIn('createmeta', result['failed'][0]['error'])
+        self.assertIn('Test Case', result['failed'][0]['error'])
+
+
+if __name__ == '__main__':
+    unittest.main()
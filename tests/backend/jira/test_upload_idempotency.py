@@ -0,0 +1,251 @@
+"""
+Tests unitarios para la idempotencia de cargas masivas
+"""
+import threading
+import time
+import unittest
+from datetime import datetime
+from unittest.mock import MagicMock, patch
+
+from app.backend.jira.csv_issue_processor import CSVIssueProcessor
+from app.backend.jira.upload_idempotency import compute_issue_fingerprint, fingerprint_label
+from app.services.jira.api.helpers import build_upload_job_id
+from app.utils.exceptions import UploadInProgressError
+
+
+class InMemoryFingerprintRepository:
+    """Repositorio de huellas en memoria para tests"""
+
+    def __init__(self):
+        self.rows = {}
+        self.lookups = 0
+        self.purges = []
+        self.jobs = {}
+        self._lock = threading.Lock()
+
+    def get_existing(self, job_id, fingerprints):
+        self.lookups += 1
+        return {fp: self.rows[(job_id, fp)] for fp in fingerprints if (job_id, fp) in self.rows}
+
+    def save(self, job_id, project_key, fingerprint, issue_key):
+        self.rows[(job_id, fingerprint)] = issue_key
+
+    def purge_older_than(self, cutoff):
+        self.purges.append(cutoff)
+        return 0
+
+    def claim_job(self, job_id, project_key, owner, stale_before):
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job and job['status'] == 'running' and job['updated_at'] >= stale_before:
+                return False
+            self.jobs[job_id] = {'status': 'running', 'owner': owner, 'updated_at': time.time()}
+            return True
+
+    def heartbeat_job(self, job_id, owner):
+        with self._lock:
+            if self.jobs[job_id]['owner'] == owner:
+                self.jobs[job_id]['updated_at'] = time.time()
+
+    def release_job(self, job_id, owner):
+        with self._lock:
+            if self.jobs[job_id]['owner'] == owner:
+                self.jobs[job_id]['status'] = 'done'
+
+
+class TestIssueFingerprint(unittest.TestCase):
+    """Tests para compute_issue_fingerprint"""
+
+    def test_fingerprint_is_stable_and_order_independent(self):
+        """Test que la huella no depende del orden de labels ni de campos"""
+        first = compute_issue_fingerprint('QA', 'Test Case', 'Login', labels=['a', 'b'],
+                                          custom_fields={'cf_1': 'x', 'cf_2': 'y'})
+        second = compute_issue_fingerprint('QA', 'test case', ' Login ', labels=['b', 'a'],
+                                           custom_fields={'cf_2': 'y', 'cf_1': 'x'})
+
+        self.assertEqual(first, second)
+
+    def test_fingerprint_changes_with_content(self):
+        """Test que contenidos distintos producen huellas distintas"""
+        self.assertNotEqual(
+            compute_issue_fingerprint('QA', 'Test Case', 'Login'),
+            compute_issue_fingerprint('QA', 'Test Case', 'Logout')
+        )
+
+    def test_label_has_no_spaces(self):
+        """Test que el label de huella es válido en Jira"""
+        label = fingerprint_label(compute_issue_fingerprint('QA', 'Bug', 'x'))
+
+        self.assertTrue(label.startswith('nexus-fp-'))
+        self.assertNotIn(' ', label)
+
+    def test_label_is_scoped_to_the_job(self):
+        """Test que el mismo contenido en otra carga no coincide con el label de un job anterior"""
+        fingerprint = compute_issue_fingerprint('QA', 'Bug', 'x')
+
+        self.assertEqual(fingerprint_label(fingerprint, 'job-1'), fingerprint_label(fingerprint, 'job-1'))
+        self.assertNotEqual(fingerprint_label(fingerprint, 'job-1'), fingerprint_label(fingerprint, 'job-2'))
+
+
+class TestUploadJobId(unittest.TestCase):
+    """Tests para build_upload_job_id"""
+
+    def test_job_comes_from_the_client_key_only(self):
+        """Test que sin clave del cliente no hay job y que la clave se separa por usuario"""
+        self.assertIsNone(build_upload_job_id('user-1', None))
+        self.assertIsNone(build_upload_job_id('user-1', '  '))
+        self.assertEqual(build_upload_job_id('user-1', 'k'), build_upload_job_id('user-1', 'k'))
+        self.assertNotEqual(build_upload_job_id('user-1', 'k'), build_upload_job_id('user-2', 'k'))
+
+
+class TestIdempotentUpload(unittest.TestCase):
+    """Tests para create_issues_from_csv con job_id"""
+
+    def setUp(self):
+        """Configuración inicial para cada test"""
+        self.repository = InMemoryFingerprintRepository()
+        patcher = patch(
+            'app.backend.jira.upload_idempotency.UploadFingerprintIndex._get_repository',
+            return_value=self.repository
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        notify_patcher = patch.object(CSVIssueProcessor, '_notify_upload_completed')
+        self.notify = notify_patcher.start()
+        self.addCleanup(notify_patcher.stop)
+
+        project_service = MagicMock()
+        project_service.get_issue_types.return_value = [{'name': 'Test Case'}]
+        fetcher = MagicMock()
+        fetcher.get_available_fields_metadata.return_value = None
+        self.creator = MagicMock()
+        self.keys = iter(f'QA-{n}' for n in range(1, 100))
+        self.creator.create_issue.side_effect = lambda **kwargs: {'success': True, 'key': next(self.keys)}
+        self.processor = CSVIssueProcessor(MagicMock(), project_service, fetcher, self.creator)
+        self.rows = [
+            {'Summary': 'Login', 'Issuetype': 'Test Case'},
+            {'Summary': 'Logout', 'Issuetype': 'Test Case'},
+            {'Summary': 'Login', 'Issuetype': 'Test Case'},
+        ]
+
+    def _upload(self, rows, job_id='job-1'):
+        return self.processor.create_issues_from_csv(rows, 'QA', filter_issue_types=False, job_id=job_id)
+
+    def test_retry_skips_already_created_issues(self):
+        """Test que un reintento del mismo job no crea duplicados"""
+        first = self._upload(self.rows)
+        second = self._upload(self.rows)
+
+        self.assertEqual(first['success_count'], 3)
+        self.assertEqual(self.creator.create_issue.call_count, 3)
+        self.assertEqual(second['skipped_count'], 3)
+        self.assertEqual([c['key'] for c in second['created']], [c['key'] for c in first['created']])
+
+    def test_partial_retry_creates_only_missing(self):
+        """Test que tras un fallo parcial solo se crean los issues pendientes"""
+        self.creator.create_issue.side_effect = [
+            {'success': True, 'key': 'QA-1'},
+            {'success': False, 'error': 'timeout'},
+            {'success': True, 'key': 'QA-3'},
+            {'success': True, 'key': 'QA-2'},
+        ]
+
+        first = self._upload(self.rows)
+        second = self._upload(self.rows)
+
+        self.assertEqual(first['error_count'], 1)
+        self.assertEqual(second['skipped_count'], 2)
+        self.assertEqual(second['success_count'], 3)
+        self.assertEqual(self.creator.create_issue.call_count, 4)
+
+    def test_identical_rows_in_one_upload_are_not_merged(self):
+        """Test que filas idénticas en la misma carga siguen creando issues distintos"""
+        result = self._upload(self.rows)
+
+        self.assertEqual(result['skipped_count'], 0)
+        self.assertEqual(len({c['key'] for c in result['created']}), 3)
+
+    def test_new_upload_of_same_content_creates_issues(self):
+        """Test que una carga nueva (otra clave) con el mismo contenido no se omite"""
+        self._upload(self.rows, job_id='job-1')
+        result = self._upload(self.rows, job_id='job-2')
+
+        self.assertEqual(result['skipped_count'], 0)
+        self.assertEqual(self.creator.create_issue.call_count, 6)
+
+    def test_expired_fingerprints_are_purged_once_per_upload(self):
+        """Test que cada carga elimina una vez las huellas fuera de la ventana de reintentos"""
+        with patch('app.backend.jira.upload_idempotency.Config') as config:
+            config.JIRA_UPLOAD_FINGERPRINT_RETENTION_HOURS = 24
+            config.JIRA_UPLOAD_FINGERPRINT_LABELS = False
+            config.JIRA_UPLOAD_JOB_STALE_SECONDS = 120
+            self._upload(self.rows)
+
+        self.assertEqual(len(self.repository.purges), 1)
+        age = datetime.now() - self.repository.purges[0]
+        self.assertAlmostEqual(age.total_seconds(), 24 * 3600, delta=60)
+
+    def test_index_is_queried_once_per_batch(self):
+        """Test que la consulta de huellas existentes se hace en lote"""
+        self._upload(self.rows)
+
+        self.assertEqual(self.repository.lookups, 1)
+
+    def test_retry_only_notifies_new_issues(self):
+        """Test que el evento de fin de carga cuenta solo issues nuevos"""
+        self._upload(self.rows)
+        self._upload(self.rows)
+
+        self.assertEqual([c.args for c in self.notify.call_args_list], [('QA', 3), ('QA', 0)])
+
+    def test_concurrent_retry_of_running_job_is_rejected(self):
+        """Test que un reintento concurrente del mismo job no crea issues mientras el original sigue en curso"""
+        first_started = threading.Event()
+        retry_done = threading.Event()
+        create = self.creator.create_issue.side_effect
+
+        def slow_create(**kwargs):
+            first_started.set()
+            retry_done.wait(timeout=5)
+            return create(**kwargs)
+
+        self.creator.create_issue.side_effect = slow_create
+        results = {}
+
+        def first_upload():
+            results['first'] = self._upload(self.rows)
+
+        worker = threading.Thread(target=first_upload)
+        worker.start()
+        self.assertTrue(first_started.wait(timeout=5))
+        try:
+            with self.assertRaises(UploadInProgressError):
+                self._upload(self.rows)
+        finally:
+            retry_done.set()
+            worker.join(timeout=5)
+
+        self.assertEqual(results['first']['success_count'], 3)
+        self.assertEqual(self.creator.create_issue.call_count, 3)
+        self.assertEqual(self._upload(self.rows)['skipped_count'], 3)
+
+    def test_stale_claim_can_be_taken_over(self):
+        """Test que una reserva sin latidos (proceso caído) no bloquea el reintento"""
+        self.repository.jobs['job-1'] = {'status': 'running', 'owner': 'dead', 'updated_at': time.time() - 3600}
+
+        result = self._upload(self.rows)
+
+        self.assertEqual(result['success_count'], 3)
+        self.assertEqual(self.repository.jobs['job-1']['status'], 'done')
+
+    def test_without_job_id_no_fingerprints_are_used(self):
+        """Test compatibilidad: sin job_id se comporta como antes"""
+        self._upload(self.rows, job_id=None)
+        self._upload(self.rows, job_id=None)
+
+        self.assertEqual(self.creator.create_issue.call_count, 6)
+        self.assertEqual(self.repository.rows, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
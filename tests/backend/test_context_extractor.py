@@ -0,0 +1,102 @@
+"""
+Tests unitarios para la extracción de contexto global (context_extractor.py)
+"""
+import unittest
+from unittest.mock import MagicMock, patch
+
+from app.backend.context_extractor import ContextExtractor, split_into_windows
+
+
+def _prompt_of(call):
+    return call.args[1]
+
+
+class TestSplitIntoWindows(unittest.TestCase):
+    """Tests para split_into_windows"""
+
+    def test_windows_cover_whole_text_without_exceeding_size(self):
+        """Test que las ventanas cubren todo el texto y respetan el tamaño máximo"""
+        text = "\n".join(f"Párrafo {n}: " + "x" * 80 for n in range(500))
+
+        windows = split_into_windows(text, 5000)
+
+        self.assertTrue(all(len(w) <= 5000 for w in windows))
+        self.assertEqual("\n".join(windows), text)
+        self.assertTrue(all(w.startswith("Párrafo") for w in windows))
+
+    def test_text_without_newlines_is_cut_at_limit(self):
+        """Test que un texto sin saltos de línea se corta en el límite"""
+        self.assertEqual(split_into_windows("a" * 25, 10), ["a" * 10, "a" * 10, "a" * 5])
+
+
+class TestExtractGlobalContext(unittest.TestCase):
+    """Tests para ContextExtractor.extract_global_context"""
+
+    def setUp(self):
+        """Configuración inicial para cada test"""
+        self.extractor = ContextExtractor.__new__(ContextExtractor)
+        self.extractor.model = MagicMock()
+        config_patcher = patch('app.backend.context_extractor.Config')
+        self.config = config_patcher.start()
+        self.addCleanup(config_patcher.stop)
+        retry_patcher = patch('app.backend.context_extractor.call_with_retry', side_effect=lambda func, **kwargs: func())
+        retry_patcher.start()
+        self.addCleanup(retry_patcher.stop)
+        pacing_patcher = patch('app.utils.chunk_executor.Config.GEMINI_MIN_CALL_INTERVAL', 0)
+        pacing_patcher.start()
+        self.addCleanup(pacing_patcher.stop)
+        self.config.CONTEXT_WINDOW_SIZE = 1000
+        self.config.CONTEXT_MAX_LENGTH = 6000
+        self.config.GEMINI_TIMEOUT_ANALYSIS = 10
+
+    def test_short_document_uses_single_call(self):
+        """Test que un documento corto se analiza con una sola llamada"""
+        with patch('app.backend.context_extractor.governed_generate_content',
+                   return_value=MagicMock(text=" CONTEXTO ")) as generate:
+            result = self.extractor.extract_global_context("Documento corto")
+
+        self.assertEqual(result, "CONTEXTO")
+        self.assertEqual(generate.call_count, 1)
+
+    def test_long_document_is_fully_analyzed_and_merged(self):
+        """Test que un documento extenso se analiza completo por ventanas y se fusiona"""
+        document = "\n".join(f"Sección {n}: " + "regla " * 30 for n in range(30)) + "\nREGLA FINAL"
+
+        def generate(model, prompt, **kwargs):
+            if "RESÚMENES PARCIALES" in prompt:
+                return MagicMock(text="CONTEXTO FUSIONADO")
+            return MagicMock(text="resumen con REGLA FINAL" if "REGLA FINAL" in prompt else "resumen")
+
+        with patch('app.backend.context_extractor.governed_generate_content', side_effect=generate) as mocked:
+            result = self.extractor.extract_global_context(document)
+
+        self.assertEqual(result, "CONTEXTO FUSIONADO")
+        prompts = [_prompt_of(c) for c in mocked.call_args_list]
+        window_prompts = [p for p in prompts if "FRAGMENTO" in p]
+        self.assertGreater(len(window_prompts), 1)
+        self.assertIn("resumen con REGLA FINAL", prompts[-1])
+
+    def test_failed_merge_falls_back_to_bounded_partials(self):
+        """Test que si la fusión falla se devuelven los resúmenes parciales recortados"""
+        self.config.CONTEXT_MAX_LENGTH = 50
+        document = "\n".join("línea " * 20 for _ in range(40))
+
+        def generate(model, prompt, **kwargs):
+            if "RESÚMENES PARCIALES" in prompt:
+                raise ValueError("fallo")
+            return MagicMock(text="resumen parcial")
+
+        with patch('app.backend.context_extractor.governed_generate_content', side_effect=generate):
+            result = self.extractor.extract_global_context(document)
+
+        self.assertTrue(result.startswith("[PARTE 1]\nresumen parcial"))
+        self.assertEqual(len(result), 50)
+
+    def test_all_windows_failing_returns_empty_context(self):
+        """Test que si todas las ventanas fallan no se bloquea el flujo"""
+        with patch('app.backend.context_extractor.governed_generate_content', side_effect=ValueError("fallo")):
+            self.assertEqual(self.extractor.extract_global_context("x" * 5000), "")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -19,14 +19,15 @@ def test_split_document_into_chunks(mock_chunker_cls, mock_config):
     assert result == ["chunk1", "chunk2"]
 
 @patch('app.backend.document_processor.Config')
-@patch('app.backend.document_processor.genai')
-def test_process_large_document_success(mock_genai, mock_config):
+@patch('app.backend.document_processor.get_gemini_model')
+def test_process_large_document_success(mock_get_model, mock_config):
     """Test de integración simulada para el procesamiento de documentos grandes."""
     # Setup
     mock_config.GOOGLE_API_KEY = "key"
     mock_config.GEMINI_MODEL = "model"
     mock_config.GEMINI_TIMEOUT_ANALYSIS = 10
     mock_config.STORY_BATCH_SIZE = 1
+    mock_config.REQUEST_PACKING_MAX_SEGMENTS = 1
     mock_config.GEMINI_TIMEOUT_BASE = 1
     mock_config.GEMINI_TIMEOUT_INCREMENT = 0
     mock_config.MAX_RETRIES = 1
@@ -46,7 +47,7 @@ def test_process_large_document_success(mock_genai, mock_config):
     # Se llamará 1 vez para análisis y luego N veces para lotes (aquí 2 funcionalidades, batch size 1 -> 2 lotes)
     mock_model.generate_content.side_effect = [mock_analysis_resp, mock_story_resp, mock_story_resp]
     
-    mock_genai.GenerativeModel.return_value = mock_model
+    mock_get_model.return_value = mock_model
     
     # Mock dependencies
     with patch('app.services.text_processor.TextProcessor') as mock_tp, \
@@ -71,3 +72,113 @@ def test_process_large_document_no_api_key(mock_config):
     result = document_processor.process_large_document("text", "role", "story")
     assert result['status'] == 'error'
     assert "API Key no configurada" in result['message']
+
+@patch('app.backend.document_processor.Config')
+@patch('app.backend.document_processor.get_gemini_model')
+def test_process_large_document_uses_relevant_passages(mock_get_model, mock_config):
+    """Test que cada lote recibe los pasajes relevantes y no el inicio fijo del documento."""
+    mock_config.GOOGLE_API_KEY = "key"
+    mock_config.STORY_BATCH_SIZE = 1
+    mock_config.GEMINI_TIMEOUT_BASE = 1
+    mock_config.GEMINI_TIMEOUT_INCREMENT = 0
+    mock_config.MAX_RETRIES = 1
+    mock_config.RETRY_DELAY = 0
+    mock_config.MIN_RESPONSE_LENGTH = 5
+
+    document = ("Portada " * 400) + "\n\nEl cajero registra devoluciones de productos con ticket."
+    mock_model = Mock()
+    mock_model.generate_content.side_effect = [
+        Mock(text="1. Registrar devoluciones - devoluciones con ticket"),
+        Mock(text="HISTORIA #1: Registrar devoluciones con ticket del cliente"),
+    ]
+    mock_get_model.return_value = mock_model
+
+    result = document_processor.process_large_document(document, "cajero", "funcionalidad", skip_healing=True)
+
+    story_prompt = mock_model.generate_content.call_args_list[1].args[0]
+    assert result['status'] == 'success'
+    assert "registra devoluciones de productos" in story_prompt
+    assert "Portada Portada" not in story_prompt
+
+@patch('app.backend.document_processor.Config')
+@patch('app.backend.document_processor.get_gemini_model')
+def test_process_large_document_packs_short_batches(mock_get_model, mock_config):
+    """Test que los lotes de funcionalidades cortas comparten una sola petición numerada en orden."""
+    mock_config.GOOGLE_API_KEY = "key"
+    mock_config.STORY_BATCH_SIZE = 1
+    mock_config.REQUEST_PACKING_MAX_SEGMENTS = 2
+    mock_config.STORY_PACK_MAX_TOKENS = 300
+    mock_config.STORY_PACK_MAX_STORIES = 10
+    mock_config.GEMINI_TIMEOUT_BASE = 1
+    mock_config.GEMINI_TIMEOUT_INCREMENT = 0
+    mock_config.MAX_RETRIES = 1
+    mock_config.RETRY_DELAY = 0
+    mock_config.MIN_RESPONSE_LENGTH = 5
+
+    mock_model = Mock()
+    mock_model.generate_content.side_effect = [
+        Mock(text="1. Alta de clientes\n2. Baja de clientes\n3. Consulta de saldo"),
+        Mock(text="HISTORIA #1: Alta de clientes\n\nHISTORIA #2: Baja de clientes"),
+        Mock(text="HISTORIA #3: Consulta de saldo del cliente"),
+    ]
+    mock_get_model.return_value = mock_model
+
+    result = document_processor.process_large_document("documento", "cajero", "funcionalidad", skip_healing=True)
+
+    story_prompts = [call.args[0] for call in mock_model.generate_content.call_args_list[1:]]
+    assert result['status'] == 'success'
+    assert len(story_prompts) == 2
+    assert "Lote 1 a 2" in story_prompts[0] and "Baja de clientes" in story_prompts[0]
+    assert "Lote 3 a 3" in story_prompts[1]
+    assert "Total de lotes generados: 2" in result['story']
+
+@patch('app.backend.document_processor.Config')
+@patch('app.backend.document_processor.get_gemini_model')
+def test_process_large_document_caps_stories_per_packed_request(mock_get_model, mock_config):
+    """Test que un paquete no pide más historias que STORY_PACK_MAX_STORIES aunque la entrada sea corta."""
+    mock_config.GOOGLE_API_KEY = "key"
+    mock_config.STORY_BATCH_SIZE = 2
+    mock_config.REQUEST_PACKING_MAX_SEGMENTS = 4
+    mock_config.STORY_PACK_MAX_TOKENS = 10000
+    mock_config.STORY_PACK_MAX_STORIES = 4
+    mock_config.GEMINI_TIMEOUT_BASE = 1
+    mock_config.GEMINI_TIMEOUT_INCREMENT = 0
+    mock_config.MAX_RETRIES = 1
+    mock_config.RETRY_DELAY = 0
+    mock_config.MIN_RESPONSE_LENGTH = 5
+
+    mock_model = Mock()
+    mock_model.generate_content.side_effect = [Mock(text="\n".join(f"{n}. Funcionalidad {n}" for n in range(1, 11)))] + [
+        Mock(text="HISTORIA #1: Historia generada para el paquete") for _ in range(3)
+    ]
+    mock_get_model.return_value = mock_model
+
+    result = document_processor.process_large_document("documento", "cajero", "funcionalidad", skip_healing=True)
+
+    story_prompts = [call.args[0] for call in mock_model.generate_content.call_args_list[1:]]
+    assert result['status'] == 'success'
+    assert [p.split("(Lote ")[1].split(")")[0] for p in story_prompts] == ["1 a 4", "5 a 8", "9 a 10"]
+
+@patch('app.backend.document_processor.Config')
+def test_heal_stories_in_sub_batches_isolates_failures(mock_config):
+    """Test que la sanación se hace por sub-lotes y un sub-lote fallido no descarta los demás."""
+    mock_config.HEALING_BATCH_SIZE = 1
+    stories = [f"HISTORIA #{n}: Historia original número {n} sin formato" for n in (1, 2, 3)]
+
+    def generate(prompt, **kwargs):
+        if "Historia 2:" in prompt:
+            raise RuntimeError("respuesta bloqueada")
+        number = 1 if "Historia 1:" in prompt else 3
+        return Mock(text=f"HISTORIA #{number}: Historia sanada número {number} con criterios")
+
+    mock_model = Mock()
+    mock_model.generate_content.side_effect = generate
+
+    result = document_processor._heal_stories_in_batch("\n\n".join(stories), [], 0, "documento", mock_model)
+
+    assert mock_model.generate_content.call_count == 3
+    assert result.split("\n\n") == [
+        "HISTORIA #1: Historia sanada número 1 con criterios",
+        stories[1],
+        "HISTORIA #3: Historia sanada número 3 con criterios",
+    ]
@@ -0,0 +1,91 @@
+"""
+Tests unitarios para la recuperación de JSON de respuestas del modelo (matrix/parser.py)
+
+El corpus reúne formas reales en que Gemini devuelve la matriz mal formada.
+"""
+import json
+import time
+import unittest
+
+from app.backend.matrix.parser import clean_json_response, recover_json
+
+
+CASE_1 = {"id_caso_prueba": "TC001", "titulo_caso_prueba": "Validar login con credenciales válidas",
+          "Pasos": ["Ingresar usuario", "Hacer clic en \"Entrar\""], "Resultado_esperado": ["Se muestra el panel"]}
+CASE_2 = {"id_caso_prueba": "TC002", "titulo_caso_prueba": "Validar mensaje con clave [inválida]",
+          "Pasos": ["Ingresar clave errónea"], "Resultado_esperado": ["Se muestra {error}"]}
+
+# (nombre, respuesta del modelo, casos esperados)
+CORPUS = [
+    ("json_limpio", json.dumps([CASE_1, CASE_2], ensure_ascii=False), [CASE_1, CASE_2]),
+    ("bloque_markdown",
+     "Aquí están los casos de prueba:\n```json\n" + json.dumps([CASE_1, CASE_2], indent=2, ensure_ascii=False) + "\n```\nEspero que sirvan.",
+     [CASE_1, CASE_2]),
+    ("bloque_markdown_sin_lenguaje", "```\n" + json.dumps([CASE_1]) + "\n```", [CASE_1]),
+    ("comas_finales",
+     '[{"id_caso_prueba": "TC001", "Pasos": ["a", "b",],}, {"id_caso_prueba": "TC002", "Pasos": [],},]',
+     [{"id_caso_prueba": "TC001", "Pasos": ["a", "b"]}, {"id_caso_prueba": "TC002", "Pasos": []}]),
+    ("truncado_a_mitad_de_objeto",
+     "```json\n[" + json.dumps(CASE_1, ensure_ascii=False) + ', {"id_caso_prueba": "TC002", "titulo_caso_prueba": "Valid',
+     [CASE_1]),
+    ("truncado_tras_coma", "[" + json.dumps(CASE_1) + ", " + json.dumps(CASE_2) + ",\n  ", [CASE_1, CASE_2]),
+    ("truncado_en_escape", '[{"a": 1}, {"b": "texto \\', [{"a": 1}]),
+    ("objeto_envoltorio_matrix", json.dumps({"matrix": [CASE_1]}), [CASE_1]),
+    ("objeto_envoltorio_truncado", '{"test_cases": [' + json.dumps(CASE_1) + ', {"id_caso', [CASE_1]),
+    ("objeto_envoltorio_otra_clave", json.dumps({"casos": [CASE_2], "total": 1}), [CASE_2]),
+    ("sin_comas_entre_objetos", '[{"a": 1}\n{"a": 2}]', [{"a": 1}, {"a": 2}]),
+    ("saltos_de_linea_sin_escapar", '[{"Descripcion": "línea 1\nlínea 2"}]', [{"Descripcion": "línea 1\nlínea 2"}]),
+    ("corchetes_en_prosa_antes_del_array", "Ver [nota]: los casos son\n[" + json.dumps(CASE_2) + "]", [CASE_2]),
+    ("literales_python", '[{"activo": True, "valor": None}]', [{"activo": True, "valor": None}]),
+    ("basura_tras_elemento", '[{"a": 1}, {"a": 2} <fin del modelo>', [{"a": 1}, {"a": 2}]),
+    ("unicode_escapado", '[{"t": "Validaci\\u00f3n"}]', [{"t": "Validación"}]),
+]
+
+
+class TestCleanJsonResponseCorpus(unittest.TestCase):
+    """Tests de clean_json_response sobre el corpus de respuestas mal formadas"""
+
+    def test_corpus(self):
+        """Test que cada respuesta del corpus recupera todos los casos completos"""
+        for name, response, expected in CORPUS:
+            with self.subTest(name):
+                self.assertEqual(clean_json_response(response), expected)
+
+    def test_responses_without_json(self):
+        """Test que respuestas sin JSON aprovechable devuelven None"""
+        for response in (None, "", "Lo siento, no puedo generar casos.", '{"mensaje": "sin casos"}'):
+            with self.subTest(response):
+                self.assertIsNone(clean_json_response(response))
+
+    def test_recover_json_keeps_top_level_object(self):
+        """Test que recover_json cierra un objeto truncado conservando las claves completas"""
+        self.assertEqual(recover_json('{"a": [1, 2], "b": {"c": "x"}, "d": "sin cerr'),
+                         {"a": [1, 2], "b": {"c": "x"}})
+
+
+class TestRecoveryIsLinear(unittest.TestCase):
+    """Tests de rendimiento de la recuperación sobre salidas grandes mal formadas"""
+
+    def test_large_truncated_output(self):
+        """Test que una salida grande truncada se recupera rápido y completa"""
+        cases = [dict(CASE_1, id_caso_prueba=f"TC{n:04d}") for n in range(3000)]
+        response = "```json\n" + json.dumps(cases, ensure_ascii=False)[:-200]
+
+        start = time.time()
+        recovered = clean_json_response(response)
+
+        self.assertLess(time.time() - start, 2.0)
+        self.assertEqual(recovered, cases[:len(recovered)])
+        self.assertEqual(len(recovered), 2999)
+
+    def test_pathological_unclosed_brackets(self):
+        """Test que corchetes sin cerrar no provocan retroceso cuadrático"""
+        response = "Texto [" * 50000
+
+        start = time.time()
+        self.assertIsNone(clean_json_response(response))
+        self.assertLess(time.time() - start, 2.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -180,9 +180,9 @@ def test_create_word_document(sample_stories_list):
 # TESTS DE GENERACIÓN (con mocks)
 # ============================================================================
 
-@patch('app.backend.story_generator.genai')
+@patch('app.backend.story_generator.get_gemini_model')
 @patch('app.backend.story_generator.Config')
-def test_generate_story_from_chunk(mock_config, mock_genai, mock_gemini_model):
+def test_generate_story_from_chunk(mock_config, mock_get_model, mock_gemini_model):
     """Test de generación de historia desde un chunk."""
     # Configurar mocks
     mock_config.GOOGLE_API_KEY = "test_key"
@@ -193,7 +193,7 @@ def test_generate_story_from_chunk(mock_config, mock_genai, mock_gemini_model):
     mock_config.GEMINI_TIMEOUT_INCREMENT = 10
     mock_config.MIN_RESPONSE_LENGTH = 50
     
-    mock_genai.GenerativeModel.return_value = mock_gemini_model
+    mock_get_model.return_value = mock_gemini_model
     
     # Ejecutar
     result = story_generator.generate_story_from_chunk(
@@ -208,9 +208,9 @@ def test_generate_story_from_chunk(mock_config, mock_genai, mock_gemini_model):
     assert 'story' in result
 
 
-@patch('app.backend.document_processor.genai')
+@patch('app.backend.document_processor.get_gemini_model')
 @patch('app.backend.document_processor.Config')
-def test_split_document_into_chunks(mock_config, mock_genai):
+def test_split_document_into_chunks(mock_config, mock_get_model):
     """Test de división de documento en chunks."""
     from app.backend.document_processor import split_document_into_chunks
     
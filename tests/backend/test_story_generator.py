@@ -6,8 +6,8 @@ from unittest.mock import Mock, patch
 from app.backend import story_generator
 
 @pytest.fixture
-def mock_genai():
-    with patch('app.backend.story_generator.genai') as mock:
+def mock_get_model():
+    with patch('app.backend.story_generator.get_gemini_model') as mock:
         yield mock
 
 @pytest.fixture
@@ -22,14 +22,14 @@ def mock_config():
         mock.MIN_RESPONSE_LENGTH = 10
         yield mock
 
-def test_generate_story_from_chunk_success(mock_genai, mock_config):
+def test_generate_story_from_chunk_success(mock_get_model, mock_config):
     """Test de generación exitosa desde un chunk."""
     # Setup mock model
     mock_model = Mock()
     mock_response = Mock()
     mock_response.text = "Historia generada exitosa..."
     mock_model.generate_content.return_value = mock_response
-    mock_genai.GenerativeModel.return_value = mock_model
+    mock_get_model.return_value = mock_model
     
     # Execute
     result = story_generator.generate_story_from_chunk(
@@ -44,7 +44,7 @@ def test_generate_story_from_chunk_success(mock_genai, mock_config):
     assert result['story'] == "Historia generada exitosa..."
     mock_model.generate_content.assert_called()
 
-def test_generate_story_from_chunk_api_key_missing(mock_genai, mock_config):
+def test_generate_story_from_chunk_api_key_missing(mock_get_model, mock_config):
     """Test de manejo de error cuando falta la API Key."""
     mock_config.GOOGLE_API_KEY = None
     
@@ -53,13 +53,13 @@ def test_generate_story_from_chunk_api_key_missing(mock_genai, mock_config):
     assert result['status'] == 'error'
     assert "API Key no configurada" in result['message']
 
-def test_generate_story_from_chunk_short_response(mock_genai, mock_config):
+def test_generate_story_from_chunk_short_response(mock_get_model, mock_config):
     """Test de manejo de respuestas demasiado cortas."""
     mock_model = Mock()
     mock_response = Mock()
     mock_response.text = "Corta" # < Config.MIN_RESPONSE_LENGTH
     mock_model.generate_content.return_value = mock_response
-    mock_genai.GenerativeModel.return_value = mock_model
+    mock_get_model.return_value = mock_model
     
     result = story_generator.generate_story_from_chunk("t", "r", "s", skip_healing=True)
     
@@ -67,7 +67,7 @@ def test_generate_story_from_chunk_short_response(mock_genai, mock_config):
     assert result['status'] == 'error'
     assert "Error en la generación" in result['message']
 
-def test_generate_story_from_text_end_to_end(mock_genai, mock_config):
+def test_generate_story_from_text_end_to_end(mock_get_model, mock_config):
     """Test de integración simulada de generate_story_from_text (Dos Pasadas)"""
     # Mocks adicionales necesarios para las dependencias internas
     with patch('app.backend.story_generator.split_document_into_chunks') as mock_split, \
@@ -91,7 +91,7 @@ def test_generate_story_from_text_end_to_end(mock_genai, mock_config):
         mock_response = Mock()
         mock_response.text = "Historia generada valida 1"
         mock_model.generate_content.return_value = mock_response
-        mock_genai.GenerativeModel.return_value = mock_model
+        mock_get_model.return_value = mock_model
         
         # Mock TextProcessor y Validator
         mock_tp = mock_tp_cls.return_value
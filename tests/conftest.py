@@ -7,6 +7,16 @@ import os
 # Agregar el directorio raíz al path
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+# Desactivar el gobernador de cuota de Gemini: los tests usan modelos simulados
+os.environ.setdefault('GEMINI_QUOTA_RPM', '0')
+os.environ.setdefault('GEMINI_QUOTA_TPM', '0')
+# Desactivar la caché de respuestas del modelo para que cada test llame a su modelo simulado
+os.environ.setdefault('LLM_CACHE_ENABLED', 'false')
+# Desactivar la memoización por huella de documento: cada test ejecuta su propio pipeline
+os.environ.setdefault('GENERATION_MEMO_ENABLED', 'false')
+# Desactivar la telemetría de llamadas al modelo para no escribir registros desde los tests
+os.environ.setdefault('LLM_TELEMETRY_ENABLED', 'false')
+
 # Configuración de pytest
 def pytest_configure(config):
     """Configuración inicial de pytest"""
@@ -0,0 +1,199 @@
+"""
+Tests unitarios para los jobs de generación persistidos
+"""
+import json
+import time
+import unittest
+from unittest.mock import MagicMock, patch
+
+from app.services.generation_jobs import GenerationJobService
+
+
+class _JobRepository:
+    """Repositorio de jobs en memoria con la interfaz de GenerationJobRepository"""
+
+    def __init__(self):
+        self.jobs = {}
+        self.events = {}
+        self.checkpoints = {}
+
+    def create(self, job_id, user_id, task_type, parameters, document_text, output_filename, filepath):
+        self.jobs[job_id] = {'id': job_id, 'user_id': user_id, 'task_type': task_type, 'status': 'running',
+                             'parameters': parameters, 'document_text': document_text,
+                             'output_filename': output_filename, 'filepath': filepath, 'attempts': 1,
+                             'updated_at': time.time()}
+
+    def get(self, job_id):
+        return dict(self.jobs[job_id]) if job_id in self.jobs else None
+
+    def set_status(self, job_id, status):
+        self.jobs[job_id]['status'] = status
+
+    def claim(self, job_id, stale_before):
+        job = self.jobs[job_id]
+        if job['status'] != 'running' or job['updated_at'] >= stale_before:
+            return False
+        job['attempts'] += 1
+        job['updated_at'] = time.time()
+        return True
+
+    def list_stale(self, stale_before):
+        return [j['id'] for j in self.jobs.values() if j['status'] == 'running' and j['updated_at'] < stale_before]
+
+    def append_event(self, job_id, seq, payload):
+        events = self.events.setdefault(job_id, {})
+        if seq in events:
+            return False
+        events[seq] = payload
+        self.jobs[job_id]['updated_at'] = time.time()
+        return True
+
+    def touch(self, job_id):
+        self.jobs[job_id]['updated_at'] = time.time()
+
+    def get_events(self, job_id, after_seq=0, limit=500):
+        return sorted((seq, p) for seq, p in self.events.get(job_id, {}).items() if seq > after_seq)[:limit]
+
+    def last_seq(self, job_id):
+        return max(self.events.get(job_id, {0: None}))
+
+    def load_checkpoint(self, job_id, key):
+        return self.checkpoints.get((job_id, key))
+
+    def save_checkpoint(self, job_id, key, result):
+        self.checkpoints[(job_id, key)] = result
+
+    def purge_older_than(self, cutoff):
+        return 0
+
+
+def _sse(message, progress, status):
+    payload = {"message": message, "progress": progress, "status": status, "terminal": status in ("completed", "error")}
+    return f"data: {json.dumps(payload)}\n\n"
+
+
+class TestGenerationJobService(unittest.TestCase):
+    """Tests para GenerationJobService"""
+
+    def setUp(self):
+        """Configuración inicial para cada test"""
+        self.repository = _JobRepository()
+        self.orchestrator = MagicMock()
+        self.orchestrator.stream_generation_pipeline.side_effect = lambda *args, **kwargs: iter([
+            _sse("Inicio", 2, "Inicio"), _sse("Fragmento 1 de 2 listo", 40, "Generación"), _sse("Listo", 100, "completed")
+        ])
+        self.service = GenerationJobService(self.orchestrator, MagicMock(), repository=self.repository,
+                                            poll_interval=0, stale_seconds=60, max_attempts=3)
+        # Ejecutar los jobs en el mismo hilo para que el test sea determinista
+        patcher = patch.object(GenerationJobService, '_start', lambda service, job_id: service._run(job_id))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_job_events_are_persisted_and_streamed_with_ids(self):
+        """Test que los eventos del pipeline se guardan y se transmiten con su número de secuencia"""
+        job_id = self.service.submit('matrix', 'documento', {'contexto': 'web'}, 'matriz', None, 'user-1')
+
+        events = list(self.service.stream_events(job_id))
+
+        self.assertEqual([e.split('\n')[0] for e in events], ['id: 1', 'id: 2', 'id: 3'])
+        self.assertEqual(self.repository.jobs[job_id]['status'], 'completed')
+        kwargs = self.orchestrator.stream_generation_pipeline.call_args.kwargs
+        self.assertEqual(kwargs['user_id'], 'user-1')
+        self.assertIsNotNone(kwargs['checkpoints'])
+
+    def test_heartbeats_refresh_activity_without_storing_events(self):
+        """Test que los latidos del pipeline mantienen vivo el job sin guardarse como eventos"""
+        heartbeat = json.dumps({"message": "Procesando (sin novedades hace 2s)", "heartbeat": True, "terminal": False})
+        self.orchestrator.stream_generation_pipeline.side_effect = lambda *args, **kwargs: iter(
+            [_sse("Inicio", 2, "Inicio")] + [f"data: {heartbeat}\n\n"] * 50 + [_sse("Listo", 100, "completed")]
+        )
+        touched = []
+        self.repository.touch = lambda job_id: touched.append(job_id)
+
+        job_id = self.service.submit('matrix', 'documento', {}, 'matriz', None, 'user-1')
+        events = list(self.service.stream_events(job_id))
+
+        self.assertEqual(len(events), 2)
+        self.assertEqual(len(self.repository.events[job_id]), 2)
+        self.assertEqual(touched, [job_id] * 50)
+
+    def test_reconnect_receives_only_missing_events(self):
+        """Test que al reconectar con Last-Event-ID solo se reciben los eventos posteriores"""
+        job_id = self.service.submit('story', 'documento', {}, 'historias', None, 'user-1')
+
+        events = list(self.service.stream_events(job_id, last_event_id=2))
+
+        self.assertEqual(len(events), 1)
+        self.assertIn('"completed"', events[0])
+
+    def test_stale_job_resumes_with_its_checkpoints(self):
+        """Test que un job abandonado se reanuda continuando la secuencia y con sus puntos de control"""
+        self.repository.create('job-1', 'user-1', 'matrix', '{}', 'documento', 'matriz', None)
+        self.repository.append_event('job-1', 1, json.dumps({"message": "Inicio", "terminal": False}))
+        self.repository.save_checkpoint('job-1', 'fragmento:0:abc', json.dumps([{'id_caso_prueba': 'TC001'}]))
+        self.repository.jobs['job-1']['updated_at'] = time.time() - 120
+        seen = {}
+
+        def pipeline(*args, checkpoints=None, **kwargs):
+            seen['checkpoint'] = checkpoints.load('fragmento:0:abc')
+            return iter([_sse("Listo", 100, "completed")])
+
+        self.orchestrator.stream_generation_pipeline.side_effect = pipeline
+
+        events = list(self.service.stream_events('job-1', last_event_id=1))
+
+        self.assertEqual(seen['checkpoint'], [{'id_caso_prueba': 'TC001'}])
+        self.assertEqual([e.split('\n')[0] for e in events], ['id: 2', 'id: 3'])
+        self.assertIn('Reanudación', events[0])
+        self.assertEqual(self.repository.jobs['job-1']['status'], 'completed')
+
+    def test_job_fails_after_max_attempts(self):
+        """Test que un job interrumpido demasiadas veces termina con un evento de error"""
+        self.repository.create('job-1', 'user-1', 'matrix', '{}', 'documento', 'matriz', None)
+        self.repository.jobs['job-1'].update(attempts=3, updated_at=time.time() - 120)
+
+        events = list(self.service.stream_events('job-1'))
+
+        self.assertEqual(len(events), 1)
+        self.assertIn('"error"', events[0])
+        self.assertEqual(self.repository.jobs['job-1']['status'], 'error')
+        self.orchestrator.stream_generation_pipeline.assert_not_called()
+
+    def test_taken_over_job_stops_without_error(self):
+        """Test que si otro worker ya ocupó el número de secuencia, este intento se detiene sin marcar error"""
+        self.repository.create('job-1', 'user-1', 'matrix', '{}', 'documento', 'matriz', None)
+
+        def pipeline(*args, **kwargs):
+            # Otro worker retoma el job y registra su evento antes que este
+            self.repository.events.setdefault('job-1', {})[1] = json.dumps({"message": "otro worker"})
+            yield _sse("Inicio", 2, "Inicio")
+            yield _sse("Listo", 100, "completed")
+
+        self.orchestrator.stream_generation_pipeline.side_effect = pipeline
+
+        self.service._run('job-1')
+
+        self.assertEqual(self.repository.jobs['job-1']['status'], 'running')
+        self.assertEqual(list(self.repository.events['job-1']), [1])
+
+    def test_event_store_failure_finishes_job_with_error(self):
+        """Test que un error al guardar un evento (distinto de secuencia ocupada) termina el job con error"""
+        self.repository.create('job-1', 'user-1', 'matrix', '{}', 'documento', 'matriz', None)
+        append_event = self.repository.append_event
+        failures = iter([True])
+
+        def flaky_append(job_id, seq, payload):
+            if next(failures, False):
+                raise RuntimeError("database is locked")
+            return append_event(job_id, seq, payload)
+
+        self.repository.append_event = flaky_append
+
+        self.service._run('job-1')
+
+        self.assertEqual(self.repository.jobs['job-1']['status'], 'error')
+        self.assertIn('database is locked', self.repository.events['job-1'][1])
+
+
+if __name__ == '__main__':
+    unittest.main()
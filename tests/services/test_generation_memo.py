@@ -0,0 +1,125 @@
+"""
+Tests unitarios para la memoización de resultados por huella de documento
+"""
+import json
+import unittest
+from unittest.mock import MagicMock, patch
+
+from app.core.config import Config
+from app.services.generation_memo import GenerationMemo, compute_generation_fingerprint
+
+
+class _FingerprintRepository:
+    """Repositorio de huellas en memoria"""
+
+    def __init__(self):
+        self.entries = {}
+
+    def get(self, fingerprint):
+        return self.entries.get(fingerprint)
+
+    def save(self, fingerprint, task_type, record_id):
+        self.entries[fingerprint] = {'task_type': task_type, 'record_id': record_id}
+
+    def delete(self, fingerprint):
+        self.entries.pop(fingerprint, None)
+
+
+class TestComputeGenerationFingerprint(unittest.TestCase):
+    """Tests para compute_generation_fingerprint"""
+
+    def test_whitespace_and_ignored_parameters_do_not_change_fingerprint(self):
+        """Test que los espacios del texto y el área no cambian la huella"""
+        base = compute_generation_fingerprint('matrix', 'Login  del\nusuario', {'tipos_prueba': ['a', 'b'], 'area': 'QA'})
+
+        self.assertEqual(base, compute_generation_fingerprint(
+            'matrix', ' Login del usuario ', {'tipos_prueba': ['b', 'a'], 'area': 'Ventas', 'on_partial': print}
+        ))
+
+    def test_content_parameters_and_task_change_fingerprint(self):
+        """Test que el texto, los parámetros y el tipo de tarea cambian la huella"""
+        base = compute_generation_fingerprint('matrix', 'Login', {'contexto': 'web'})
+
+        self.assertNotEqual(base, compute_generation_fingerprint('matrix', 'Logout', {'contexto': 'web'}))
+        self.assertNotEqual(base, compute_generation_fingerprint('matrix', 'Login', {'contexto': 'móvil'}))
+        self.assertNotEqual(base, compute_generation_fingerprint('story', 'Login', {'contexto': 'web'}))
+
+    def test_prompt_settings_change_fingerprint(self):
+        """Test que la estrategia de chunking, la recuperación y el empaquetado cambian la huella"""
+        base = compute_generation_fingerprint('matrix', 'Login', {})
+
+        for name, value in [('CHUNK_BY_TOKENS', False), ('MATRIX_MAX_CHUNK_TOKENS', 1), ('CHUNK_OVERLAP_TOKENS', 99),
+                            ('RETRIEVAL_TOP_K', 99), ('REQUEST_PACKING_MAX_SEGMENTS', 99)]:
+            with self.subTest(name), patch.object(Config, name, value):
+                self.assertNotEqual(base, compute_generation_fingerprint('matrix', 'Login', {}))
+
+    def test_each_user_has_its_own_fingerprint(self):
+        """Test que el mismo documento de dos usuarios produce huellas distintas"""
+        self.assertNotEqual(
+            compute_generation_fingerprint('matrix', 'Login', {}, user_id='u1'),
+            compute_generation_fingerprint('matrix', 'Login', {}, user_id='u2')
+        )
+
+
+class TestGenerationMemo(unittest.TestCase):
+    """Tests para GenerationMemo"""
+
+    def setUp(self):
+        """Configuración inicial para cada test"""
+        self.repository = _FingerprintRepository()
+        self.story_repository = MagicMock()
+        self.test_case_repository = MagicMock()
+        self.memo = GenerationMemo(self.repository, self.story_repository, self.test_case_repository, enabled=True)
+
+    def test_lookup_returns_saved_test_cases(self):
+        """Test que una huella registrada devuelve los casos originales del registro"""
+        cases = [{'id_caso_prueba': 'TC001'}, {'id_caso_prueba': 'TC002'}]
+        self.test_case_repository.get_by_id.return_value = MagicMock(
+            test_case_content=json.dumps([{'summary': c['id_caso_prueba'], 'raw_data': c} for c in cases])
+        )
+
+        self.memo.remember('huella', 'matrix', 7)
+
+        self.assertEqual(self.memo.lookup('huella', 'matrix'), cases)
+        self.test_case_repository.get_by_id.assert_called_once_with(7)
+        self.assertIsNone(self.memo.lookup('huella', 'story'))
+
+    def test_lookup_returns_saved_stories(self):
+        """Test que una huella de historias devuelve el texto de cada historia"""
+        self.story_repository.get_by_id.return_value = MagicMock(
+            story_content=json.dumps([{'title': 'A', 'raw_text': 'HISTORIA #1: A'}])
+        )
+        self.memo.remember('huella', 'story', 3)
+
+        self.assertEqual(self.memo.lookup('huella', 'story'), ['HISTORIA #1: A'])
+
+    def test_lookup_ignores_records_of_other_users(self):
+        """Test que no se reutiliza un registro de otro usuario"""
+        self.test_case_repository.get_by_id.return_value = MagicMock(
+            user_id='u1', test_case_content=json.dumps([{'raw_data': {'id_caso_prueba': 'TC001'}}])
+        )
+        self.memo.remember('huella', 'matrix', 7)
+
+        self.assertIsNone(self.memo.lookup('huella', 'matrix', user_id='u2'))
+        self.assertEqual(self.memo.lookup('huella', 'matrix', user_id='u1'), [{'id_caso_prueba': 'TC001'}])
+
+    def test_missing_record_forgets_fingerprint(self):
+        """Test que si el registro ya no existe la huella se elimina"""
+        self.test_case_repository.get_by_id.return_value = None
+        self.memo.remember('huella', 'matrix', 7)
+
+        self.assertIsNone(self.memo.lookup('huella', 'matrix'))
+        self.assertEqual(self.repository.entries, {})
+
+    def test_disabled_memo_does_nothing(self):
+        """Test que con la memoización desactivada no se registra ni consulta nada"""
+        memo = GenerationMemo(self.repository, self.story_repository, self.test_case_repository, enabled=False)
+
+        memo.remember('huella', 'matrix', 7)
+
+        self.assertEqual(self.repository.entries, {})
+        self.assertIsNone(memo.lookup('huella', 'matrix'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,9 +1,12 @@
 """
 Tests unitarios para el orquestador de generación
 """
+import json
+import threading
 import unittest
 from unittest.mock import patch, MagicMock
 from app.services.generation_orchestrator import GenerationOrchestrator
+from app.utils.job_checkpoints import current_checkpoints
 
 
 class TestGenerationOrchestrator(unittest.TestCase):
@@ -110,5 +113,126 @@ class TestGenerationOrchestrator(unittest.TestCase):
             self.assertIsNotNone(result)
 
 
+class TestStreamGenerationPipeline(unittest.TestCase):
+    """Tests para los resultados parciales del pipeline SSE"""
+
+    @patch('app.services.generation_orchestrator.TestCaseRepository')
+    @patch('app.services.generation_orchestrator.UserStoryRepository')
+    def test_partial_results_are_sent_before_completion(self, _stories_repo, _cases_repo):
+        """Test que cada caso entregado por el generador se envía como evento 'partial'"""
+        orchestrator = GenerationOrchestrator(MagicMock(), MagicMock(), MagicMock(), MagicMock())
+
+        def agent(task_type, document_text, parameters):
+            parameters['on_partial']('test_case', {'titulo_caso_prueba': 'Login válido'})
+            parameters['on_partial']('test_case', {'titulo_caso_prueba': 'Login inválido'})
+            return {'error': 'fin de la prueba'}
+
+        events = [json.loads(e[len('data: '):]) for e in orchestrator.stream_generation_pipeline(
+            'matrix', 'documento', {}, 'salida', '/tmp/x', agent
+        )]
+
+        partial = [e for e in events if e['status'] == 'partial']
+        self.assertEqual([e['data']['item']['titulo_caso_prueba'] for e in partial], ['Login válido', 'Login inválido'])
+        self.assertEqual([e['data']['index'] for e in partial], [1, 2])
+        self.assertFalse(any(e['terminal'] for e in partial))
+        self.assertEqual(events[-1]['status'], 'error')
+
+    @patch('app.services.generation_orchestrator.TestCaseRepository')
+    @patch('app.services.generation_orchestrator.UserStoryRepository')
+    def test_generator_progress_events_are_forwarded(self, _stories_repo, _cases_repo):
+        """Test que los eventos de progreso del generador llegan al stream con su porcentaje real"""
+        orchestrator = GenerationOrchestrator(MagicMock(), MagicMock(), MagicMock(), MagicMock())
+
+        def agent(task_type, document_text, parameters):
+            parameters['on_progress']('chunk_started', {'label': 'fragmento', 'index': 0, 'total': 2})
+            parameters['on_progress']('chunk_finished', {'label': 'fragmento', 'index': 0, 'total': 2, 'items': 4})
+            parameters['on_progress']('dedup_removed', {'removed': 1, 'remaining': 3})
+            return {'error': 'fin de la prueba'}
+
+        events = [json.loads(e[len('data: '):]) for e in orchestrator.stream_generation_pipeline(
+            'matrix', 'documento', {}, 'salida', '/tmp/x', agent
+        )]
+
+        progress = [e for e in events if e.get('data', {}).get('event')]
+        self.assertEqual([e['data']['event'] for e in progress], ['chunk_started', 'chunk_finished', 'dedup_removed'])
+        self.assertEqual(progress[1]['message'], "Fragmento 1/2 completado: 4 resultado(s)")
+        self.assertLess(progress[0]['progress'], progress[1]['progress'])
+        self.assertEqual(events[-1]['status'], 'error')
+
+    @patch('app.services.generation_orchestrator.TestCaseRepository')
+    @patch('app.services.generation_orchestrator.UserStoryRepository')
+    def test_memoized_document_skips_generation(self, _stories_repo, _cases_repo):
+        """Test que un documento ya procesado reutiliza el resultado sin llamar al agente"""
+        orchestrator = GenerationOrchestrator(MagicMock(), MagicMock(), MagicMock(), MagicMock())
+        orchestrator.generation_memo = MagicMock()
+        orchestrator.generation_memo.lookup.return_value = [{'id_caso_prueba': 'TC001'}]
+        orchestrator.process_matrix_generation = MagicMock(return_value=({'download_url': '/x.zip'}, None))
+        agent = MagicMock()
+
+        events = [json.loads(e[len('data: '):]) for e in orchestrator.stream_generation_pipeline(
+            'matrix', 'documento', {}, 'salida', '/tmp/x', agent, user_id='u1'
+        )]
+
+        agent.assert_not_called()
+        self.assertEqual(orchestrator.generation_memo.lookup.call_args.kwargs, {'user_id': 'u1'})
+        self.assertEqual(orchestrator.process_matrix_generation.call_args.args[0], [{'id_caso_prueba': 'TC001'}])
+        self.assertFalse(orchestrator.process_matrix_generation.call_args.kwargs['persist'])
+        self.assertEqual(events[-1]['status'], 'completed')
+        self.assertTrue(events[-1]['data']['memoized'])
+
+
+class TestProcessBothGeneration(unittest.TestCase):
+    """Tests para la generación combinada de historias y matriz"""
+
+    def test_story_and_matrix_pipelines_run_concurrently(self):
+        """Test que ambos pipelines corren a la vez y el ZIP se arma cuando terminan los dos"""
+        orchestrator = GenerationOrchestrator(MagicMock(), MagicMock(), MagicMock(), MagicMock())
+        orchestrator.process_story_generation = MagicMock(return_value=({'filename': 'x.docx', 'stories_count': 2}, None))
+        orchestrator.process_matrix_generation = MagicMock(return_value=({'test_cases': [{'id': 1}], 'test_cases_count': 1}, None))
+        orchestrator.file_generator.generate_json.return_value = '[]'
+        both_started = threading.Barrier(2, timeout=5)
+        calls = []
+
+        def agent(task_type, document_text, parameters):
+            both_started.wait()
+            calls.append((task_type, document_text))
+            return {'tool_used': task_type}
+
+        result, error = orchestrator.process_both_generation('documento', {}, 'salida', '/tmp/x', agent, MagicMock(),
+                                                             user_id='u1')
+
+        self.assertIsNone(error)
+        self.assertEqual(sorted(calls), [('matrix', 'documento'), ('story', 'documento')])
+        self.assertEqual((result['stories_count'], result['test_cases_count']), (2, 1))
+        self.assertEqual(orchestrator.process_story_generation.call_args.kwargs['user_id'], 'u1')
+        orchestrator.file_generator.create_zip_file.assert_called_once()
+
+    @patch('app.services.generation_orchestrator.TestCaseRepository')
+    @patch('app.services.generation_orchestrator.UserStoryRepository')
+    def test_both_task_streams_the_combined_generation(self, _stories_repo, _cases_repo):
+        """Test que 'both' en el pipeline SSE genera historias y matriz una sola vez cada una y entrega el ZIP"""
+        orchestrator = GenerationOrchestrator(MagicMock(), MagicMock(), MagicMock(), MagicMock())
+        orchestrator.process_story_generation = MagicMock(return_value=({'filename': 'x.docx', 'stories_count': 2}, None))
+        orchestrator.process_matrix_generation = MagicMock(return_value=({'test_cases': [{'id': 1}], 'test_cases_count': 1}, None))
+        orchestrator.file_generator.generate_json.return_value = '[]'
+        checkpoints = MagicMock()
+        calls = []
+
+        def agent(task_type, document_text, parameters):
+            calls.append((task_type, current_checkpoints()))
+            return {'tool_used': task_type}
+
+        events = [json.loads(e[len('data: '):]) for e in orchestrator.stream_generation_pipeline(
+            'both', 'documento', {}, 'salida', '/tmp/x', agent, MagicMock(), checkpoints=checkpoints, user_id='u1'
+        )]
+
+        self.assertEqual(sorted(task for task, _ in calls), ['matrix', 'story'])
+        self.assertTrue(all(scope is checkpoints for _, scope in calls))
+        self.assertEqual(events[-1]['status'], 'completed')
+        self.assertEqual(events[-1]['data']['filename'], 'salida_completo.zip')
+        self.assertEqual((events[-1]['data']['stories_count'], events[-1]['data']['test_cases_count']), (2, 1))
+        self.assertEqual(orchestrator.process_matrix_generation.call_args.kwargs['user_id'], 'u1')
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,54 @@
+"""
+Tests unitarios para la invalidación del caché de métricas tras cargas masivas
+"""
+import time
+import unittest
+
+from app.services.metrics_cache import MetricsCache
+
+
+class InMemoryInvalidationRepository:
+    """Repositorio de invalidaciones compartido en memoria (simula la BD entre workers)"""
+
+    def __init__(self):
+        self.rows = {}
+
+    def get(self, project_key):
+        return self.rows.get(project_key)
+
+    def touch(self, project_key, invalidated_at=None):
+        self.rows[project_key] = invalidated_at or time.time()
+
+
+class TestMetricsCacheUploadInvalidation(unittest.TestCase):
+    """Tests para MetricsCache.notify_issues_created"""
+
+    def setUp(self):
+        """Configuración inicial para cada test"""
+        self.repository = InMemoryInvalidationRepository()
+        self.worker_a = MetricsCache(ttl_hours=6, invalidation_repository=self.repository)
+        self.worker_b = MetricsCache(ttl_hours=6, invalidation_repository=self.repository)
+        for cache in (self.worker_a, self.worker_b):
+            cache.set('QA', 'general', [], {'total_issues': 10})
+            cache.set('OTRO', 'general', [], {'total_issues': 5})
+
+    def test_upload_invalidates_project_in_every_worker(self):
+        """Test que la carga en un worker invalida las métricas del proyecto en los demás"""
+        removed = self.worker_a.notify_issues_created('QA', 3)
+
+        self.assertEqual(removed, 1)
+        self.assertIsNone(self.worker_a.get('QA', 'general', []))
+        self.assertIsNone(self.worker_b.get('QA', 'general', []))
+        self.assertEqual(self.worker_b.get('OTRO', 'general', []), {'total_issues': 5})
+
+    def test_metrics_cached_after_upload_are_served(self):
+        """Test que las métricas recalculadas después de la carga sí se sirven desde caché"""
+        self.worker_a.notify_issues_created('QA', 3)
+        time.sleep(0.01)
+        self.worker_b.set('QA', 'general', [], {'total_issues': 13})
+
+        self.assertEqual(self.worker_b.get('QA', 'general', []), {'total_issues': 13})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+"""
+Tests unitarios para el seguimiento del progreso real del pipeline
+"""
+import unittest
+
+from app.services.pipeline_progress import GENERATION_END, GENERATION_START, PipelineProgress
+from app.utils.progress_events import CHUNK_FINISHED, CHUNK_STARTED, DEDUP_REMOVED, PHASE_STARTED
+
+
+class _Clock:
+    """Reloj manual para los tests"""
+
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestPipelineProgress(unittest.TestCase):
+    """Tests para PipelineProgress"""
+
+    def setUp(self):
+        """Configuración inicial para cada test"""
+        self.clock = _Clock()
+        self.tracker = PipelineProgress(clock=self.clock)
+
+    def test_progress_follows_finished_chunks_with_eta(self):
+        """Test que el porcentaje y la ETA se derivan de los fragmentos terminados"""
+        self.tracker.apply(PHASE_STARTED, {'phase': 'generation', 'total': 4})
+        for index in range(4):
+            self.tracker.apply(CHUNK_STARTED, {'label': 'fragmento', 'index': index, 'total': 4})
+
+        self.clock.now += 10
+        message, _, data = self.tracker.apply(CHUNK_FINISHED, {'label': 'fragmento', 'index': 0, 'total': 4, 'items': 3})
+
+        self.assertEqual(message, "Fragmento 1/4 completado: 3 resultado(s)")
+        self.assertEqual(self.tracker.progress, int(GENERATION_START + (GENERATION_END - GENERATION_START) * 0.25))
+        self.assertEqual(data['eta_seconds'], 30.0)
+        self.assertEqual(data['event'], CHUNK_FINISHED)
+
+    def test_nested_batches_fill_their_chunk(self):
+        """Test que los lotes internos de un fragmento avanzan la parte proporcional"""
+        self.tracker.apply(CHUNK_STARTED, {'label': 'fragmento', 'index': 0, 'total': 2})
+        self.tracker.apply(CHUNK_STARTED, {'label': 'lote', 'index': 0, 'total': 2})
+        self.tracker.apply(CHUNK_FINISHED, {'label': 'lote', 'index': 0, 'total': 2})
+        quarter = self.tracker.progress
+        self.tracker.apply(CHUNK_FINISHED, {'label': 'lote', 'index': 1, 'total': 2})
+        self.tracker.apply(CHUNK_FINISHED, {'label': 'fragmento', 'index': 0, 'total': 2})
+
+        self.assertEqual(quarter, int(GENERATION_START + (GENERATION_END - GENERATION_START) * 0.25))
+        self.assertEqual(self.tracker.progress, int(GENERATION_START + (GENERATION_END - GENERATION_START) * 0.5))
+
+    def test_progress_never_goes_back_and_heartbeat_reports_idle_time(self):
+        """Test que el porcentaje no retrocede y el latido indica el tiempo sin novedades"""
+        self.tracker.apply(DEDUP_REMOVED, {'removed': 2, 'remaining': 8})
+        self.tracker.apply(PHASE_STARTED, {'phase': 'context'})
+        self.clock.now += 7
+
+        self.assertEqual(self.tracker.progress, GENERATION_END)
+        self.assertIn("sin novedades hace 7s", self.tracker.heartbeat())
+
+
+if __name__ == '__main__':
+    unittest.main()
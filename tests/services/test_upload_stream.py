@@ -0,0 +1,120 @@
+"""
+Tests unitarios para la ingesta en streaming de cargas masivas
+"""
+import io
+import os
+import unittest
+from unittest.mock import MagicMock, patch
+
+from app.backend.jira.csv_issue_processor import CSVIssueProcessor
+from app.services.jira.utils.upload_stream import (
+    StopOnParseError, StreamingUploadSummary, iter_csv_rows, iter_ndjson_rows
+)
+
+
+class TestStreamParsers(unittest.TestCase):
+    """Tests para iter_ndjson_rows e iter_csv_rows"""
+
+    def test_ndjson_rows_are_parsed_lazily(self):
+        """Test que cada línea produce una fila y se ignoran líneas vacías"""
+        body = io.BytesIO('{"Summary": "Login", "Prioridad": null}\n\n{"Summary": "Café"}\n'.encode('utf-8'))
+
+        rows = list(iter_ndjson_rows(body))
+
+        self.assertEqual(rows, [{'Summary': 'Login', 'Prioridad': ''}, {'Summary': 'Café'}])
+
+    def test_ndjson_invalid_line_reports_line_number(self):
+        """Test que una línea inválida indica su número"""
+        rows = iter_ndjson_rows(io.BytesIO(b'{"Summary": "ok"}\n{roto\n'))
+
+        next(rows)
+        with self.assertRaisesRegex(ValueError, 'Línea 2'):
+            next(rows)
+
+    def test_csv_rows_with_bom(self):
+        """Test que el CSV con BOM se lee con su cabecera"""
+        body = io.BytesIO('﻿Summary,Issuetype\nLogin,Test Case\n'.encode('utf-8'))
+
+        rows = list(iter_csv_rows(body))
+
+        self.assertEqual(rows, [{'Summary': 'Login', 'Issuetype': 'Test Case'}])
+
+
+class TestStreamingUploadSummary(unittest.TestCase):
+    """Tests para StreamingUploadSummary"""
+
+    def test_summary_matches_txt_format(self):
+        """Test que el resumen combina creados, errores y query con rango numérico de claves"""
+        summary = StreamingUploadSummary()
+        summary.add('created', {'summary': 'A', 'key': 'QA-9', 'issue_type': 'Bug'})
+        summary.add('created', {'summary': 'B', 'key': 'QA-10', 'issue_type': 'Bug'})
+        summary.add('failed', {'row': 3, 'summary': 'C', 'error': 'boom'})
+
+        path = summary.write_summary('carga.csv', {'success_count': 2, 'error_count': 1, 'total': 3}, 'QA')
+        self.addCleanup(os.remove, path)
+        summary.close()
+        with open(path, encoding='utf-8') as f:
+            content = f.read()
+
+        self.assertIn('1. [OK] A --> QA-9\n2. [OK] B --> QA-10\n', content)
+        self.assertIn('[ERROR] Fila 3: C --> Error: boom', content)
+        self.assertTrue(content.endswith('PROJECT = QA and key <= "QA-10" and key >= "QA-9"'))
+        self.assertEqual(summary.issue_types_distribution, {'Bug': 2})
+
+
+class TestIterableUpload(unittest.TestCase):
+    """Tests para create_issues_from_csv con filas en streaming"""
+
+    @patch.object(CSVIssueProcessor, '_notify_upload_completed')
+    def test_generator_input_with_result_sink(self, _notify):
+        """Test que un generador se procesa por lotes y los resultados van al sink"""
+        project_service = MagicMock()
+        project_service.get_issue_types.return_value = [{'name': 'Test Case'}]
+        fetcher = MagicMock()
+        fetcher.get_available_fields_metadata.return_value = None
+        creator = MagicMock()
+        creator.create_issue.return_value = {'success': True, 'key': 'QA-1'}
+        processor = CSVIssueProcessor(MagicMock(), project_service, fetcher, creator)
+        sink = MagicMock()
+        rows = ({'Summary': f'Caso {n}', 'Issuetype': 'Test Case'} for n in range(5))
+
+        result = processor.create_issues_from_csv(rows, 'QA', filter_issue_types=False, result_sink=sink)
+
+        self.assertEqual(result['total'], 5)
+        self.assertEqual(result['success_count'], 5)
+        self.assertEqual(result['created'], [])
+        self.assertEqual(sink.add.call_count, 5)
+
+    @patch.object(CSVIssueProcessor, '_notify_upload_completed')
+    def test_malformed_line_stops_upload_and_keeps_created_issues(self, notify):
+        """Test que una línea malformada detiene la carga sin perder el resumen de lo creado"""
+        project_service = MagicMock()
+        project_service.get_issue_types.return_value = [{'name': 'Test Case'}]
+        fetcher = MagicMock()
+        fetcher.get_available_fields_metadata.return_value = None
+        creator = MagicMock()
+        creator.create_issue.side_effect = [{'success': True, 'key': f'QA-{n}'} for n in (1, 2)]
+        processor = CSVIssueProcessor(MagicMock(), project_service, fetcher, creator)
+        body = io.BytesIO(b'{"Summary": "A", "Issuetype": "Test Case"}\n'
+                          b'{"Summary": "B", "Issuetype": "Test Case"}\n{roto\n'
+                          b'{"Summary": "C", "Issuetype": "Test Case"}\n')
+        rows = StopOnParseError(iter_ndjson_rows(body))
+        summary = StreamingUploadSummary()
+        self.addCleanup(summary.close)
+
+        result = processor.create_issues_from_csv(rows, 'QA', filter_issue_types=False, result_sink=summary)
+        result['parse_error'] = rows.error
+        path = summary.write_summary('carga.ndjson', result, 'QA')
+        self.addCleanup(os.remove, path)
+        with open(path, encoding='utf-8') as f:
+            content = f.read()
+
+        self.assertEqual(result['success_count'], 2)
+        self.assertEqual(creator.create_issue.call_count, 2)
+        self.assertIn('Línea 3', rows.error)
+        self.assertIn('[ERROR] Carga detenida: Línea 3', content)
+        notify.assert_called_once_with('QA', 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
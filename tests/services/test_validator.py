@@ -1,6 +1,9 @@
 """
 Tests unitarios para el servicio de validación
 """
+import os
+import random
+import time
 import unittest
 from app.services.validator import Validator
 
@@ -121,5 +124,139 @@ class TestValidator(unittest.TestCase):
         self.assertFalse(result)
 
 
+
+def _pairwise_duplicates(items, threshold):
+    """Referencia: comparación de todos los pares (implementación anterior)"""
+    from difflib import SequenceMatcher
+    duplicates = []
+    for i in range(len(items)):
+        if i in duplicates:
+            continue
+        for j in range(i + 1, len(items)):
+            if j not in duplicates and SequenceMatcher(None, items[i].lower(), items[j].lower()).ratio() > threshold:
+                duplicates.append(j)
+    return duplicates
+
+
+class TestFindDuplicates(unittest.TestCase):
+    """Tests para Validator.find_duplicates (MinHash/LSH)"""
+
+    def setUp(self):
+        """Configuración inicial para cada test"""
+        self.validator = Validator()
+        rng = random.Random(7)
+        vocab = [''.join(rng.choice('abcdefghijklmnopqrstuvwxyz') for _ in range(rng.randint(3, 10))) for _ in range(400)]
+
+        def phrase(n):
+            return ' '.join(rng.choice(vocab) for _ in range(n))
+
+        self.cases = [f"Validar {phrase(6)} {phrase(20)} {[phrase(6) for _ in range(4)]}" for _ in range(60)]
+        for _ in range(8):
+            words = rng.choice(self.cases).split(' ')
+            words[rng.randrange(len(words))] = rng.choice(vocab)
+            self.cases.append(' '.join(words))
+        rng.shuffle(self.cases)
+
+    def test_same_result_as_pairwise_comparison(self):
+        """Test que el resultado coincide con comparar todos los pares"""
+        for threshold in (0.85, 0.9):
+            with self.subTest(threshold=threshold):
+                self.assertEqual(self.validator.find_duplicates(self.cases, threshold=threshold),
+                                 _pairwise_duplicates(self.cases, threshold))
+
+    def test_first_occurrence_is_kept(self):
+        """Test que se marca como duplicado el ítem posterior, no el original"""
+        items = ["Validar inicio de sesión con credenciales válidas", "Exportar reporte mensual en PDF",
+                 "Validar inicio de sesión con credenciales validas", "", ""]
+
+        self.assertEqual(self.validator.find_duplicates(items), [2, 4])
+
+    def test_result_is_deterministic(self):
+        """Test que dos ejecuciones dan exactamente el mismo resultado"""
+        self.assertEqual(self.validator.find_duplicates(self.cases), self.validator.find_duplicates(list(self.cases)))
+
+
+def _legacy_semantic_validate_case(case, story_context=""):
+    """Referencia: validación semántica con búsquedas término a término (implementación anterior)"""
+    issues = []
+    pasos = case.get('Pasos', [])
+    resultados = case.get('Resultado_esperado', [])
+    titulo = case.get('titulo_caso_prueba', '')
+    steps_without_verb = sum(1 for p in pasos if not any(v in str(p).lower() for v in Validator.ACTION_VERBS))
+    steps_too_short = sum(1 for p in pasos if len(str(p).lower().split()) < 3)
+    if steps_without_verb > 0:
+        issues.append(f"Se detectaron {steps_without_verb} pasos sin verbos de acción claros.")
+    if steps_too_short > 0:
+        issues.append(f"Se detectaron {steps_too_short} pasos demasiado cortos (posible falta de objeto de la acción).")
+    full_text = f"{titulo} {' '.join(str(p) for p in pasos)} {' '.join(str(r) for r in resultados)}".lower()
+    red_flags_found = [flag for flag in Validator.RED_FLAGS if flag in full_text]
+    if red_flags_found:
+        issues.append(f"Se detectaron términos vagos o incompletos (Red Flags): {', '.join(red_flags_found)}")
+    vague_terms = ['correctamente', 'bien', 'exitoso', 'esperado', 'funciona', 'ok', 'normal']
+    vague_results = sum(1 for r in resultados
+                        if any(t in str(r).lower() for t in vague_terms) and len(str(r).lower().split()) < 4)
+    if vague_results > 0:
+        issues.append(f"Se detectaron {vague_results} resultados que carecen de criterios de éxito específicos.")
+    if not pasos or len(pasos) < 3:
+        issues.append("El caso de prueba tiene muy pocos pasos para ser exhaustivo.")
+    if story_context and titulo:
+        story_keywords = [w for w in story_context.lower().split() if len(w) > 5]
+        if story_keywords and not any(kw in titulo.lower() for kw in story_keywords[:15]):
+            issues.append("El título del caso de prueba no parece estar alineado con los conceptos clave de la historia.")
+    return {"is_valid": len(issues) == 0, "issues": issues, "score": max(0.0, 1.0 - (len(issues) * 0.20))}
+
+
+class TestSemanticValidationBenchmark(unittest.TestCase):
+    """Tests de equivalencia y rendimiento de la validación semántica sobre una matriz sintética"""
+
+    @classmethod
+    def setUpClass(cls):
+        """Matriz sintética de 1.000 casos con verbos, red flags y resultados vagos mezclados"""
+        rng = random.Random(11)
+        words = ['usuario', 'formulario', 'pantalla', 'botón', 'reporte', 'sesión', 'campo', 'mensaje', 'tabla']
+        verbs = Validator.ACTION_VERBS + ['hacer', 'ver', 'tener']
+        extras = Validator.RED_FLAGS + ['', '', '', '', '']
+        results = ['Funciona bien', 'El sistema muestra el reporte con totales', 'ok', 'Se guarda el registro esperado']
+        cls.story = ' '.join(rng.choice(words + ['autenticación', 'exportación', 'facturación']) for _ in range(400))
+        cls.cases = []
+        for n in range(1000):
+            steps = [f"{rng.choice(verbs)} {' '.join(rng.choice(words) for _ in range(rng.randint(0, 6)))} {rng.choice(extras)}"
+                     for _ in range(rng.randint(1, 8))]
+            cls.cases.append({
+                'titulo_caso_prueba': f"Caso {n} de {rng.choice(words + ['autenticación', 'facturación'])}",
+                'Pasos': steps,
+                'Resultado_esperado': [rng.choice(results) for _ in range(rng.randint(1, 3))],
+            })
+        cls.validator = Validator()
+
+    def test_same_result_as_term_by_term_validation(self):
+        """Test que la validación compilada da exactamente el mismo resultado que la anterior"""
+        for case in self.cases:
+            self.assertEqual(self.validator.semantic_validate_case(case, self.story),
+                             _legacy_semantic_validate_case(case, self.story))
+
+    @unittest.skipUnless(os.getenv('RUN_BENCHMARKS'), "Benchmark de tiempo real: ejecutar con RUN_BENCHMARKS=1")
+    def test_compiled_validation_is_faster(self):
+        """Test (benchmark) que validar 1.000 casos es más rápido que con búsquedas término a término"""
+        start = time.perf_counter()
+        for case in self.cases:
+            _legacy_semantic_validate_case(case, self.story)
+        legacy_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for case in self.cases:
+            self.validator.semantic_validate_case(case, self.story)
+        compiled_seconds = time.perf_counter() - start
+
+        self.assertLess(compiled_seconds, legacy_seconds)
+
+    def test_story_validation_checks_document_keywords(self):
+        """Test que la historia se contrasta con las primeras palabras clave del documento"""
+        story = "Como usuario quiero exportar la facturación para conciliar. Criterios de aceptación: " + "detalle " * 30
+
+        self.assertTrue(self.validator.semantic_validate_story(story, "Módulo de facturación mensual")["is_valid"])
+        self.assertFalse(self.validator.semantic_validate_story(story, "Módulo de inventarios")["is_valid"])
+
+
 if __name__ == '__main__':
     unittest.main()
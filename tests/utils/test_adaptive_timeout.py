@@ -0,0 +1,96 @@
+"""
+Tests unitarios para los timeouts adaptativos de llamadas al modelo
+"""
+import unittest
+from unittest.mock import MagicMock, patch
+
+from app.utils.adaptive_timeout import LatencyTracker, adaptive_timeout, prompt_bucket
+from app.utils.llm_call import governed_generate_content
+from app.utils.retry_utils import call_with_retry
+
+
+class TestLatencyTracker(unittest.TestCase):
+    """Tests para LatencyTracker"""
+
+    def setUp(self):
+        """Configuración inicial para cada test"""
+        self.tracker = LatencyTracker(window=100, min_samples=10, margin=2.0, floor=5, ceiling=120)
+
+    def test_prompt_size_buckets(self):
+        """Test que los prompts se agrupan por potencias de dos de su tamaño"""
+        self.assertEqual([prompt_bucket(n) for n in (0, 4095, 4096, 8191, 8192, 10 ** 9)], [0, 0, 1, 1, 2, 8])
+
+    @patch('app.utils.adaptive_timeout.Config')
+    def test_configured_schedule_until_enough_samples(self, config):
+        """Test que sin muestras suficientes se usa base + intento × incremento"""
+        config.GEMINI_TIMEOUT_BASE, config.GEMINI_TIMEOUT_INCREMENT = 180, 60
+        for _ in range(9):
+            self.tracker.observe(1000, 3.0)
+
+        self.assertEqual(self.tracker.timeout_for(1000), 180)
+        self.assertEqual(self.tracker.timeout_for(1000, attempt=2), 300)
+
+    def test_timeout_follows_observed_percentiles(self):
+        """Test que el primer intento usa el p95 y los reintentos el p99, con margen y límites"""
+        for seconds in range(1, 101):
+            self.tracker.observe(1000, seconds / 10)
+
+        self.assertEqual(self.tracker.timeout_for(1000), 19.0)
+        self.assertEqual(self.tracker.timeout_for(1000, attempt=1), 19.8)
+        self.assertEqual(self.tracker.timeout_for(1000, attempt=9), 120)
+        for _ in range(100):
+            self.tracker.observe(1000, 0.5)
+        self.assertEqual(self.tracker.timeout_for(1000), 5)
+
+    def test_small_bucket_uses_larger_prompts_as_bound(self):
+        """Test que una cubeta sin muestras usa la cubeta mayor más cercana"""
+        for _ in range(10):
+            self.tracker.observe(20000, 30.0)
+
+        self.assertEqual(self.tracker.timeout_for(500), 60.0)
+        self.assertEqual(self.tracker.timeout_for(20000), 60.0)
+        self.assertNotEqual(self.tracker.timeout_for(100000), 60.0)
+
+
+class TestAdaptiveTimeoutIntegration(unittest.TestCase):
+    """Tests de adaptive_timeout con reintentos y con governed_generate_content"""
+
+    def setUp(self):
+        """Configuración inicial para cada test"""
+        self.tracker = LatencyTracker(window=100, min_samples=1, margin=1.0, floor=1, ceiling=1000)
+        patcher = patch('app.utils.adaptive_timeout.get_latency_tracker', return_value=self.tracker)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_retry_receives_larger_timeout(self):
+        """Test que dentro de call_with_retry cada reintento recibe más tiempo"""
+        for seconds in (10.0, 10.0, 40.0):
+            self.tracker.observe(100, seconds)
+        timeouts = []
+
+        def call():
+            timeouts.append(adaptive_timeout('prompt'))
+            if len(timeouts) < 3:
+                raise TimeoutError("timed out")
+            return 'ok'
+
+        with patch('app.utils.retry_utils.time.sleep'):
+            self.assertEqual(call_with_retry(call, max_retries=3), 'ok')
+
+        self.assertEqual(timeouts, [40.0, 40.0, 80.0])
+
+    def test_model_calls_feed_the_tracker(self):
+        """Test que las llamadas exitosas y las cortadas por timeout registran su duración"""
+        model = MagicMock()
+        model.generate_content.side_effect = [MagicMock(text='ok', usage_metadata=None), Exception("Deadline exceeded")]
+
+        with patch('app.utils.llm_call.get_latency_tracker', return_value=self.tracker):
+            governed_generate_content(model, 'x' * 5000)
+            with self.assertRaises(Exception):
+                governed_generate_content(model, 'x' * 5000)
+
+        self.assertEqual(self.tracker.snapshot()[1]['samples'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
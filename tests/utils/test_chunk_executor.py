@@ -0,0 +1,117 @@
+"""
+Tests unitarios para el ejecutor de fragmentos con concurrencia acotada
+"""
+import threading
+import time
+import unittest
+
+from app.utils.chunk_executor import ChunkExecutor
+from app.utils.job_checkpoints import checkpoint_scope
+
+
+class TestChunkExecutor(unittest.TestCase):
+    """Tests para ChunkExecutor"""
+
+    def test_results_keep_input_order(self):
+        """Test que los resultados respetan el orden aunque terminen desordenados"""
+        def work(index, item):
+            time.sleep(0.02 * (3 - index))
+            return item.upper()
+
+        results = ChunkExecutor(max_workers=3, min_interval=0).map_ordered(work, ['a', 'b', 'c'])
+
+        self.assertEqual([r.value for r in results], ['A', 'B', 'C'])
+        self.assertEqual([r.index for r in results], [0, 1, 2])
+
+    def test_concurrency_is_bounded(self):
+        """Test que nunca hay más llamadas simultáneas que max_workers"""
+        lock = threading.Lock()
+        state = {'active': 0, 'peak': 0}
+
+        def work(index, item):
+            with lock:
+                state['active'] += 1
+                state['peak'] = max(state['peak'], state['active'])
+            time.sleep(0.02)
+            with lock:
+                state['active'] -= 1
+            return item
+
+        ChunkExecutor(max_workers=2, min_interval=0).map_ordered(work, range(6))
+
+        self.assertEqual(state['peak'], 2)
+
+    def test_min_interval_spaces_call_starts(self):
+        """Test que los inicios de llamada se separan por min_interval"""
+        starts = []
+
+        def work(index, item):
+            starts.append(time.monotonic())
+            return item
+
+        ChunkExecutor(max_workers=3, min_interval=0.05).map_ordered(work, range(3))
+
+        starts.sort()
+        self.assertGreaterEqual(starts[2] - starts[0], 0.09)
+
+    def test_errors_are_isolated_per_chunk(self):
+        """Test que un fragmento fallido no impide procesar el resto"""
+        def work(index, item):
+            if index == 1:
+                raise ValueError("fallo")
+            return item
+
+        results = ChunkExecutor(max_workers=2, min_interval=0).map_ordered(work, ['a', 'b', 'c'])
+
+        self.assertEqual([r.ok for r in results], [True, False, True])
+        self.assertIsInstance(results[1].error, ValueError)
+
+
+    def test_progress_events_report_each_item(self):
+        """Test que se informa el inicio y el fin de cada elemento con su número de resultados"""
+        events = []
+
+        def work(index, item):
+            if item == 'error':
+                raise ValueError("fallo")
+            return [item] * (index + 1)
+
+        ChunkExecutor(max_workers=1, min_interval=0).map_ordered(
+            work, ['a', 'error'], label="lote", on_progress=lambda event, data: events.append((event, data))
+        )
+
+        self.assertEqual([(e, d['index']) for e, d in events],
+                         [('chunk_started', 0), ('chunk_finished', 0), ('chunk_started', 1), ('chunk_finished', 1)])
+        self.assertEqual((events[1][1]['items'], events[1][1]['ok'], events[1][1]['total']), (1, True, 2))
+        self.assertEqual((events[3][1]['items'], events[3][1]['ok']), (0, False))
+
+
+    def test_resumable_items_reuse_checkpoints(self):
+        """Test que dentro de un job los elementos ya completados se reutilizan y los nuevos se guardan"""
+        class Store(dict):
+            def load(self, key):
+                return self.get(key)
+
+            def save(self, key, value):
+                self[key] = value
+
+        store = Store()
+        calls = []
+
+        def work(index, item):
+            calls.append(item)
+            return [item.upper()] if item != 'b' else []
+
+        with checkpoint_scope(store):
+            ChunkExecutor(max_workers=2, min_interval=0).map_ordered(work, ['a', 'b', 'c'], resumable=True)
+            calls.clear()
+            results = ChunkExecutor(max_workers=2, min_interval=0).map_ordered(work, ['a', 'b', 'c'], resumable=True)
+
+        self.assertEqual([r.value for r in results], [['A'], [], ['C']])
+        # Solo el elemento sin resultado (vacío) vuelve a ejecutarse
+        self.assertEqual(calls, ['b'])
+        self.assertEqual(len(store), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+"""
+Tests unitarios para la división de documentos en chunks
+"""
+import time
+import unittest
+
+from app.utils.document_chunker import ChunkingStrategy, DocumentChunker, estimate_text_tokens
+
+PROSE = ("El sistema debe permitir que el usuario administrador configure los parámetros de facturación. "
+         "La validación se hace contra el registro oficial del contribuyente.")
+TABLE_ROW = "| 001 | Servicio A | 12 | 3.500,00 | 42.000,00 |"
+
+
+class TestEstimateTextTokens(unittest.TestCase):
+    """Tests para estimate_text_tokens"""
+
+    def test_tables_cost_more_tokens_per_character_than_prose(self):
+        """Test que las tablas se miden con más tokens por carácter que la prosa"""
+        prose_ratio = len(PROSE) / estimate_text_tokens(PROSE)
+        table_ratio = len(TABLE_ROW) / estimate_text_tokens(TABLE_ROW)
+
+        self.assertGreater(prose_ratio, 3.0)
+        self.assertLess(table_ratio, 2.5)
+        self.assertEqual(estimate_text_tokens("   \n  "), 0)
+
+
+class TestTokenStrategy(unittest.TestCase):
+    """Tests para la estrategia de presupuesto de tokens"""
+
+    def setUp(self):
+        """Configuración inicial para cada test"""
+        paragraphs = [f"Requisito {n}: {PROSE}" if n % 3 else TABLE_ROW for n in range(60)]
+        self.text = "\n".join(paragraphs)
+
+    def test_chunks_fit_the_budget_and_keep_every_paragraph(self):
+        """Test que cada chunk cabe en el presupuesto y no se pierde ningún párrafo"""
+        chunker = DocumentChunker(strategy=ChunkingStrategy.TOKEN, max_chunk_tokens=200, overlap_tokens=0)
+
+        chunks = chunker.split_document_into_chunks(self.text)
+
+        self.assertGreater(len(chunks), 1)
+        self.assertTrue(all(estimate_text_tokens(chunk) <= 200 for chunk in chunks))
+        self.assertEqual("\n".join(chunks), self.text)
+
+    def test_overlap_repeats_the_tail_of_the_previous_chunk(self):
+        """Test que cada chunk empieza con el final del anterior, sin superar el solapamiento"""
+        chunker = DocumentChunker(strategy=ChunkingStrategy.TOKEN, max_chunk_tokens=200, overlap_tokens=60)
+
+        chunks = chunker.split_document_into_chunks(self.text)
+
+        for previous, current in zip(chunks, chunks[1:]):
+            previous_lines, current_lines = previous.split("\n"), current.split("\n")
+            shared = max(k for k in range(len(current_lines)) if k == 0 or previous_lines[-k:] == current_lines[:k])
+            self.assertGreaterEqual(shared, 1)
+            self.assertLessEqual(estimate_text_tokens("\n".join(current_lines[:shared])), 60)
+        self.assertTrue(all(estimate_text_tokens(chunk) <= 200 for chunk in chunks))
+
+    def test_oversized_paragraph_is_split_by_sentences_and_words(self):
+        """Test que un párrafo más grande que el presupuesto se divide sin exceder el límite"""
+        chunker = DocumentChunker(strategy=ChunkingStrategy.TOKEN, max_chunk_tokens=30, overlap_tokens=0)
+        text = PROSE + " " + " ".join(["palabra"] * 100)
+
+        chunks = chunker.split_document_into_chunks(text)
+
+        self.assertTrue(all(estimate_text_tokens(chunk) <= 30 for chunk in chunks))
+        self.assertEqual(" ".join(chunks).split(), text.split())
+
+
+class TestLinearAssembly(unittest.TestCase):
+    """Tests de rendimiento del armado de chunks sobre documentos grandes"""
+
+    def test_large_document_is_split_quickly(self):
+        """Test que un documento grande se divide en tiempo lineal con todas las estrategias"""
+        text = "\n".join(f"{n}. {PROSE}" for n in range(20000))
+
+        for strategy in ChunkingStrategy:
+            with self.subTest(strategy.value):
+                chunker = DocumentChunker(max_chunk_size=200000, strategy=strategy, max_chunk_tokens=50000)
+                start = time.time()
+                chunks = chunker.split_document_into_chunks(text)
+                self.assertLess(time.time() - start, 3.0)
+                self.assertGreater(len(chunks), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
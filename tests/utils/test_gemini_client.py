@@ -0,0 +1,60 @@
+"""
+Tests unitarios para el registro de clientes de Gemini
+"""
+import threading
+import unittest
+from unittest.mock import patch
+
+from app.utils.gemini_client import GeminiClientRegistry
+
+
+@patch('app.utils.gemini_client.genai')
+class TestGeminiClientRegistry(unittest.TestCase):
+    """Tests para GeminiClientRegistry"""
+
+    def test_sdk_configured_once_and_models_reused(self, mock_genai):
+        """Test que el SDK se configura una vez y el modelo se reutiliza por (modelo, configuración)"""
+        registry = GeminiClientRegistry()
+
+        first = registry.get_model('gemini-a', api_key='k1')
+        second = registry.get_model('gemini-a', api_key='k1')
+        registry.get_model('gemini-a', {'temperature': 0.2}, api_key='k1')
+
+        self.assertIs(first, second)
+        mock_genai.configure.assert_called_once_with(api_key='k1')
+        self.assertEqual(mock_genai.GenerativeModel.call_count, 2)
+
+    def test_new_api_key_reconfigures_and_drops_models(self, mock_genai):
+        """Test que otra API key reconfigura el SDK y crea modelos nuevos"""
+        registry = GeminiClientRegistry()
+        registry.get_model('gemini-a', api_key='k1')
+
+        registry.get_model('gemini-a', api_key='k2')
+
+        self.assertEqual([c.kwargs['api_key'] for c in mock_genai.configure.call_args_list], ['k1', 'k2'])
+        self.assertEqual(mock_genai.GenerativeModel.call_count, 2)
+
+    def test_missing_api_key_raises(self, mock_genai):
+        """Test que sin API key se informa el error sin tocar el SDK"""
+        with patch('app.utils.gemini_client.Config.GOOGLE_API_KEY', None):
+            with self.assertRaises(ValueError):
+                GeminiClientRegistry().get_model('gemini-a')
+        mock_genai.configure.assert_not_called()
+
+    def test_concurrent_requests_share_one_model(self, mock_genai):
+        """Test que peticiones concurrentes obtienen la misma instancia con una sola configuración"""
+        registry = GeminiClientRegistry()
+        models = []
+        threads = [threading.Thread(target=lambda: models.append(registry.get_model('gemini-a', api_key='k1')))
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len({id(m) for m in models}), 1)
+        mock_genai.configure.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+"""
+Tests unitarios para la caché de respuestas del modelo
+"""
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+from app.utils.llm_cache import LLMResponseCache, compute_cache_key, skip_cache_reads
+from app.utils.llm_call import governed_generate_content
+
+
+class TestLLMResponseCache(unittest.TestCase):
+    """Tests para LLMResponseCache"""
+
+    def setUp(self):
+        """Configuración inicial para cada test"""
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, True)
+        self.cache = LLMResponseCache(path=os.path.join(self.directory, 'cache.db'), ttl_hours=1,
+                                      max_entries=2, enabled=True)
+
+    def test_key_depends_on_model_prompt_and_config(self):
+        """Test que la clave cambia con el modelo, el prompt o la configuración"""
+        base = compute_cache_key('gemini', 'prompt', {'temperature': 0.2})
+
+        self.assertEqual(base, compute_cache_key('gemini', 'prompt', {'temperature': 0.2}))
+        self.assertNotEqual(base, compute_cache_key('otro', 'prompt', {'temperature': 0.2}))
+        self.assertNotEqual(base, compute_cache_key('gemini', 'prompt 2', {'temperature': 0.2}))
+        self.assertNotEqual(base, compute_cache_key('gemini', 'prompt', {'temperature': 0.9}))
+
+    def test_hits_and_misses_are_counted(self):
+        """Test que los aciertos y fallos se cuentan"""
+        self.assertIsNone(self.cache.get('k'))
+        self.cache.set('k', 'gemini', 'respuesta')
+
+        self.assertEqual(self.cache.get('k'), 'respuesta')
+        stats = self.cache.get_stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['entries']), (1, 1, 1))
+        self.assertEqual(stats['hit_rate'], 0.5)
+
+    def test_expired_entries_are_not_served(self):
+        """Test que una respuesta con TTL vencido no se reutiliza"""
+        with patch('app.utils.llm_cache.time.time', return_value=1000.0):
+            self.cache.set('k', 'gemini', 'respuesta')
+        with patch('app.utils.llm_cache.time.time', return_value=1000.0 + 3601):
+            self.assertIsNone(self.cache.get('k'))
+
+        self.assertEqual(self.cache.get_stats()['entries'], 0)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        """Test que al superar el máximo se expulsa la entrada menos usada"""
+        with patch('app.utils.llm_cache.time.time', side_effect=[1.0, 2.0, 3.0, 4.0, 5.0, 6.0, 7.0]):
+            self.cache.set('a', 'gemini', 'A')
+            self.cache.set('b', 'gemini', 'B')
+            self.cache.get('a')
+            self.cache.set('c', 'gemini', 'C')
+
+            self.assertEqual(self.cache.get('a'), 'A')
+            self.assertIsNone(self.cache.get('b'))
+            self.assertEqual(self.cache.get('c'), 'C')
+
+    def test_retry_skips_cached_response(self):
+        """Test que dentro de un reintento no se leen respuestas de caché"""
+        self.cache.set('k', 'gemini', 'respuesta')
+
+        with skip_cache_reads():
+            self.assertIsNone(self.cache.get('k'))
+        self.assertEqual(self.cache.get('k'), 'respuesta')
+
+
+class TestGovernedGenerateContentCache(unittest.TestCase):
+    """Tests de la caché delante de governed_generate_content"""
+
+    def setUp(self):
+        """Configuración inicial para cada test"""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, True)
+        cache = LLMResponseCache(path=os.path.join(directory, 'cache.db'), enabled=True)
+        patcher = patch('app.utils.llm_call.get_llm_cache', return_value=cache)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.model = MagicMock(model_name='models/gemini-test', _generation_config={'temperature': 0.2})
+        self.model.generate_content.return_value = MagicMock(text='[{"a": 1}]', usage_metadata=None)
+
+    def test_identical_prompt_is_served_from_cache(self):
+        """Test que un prompt idéntico no vuelve a llamar al modelo"""
+        first = governed_generate_content(self.model, 'prompt', request_options={'timeout': 10})
+        second = governed_generate_content(self.model, 'prompt', request_options={'timeout': 99})
+
+        self.assertEqual(first.text, second.text)
+        self.assertEqual(self.model.generate_content.call_count, 1)
+
+    def test_streaming_listener_receives_cached_text(self):
+        """Test que en streaming la respuesta en caché se entrega al listener"""
+        governed_generate_content(self.model, 'prompt')
+        received = []
+
+        governed_generate_content(self.model, 'prompt', on_text=received.append)
+
+        self.assertEqual(received, ['[{"a": 1}]'])
+        self.assertEqual(self.model.generate_content.call_count, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,28 @@
+"""
+Tests unitarios para el camino de las llamadas al modelo
+"""
+import unittest
+from unittest.mock import MagicMock, patch
+
+from app.utils.llm_call import governed_generate_content
+
+
+class TestGovernedGenerateContent(unittest.TestCase):
+    """Tests para governed_generate_content"""
+
+    def test_quota_error_is_reported_with_api_delay(self):
+        """Test que un 429 se registra con el tiempo sugerido por la API"""
+        governor = MagicMock()
+        model = MagicMock()
+        model.generate_content.side_effect = Exception("429 Resource exhausted. Please retry in 17.5s")
+
+        with patch('app.utils.llm_call.get_quota_governor', return_value=governor):
+            with self.assertRaises(Exception):
+                governed_generate_content(model, "prompt")
+
+        governor.acquire.assert_called_once()
+        governor.report_quota_exceeded.assert_called_once_with(17.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+"""
+Tests unitarios para la grabación y reproducción de llamadas al modelo
+"""
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+from app.utils.chunk_executor import ChunkExecutor
+from app.utils.llm_cache import cache_key_for_call
+from app.utils.llm_cassette import CassetteMissError, LLMCassette, RECORD, REPLAY, use_cassette
+from app.utils.llm_call import governed_generate_content
+from app.utils.quota_governor import is_quota_error
+from app.utils.retry_utils import call_with_retry
+
+
+class TestLLMCassette(unittest.TestCase):
+    """Tests para LLMCassette y su uso desde governed_generate_content"""
+
+    def setUp(self):
+        """Configuración inicial para cada test"""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, True)
+        self.path = os.path.join(directory, 'pipeline.jsonl')
+        self.model = MagicMock(model_name='models/gemini-test', _generation_config={'temperature': 0.2})
+        self.model.generate_content.side_effect = lambda prompt, **kwargs: MagicMock(
+            text=f'[{{"respuesta": "{prompt}"}}]', usage_metadata=None)
+
+    def _record(self, *prompts):
+        with use_cassette(self.path, RECORD):
+            for prompt in prompts:
+                governed_generate_content(self.model, prompt)
+        self.model.generate_content.reset_mock()
+
+    def test_replay_returns_recorded_responses_without_calling_the_model(self):
+        """Test que la reproducción devuelve lo grabado sin llamar al modelo"""
+        self._record('prompt A', 'prompt B')
+
+        with use_cassette(self.path, REPLAY):
+            second = governed_generate_content(self.model, 'prompt B')
+            first = governed_generate_content(self.model, 'prompt A')
+
+        self.assertEqual(first.text, '[{"respuesta": "prompt A"}]')
+        self.assertEqual(second.text, '[{"respuesta": "prompt B"}]')
+        self.model.generate_content.assert_not_called()
+        with open(self.path, encoding='utf-8') as f:
+            recorded = [json.loads(line) for line in f]
+        self.assertEqual([r['prompt'] for r in recorded], ['prompt A', 'prompt B'])
+        self.assertTrue(all(r['latency_seconds'] >= 0 for r in recorded))
+
+    def test_unrecorded_prompt_raises(self):
+        """Test que un prompt que no está grabado falla en lugar de llamar a la red"""
+        self._record('prompt A')
+
+        with use_cassette(self.path, REPLAY):
+            with self.assertRaises(CassetteMissError):
+                governed_generate_content(self.model, 'prompt modificado')
+        self.model.generate_content.assert_not_called()
+
+    def test_streaming_listener_receives_replayed_text(self):
+        """Test que en streaming el listener recibe la respuesta reproducida"""
+        self._record('prompt A')
+        received = []
+
+        with use_cassette(self.path, REPLAY):
+            governed_generate_content(self.model, 'prompt A', on_text=received.append)
+
+        self.assertEqual(received, ['[{"respuesta": "prompt A"}]'])
+
+    def test_recorded_latency_is_scaled(self):
+        """Test que la latencia grabada se simula escalada"""
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({'key': 'k', 'model': 'm', 'prompt': 'p', 'response': 'r', 'latency_seconds': 4.0}) + '\n')
+        cassette = LLMCassette(self.path, REPLAY, latency_scale=0.5)
+
+        with patch('app.utils.llm_cassette.time.sleep') as sleep:
+            cassette.call('k', 'm', 'p', MagicMock(), str)
+
+        sleep.assert_called_once_with(2.0)
+
+    def test_injected_quota_errors_are_deterministic_and_retried(self):
+        """Test que los 429 simulados dependen solo de la semilla y se recuperan con reintentos"""
+        self._record('prompt A')
+        key = cache_key_for_call(self.model, 'prompt A', {})
+
+        def failures(seed):
+            cassette = LLMCassette(self.path, REPLAY, error_rate=0.5, seed=seed)
+            outcomes = []
+            for _ in range(20):
+                try:
+                    cassette.call(key, 'm', 'prompt A', MagicMock(), str)
+                    outcomes.append(True)
+                except Exception as e:
+                    self.assertTrue(is_quota_error(e))
+                    outcomes.append(False)
+            return outcomes
+
+        self.assertEqual(failures(7), failures(7))
+        self.assertIn(False, failures(7))
+
+        with use_cassette(self.path, REPLAY, error_rate=0.5, seed=7, retry_after_seconds=0):
+            with patch('app.utils.retry_utils.time.sleep'):
+                response = call_with_retry(lambda: governed_generate_content(self.model, 'prompt A'), max_retries=10)
+        self.assertEqual(response.text, '[{"respuesta": "prompt A"}]')
+
+    def test_replay_skips_quota_pacing_and_latency(self):
+        """Test que la reproducción no espera cuota ni ritmo ni alimenta la latencia, salvo los 429 simulados"""
+        self._record('prompt A')
+        governor = MagicMock()
+
+        with patch('app.utils.llm_call.get_quota_governor', return_value=governor), \
+                patch('app.utils.llm_call.get_latency_tracker') as tracker, \
+                patch('app.utils.chunk_executor.time.sleep') as sleep:
+            with use_cassette(self.path, REPLAY):
+                governed_generate_content(self.model, 'prompt A')
+                ChunkExecutor(max_workers=1, min_interval=10).map_ordered(lambda item: item, ['a', 'b'])
+            with use_cassette(self.path, REPLAY, error_rate=1.0):
+                with self.assertRaises(Exception):
+                    governed_generate_content(self.model, 'prompt A')
+
+        governor.acquire.assert_not_called()
+        tracker.return_value.observe.assert_not_called()
+        sleep.assert_not_called()
+        governor.report_quota_exceeded.assert_called_once()
+
+
+if __name__ == '__main__':
+    unittest.main()
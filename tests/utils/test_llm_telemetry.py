@@ -0,0 +1,81 @@
+"""
+Tests unitarios para la telemetría de llamadas al modelo
+"""
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+from app.utils.llm_telemetry import LLMTelemetryStore, llm_stage, record_pause
+from app.utils.llm_call import governed_generate_content
+from app.utils.retry_utils import call_with_retry
+
+
+class TestLLMTelemetry(unittest.TestCase):
+    """Tests para LLMTelemetryStore y la instrumentación de las llamadas"""
+
+    def setUp(self):
+        """Configuración inicial para cada test"""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, True)
+        self.store = LLMTelemetryStore(path=os.path.join(directory, 'telemetry.db'), enabled=True, max_rows=100)
+        patcher = patch('app.utils.llm_telemetry.get_llm_telemetry', return_value=self.store)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        sleep_patcher = patch('app.utils.retry_utils.time.sleep')
+        sleep_patcher.start()
+        self.addCleanup(sleep_patcher.stop)
+        self.model = MagicMock(model_name='models/gemini-test')
+        self.model.generate_content.return_value = MagicMock(
+            text='respuesta', usage_metadata=MagicMock(prompt_token_count=120, candidates_token_count=30,
+                                                       total_token_count=150))
+
+    def test_retries_and_backoff_are_recorded_in_one_operation(self):
+        """Test que los intentos de call_with_retry se registran como una operación con sus reintentos"""
+        self.model.generate_content.side_effect = [Exception('error temporal'), self.model.generate_content.return_value]
+
+        result = call_with_retry(lambda: governed_generate_content(self.model, 'prompt').text,
+                                 max_retries=3, retry_delay=2, stage='chunk')
+
+        self.assertEqual(result, 'respuesta')
+        chunk = self.store.summary()['stages']['chunk']
+        self.assertEqual((chunk['operations'], chunk['failures'], chunk['retries']), (1, 0, 1))
+        self.assertEqual(chunk['backoff_seconds'], 2)
+        self.assertEqual((chunk['prompt_tokens'], chunk['response_tokens']), (120 + 2, 30))
+        self.assertEqual(chunk['estimated_token_operations'], 1)
+
+    def test_exhausted_retries_are_recorded_as_failure(self):
+        """Test que una operación que agota los reintentos queda registrada como fallida"""
+        self.model.generate_content.side_effect = Exception('caído')
+
+        with self.assertRaises(Exception):
+            call_with_retry(lambda: governed_generate_content(self.model, 'prompt'), max_retries=2, stage='healing')
+
+        healing = self.store.summary()['stages']['healing']
+        self.assertEqual((healing['operations'], healing['failures'], healing['retries']), (1, 1, 1))
+
+    def test_direct_call_uses_active_stage_and_usage_metadata(self):
+        """Test que una llamada directa toma la etapa activa y los tokens reales de usage_metadata"""
+        with llm_stage('analysis'):
+            governed_generate_content(self.model, 'prompt')
+        record_pause('pacing', 1.5)
+
+        summary = self.store.summary()
+        analysis = summary['stages']['analysis']
+        self.assertEqual((analysis['operations'], analysis['prompt_tokens'], analysis['response_tokens']), (1, 120, 30))
+        self.assertEqual(analysis['estimated_token_operations'], 0)
+        self.assertEqual(summary['stages']['pacing']['wall_seconds'], 1.5)
+        self.assertEqual(summary['totals']['operations'], 2)
+
+    def test_oldest_rows_are_discarded(self):
+        """Test que se conservan solo los registros más recientes"""
+        self.store.max_rows = 3
+        for _ in range(5):
+            record_pause('pacing', 1.0)
+
+        self.assertEqual(self.store.summary()['totals']['operations'], 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
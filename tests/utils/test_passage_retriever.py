@@ -0,0 +1,62 @@
+"""
+Tests unitarios para la recuperación de pasajes con BM25
+"""
+import unittest
+
+from app.utils.passage_retriever import BM25Index, split_into_passages, tokenize
+
+
+DOCUMENT = """Introducción general del sistema de ventas y sus módulos.
+
+Módulo de facturación: el usuario emite facturas electrónicas y anula facturas emitidas.
+
+Módulo de inventario: el almacenero registra entradas de mercadería y controla el stock mínimo.
+
+Módulo de reportes: el gerente descarga reportes mensuales de ventas en PDF."""
+
+
+class TestTokenize(unittest.TestCase):
+    """Tests para tokenize"""
+
+    def test_accents_case_and_stopwords_are_normalized(self):
+        """Test que se eliminan tildes, mayúsculas y palabras vacías"""
+        self.assertEqual(tokenize("La Facturación de las FACTURAS 2024"), ['facturacion', 'facturas'])
+
+
+class TestBM25Index(unittest.TestCase):
+    """Tests para BM25Index"""
+
+    def setUp(self):
+        """Configuración inicial para cada test"""
+        self.index = BM25Index.from_document(DOCUMENT, passage_size=100)
+
+    def test_paragraphs_become_passages(self):
+        """Test que cada párrafo corto forma un pasaje"""
+        self.assertEqual(len(self.index.passages), 4)
+        self.assertEqual(split_into_passages("a\n\nb", 10), ["a\nb"])
+
+    def test_most_relevant_passage_ranks_first(self):
+        """Test que el pasaje que comparte términos con la consulta queda primero"""
+        results = self.index.search("Control de stock de mercadería", top_k=2)
+
+        self.assertEqual(results[0][0], 2)
+        self.assertEqual(len(results), 1)
+
+    def test_retrieve_keeps_document_order_and_budget(self):
+        """Test que los pasajes se devuelven en orden del documento y dentro del presupuesto"""
+        query = "reportes mensuales\nanular facturas electrónicas"
+
+        reference = self.index.retrieve(query, top_k=3, max_chars=1000)
+        self.assertLess(reference.index("facturación"), reference.index("reportes"))
+        self.assertNotIn("inventario", reference)
+
+        limited = self.index.retrieve(query, top_k=3, max_chars=100)
+        self.assertEqual(limited.count("Módulo"), 1)
+
+    def test_unrelated_query_returns_empty_reference(self):
+        """Test que una consulta sin términos en común no devuelve pasajes"""
+        self.assertEqual(self.index.retrieve("autenticación biométrica", top_k=3, max_chars=1000), "")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+"""
+Tests unitarios para el gobernador de cuota de Gemini
+"""
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from app.utils.quota_governor import QuotaGovernor, parse_retry_delay
+
+
+class TestQuotaGovernor(unittest.TestCase):
+    """Tests para QuotaGovernor con almacén SQLite compartido"""
+
+    def setUp(self):
+        """Configuración inicial para cada test"""
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir, True)
+        self.path = os.path.join(self.tmpdir, 'quota.db')
+        self.now = 1000.0
+        patcher = patch('app.utils.quota_governor.time.time', side_effect=lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        sleep_patcher = patch('app.utils.quota_governor.time.sleep', side_effect=self._advance)
+        self.sleep = sleep_patcher.start()
+        self.addCleanup(sleep_patcher.stop)
+
+    def _advance(self, seconds):
+        self.now += seconds
+
+    def _governor(self, **kwargs):
+        params = {'rpm': 2, 'tpm': 0, 'store_path': self.path, 'bucket': 'model', 'max_wait': 120, 'cooldown': 15}
+        params.update(kwargs)
+        return QuotaGovernor(**params)
+
+    def test_admits_calls_within_capacity(self):
+        """Test que las llamadas dentro de la cuota no esperan"""
+        governor = self._governor()
+
+        self.assertEqual(governor.acquire(), 0.0)
+        self.assertEqual(governor.acquire(), 0.0)
+        self.sleep.assert_not_called()
+
+    def test_workers_share_the_same_bucket(self):
+        """Test que dos workers (instancias) consumen la misma cuota"""
+        worker_a = self._governor()
+        worker_b = self._governor()
+
+        worker_a.acquire()
+        worker_a.acquire()
+        waited = worker_b.acquire()
+
+        # 2 RPM -> una petición nueva cada 30 s
+        self.assertAlmostEqual(waited, 30.0, delta=0.01)
+
+    def test_token_bucket_limits_large_prompts(self):
+        """Test que el límite TPM retiene llamadas con muchos tokens"""
+        governor = self._governor(rpm=0, tpm=600)
+
+        governor.acquire(600)
+        waited = governor.acquire(300)
+
+        self.assertAlmostEqual(waited, 30.0, delta=0.01)
+
+    def test_quota_error_pauses_every_worker(self):
+        """Test que un 429 en un worker pausa las llamadas del resto"""
+        worker_a = self._governor(rpm=60)
+        worker_b = self._governor(rpm=60)
+
+        worker_a.report_quota_exceeded(retry_after=20)
+        waited = worker_b.acquire()
+
+        self.assertGreaterEqual(waited, 20.0)
+
+    def test_max_wait_sends_call_anyway(self):
+        """Test que la espera nunca supera max_wait"""
+        governor = self._governor(rpm=1, max_wait=10)
+        governor.acquire()
+
+        self.assertEqual(governor.acquire(), 0.0)
+
+    def test_disabled_governor_is_noop(self):
+        """Test que sin límites configurados no se toca el almacén"""
+        governor = self._governor(rpm=0, tpm=0)
+
+        self.assertEqual(governor.acquire(10_000), 0.0)
+        self.assertFalse(os.path.exists(self.path))
+
+
+class TestParseRetryDelay(unittest.TestCase):
+    """Tests para parse_retry_delay"""
+
+    def test_parse_retry_delay_from_grpc_details(self):
+        """Test que se reconoce el formato retry_delay de la API"""
+        self.assertEqual(parse_retry_delay(Exception("quota exceeded retry_delay { seconds: 42 }")), 42.0)
+        self.assertIsNone(parse_retry_delay(Exception("timeout")))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+"""
+Tests unitarios para el empaquetado de segmentos en peticiones compartidas
+"""
+import unittest
+
+from app.utils.request_packing import pack_segments, story_number
+
+
+class TestPackSegments(unittest.TestCase):
+    """Tests para pack_segments"""
+
+    def test_adjacent_segments_are_packed_within_budget(self):
+        """Test que los segmentos se agrupan en orden sin superar el presupuesto ni el máximo"""
+        packs = pack_segments([10, 20, 30, 50, 5, 5, 5, 5], measure=lambda n: n, budget=60, max_segments=3)
+
+        self.assertEqual(packs, [[10, 20, 30], [50, 5, 5], [5, 5]])
+
+    def test_oversized_segment_forms_its_own_pack(self):
+        """Test que un segmento mayor que el presupuesto no se divide ni arrastra a sus vecinos"""
+        packs = pack_segments([5, 100, 5], measure=lambda n: n, budget=60, max_segments=4)
+
+        self.assertEqual(packs, [[5], [100], [5]])
+
+    def test_result_count_caps_the_pack(self):
+        """Test que el máximo de resultados por paquete corta aunque quede presupuesto"""
+        batches = [range(0, 5), range(5, 10), range(10, 12), range(12, 14)]
+
+        packs = pack_segments(batches, measure=lambda b: 1, budget=100, max_segments=4, count=len, max_count=10)
+
+        self.assertEqual([[b.start for b in pack] for pack in packs], [[0, 5], [10, 12]])
+
+    def test_single_segment_per_pack_disables_packing(self):
+        """Test que con máximo 1 cada segmento va en su propia petición"""
+        self.assertEqual(pack_segments(['a', 'b'], measure=len, budget=100, max_segments=1), [['a'], ['b']])
+        self.assertEqual(pack_segments([], measure=len, budget=100, max_segments=4), [])
+
+
+class TestStoryNumber(unittest.TestCase):
+    """Tests para story_number"""
+
+    def test_story_headers(self):
+        """Test que se extrae el número de cabeceras funcionales y no funcionales"""
+        self.assertEqual(story_number("HISTORIA #12: Registrar pago"), 12)
+        self.assertEqual(story_number("Historia No Funcional # 3 - Rendimiento"), 3)
+        self.assertIsNone(story_number("Historia de usuario general"))
+        self.assertIsNone(story_number(None))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,59 @@
+"""
+Tests unitarios para los almacenes en archivos SQLite locales
+"""
+import os
+import shutil
+import tempfile
+import unittest
+
+from app.utils.sqlite_store import SQLiteFileStore, process_singleton, resolve_store_path
+
+
+class _CounterStore(SQLiteFileStore):
+    """Almacén mínimo para tests"""
+
+    SCHEMA = ('CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)',)
+
+
+class TestSQLiteFileStore(unittest.TestCase):
+    """Tests para SQLiteFileStore"""
+
+    def setUp(self):
+        """Configuración inicial para cada test"""
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, True)
+        self.store = _CounterStore(os.path.join(self.directory, 'store.db'))
+
+    def test_schema_is_created_on_first_access(self):
+        """Test que el esquema se crea al primer uso y no al construir el almacén"""
+        self.assertFalse(os.path.exists(self.store.path))
+
+        with self.store._connection() as conn:
+            conn.execute("INSERT INTO counters (name, value) VALUES ('a', 1)")
+            self.assertEqual(conn.execute('SELECT value FROM counters').fetchone()[0], 1)
+
+    def test_failed_transaction_is_rolled_back(self):
+        """Test que una transacción con error no deja cambios"""
+        with self.assertRaises(RuntimeError):
+            with self.store._transaction() as conn:
+                conn.execute("INSERT INTO counters (name, value) VALUES ('a', 1)")
+                raise RuntimeError('fallo')
+
+        with self.store._connection() as conn:
+            self.assertEqual(conn.execute('SELECT COUNT(*) FROM counters').fetchone()[0], 0)
+
+    def test_path_resolution_order(self):
+        """Test que la ruta explícita gana a la configurada y esta al archivo temporal"""
+        self.assertEqual(resolve_store_path('a.db', 'b.db', 'c.db'), 'a.db')
+        self.assertEqual(resolve_store_path(None, 'b.db', 'c.db'), 'b.db')
+        self.assertEqual(resolve_store_path(None, None, 'c.db'), os.path.join(tempfile.gettempdir(), 'c.db'))
+
+    def test_singleton_creates_one_instance(self):
+        """Test que el accesor crea la instancia una sola vez"""
+        get = process_singleton(object)
+
+        self.assertIs(get(), get())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+"""
+Tests unitarios para los parsers incrementales de respuestas en streaming
+"""
+import json
+import unittest
+from unittest.mock import MagicMock
+
+from app.utils.stream_parsers import IncrementalJSONArrayParser, IncrementalStorySplitter, stream_emitter
+from app.utils.llm_call import governed_generate_content
+
+
+def _split(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+class TestIncrementalJSONArrayParser(unittest.TestCase):
+    """Tests para IncrementalJSONArrayParser"""
+
+    def setUp(self):
+        """Configuración inicial para cada test"""
+        self.cases = [
+            {'id_caso_prueba': 'TC001', 'titulo_caso_prueba': 'Login {válido}', 'Pasos': ['Abrir', 'Ingresar "x"']},
+            {'id_caso_prueba': 'TC002', 'titulo_caso_prueba': 'Cerrar ] sesión', 'Pasos': []},
+        ]
+        self.response = "```json\n" + json.dumps(self.cases, ensure_ascii=False, indent=2) + "\n```"
+
+    def test_objects_split_across_fragments(self):
+        """Test que cada objeto se entrega completo sin importar cómo llegan los fragmentos"""
+        for size in (1, 3, 17, len(self.response)):
+            parser = IncrementalJSONArrayParser()
+            items = [item for fragment in _split(self.response, size) for item in parser.feed(fragment)]
+            self.assertEqual(items, self.cases, f"fragmentos de {size}")
+
+    def test_object_emitted_as_soon_as_it_closes(self):
+        """Test que el primer objeto se entrega antes de que termine el array"""
+        parser = IncrementalJSONArrayParser()
+        first_end = self.response.index('}', self.response.index('"Pasos"')) + 1
+
+        self.assertEqual(parser.feed(self.response[:first_end]), [self.cases[0]])
+        self.assertEqual(parser.feed(self.response[first_end:]), [self.cases[1]])
+
+    def test_escaped_quotes_and_malformed_objects(self):
+        """Test que las comillas escapadas no rompen el estado y un objeto inválido se omite"""
+        parser = IncrementalJSONArrayParser()
+
+        items = parser.feed('[{"a": "dice \\"}\\" fin"}, {"b": tru}, {"c": 1}]')
+
+        self.assertEqual(items, [{'a': 'dice "}" fin'}, {'c': 1}])
+
+
+class TestIncrementalStorySplitter(unittest.TestCase):
+    """Tests para IncrementalStorySplitter"""
+
+    def test_story_completed_when_next_header_arrives(self):
+        """Test que una historia se entrega al llegar la cabecera de la siguiente"""
+        splitter = IncrementalStorySplitter()
+
+        self.assertEqual(splitter.feed("Intro\nHISTORIA #1: Login\nComo usuario quiero entrar\n"), [])
+        self.assertEqual(splitter.feed("HISTORIA #2: Logout\nComo usuario quiero salir"),
+                         ["HISTORIA #1: Login\nComo usuario quiero entrar"])
+        self.assertEqual(splitter.close(), ["HISTORIA #2: Logout\nComo usuario quiero salir"])
+
+    def test_header_split_across_fragments(self):
+        """Test que una cabecera partida entre fragmentos se reconoce"""
+        text = "HISTORIA #1: A\nTexto uno\nHISTORIA NO FUNCIONAL #2: B\nTexto dos\n"
+        splitter = IncrementalStorySplitter()
+
+        stories = [s for fragment in _split(text, 4) for s in splitter.feed(fragment)] + splitter.close()
+
+        self.assertEqual(stories, ["HISTORIA #1: A\nTexto uno", "HISTORIA NO FUNCIONAL #2: B\nTexto dos"])
+
+
+class TestStreamingDelivery(unittest.TestCase):
+    """Tests para stream_emitter y governed_generate_content en streaming"""
+
+    def test_retry_does_not_repeat_delivered_items(self):
+        """Test que un reintento omite los resultados ya entregados"""
+        on_partial = MagicMock()
+
+        first = stream_emitter(on_partial, 'test_case')
+        first('a')
+        retry = stream_emitter(on_partial, 'test_case', skip=1)
+        retry('a')
+        retry('b')
+
+        self.assertEqual([c.args for c in on_partial.call_args_list], [('test_case', 'a'), ('test_case', 'b')])
+
+    def test_governed_generate_content_streams_fragments(self):
+        """Test que con on_text se pide streaming y se entrega cada fragmento"""
+        chunks = [MagicMock(text='[{"a"'), MagicMock(text=': 1}]')]
+        response = MagicMock()
+        response.__iter__.return_value = iter(chunks)
+        model = MagicMock()
+        model.generate_content.return_value = response
+        received = []
+
+        result = governed_generate_content(model, 'prompt', on_text=received.append)
+
+        self.assertIs(result, response)
+        self.assertEqual(received, ['[{"a"', ': 1}]'])
+        self.assertTrue(model.generate_content.call_args.kwargs['stream'])
+
+
+if __name__ == '__main__':
+    unittest.main()